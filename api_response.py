@@ -0,0 +1,150 @@
+"""
+Serialización JSON rápida y compresión de las respuestas de la API
+"""
+
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+
+import config
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+
+# Tipos de contenido que vale la pena comprimir
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serializa un objeto a JSON compacto en UTF-8.
+
+    Args:
+        obj (Any): Objeto a serializar
+
+    Returns:
+        bytes: JSON codificado
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=DefaultJSONProvider.default, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask que usa orjson si está instalado.
+
+    jsonify() sigue funcionando igual; las claves no se ordenan y en modo
+    debug la salida se indenta con el codificador estándar.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(obj)
+        return self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
+
+
+def to_columnar(contacts: List[Dict[str, Any]], fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Convierte una lista de contactos en columnas (un arreglo por campo).
+
+    Para páginas grandes el resultado es más chico y rápido de serializar,
+    porque los nombres de campo no se repiten en cada contacto.
+
+    Args:
+        contacts (List[Dict[str, Any]]): Contactos
+        fields (Optional[Sequence[str]]): Campos a incluir (por defecto todos los presentes)
+
+    Returns:
+        Dict[str, Any]: fields, count y columns ({campo: [valores]})
+    """
+    if fields is None:
+        fields = list(dict.fromkeys(key for contact in contacts for key in contact))
+    return {
+        'fields': list(fields),
+        'count': len(contacts),
+        'columns': {field: [contact.get(field) for contact in contacts] for field in fields}
+    }
+
+
+def _accepted_encoding() -> Optional[str]:
+    """
+    Elige la codificación según Accept-Encoding (brotli antes que gzip).
+    """
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Comprime la respuesta si el cliente lo acepta y supera el tamaño mínimo.
+
+    Las respuestas en streaming (como los eventos SSE) no se comprimen.
+
+    Args:
+        response (Response): Respuesta de Flask
+
+    Returns:
+        Response: La misma respuesta, comprimida si corresponde
+    """
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < config.COMPRESSION_MIN_BYTES:
+        return response
+
+    encoding = _accepted_encoding()
+    if encoding == 'br':
+        data = brotli.compress(data, quality=config.BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        data = gzip.compress(data, compresslevel=config.GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app: Flask):
+    """
+    Instala el proveedor JSON rápido y la compresión en una aplicación Flask.
+
+    Args:
+        app (Flask): Aplicación
+    """
+    app.json = FastJSONProvider(app)
+    app.after_request(compress_response)
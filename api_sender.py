@@ -0,0 +1,437 @@
+"""
+Envío de mensajes a través de una API HTTP usando asyncio
+"""
+
+import asyncio
+import random
+import time
+from typing import List, Dict, Optional, Tuple
+
+import aiohttp
+
+import config
+import logger
+import utils
+from event_bus import EventBus
+from message_sender import SendingStats
+
+
+# Códigos HTTP que justifican un reintento
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Limitador de tasa tipo token bucket.
+
+    Las reservas pueden dejar el saldo en negativo: cada solicitud obtiene su
+    turno en orden de llegada y espera el tiempo necesario para que se repongan
+    los tokens que consumió.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("La tasa del token bucket debe ser mayor a 0")
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._last = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Reserva tokens y retorna cuánto hay que esperar para usarlos.
+
+        Args:
+            tokens (float): Tokens a consumir
+
+        Returns:
+            float: Segundos de espera (0 si hay saldo disponible)
+        """
+        self._refill()
+        self.tokens -= tokens
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    async def acquire(self, tokens: float = 1):
+        """
+        Espera hasta disponer de los tokens solicitados.
+
+        Args:
+            tokens (float): Tokens a consumir
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class ApiMessageSender:
+    """
+    Envía mensajes a una API HTTP manteniendo varias solicitudes en vuelo
+    sobre un único pool de conexiones.
+    """
+
+    def __init__(self, base_url: str = config.API_BASE_URL,
+                 api_token: str = config.API_TOKEN,
+                 concurrency: int = config.API_MAX_CONCURRENCY,
+                 rate_per_second: float = config.API_RATE_PER_SECOND,
+                 burst: int = config.API_BURST,
+                 max_retries: int = config.API_MAX_RETRIES,
+                 backoff_base: float = config.API_BACKOFF_BASE,
+                 backoff_max: float = config.API_BACKOFF_MAX,
+                 default_account: str = config.API_DEFAULT_ACCOUNT,
+                 progress_callback=None,
+                 events: Optional[EventBus] = None):
+        if not base_url:
+            raise ValueError("No se configuró la URL de la API (WHATSAPP_API_URL)")
+        self.base_url = base_url.rstrip('/')
+        self.api_token = api_token
+        self.concurrency = max(1, concurrency)
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.default_account = default_account
+        self.progress_callback = progress_callback
+        self.events = events or EventBus()
+        self.stats = SendingStats()
+        self.is_sending = False
+        self.should_stop = False
+        self._paused = False
+        self.message_template = config.DEFAULT_MESSAGE_TEMPLATE
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._processed = 0
+
+    def send_messages_to_contacts(self, contacts: List[Dict],
+                                  limit: Optional[int] = None,
+                                  message_template: Optional[str] = None) -> SendingStats:
+        """
+        Envía mensajes a una lista de contactos de forma concurrente.
+
+        Args:
+            contacts (List[Dict]): Lista de contactos
+            limit (Optional[int]): Límite de mensajes a enviar
+            message_template (Optional[str]): Plantilla para los contactos sin mensaje propio
+
+        Returns:
+            SendingStats: Estadísticas del envío
+        """
+        return asyncio.run(self.send_messages_async(contacts, limit, message_template))
+
+    async def send_messages_async(self, contacts: List[Dict],
+                                  limit: Optional[int] = None,
+                                  message_template: Optional[str] = None) -> SendingStats:
+        """
+        Versión asíncrona de send_messages_to_contacts.
+
+        Args:
+            contacts (List[Dict]): Lista de contactos
+            limit (Optional[int]): Límite de mensajes a enviar
+            message_template (Optional[str]): Plantilla para los contactos sin mensaje propio
+
+        Returns:
+            SendingStats: Estadísticas del envío
+        """
+        contacts_to_process = contacts[:limit] if limit else contacts
+
+        self.stats = SendingStats()
+        self.stats.total_contacts = len(contacts_to_process)
+        self.stats.start_time = time.time()
+        self.is_sending = True
+        self.should_stop = False
+        self.message_template = message_template or config.DEFAULT_MESSAGE_TEMPLATE
+        self._buckets = {}
+        self._processed = 0
+
+        logger.log_session_start(len(contacts), self.stats.total_contacts)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for contact in contacts_to_process:
+            queue.put_nowait(contact)
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=config.API_REQUEST_TIMEOUT)
+        headers = {'Authorization': f"Bearer {self.api_token}"} if self.api_token else None
+
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                             headers=headers) as session:
+                workers = [
+                    asyncio.create_task(self._worker(session, queue))
+                    for _ in range(min(self.concurrency, max(1, len(contacts_to_process))))
+                ]
+                await asyncio.gather(*workers)
+
+        except Exception as e:
+            logger.log_error("Error durante el envío de mensajes por API", e)
+
+        finally:
+            self.stats.end_time = time.time()
+            self.is_sending = False
+            logger.log_session_end(
+                self.stats.messages_sent,
+                self.stats.total_contacts,
+                self.stats.messages_failed
+            )
+
+        return self.stats
+
+    async def _worker(self, session: aiohttp.ClientSession, queue: asyncio.Queue):
+        """
+        Toma contactos de la cola hasta vaciarla o hasta que se detenga el envío.
+
+        Args:
+            session (aiohttp.ClientSession): Sesión HTTP compartida
+            queue (asyncio.Queue): Cola de contactos pendientes
+        """
+        while not self.should_stop:
+            if self._paused:
+                await asyncio.sleep(0.2)
+                continue
+
+            try:
+                contact = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                status, error = await self._process_contact(session, contact)
+            except Exception as e:
+                nombre = contact.get('nombre', 'Sin nombre')
+                logger.log_error(f"Error al enviar mensaje a {nombre}", e)
+                logger.log_message_sent(nombre, contact.get('telefono', ''),
+                                        contact.get('mensaje', ''), "ERROR", str(e))
+                self.stats.messages_failed += 1
+                status, error = "ERROR", str(e)
+
+            self._processed += 1
+            self._publish_result(self._processed, contact, status, error)
+            if self.progress_callback:
+                self.progress_callback(self._processed, self.stats.total_contacts)
+
+    async def _process_contact(self, session: aiohttp.ClientSession, contact: Dict) -> Tuple[str, str]:
+        """
+        Valida, formatea y envía el mensaje de un contacto.
+
+        Args:
+            session (aiohttp.ClientSession): Sesión HTTP compartida
+            contact (Dict): Datos del contacto
+
+        Returns:
+            Tuple[str, str]: Estado (ENVIADO, SALTADO o ERROR) y descripción del error
+        """
+        nombre = contact.get('nombre', 'Sin nombre')
+        telefono = contact.get('telefono', '')
+        mensaje = contact.get('mensaje') or self.message_template
+
+        if not utils.validate_phone_number(telefono):
+            error_msg = f"Número de teléfono inválido: {telefono}"
+            logger.log_warning(error_msg)
+            logger.log_message_sent(nombre, telefono, mensaje, "SALTADO", error_msg)
+            self.stats.messages_skipped += 1
+            return "SALTADO", error_msg
+
+        mensaje_formateado = utils.format_message(mensaje, contact)
+        account = str(contact.get('cuenta') or self.default_account)
+
+        error = await self._post_with_retries(session, account, telefono, mensaje_formateado)
+
+        if error is None:
+            logger.log_info(config.MESSAGES["message_sent"].format(contact=nombre))
+            logger.log_message_sent(nombre, telefono, mensaje_formateado, "ENVIADO")
+            self.stats.messages_sent += 1
+            return "ENVIADO", ""
+
+        logger.log_warning(config.MESSAGES["message_failed"].format(contact=nombre, error=error))
+        logger.log_message_sent(nombre, telefono, mensaje_formateado, "ERROR", error)
+        self.stats.messages_failed += 1
+        return "ERROR", error
+
+    def _publish_result(self, current: int, contact: Dict, status: str, error: str = ""):
+        """
+        Publica el resultado de un contacto y los contadores actualizados,
+        con los mismos datos que MessageSender.
+
+        Args:
+            current (int): Contactos procesados hasta este
+            contact (Dict): Datos del contacto
+            status (str): ENVIADO, SALTADO o ERROR
+            error (str): Descripción del error, si lo hubo
+        """
+        if not self.events.has_subscribers():
+            return
+
+        self.events.publish('contact_result', {
+            'position': current,
+            'total': self.stats.total_contacts,
+            'nombre': contact.get('nombre', 'Sin nombre'),
+            'telefono': contact.get('telefono', ''),
+            'status': status,
+            'error': error
+        })
+        self.events.publish('progress', self.get_progress())
+
+    def get_progress(self) -> Dict:
+        """
+        Obtiene los contadores del envío y el tiempo estimado restante.
+
+        Returns:
+            Dict: Contadores, porcentaje y ETA en segundos (None si no se puede estimar)
+        """
+        processed = self.stats.messages_sent + self.stats.messages_failed + self.stats.messages_skipped
+        total = self.stats.total_contacts
+        remaining = max(0, total - processed)
+
+        eta = None
+        if processed and self.stats.start_time:
+            elapsed = time.time() - self.stats.start_time
+            eta = round(elapsed / processed * remaining, 1)
+
+        return {
+            'processed': processed,
+            'total': total,
+            'percentage': round(processed / total * 100, 1) if total else 0.0,
+            'messages_sent': self.stats.messages_sent,
+            'messages_failed': self.stats.messages_failed,
+            'messages_skipped': self.stats.messages_skipped,
+            'messages_retried': self.stats.messages_retried,
+            'messages_suppressed': self.stats.messages_suppressed,
+            'pending_retries': 0,
+            'eta_seconds': eta
+        }
+
+    async def _post_with_retries(self, session: aiohttp.ClientSession, account: str,
+                                 telefono: str, mensaje: str) -> Optional[str]:
+        """
+        Envía la solicitud a la API respetando el límite de la cuenta y
+        reintentando ante respuestas 429/5xx o errores de red.
+
+        Args:
+            session (aiohttp.ClientSession): Sesión HTTP compartida
+            account (str): Cuenta emisora
+            telefono (str): Teléfono de destino
+            mensaje (str): Mensaje ya formateado
+
+        Returns:
+            Optional[str]: None si el envío fue exitoso, o la descripción del error
+        """
+        url = f"{self.base_url}{config.API_SEND_PATH}"
+        payload = {'account': account, 'to': telefono, 'text': mensaje}
+        bucket = self._get_bucket(account)
+        error = None
+
+        for attempt in range(self.max_retries + 1):
+            if self.should_stop:
+                return "Envío detenido por el usuario"
+
+            await bucket.acquire()
+            retry_after = None
+
+            try:
+                async with session.post(url, json=payload) as response:
+                    if response.status < 300:
+                        return None
+
+                    body = await response.text()
+                    error = f"HTTP {response.status}: {utils.truncate_string(body, 100)}"
+                    if response.status not in RETRYABLE_STATUS:
+                        return error
+                    retry_after = utils.safe_float(response.headers.get('Retry-After'), None)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"Error de red: {e.__class__.__name__}"
+
+            if attempt < self.max_retries:
+                delay = self._backoff_delay(attempt, retry_after)
+                logger.log_debug(f"Reintentando envío a {telefono} en {delay:.2f}s ({error})")
+                await asyncio.sleep(delay)
+
+        return error
+
+    def _get_bucket(self, account: str) -> TokenBucket:
+        """
+        Obtiene (o crea) el token bucket de una cuenta.
+
+        Args:
+            account (str): Cuenta emisora
+
+        Returns:
+            TokenBucket: Limitador de la cuenta
+        """
+        bucket = self._buckets.get(account)
+        if bucket is None:
+            bucket = TokenBucket(self.rate_per_second, self.burst)
+            self._buckets[account] = bucket
+        return bucket
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Calcula la espera antes de un reintento (backoff exponencial con jitter completo).
+
+        Args:
+            attempt (int): Número de intento fallido (desde 0)
+            retry_after (Optional[float]): Valor de la cabecera Retry-After si existe
+
+        Returns:
+            float: Segundos de espera
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def stop_sending(self):
+        """
+        Detiene el envío de mensajes.
+        """
+        self.should_stop = True
+        logger.log_info("Solicitando detener el envío de mensajes...")
+
+    def pause_sending(self):
+        """
+        Pausa el envío: las solicitudes en vuelo terminan, no se inician nuevas.
+        """
+        self._paused = True
+        logger.log_info("Envío de mensajes pausado")
+
+    def resume_sending(self):
+        """
+        Reanuda el envío tras una pausa.
+        """
+        self._paused = False
+        logger.log_info("Envío de mensajes reanudado")
+
+    def is_paused(self) -> bool:
+        """
+        Verifica si el envío está pausado.
+
+        Returns:
+            bool: True si el envío está pausado
+        """
+        return self._paused
+
+    def get_stats(self) -> SendingStats:
+        """
+        Obtiene las estadísticas actuales.
+
+        Returns:
+            SendingStats: Estadísticas del envío
+        """
+        return self.stats
+
+    def is_sending_active(self) -> bool:
+        """
+        Verifica si el envío está activo.
+
+        Returns:
+            bool: True si el envío está activo
+        """
+        return self.is_sending
@@ -4,11 +4,14 @@ Interfaz web moderna para el bot de WhatsApp
 Inspirada en shadcn/ui con Flask + SocketIO
 """
 
-from flask import Flask, request, jsonify
-from flask_socketio import SocketIO, emit
+from flask import Flask, request, jsonify, send_file, g
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
+import functools
+import hmac
 import os
 import json
+import tempfile
 import threading
 import time
 from pathlib import Path
@@ -19,10 +22,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Importar módulos del bot
-from data_manager import DataManager
-from main import WhatsAppBot
+import api_response
+from campaign import CampaignSettings
+from contact_cache import get_default_cache
+from contact_index import ContactIndex
+from job_manager import JobManager, JobStateError, WorkerUnavailableError
+from log_buffer import LogBuffer
+from progress_relay import ProgressRelay
+from shared_state import SharedStateStore, SQLitePubSubManager
+import task_pool as tasks
+from task_pool import TaskPool, TaskPoolBusyError, TaskTimeoutError
+from upload_stream import receive_upload, UploadError
+from upload_store import BlobMissingError, UploadStore
 import config
+import instrumentation
 import logger
+import metrics
+import profiling
+import utils
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'whatsapp_bot_secret_key')
@@ -32,17 +49,22 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 # Enable CORS for all routes
 CORS(app, origins=["*"])
 
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# JSON con orjson (si está instalado) y compresión gzip/brotli
+api_response.init_app(app)
 
-# Variables globales para el estado del bot
-bot_instance = None
-bot_running = False
-current_stats = {
-    'total_contacts': 0,
-    'messages_sent': 0,
-    'current_contact': '',
-    'status': 'idle'
-}
+# Con varios workers de gunicorn o con el worker del navegador las campañas
+# y los eventos se comparten entre procesos
+shared_state = SharedStateStore() if config.WEB_CONCURRENCY > 1 or config.BROWSER_WORKER else None
+
+def _socketio_queue_options():
+    """Cola de mensajes de Socket.IO: la URL configurada, SQLite con varios workers o ninguna"""
+    if config.SOCKETIO_MESSAGE_QUEUE:
+        return {'message_queue': config.SOCKETIO_MESSAGE_QUEUE}
+    if shared_state is not None:
+        return {'client_manager': SQLitePubSubManager(shared_state)}
+    return {}
+
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', **_socketio_queue_options())
 
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 
@@ -60,7 +82,12 @@ def index():
             'upload': '/api/upload',
             'files': '/api/files',
             'validate': '/api/validate-file/<filename>',
-            'preview': '/api/contacts/preview/<filename>'
+            'preview': '/api/contacts/preview/<filename>',
+            'export': '/api/contacts/<filename>/export?format=csv|xlsx',
+            'jobs': '/api/jobs',
+            'logs': '/api/logs?since=<cursor>',
+            'timings': '/api/timings',
+            'metrics': '/metrics'
         },
         'websocket': 'Socket.IO enabled',
         'message': 'Backend funcionando correctamente'
@@ -75,78 +102,263 @@ def health_check():
         'service': 'whatsapp-bot-backend'
     })
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Métricas en formato de texto de Prometheus.
+
+    Con varios workers incluye las últimas métricas publicadas por cada
+    worker vivo en el estado compartido; no se parsea ningún archivo.
+    """
+    snapshots = metrics.collect_snapshots(shared_state, job_manager.worker_id, task_pool)
+    body = metrics.render(job_manager.list_job_dicts(), snapshots)
+    return app.response_class(body, content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Endpoint para subir archivos de contactos"""
+    """
+    Endpoint para subir archivos de contactos.
+
+    El archivo se procesa mientras llega: la respuesta trae los conteos y la
+    vista previa, y la validación completa queda en la tarea validation_job
+    (GET /api/jobs/<id>). Si el mismo contenido ya se había validado, el
+    resultado viene en validation y no se crea la tarea.
+    """
     try:
-        if 'file' not in request.files:
-            return jsonify({'success': False, 'error': 'No se seleccionó archivo'})
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'success': False, 'error': 'No se seleccionó archivo'})
-        
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            # Validar el archivo
-            try:
-                dm = DataManager()
-                contacts = dm.load_contacts(filepath)
-                
-                return jsonify({
-                    'success': True,
-                    'filename': filename,
-                    'filepath': filepath,
-                    'contact_count': len(contacts),
-                    'preview': contacts[:5]  # Primeros 5 contactos para preview
-                })
-            except Exception as e:
-                return jsonify({'success': False, 'error': f'Error al procesar archivo: {str(e)}'})
-        else:
-            return jsonify({'success': False, 'error': 'Tipo de archivo no permitido'})
-    
-    except Exception as e:
+        upload = receive_upload(request.stream, request.content_type,
+                                app.config['UPLOAD_FOLDER'], allowed_file, store=upload_store)
+        validation = upload_store.get_cached(upload.sha256, 'validation')
+        if validation is not None:
+            return jsonify(dict(upload.to_dict(), success=True, validation_job=None, validation=validation))
+
+        job = job_manager.submit_validation(upload.filepath,
+                                            index_path=str(upload_store.index_path(upload.sha256)))
+        return jsonify(dict(upload.to_dict(), success=True, validation_job=job.id, validation=None))
+
+    except UploadError as e:
         return jsonify({'success': False, 'error': str(e)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Error al procesar archivo: {str(e)}'})
 
 @app.route('/api/contacts/preview/<filename>')
 def preview_contacts(filename):
     """Obtener preview de contactos de un archivo"""
     try:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
-        if not os.path.exists(filepath):
+        filepath = _resolve_upload(filename)
+        if filepath is None:
             return jsonify({'success': False, 'error': 'Archivo no encontrado'})
         
-        dm = DataManager()
-        contacts = dm.load_contacts(filepath)
-        
+        # Solo se leen los primeros 10 contactos válidos del índice
+        index = _contact_index(filepath)
         return jsonify({
             'success': True,
-            'total_contacts': len(contacts),
-            'preview': contacts[:10]  # Primeros 10 contactos
+            'total_contacts': index.counts()['valid'],
+            'preview': index.page(limit=10, status='valid')['contacts']
         })
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/contacts/<filename>')
+def browse_contacts(filename):
+    """
+    Recorrer los contactos de un archivo por páginas.
+
+    Parámetros: cursor (next_cursor de la página anterior), limit, fields
+    (campos separados por coma), status (valid, invalid_phone, empty_name)
+    y q (prefijo del teléfono o del nombre). Con format=columnar los
+    contactos vienen como un arreglo por campo.
+    """
+    filepath = _resolve_upload(filename)
+    if filepath is None:
+        return jsonify({'success': False, 'error': 'Archivo no encontrado'}), 404
+
+    try:
+        cursor = int(request.args.get('cursor') or 0)
+        if cursor < 0:
+            raise ValueError(cursor)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'cursor inválido'}), 400
+    try:
+        limit = int(request.args.get('limit') or config.CONTACTS_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit debe ser un número'}), 400
+
+    fields = request.args.get('fields')
+    try:
+        index = _contact_index(filepath)
+        page = index.page(
+            cursor=cursor,
+            limit=min(max(1, limit), config.CONTACTS_PAGE_MAX),
+            fields=[field.strip() for field in fields.split(',') if field.strip()] if fields else None,
+            status=request.args.get('status') or None,
+            search=request.args.get('q') or None
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except TASK_ERRORS as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    if request.args.get('format') == 'columnar':
+        page['contacts'] = api_response.to_columnar(page['contacts'])
+    return jsonify(dict(page, success=True, counts=index.counts(), columns=index.columns()))
+
+@app.route('/api/cache/contacts')
+def contact_cache_stats():
+    """Aciertos, fallos y tiempos de carga de la caché de contactos procesados"""
+    cache = get_default_cache()
+    if cache is None:
+        return jsonify({'success': True, 'enabled': False})
+    return jsonify({'success': True, 'enabled': True, 'stats': cache.get_stats()})
+
+@app.route('/api/timings', methods=['GET', 'DELETE'])
+def stage_timings():
+    """Histogramas de tiempos por etapa de este proceso (DELETE los reinicia)"""
+    if request.method == 'DELETE':
+        instrumentation.registry.reset()
+    return jsonify({
+        'success': True,
+        'enabled': instrumentation.registry.enabled,
+        'started_at': instrumentation.registry.started_at,
+        'stages': instrumentation.snapshot()
+    })
+
+def _is_admin():
+    """True si el request trae el token de administración (X-Admin-Token o Authorization: Bearer)"""
+    if not config.ADMIN_TOKEN:
+        return False
+    token = request.headers.get('X-Admin-Token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+    return hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode())
+
+def admin_required(view):
+    """Rutas de administración: no existen sin ADMIN_TOKEN y piden el token"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not config.ADMIN_TOKEN:
+            return jsonify({'success': False, 'error': 'Ruta no encontrada'}), 404
+        if not _is_admin():
+            return jsonify({'success': False, 'error': 'Token de administración inválido'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.before_request
+def start_request_profile():
+    """Con ?profile=1 y el token de administración, perfila el request con cProfile"""
+    if config.ADMIN_TOKEN and request.args.get('profile') == '1' and _is_admin():
+        try:
+            profiling.profiler.start_call(f"request-{request.endpoint}")
+            g.profiling_request = True
+        except profiling.ProfilingError as e:
+            logger.log_warning(f"No se perfila {request.path}: {e}")
+
+@app.after_request
+def stop_request_profile(response):
+    """Guarda el perfil del request e indica el archivo en X-Profile-Path"""
+    if g.pop('profiling_request', False):
+        result = profiling.profiler.stop_call()
+        if result is not None:
+            response.headers['X-Profile-Path'] = result['path']
+    return response
+
+@app.route('/api/admin/profile', methods=['GET', 'POST', 'DELETE'])
+@admin_required
+def admin_profile():
+    """
+    Perfilado por muestreo de pilas.
+
+    POST {seconds, job_id?, interval?} lo inicia (solo el hilo de la
+    campaña si se indica job_id, en el worker que la ejecuta), DELETE lo
+    termina antes de tiempo y GET devuelve el estado y los resultados
+    recientes de este worker.
+    """
+    if request.method == 'DELETE':
+        return jsonify({'success': True, 'result': profiling.profiler.stop_sampling()})
+    if request.method == 'GET':
+        return jsonify(dict(profiling.profiler.status(), success=True))
+
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data.get('seconds', 30))
+        interval = float(data.get('interval', config.PROFILE_SAMPLE_INTERVAL))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'seconds e interval deben ser números'}), 400
+    if seconds <= 0 or interval <= 0:
+        return jsonify({'success': False, 'error': 'seconds e interval deben ser positivos'}), 400
+
+    try:
+        if data.get('job_id'):
+            session = job_manager.request_profile(data['job_id'], seconds, interval)
+        else:
+            session = profiling.profiler.start_sampling(seconds, 'process', None, interval)
+    except KeyError:
+        return jsonify({'success': False, 'error': 'La campaña no está corriendo'}), 404
+    except profiling.ProfilingError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    return jsonify({'success': True, 'profile': session}), 202
+
+@app.route('/api/admin/memory', methods=['POST', 'DELETE'])
+@admin_required
+def admin_memory():
+    """
+    Snapshots de memoria con tracemalloc.
+
+    POST {action: 'start'} activa el trazado y toma la línea base, POST
+    {action: 'snapshot', scope?} guarda el reporte (scope 'data_manager'
+    cuenta solo lo asignado desde DataManager) y DELETE desactiva el trazado.
+    """
+    if request.method == 'DELETE':
+        profiling.profiler.stop_memory()
+        return jsonify({'success': True})
+
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    scope = data.get('scope')
+    if scope is not None and not str(scope).isidentifier():
+        return jsonify({'success': False, 'error': 'scope debe ser el nombre de un módulo'}), 400
+    if action == 'start':
+        profiling.profiler.start_memory()
+        return jsonify({'success': True})
+    if action == 'snapshot':
+        try:
+            return jsonify({'success': True, 'result': profiling.profiler.memory_snapshot('web', scope)})
+        except profiling.ProfilingError as e:
+            return jsonify({'success': False, 'error': str(e)}), 409
+    return jsonify({'success': False, 'error': 'Acción no soportada'}), 400
+
 @app.route('/api/files')
 def list_files():
-    """Listar archivos disponibles en la carpeta data"""
+    """Listar archivos subidos y los disponibles en la carpeta data"""
     try:
         data_dir = Path(app.config['UPLOAD_FOLDER'])
         files = []
+
+        for stored in upload_store.list():
+            try:
+                files.append({
+                    'name': stored.name,
+                    'size': stored.size,
+                    'contact_count': _contact_count(stored.sha256, stored.path),
+                    'modified': stored.uploaded_at,
+                    'sha256': stored.sha256
+                })
+            except Exception:
+                files.append({
+                    'name': stored.name,
+                    'size': stored.size,
+                    'contact_count': 0,
+                    'modified': stored.uploaded_at,
+                    'sha256': stored.sha256,
+                    'error': True
+                })
+        listed = {entry['name'] for entry in files}
         
         for file_path in data_dir.glob('*'):
-            if file_path.is_file() and allowed_file(file_path.name):
+            if file_path.is_file() and allowed_file(file_path.name) and file_path.name not in listed:
                 try:
-                    dm = DataManager()
-                    contacts = dm.load_contacts(str(file_path))
                     files.append({
                         'name': file_path.name,
                         'size': file_path.stat().st_size,
-                        'contact_count': len(contacts),
+                        'contact_count': _contact_count(_file_sha256(file_path), str(file_path)),
                         'modified': file_path.stat().st_mtime
                     })
                 except:
@@ -163,153 +375,366 @@ def list_files():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-class BotRunner:
-    """Clase para ejecutar el bot con updates en tiempo real"""
-
-    def __init__(self, socketio_instance):
-        self.socketio = socketio_instance
-        self.bot_instance = None
-        self.running = False
-        self.stats = {
-            'total_contacts': 0,
-            'messages_sent': 0,
-            'current_contact': '',
-            'status': 'idle'
-        }
-
-    def emit_update(self, event, data):
-        """Emitir actualización via SocketIO"""
-        self.socketio.emit(event, data)
-
-    def run_bot(self, filepath, limit, delay, message_template):
-        """Ejecutar el bot con monitoreo en tiempo real"""
-        try:
-            self.running = True
-            self.stats['status'] = 'starting'
-            self.emit_update('status_update', {'message': 'Iniciando bot...', 'stats': self.stats})
-
-            # Cargar contactos
-            self.emit_update('status_update', {'message': 'Cargando contactos...', 'stats': self.stats})
-            dm = DataManager()
-            contacts = dm.load_contacts(filepath)
-            self.stats['total_contacts'] = len(contacts)
-
-            self.emit_update('status_update', {
-                'message': f'Contactos cargados: {len(contacts)}',
-                'stats': self.stats
-            })
+def _contact_count(sha256, filepath):
+    """Cantidad de contactos de un archivo, calculada una sola vez por contenido"""
+    validation = upload_store.get_cached(sha256, 'validation')
+    if validation is not None:
+        return validation['contact_count']
+    return upload_store.cached(sha256, 'contact_count',
+                               lambda: task_pool.run(tasks.count_contacts, filepath))
+
+def _file_sha256(filepath):
+    """Hash de un blob del almacén o, para la carpeta data, recalculado solo si cambian tamaño o fecha"""
+    sha256 = upload_store.hash_of(filepath)
+    if sha256 is not None:
+        return sha256
+    path = str(Path(filepath).resolve())
+    info = os.stat(path)
+    known = _data_folder_hashes.get(path)
+    if known and known[:2] == (info.st_size, info.st_mtime_ns):
+        return known[2]
+    sha256 = utils.file_sha256(path)
+    _data_folder_hashes[path] = (info.st_size, info.st_mtime_ns, sha256)
+    return sha256
+
+def _resolve_upload(filename):
+    """Ruta del archivo subido con ese nombre (o de la carpeta data), None si no existe"""
+    filename = secure_filename(filename)
+    stored = upload_store.resolve(filename)
+    if stored is not None:
+        return stored.path
+    return _data_folder_file(filename)
+
+def _data_folder_file(filename):
+    """Ruta de un archivo de la carpeta data, None si no existe"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    return filepath if os.path.exists(filepath) else None
+
+def _contact_index(filepath):
+    """Índice de contactos del archivo, construido la primera vez si la subida no lo creó"""
+    sha256 = _file_sha256(filepath)
+    index = ContactIndex(upload_store.index_path(sha256))
+    if not index.exists:
+        task_pool.run(tasks.build_contact_index, filepath, str(index.path))
+    return index
+
+# Archivos subidos, guardados por hash con sus resultados ya calculados
+upload_store = UploadStore()
+# Hashes de los archivos de la carpeta data por ruta: (tamaño, fecha, sha256)
+_data_folder_hashes = {}
+
+# Parseo, validación y exportación de archivos en procesos aparte, para no
+# bloquear a las demás peticiones; con la cola llena se responde 503
+task_pool = TaskPool()
+TASK_ERRORS = (TaskPoolBusyError, TaskTimeoutError)
+
+# Gestor de campañas: cada campaña tiene su propio bot y sus estadísticas.
+# Con BROWSER_WORKER las campañas con navegador corren en python -m worker
+job_manager = JobManager(store=shared_state, task_pool=task_pool, upload_store=upload_store,
+                         browser_worker=config.BROWSER_WORKER_ID if config.BROWSER_WORKER else None)
+job_manager.sweep_pins()
+job_manager.start_coordination()
+if config.BROWSER_WORKER:
+    job_manager.follow_remote_events()
+
+# Progreso de cada campaña agrupado y emitido a la sala de la campaña
+progress_relay = ProgressRelay(lambda event, data, room: socketio.emit(event, data, to=room))
+# Los eventos del worker del navegador llegan a todos los procesos web: cada uno los emite solo a sus clientes
+remote_progress_relay = ProgressRelay(lambda event, data, room: socketio.emit(event, data, to=room, ignore_queue=True))
+
+# Log de actividad de las campañas, consultable con ?since=<cursor>
+log_buffer = LogBuffer(config.WEB_LOG_MAX_MESSAGES)
+
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+JOB_STATE_LOG_LEVELS = {'done': 'SUCCESS', 'failed': 'ERROR', 'cancelled': 'WARNING'}
+RESULT_LOG_LEVELS = {'ENVIADO': 'SUCCESS', 'ERROR': 'ERROR', 'SALTADO': 'WARNING', 'REINTENTO': 'WARNING'}
+
+def _log_job_activity(event, data):
+    """Registrar en el log web los cambios de estado y resultados de las campañas"""
+    if event == 'job_update':
+        label = 'Campaña' if data['kind'] == 'campaign' else 'Validación'
+        log_buffer.append(f"{label} {data['id']}: {data['state']}",
+                          JOB_STATE_LOG_LEVELS.get(data['state'], 'INFO'), job_id=data['id'])
+    elif event == 'job_event' and data['event'] == 'contact_result':
+        result = data['data']
+        message = f"{result['status']} {result['nombre']} ({result['telefono']})"
+        if result.get('error'):
+            message += f": {result['error']}"
+        log_buffer.append(message, RESULT_LOG_LEVELS.get(result['status'], 'INFO'), job_id=data['job_id'])
+
+def _track_upload_usage(data):
+    """Guardar las validaciones terminadas y liberar el archivo de las campañas terminadas"""
+    if data['state'] not in ('done', 'failed', 'cancelled'):
+        return
+    job = job_manager.get(data['id'])
+    sha256 = upload_store.hash_of(job.filepath) if job else None
+    if sha256 is None:
+        return
+
+    if data['kind'] == 'validation':
+        if data['state'] == 'done':
+            upload_store.set_cached(sha256, 'validation', job.result)
+    else:
+        upload_store.unpin(sha256, job.id)
+
+def _relay_job_update(event, data, remote=False):
+    """Reenviar los cambios de estado y el progreso de las campañas via SocketIO"""
+    _log_job_activity(event, data)
+    if event == 'job_event':
+        relay = remote_progress_relay if remote else progress_relay
+        relay.publish(data['job_id'], data['event'], data['data'])
+        return
+
+    _track_upload_usage(data)
+    socketio.emit(event, data, ignore_queue=remote)
+    if data['kind'] == 'campaign' and data['state'] in ('done', 'failed'):
+        socketio.emit('bot_completed', dict(data['stats'], job_id=data['id']), ignore_queue=remote)
+
+job_manager.events.subscribe(_relay_job_update)
+job_manager.remote_events.subscribe(lambda event, data: _relay_job_update(event, data, remote=True))
+
+def _parse_job_request(data):
+    """Validar los parámetros de una campaña"""
+    data = data or {}
+    filename = data.get('filename')
+    if not filename:
+        raise ValueError('No se especificó archivo de contactos')
+
+    return {'filename': secure_filename(filename), 'settings': CampaignSettings.from_dict(data)}
+
+def _submit_campaign(params):
+    """Crear una campaña protegiendo su archivo subido mientras dure"""
+    # El pin provisorio se toma al resolver el nombre (en un solo paso con el
+    # almacén bloqueado) y cubre el tiempo hasta conocer el ID de la campaña
+    token = f"submit-{threading.get_ident()}-{time.monotonic_ns()}"
+    stored = upload_store.resolve_and_pin(params['filename'], token)
+    if stored is None:
+        filepath = _data_folder_file(params['filename'])
+        if filepath is None:
+            raise ValueError('Archivo de contactos no encontrado')
+        return job_manager.submit(filepath, params['settings'])
 
-            # Actualizar configuración del mensaje
-            original_template = config.DEFAULT_MESSAGE_TEMPLATE
-            config.DEFAULT_MESSAGE_TEMPLATE = message_template
-
-            try:
-                # Crear instancia del bot
-                self.bot_instance = WhatsAppBot()
-
-                # Ejecutar bot
-                self.emit_update('status_update', {'message': 'Iniciando WhatsApp Web...', 'stats': self.stats})
-                success = self.bot_instance.run(filepath, limit, delay)
+    try:
+        job = job_manager.submit(stored.path, params['settings'])
+        upload_store.pin(stored.sha256, job.id)
+        if job.is_finished:
+            upload_store.unpin(stored.sha256, job.id)
+    finally:
+        upload_store.unpin(stored.sha256, token)
+    return job
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Crear una nueva campaña"""
+    try:
+        params = _parse_job_request(request.get_json(silent=True))
+        job = _submit_campaign(params)
+        return jsonify({'success': True, 'job': job.to_dict()}), 202
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except BlobMissingError:
+        return jsonify({'success': False, 'error': 'El archivo se reemplazó o eliminó mientras se creaba la campaña'}), 409
+    except WorkerUnavailableError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Listar campañas"""
+    return jsonify({'success': True, 'jobs': job_manager.list_job_dicts()})
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Obtener el estado de una campaña"""
+    job = job_manager.get_job_dict(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Campaña no encontrada'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/jobs/<job_id>/<action>', methods=['POST'])
+def job_action(job_id, action):
+    """Pausar, reanudar o cancelar una campaña"""
+    if action not in ('pause', 'resume', 'cancel'):
+        return jsonify({'success': False, 'error': 'Acción no soportada'}), 404
+    try:
+        job = job_manager.request_action(job_id, action)
+        return jsonify({'success': True, 'job': job})
+    except KeyError:
+        return jsonify({'success': False, 'error': 'Campaña no encontrada'}), 404
+    except JobStateError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+
+def _parse_since(value):
+    """Cursor del log (0 si falta o es inválido)"""
+    try:
+        return max(0, int(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+@app.route('/api/logs')
+def get_logs():
+    """Obtener los mensajes de log posteriores a ?since=<cursor>"""
+    return jsonify(dict(log_buffer.to_dict(_parse_since(request.args.get('since'))), success=True))
+
+@socketio.on('get_logs')
+def handle_get_logs(data=None):
+    """Obtener los mensajes de log posteriores a un cursor via SocketIO"""
+    emit('logs', log_buffer.to_dict(_parse_since((data or {}).get('since'))))
+
+@socketio.on('submit_job')
+def handle_submit_job(data):
+    """Crear una nueva campaña via SocketIO"""
+    try:
+        job = _submit_campaign(_parse_job_request(data))
+        join_room(job.id)
+        emit('job_submitted', job.to_dict())
+    except (ValueError, BlobMissingError, WorkerUnavailableError) as e:
+        emit('error', {'message': str(e)})
 
-                self.stats['status'] = 'completed' if success else 'failed'
-                self.emit_update('bot_completed', self.stats)
+@socketio.on('get_job')
+def handle_get_job(data):
+    """Obtener el estado de una campaña via SocketIO"""
+    job = job_manager.get_job_dict((data or {}).get('job_id', ''))
+    if job is None:
+        emit('error', {'message': 'Campaña no encontrada'})
+        return
+    emit('job_update', job)
+
+@socketio.on('subscribe_job')
+def handle_subscribe_job(data):
+    """Recibir el progreso en tiempo real ('job_progress') de una campaña"""
+    job = job_manager.get_job_dict((data or {}).get('job_id', ''))
+    if job is None:
+        emit('error', {'message': 'Campaña no encontrada'})
+        return
+    join_room(job['id'])
+    emit('job_update', job)
+
+@socketio.on('unsubscribe_job')
+def handle_unsubscribe_job(data):
+    """Dejar de recibir el progreso de una campaña"""
+    leave_room((data or {}).get('job_id', ''))
+
+@socketio.on('list_jobs')
+def handle_list_jobs():
+    """Listar campañas via SocketIO"""
+    emit('jobs', job_manager.list_job_dicts())
+
+def _handle_socket_job_action(data, action):
+    try:
+        job = job_manager.request_action((data or {}).get('job_id', ''), action)
+        emit('job_update', job)
+    except KeyError:
+        emit('error', {'message': 'Campaña no encontrada'})
+    except JobStateError as e:
+        emit('error', {'message': str(e)})
 
-            finally:
-                # Restaurar configuración original
-                config.DEFAULT_MESSAGE_TEMPLATE = original_template
+@socketio.on('pause_job')
+def handle_pause_job(data):
+    """Pausar una campaña via SocketIO"""
+    _handle_socket_job_action(data, 'pause')
 
-        except Exception as e:
-            self.stats['status'] = 'error'
-            self.emit_update('error', {'message': f'Error ejecutando bot: {str(e)}'})
-        finally:
-            self.running = False
+@socketio.on('resume_job')
+def handle_resume_job(data):
+    """Reanudar una campaña via SocketIO"""
+    _handle_socket_job_action(data, 'resume')
 
-# Instancia global del runner
-bot_runner = BotRunner(socketio)
+@socketio.on('cancel_job')
+def handle_cancel_job(data):
+    """Cancelar una campaña via SocketIO"""
+    _handle_socket_job_action(data, 'cancel')
 
 @socketio.on('start_bot')
 def handle_start_bot(data):
-    """Iniciar el bot de WhatsApp"""
-    global bot_runner
-
+    """Iniciar el bot de WhatsApp (crea una campaña)"""
     try:
-        if bot_runner.running:
-            emit('error', {'message': 'El bot ya está ejecutándose'})
-            return
-
-        # Validar datos
-        filename = data.get('filename')
-        limit = int(data.get('limit', 50))
-        delay = int(data.get('delay', 20))
-        message_template = data.get('message', config.DEFAULT_MESSAGE_TEMPLATE)
-
-        if not filename:
-            emit('error', {'message': 'No se especificó archivo de contactos'})
-            return
-
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
-        if not os.path.exists(filepath):
-            emit('error', {'message': 'Archivo de contactos no encontrado'})
-            return
-
-        emit('bot_started', bot_runner.stats)
-
-        # Ejecutar bot en hilo separado
-        def run_bot_thread():
-            bot_runner.run_bot(filepath, limit, delay, message_template)
-
-        thread = threading.Thread(target=run_bot_thread)
-        thread.daemon = True
-        thread.start()
-
+        job = _submit_campaign(_parse_job_request(data))
+        join_room(job.id)
+        emit('bot_started', dict(job.get_stats(), job_id=job.id))
+    except ValueError as e:
+        emit('error', {'message': str(e)})
     except Exception as e:
         emit('error', {'message': str(e)})
 
 @socketio.on('stop_bot')
-def handle_stop_bot():
-    """Detener el bot"""
-    global bot_runner
-
+def handle_stop_bot(data=None):
+    """Detener una campaña (o todas las activas si no se indica cuál)"""
     try:
-        if bot_runner.bot_instance and hasattr(bot_runner.bot_instance, 'stop'):
-            bot_runner.bot_instance.stop()
-        bot_runner.running = False
-        bot_runner.stats['status'] = 'stopped'
+        job_id = (data or {}).get('job_id')
+        jobs = [job_manager.get_job_dict(job_id)] if job_id else [
+            job for job in job_manager.list_job_dicts() if job['kind'] == 'campaign'
+        ]
+        for job in jobs:
+            if job is not None and job['state'] not in FINISHED_STATES:
+                job_manager.request_action(job['id'], 'cancel')
         emit('bot_stopped', {'message': 'Bot detenido'})
     except Exception as e:
         emit('error', {'message': f'Error deteniendo bot: {str(e)}'})
 
 @socketio.on('get_status')
 def handle_get_status():
-    """Obtener estado actual del bot"""
-    emit('status_update', {'stats': bot_runner.stats, 'running': bot_runner.running})
+    """Obtener estado de la campaña más reciente"""
+    jobs = [job for job in job_manager.list_job_dicts() if job['kind'] == 'campaign']
+    latest = jobs[-1] if jobs else None
+    stats = latest['stats'] if latest else {
+        'total_contacts': 0, 'messages_sent': 0, 'current_contact': '', 'status': 'idle'
+    }
+    active = [job for job in jobs if job['state'] not in FINISHED_STATES]
+    emit('status_update', {
+        'stats': stats,
+        'running': bool(active),
+        'jobs': active
+    })
 
 @app.route('/api/validate-file/<filename>')
 def validate_file(filename):
     """Validar un archivo de contactos"""
     try:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
-        if not os.path.exists(filepath):
+        filepath = _resolve_upload(filename)
+        if filepath is None:
             return jsonify({'success': False, 'error': 'Archivo no encontrado'})
 
-        dm = DataManager()
-        contacts = dm.load_contacts(filepath)
+        def compute():
+            # Estadísticas de validación, calculadas en el pool de procesos
+            result = task_pool.run(tasks.check_phones, filepath)
+            result['sample_contacts'] = tasks.unpack_contacts(result['sample_contacts'])
+            return result
 
-        # Estadísticas de validación
-        valid_phones = sum(1 for c in contacts if len(c.get('telefono', '')) >= 10)
-        invalid_phones = len(contacts) - valid_phones
+        sha256 = _file_sha256(filepath)
+        return jsonify(dict(upload_store.cached(sha256, 'phone_check', compute), success=True))
 
-        return jsonify({
-            'success': True,
-            'total_contacts': len(contacts),
-            'valid_phones': valid_phones,
-            'invalid_phones': invalid_phones,
-            'sample_contacts': contacts[:5]
-        })
+    except TASK_ERRORS as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
 
+EXPORT_FORMATS = {'csv': 'text/csv', 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'}
+
+@app.route('/api/contacts/<filename>/export')
+def export_contacts(filename):
+    """Descargar los contactos válidos de un archivo como CSV o Excel (?format=csv|xlsx)"""
+    filepath = _resolve_upload(filename)
+    if filepath is None:
+        return jsonify({'success': False, 'error': 'Archivo no encontrado'}), 404
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Formato no soportado'}), 400
+
+    fd, output_path = tempfile.mkstemp(suffix=f'.{export_format}')
+    os.close(fd)
+    try:
+        task_pool.run(tasks.export_contacts, filepath, output_path, export_format)
+        response = send_file(output_path, mimetype=EXPORT_FORMATS[export_format], as_attachment=True,
+                             download_name=f"{Path(secure_filename(filename)).stem}_contactos.{export_format}")
+    except TASK_ERRORS as e:
+        os.unlink(output_path)
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
+        os.unlink(output_path)
         return jsonify({'success': False, 'error': str(e)})
 
+    response.call_on_close(lambda: os.unlink(output_path))
+    return response
+
 if __name__ == '__main__':
     # Crear directorio de templates si no existe
     os.makedirs('templates', exist_ok=True)
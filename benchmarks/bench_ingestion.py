@@ -0,0 +1,31 @@
+"""
+Carga de contactos: DataManager.load_contacts con CSV (UTF-8 y Latin-1) y Excel
+"""
+
+import pytest
+
+from contact_cache import ContactCache
+from data_manager import DataManager
+
+
+@pytest.mark.benchmark(group='load_contacts')
+@pytest.mark.parametrize('kind,encoding', [('csv', 'utf-8'), ('csv', 'latin-1'), ('xlsx', 'utf-8')],
+                         ids=['csv-utf8', 'csv-latin1', 'xlsx'])
+def bench_load_contacts(benchmark, dataset, timing, kind, encoding):
+    path = dataset(kind, encoding)
+    contacts = benchmark.pedantic(lambda: DataManager().load_contacts(path), **timing)
+    assert contacts
+
+
+@pytest.mark.benchmark(group='load_contacts')
+def bench_load_contacts_cached(benchmark, dataset, timing, tmp_path):
+    path = dataset('csv')
+    cache = ContactCache(tmp_path / 'cache')
+    DataManager(cache=cache).load_contacts(path)
+    misses = cache.get_stats()['misses']
+
+    contacts = benchmark.pedantic(lambda: DataManager(cache=cache).load_contacts(path), **timing)
+    assert contacts
+    # Con --benchmark-disable pedantic corre una sola vez: basta con que todas las cargas medidas acierten
+    stats = cache.get_stats()
+    assert stats['hits'] > 0 and stats['misses'] == misses
@@ -0,0 +1,31 @@
+"""
+Escrituras: logger.log_message_sent por mensaje y DataManager.export_contacts
+"""
+
+import pytest
+
+import config
+import logger
+from data_manager import DataManager
+
+
+@pytest.mark.benchmark(group='log_message_sent')
+def bench_log_message_sent(benchmark, rows, timing):
+    def log_all():
+        for nombre, telefono, mensaje, _ in rows:
+            logger.log_message_sent(nombre, telefono, mensaje or config.DEFAULT_MESSAGE_TEMPLATE, "ENVIADO")
+
+    benchmark.pedantic(log_all, setup=lambda: config.MESSAGES_LOG_FILE.unlink(missing_ok=True),
+                       **timing)
+    assert config.MESSAGES_LOG_FILE.exists()
+
+
+@pytest.mark.benchmark(group='export_contacts')
+@pytest.mark.parametrize('format', ['csv', 'xlsx'])
+def bench_export_contacts(benchmark, dataset, timing, tmp_path, format):
+    data_manager = DataManager()
+    data_manager.load_contacts(dataset('csv'))
+    output = tmp_path / f'export.{format}'
+
+    exported = benchmark.pedantic(data_manager.export_contacts, args=(output, format), **timing)
+    assert exported and output.exists()
@@ -0,0 +1,20 @@
+"""
+Personalización de mensajes: utils.format_message sobre los contactos cargados
+"""
+
+import pytest
+
+import config
+import utils
+from data_manager import DataManager
+
+
+@pytest.mark.benchmark(group='format_message')
+def bench_format_message(benchmark, dataset, timing):
+    contacts = DataManager().load_contacts(dataset('csv'), config.DEFAULT_MESSAGE_TEMPLATE)
+
+    def render_all():
+        return [utils.format_message(contact['mensaje'], contact) for contact in contacts]
+
+    messages = benchmark.pedantic(render_all, **timing)
+    assert len(messages) == len(contacts)
@@ -0,0 +1,28 @@
+"""
+Validación: DataManager.validate_contacts y utils.format_phone_number con teléfonos sucios
+"""
+
+import pytest
+
+import utils
+from data_manager import DataManager
+
+
+@pytest.mark.benchmark(group='validate_contacts')
+def bench_validate_contacts(benchmark, dataset, timing):
+    data_manager = DataManager()
+    data_manager.load_contacts(dataset('csv'))
+
+    stats = benchmark.pedantic(data_manager.validate_contacts, **timing)
+    assert stats['valid'] == stats['total']
+
+
+@pytest.mark.benchmark(group='format_phone_number')
+def bench_format_phone_number(benchmark, rows, timing):
+    phones = [row[1] for row in rows]
+
+    def format_all():
+        return [utils.format_phone_number(phone) for phone in phones]
+
+    formatted = benchmark.pedantic(format_all, **timing)
+    assert any(formatted) and None in formatted
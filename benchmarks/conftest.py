@@ -0,0 +1,204 @@
+"""
+Configuración de los benchmarks con pytest-benchmark (bench_*.py)
+
+Genera los conjuntos de datos (1k, 100k y 1M filas; CSV en UTF-8 y
+Latin-1 y Excel) con teléfonos sucios, nombres con acentos, mensajes con y
+sin plantilla y filas inválidas. Se guardan en una carpeta temporal y se
+reutilizan entre corridas.
+
+Uso (desde la raíz del repositorio):
+
+    pytest benchmarks                                  # 1k y 100k
+    pytest benchmarks --bench-sizes 1k,100k,1M         # incluye 1M (varios minutos)
+    pytest benchmarks --benchmark-save=baseline        # guardar la línea base
+    pytest benchmarks --benchmark-compare              # comparar con la última línea base
+
+Las líneas base son JSON en benchmarks/baselines/<máquina>/. Al comparar,
+la corrida falla si la mediana de algún benchmark empeora más que
+REGRESSION_THRESHOLD (se puede cambiar con --benchmark-compare-fail).
+"""
+
+import csv
+import logging
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+
+BASELINE_DIR = Path(__file__).resolve().parent / 'baselines'
+REGRESSION_THRESHOLD = 'median:25%'
+DEFAULT_SIZES = '1k,100k'
+DATASET_VERSION = 1  # Cambiarlo al modificar make_rows para regenerar los archivos
+
+# Rondas por tamaño: los archivos grandes tardan segundos por ronda
+ROUNDS = ((1_000, 50), (100_000, 3))
+
+FIRST_NAMES = ['José', 'María', 'Ñandú', 'Ana Lucía', 'João', 'Zoë', "O'Brien", 'Renée', 'Íñigo', 'Carlos']
+LAST_NAMES = ['Núñez', 'García', 'Pérez', 'Gómez', 'Müller', 'Fernández', 'López', 'Ávila']
+CITIES = ['Buenos Aires', 'Córdoba', 'Rosario', 'San Miguel de Tucumán', '']
+MESSAGES = ['', '', '¡Hola {nombre}! ¿Cómo estás?', 'Hola {nombre}, te escribimos desde {ciudad}',
+            'Precio especial: {precio}', 'Mensaje fijo sin variables']
+
+
+def dirty_phone(rng: random.Random, number: str) -> str:
+    """Teléfono con uno de los formatos que aparecen en archivos reales"""
+    formats = [
+        f'+54 9 11 {number[:4]}-{number[4:]}',
+        f'(011) 15-{number[:4]}-{number[4:]}',
+        f'54911{number}',
+        f'  54 911 {number}  ',
+        f'54911{number}.0',
+        f'+54-9-11-{number}',
+        number[:3],  # Demasiado corto
+        '',
+        'sin teléfono',
+    ]
+    weights = [20, 10, 30, 10, 10, 10, 4, 3, 3]
+    return rng.choices(formats, weights)[0]
+
+
+def make_rows(count: int, seed: int = 1):
+    """Filas (nombre, telefono, mensaje, ciudad); algunas sin nombre o con teléfono inválido"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        nombre = '' if rng.random() < 0.01 else f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}'
+        rows.append((
+            nombre,
+            dirty_phone(rng, f'{rng.randrange(10**8):08d}'),
+            rng.choice(MESSAGES),
+            rng.choice(CITIES)
+        ))
+    return rows
+
+
+def write_csv(path: Path, rows, encoding: str):
+    with open(path, 'w', newline='', encoding=encoding, errors='replace') as f:
+        writer = csv.writer(f)
+        writer.writerow(['nombre', 'telefono', 'mensaje', 'ciudad'])
+        writer.writerows(rows)
+
+
+def write_xlsx(path: Path, rows):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(['nombre', 'telefono', 'mensaje', 'ciudad'])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+def size_id(size: int) -> str:
+    if size % 1_000_000 == 0:
+        return f'{size // 1_000_000}M'
+    if size % 1_000 == 0:
+        return f'{size // 1_000}k'
+    return str(size)
+
+
+def rounds_for(size: int) -> int:
+    return next((rounds for limit, rounds in ROUNDS if size <= limit), 1)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('whatsapp-bot benchmarks')
+    group.addoption('--bench-sizes', default=DEFAULT_SIZES,
+                    help=f'Filas de los conjuntos de datos, separadas por coma (por defecto {DEFAULT_SIZES})')
+    group.addoption('--bench-data-dir', default=str(Path(tempfile.gettempdir()) / 'whatsapp_bot_benchmarks'),
+                    help='Carpeta donde se generan y reutilizan los conjuntos de datos')
+
+
+def pytest_configure(config):
+    if not config.pluginmanager.hasplugin('benchmark'):
+        return
+
+    from pytest_benchmark.utils import parse_compare_fail
+
+    if config.getoption('benchmark_storage') == 'file://./.benchmarks':
+        config.option.benchmark_storage = f'file://{BASELINE_DIR}'
+    if config.getoption('benchmark_compare') and not config.getoption('benchmark_compare_fail'):
+        config.option.benchmark_compare_fail = [parse_compare_fail(REGRESSION_THRESHOLD)]
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        sizes = [parse_size(value) for value in metafunc.config.getoption('bench_sizes').split(',')]
+        metafunc.parametrize('size', sizes, ids=[size_id(size) for size in sizes])
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_state(tmp_path_factory):
+    """Sin caché de contactos, sin logs en consola y con el log, el CSV de mensajes y los tiempos en una carpeta temporal"""
+    patcher = pytest.MonkeyPatch()
+    logs_dir = tmp_path_factory.mktemp('logs')
+    patcher.setattr(config, 'CONTACT_CACHE_ENABLED', False)
+    patcher.setattr(config, 'LOG_FILE', logs_dir / 'whatsapp_bot.log')
+    patcher.setattr(config, 'MESSAGES_LOG_FILE', logs_dir / 'messages_sent.csv')
+    patcher.setattr(config, 'TIMINGS_FILE', logs_dir / 'timings.json')
+    bot_logger = logging.getLogger('whatsapp_bot')
+    level = bot_logger.level
+    bot_logger.setLevel(logging.ERROR)
+    yield
+    bot_logger.setLevel(level)
+    patcher.undo()
+
+
+@pytest.fixture(scope='session')
+def data_dir(request) -> Path:
+    path = Path(request.config.getoption('bench_data_dir'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+_rows_cache = {}
+
+
+@pytest.fixture
+def rows(size):
+    """Filas generadas del tamaño pedido (en memoria, una vez por sesión)"""
+    if size not in _rows_cache:
+        _rows_cache[size] = make_rows(size)
+    return _rows_cache[size]
+
+
+@pytest.fixture
+def dataset(data_dir, size):
+    """
+    Devuelve una función que crea (o reutiliza) el archivo del tamaño pedido.
+
+    dataset('csv', 'latin-1') o dataset('xlsx').
+    """
+    def build(kind: str, encoding: str = 'utf-8') -> Path:
+        suffix = f'-{encoding}.csv' if kind == 'csv' else '.xlsx'
+        path = data_dir / f'contactos-v{DATASET_VERSION}-{size_id(size)}{suffix}'
+        if not path.exists():
+            temp = path.with_name(path.name + '.part')
+            rows = _rows_cache.get(size) or make_rows(size)
+            if kind == 'csv':
+                write_csv(temp, rows, encoding)
+            else:
+                write_xlsx(temp, rows)
+            temp.replace(path)
+        return path
+
+    return build
+
+
+@pytest.fixture
+def timing(size) -> dict:
+    """Argumentos de benchmark.pedantic según el tamaño (con una ronda de calentamiento en los chicos)"""
+    return {'rounds': rounds_for(size), 'iterations': 1, 'warmup_rounds': 1 if size <= 1_000 else 0}
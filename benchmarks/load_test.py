@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del backend (app.py) con dashboards de Socket.IO y subidas en paralelo
+
+Levanta app.py en un proceso aparte, con el estado en una carpeta temporal
+y un bot simulado en lugar de Chrome, y lo somete durante un tiempo fijo a:
+
+- subidas de CSV (POST /api/upload) seguidas de la vista previa y la validación
+- listados de archivos (GET /api/files)
+- dashboards conectados por Socket.IO que piden get_status periódicamente y
+  se suscriben al progreso de las campañas
+- campañas iniciadas con start_bot
+
+Informa pedidos por segundo y percentiles de latencia de cada operación,
+la demora de los eventos de las campañas hasta los dashboards y el
+crecimiento de memoria del servidor. No necesita red ni WhatsApp.
+
+El cliente de Socket.IO necesita requests (y websocket-client para usar
+websocket en lugar de long-polling).
+
+Uso: python benchmarks/load_test.py [--dashboards 50] [--duration 30] [--json resultado.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import requests
+import socketio
+
+try:
+    import websocket  # noqa: F401  (websocket-client: habilita el transporte websocket)
+    TRANSPORTS = ['websocket', 'polling']
+except ImportError:
+    TRANSPORTS = ['polling']
+
+# Estados de campaña con su marca de tiempo en el job, para medir la demora de job_update
+STATE_TIMESTAMPS = {'queued': 'created_at', 'starting': 'started_at', 'done': 'finished_at',
+                    'failed': 'finished_at', 'cancelled': 'finished_at'}
+
+
+class SimulatedBot:
+    """
+    Bot sin navegador: carga los contactos y publica los mismos eventos que
+    WhatsAppBot, con una demora fija por mensaje.
+    """
+
+    def __init__(self, events, message_delay: float):
+        from message_sender import SendingStats
+
+        self.events = events
+        self.message_delay = message_delay
+        self.contacts = []
+        self.phase = 'idle'
+        self.stats = SendingStats()
+        self.message_sender = SimpleNamespace(get_stats=lambda: self.stats)
+        self._stopped = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def run(self, input_file, limit=None, delay=None, settings=None) -> bool:
+        from data_manager import DataManager
+
+        contacts = DataManager().load_contacts(input_file)
+        limit = limit or (settings.limit if settings else None)
+        self.contacts = contacts[:limit] if limit else contacts
+        self.stats.total_contacts = len(self.contacts)
+        self.stats.start_time = time.time()
+
+        for phase in ('starting', 'authenticating', 'sending'):
+            self.phase = phase
+            self.events.publish('phase', {'phase': phase})
+
+        for position, contact in enumerate(self.contacts, 1):
+            self._running.wait()
+            if self._stopped.wait(self.message_delay):
+                break
+            self.stats.messages_sent += 1
+            self.events.publish('contact_result', {
+                'position': position, 'total': self.stats.total_contacts,
+                'nombre': contact['nombre'], 'telefono': contact['telefono'],
+                'status': 'ENVIADO', 'error': '', 'sent_at': time.time()
+            })
+            self.events.publish('progress', {
+                'processed': position, 'total': self.stats.total_contacts,
+                'percentage': round(position / self.stats.total_contacts * 100, 1),
+                'messages_sent': self.stats.messages_sent
+            })
+        self.stats.end_time = time.time()
+        return self.stats.messages_sent > 0
+
+    def stop(self):
+        self._stopped.set()
+        self._running.set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+
+def serve(port: int, message_delay: float):
+    """
+    Modo servidor: app.py con el bot simulado (el proceso hijo de la prueba).
+    """
+    import app as backend
+
+    backend.job_manager._bot_factory = lambda events: SimulatedBot(events, message_delay)
+    backend.socketio.run(backend.app, host='127.0.0.1', port=port,
+                         allow_unsafe_werkzeug=True, log_output=False)
+
+
+class Recorder:
+    """
+    Latencias y errores por operación, y demoras de los eventos, seguros entre hilos.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.delays = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def timed(self, name: str, function):
+        started = time.perf_counter()
+        try:
+            result = function()
+        except Exception:
+            with self._lock:
+                self.errors[name] += 1
+            return None
+        with self._lock:
+            self.latencies[name].append((time.perf_counter() - started) * 1000)
+        return result
+
+    def error(self, name: str):
+        with self._lock:
+            self.errors[name] += 1
+
+    def delay(self, name: str, seconds: float):
+        with self._lock:
+            self.delays[name].append(seconds * 1000)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(values):
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50': round(statistics.median(values), 2),
+        'p95': round(percentile(values, 95), 2),
+        'p99': round(percentile(values, 99), 2),
+        'max': round(max(values), 2)
+    }
+
+
+def make_csv(rows: int, tag: str) -> bytes:
+    """CSV de contactos con contenido único (tag), para que ninguna caché lo evite"""
+    lines = ['nombre,telefono,mensaje']
+    lines.extend(f'Contacto {tag} {i},+54 9 11 {i % 10**8:08d},' for i in range(rows))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def rss_mb(pid: int):
+    """Memoria residente de un proceso en MB (None fuera de Linux)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def uploader(base_url, recorder, stop, rows, uploaded, worker):
+    session = requests.Session()
+    count = 0
+    while not stop.is_set():
+        name = f'carga-{worker}-{count}.csv'
+        files = {'file': (name, make_csv(rows, f'{worker}-{count}'), 'text/csv')}
+        response = recorder.timed('POST /api/upload',
+                                  lambda: session.post(f'{base_url}/api/upload', files=files, timeout=60))
+        count += 1
+        if response is None or not response.json().get('success'):
+            recorder.error('POST /api/upload')
+            continue
+        uploaded.append(name)
+        recorder.timed('GET preview', lambda: session.get(f'{base_url}/api/contacts/preview/{name}', timeout=60))
+        recorder.timed('GET validate', lambda: session.get(f'{base_url}/api/validate-file/{name}', timeout=60))
+
+
+def file_lister(base_url, recorder, stop, interval):
+    session = requests.Session()
+    while not stop.wait(interval):
+        recorder.timed('GET /api/files', lambda: session.get(f'{base_url}/api/files', timeout=60))
+
+
+def dashboard(base_url, recorder, stop, interval):
+    """Cliente de Socket.IO: pide get_status y mide la demora de los eventos de campañas"""
+    client = socketio.Client(reconnection=False)
+    status = threading.Event()
+    seen = set()
+
+    @client.on('status_update')
+    def on_status(data):
+        status.set()
+
+    @client.on('job_update')
+    def on_job_update(job):
+        now = time.time()
+        key = (job['id'], job['state'])
+        if key in seen:
+            return
+        seen.add(key)
+        timestamp = job.get(STATE_TIMESTAMPS.get(job['state'], ''), None)
+        if timestamp:
+            recorder.delay('job_update', now - timestamp)
+        if job['kind'] == 'campaign' and job['state'] == 'queued':
+            client.emit('subscribe_job', {'job_id': job['id']})
+
+    @client.on('job_progress')
+    def on_progress(payload):
+        now = time.time()
+        for result in payload['results']:
+            if 'sent_at' in result:
+                recorder.delay('job_progress', now - result['sent_at'])
+
+    if recorder.timed('sio connect', lambda: client.connect(base_url, transports=TRANSPORTS,
+                                                            wait_timeout=30)) is None and not client.connected:
+        return
+    while not stop.is_set():
+        status.clear()
+        started = time.perf_counter()
+        client.emit('get_status')
+        if status.wait(10):
+            with recorder._lock:
+                recorder.latencies['sio get_status'].append((time.perf_counter() - started) * 1000)
+        else:
+            recorder.error('sio get_status')
+        stop.wait(interval)
+    client.disconnect()
+
+
+def campaign_starter(base_url, recorder, stop, interval, uploaded, limit):
+    """Cliente de Socket.IO que inicia una campaña con start_bot cada interval segundos"""
+    client = socketio.Client(reconnection=False)
+    started_event = threading.Event()
+    client.on('bot_started', lambda data: started_event.set())
+    client.on('error', lambda data: recorder.error('sio start_bot'))
+    client.connect(base_url, transports=TRANSPORTS, wait_timeout=30)
+
+    while not stop.wait(interval):
+        if not uploaded:
+            continue
+        started_event.clear()
+        started = time.perf_counter()
+        client.emit('start_bot', {'filename': uploaded[-1], 'limit': limit, 'delay': 0})
+        if started_event.wait(10):
+            with recorder._lock:
+                recorder.latencies['sio start_bot'].append((time.perf_counter() - started) * 1000)
+        else:
+            recorder.error('sio start_bot')
+    client.disconnect()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f'{base_url}/health', timeout=1).ok:
+                return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError('El servidor no respondió a /health')
+
+
+def run_load(args, base_url, server_pid):
+    recorder = Recorder()
+    stop = threading.Event()
+    uploaded = []
+
+    threads = [threading.Thread(target=dashboard, args=(base_url, recorder, stop, args.status_interval))
+               for _ in range(args.dashboards)]
+    threads += [threading.Thread(target=uploader, args=(base_url, recorder, stop, args.rows, uploaded, i))
+                for i in range(args.uploaders)]
+    threads.append(threading.Thread(target=file_lister, args=(base_url, recorder, stop, args.files_interval)))
+    if args.campaign_interval > 0:
+        threads.append(threading.Thread(target=campaign_starter, args=(
+            base_url, recorder, stop, args.campaign_interval, uploaded, args.campaign_contacts)))
+
+    memory_start = rss_mb(server_pid) if server_pid else None
+    started = time.perf_counter()
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    stop.wait(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=15)
+    elapsed = time.perf_counter() - started
+    memory_end = rss_mb(server_pid) if server_pid else None
+
+    return {
+        'duration': round(elapsed, 2),
+        'dashboards': args.dashboards,
+        'uploaders': args.uploaders,
+        'transports': TRANSPORTS,
+        'operations': {
+            name: dict(summarize(values), errors=recorder.errors.get(name, 0),
+                       rps=round(len(values) / elapsed, 2))
+            for name, values in sorted(recorder.latencies.items())
+        },
+        'errors': dict(recorder.errors),
+        'fanout_ms': {name: summarize(values) for name, values in sorted(recorder.delays.items())},
+        'memory_mb': {
+            'start': round(memory_start, 1) if memory_start else None,
+            'end': round(memory_end, 1) if memory_end else None,
+            'growth': round(memory_end - memory_start, 1) if memory_start and memory_end else None
+        }
+    }
+
+
+def print_report(result):
+    print(f"📊 {result['dashboards']} dashboards, {result['uploaders']} subidas en paralelo, "
+          f"{result['duration']} s ({'/'.join(result['transports'])})")
+    print(f"{'operación':<20}{'pedidos':>8}{'errores':>8}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    names = sorted(set(result['operations']) | set(result['errors']))
+    for name in names:
+        op = result['operations'].get(name, {'count': 0, 'rps': 0})
+        errors = result['errors'].get(name, 0)
+        if op['count']:
+            print(f"{name:<20}{op['count']:>8}{errors:>8}{op['rps']:>8.1f}"
+                  f"{op['p50']:>9.1f}{op['p95']:>9.1f}{op['p99']:>9.1f}{op['max']:>9.1f}")
+        else:
+            print(f"{name:<20}{0:>8}{errors:>8}")
+
+    print("\n📡 Demora de los eventos hasta los dashboards (job_progress incluye el agrupado de ProgressRelay)")
+    for name, delay in result['fanout_ms'].items():
+        if delay['count']:
+            print(f"{name:<20}{delay['count']:>8} eventos  p50 {delay['p50']:.1f} ms  "
+                  f"p95 {delay['p95']:.1f} ms  p99 {delay['p99']:.1f} ms  max {delay['max']:.1f} ms")
+
+    memory = result['memory_mb']
+    if memory['growth'] is not None:
+        print(f"\n💾 Memoria del servidor: {memory['start']} MB -> {memory['end']} MB "
+              f"(crecimiento {memory['growth']:+.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga del backend Flask/Socket.IO')
+    parser.add_argument('--dashboards', type=int, default=50, help='Clientes de Socket.IO conectados')
+    parser.add_argument('--uploaders', type=int, default=4, help='Hilos que suben archivos sin pausa')
+    parser.add_argument('--duration', type=float, default=30, help='Segundos de carga')
+    parser.add_argument('--rows', type=int, default=2000, help='Filas de cada CSV subido')
+    parser.add_argument('--status-interval', type=float, default=1.0, help='Segundos entre get_status de cada dashboard')
+    parser.add_argument('--files-interval', type=float, default=0.5, help='Segundos entre listados de archivos')
+    parser.add_argument('--campaign-interval', type=float, default=5.0, help='Segundos entre campañas (0: ninguna)')
+    parser.add_argument('--campaign-contacts', type=int, default=200, help='Contactos de cada campaña')
+    parser.add_argument('--message-delay', type=float, default=0.01, help='Segundos por mensaje del bot simulado')
+    parser.add_argument('--url', help='Usar un servidor ya levantado (sin medición de memoria)')
+    parser.add_argument('--json', help='Guardar el resultado en este archivo')
+    parser.add_argument('--serve', type=int, metavar='PUERTO', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.message_delay)
+        return
+
+    server = None
+    state_dir = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        port = free_port()
+        state_dir = tempfile.mkdtemp(prefix='load-test-')
+        env = dict(os.environ, STATE_DIR=state_dir, PYTHONUNBUFFERED='1')
+        server = subprocess.Popen(
+            [sys.executable, __file__, '--serve', str(port), '--message-delay', str(args.message_delay)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        base_url = f'http://127.0.0.1:{port}'
+
+    try:
+        wait_ready(base_url)
+        result = run_load(args, base_url, server.pid if server else None)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        if state_dir:
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+    print_report(result)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2), encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga: latencia de /health mientras se parsea un archivo grande
+
+Levanta app.py en un servidor local con hilos y mide la latencia de
+/health en tres fases: sin carga, parseando un CSV grande en el hilo del
+handler (TaskPool sin procesos) y parseando con el pool de procesos. Con
+el pool la latencia debería quedar igual que sin carga.
+
+Uso: python benchmarks/parse_offload_benchmark.py [filas] [parseos]
+"""
+
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import app as backend
+from task_pool import TaskPool
+from upload_store import UploadStore
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def write_csv(path, rows):
+    """CSV de contactos con teléfonos válidos"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('nombre,telefono,mensaje\n')
+        for i in range(rows):
+            f.write(f'Contacto {i},+54 9 11 {i % 10**8:08d},\n')
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure_health(base_url, stop):
+    """Pide /health sin pausa hasta que se active stop; devuelve latencias en ms"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        with urllib.request.urlopen(f'{base_url}/health') as response:
+            response.read()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def run_phase(base_url, filenames):
+    """Latencias de /health mientras se validan los archivos (ninguno: sin carga)"""
+    stop = threading.Event()
+    latencies = []
+    prober = threading.Thread(target=lambda: latencies.extend(measure_health(base_url, stop)))
+    prober.start()
+
+    started = time.perf_counter()
+    if filenames:
+        for name in filenames:
+            with urllib.request.urlopen(f'{base_url}/api/validate-file/{name}') as response:
+                response.read()
+    else:
+        time.sleep(2)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    prober.join()
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia de los handlers durante el parseo de archivos')
+    parser.add_argument('rows', nargs='?', type=int, default=100_000, help='Filas del CSV')
+    parser.add_argument('parses', nargs='?', type=int, default=2, help='Archivos parseados por fase')
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp())
+    store = UploadStore(work_dir / 'uploads')
+    backend.upload_store = store
+
+    # Un contenido distinto por parseo, para que ninguna caché lo evite
+    base = work_dir / 'base.csv'
+    write_csv(base, args.rows)
+    names = {'inline': [], 'pool': []}
+    for phase in names:
+        for i in range(args.parses):
+            temp = work_dir / f'{phase}-{i}.part'
+            shutil.copy(base, temp)
+            with open(temp, 'a', encoding='utf-8') as f:
+                f.write(f'Extra {phase} {i},+54 9 11 5555 {i:04d},\n')
+            names[phase].append(store.add(temp, f'{phase}-{i}.csv').name)
+
+    server = make_server('127.0.0.1', 0, backend.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    pool = TaskPool()
+    pool.run(len, [])  # Arrancar los procesos antes de medir
+    phases = [
+        ('sin carga', None, []),
+        ('en el hilo', TaskPool(max_workers=0), names['inline']),
+        ('con pool', pool, names['pool']),
+    ]
+
+    print(f"📊 /health durante la validación de {args.parses} CSV de {args.rows} filas")
+    print(f"{'fase':<12}{'parseo s':>10}{'pedidos':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    try:
+        for label, task_pool, filenames in phases:
+            if task_pool is not None:
+                backend.task_pool = task_pool
+            elapsed, latencies = run_phase(base_url, filenames)
+            print(f"{label:<12}{elapsed:>10.2f}{len(latencies):>9}"
+                  f"{statistics.median(latencies):>9.2f}{percentile(latencies, 95):>9.2f}"
+                  f"{percentile(latencies, 99):>9.2f}{max(latencies):>9.2f}")
+    finally:
+        server.shutdown()
+        pool.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
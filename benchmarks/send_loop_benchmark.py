@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark del ciclo de envío completo contra WhatsApp Web simulado
+
+Corre WhatsAppBot.run sobre un CSV de contactos con fake_whatsapp en lugar
+de Chrome: carga, validación, login, búsqueda, envío, reintentos y
+recuperación de la sesión, sin pausas entre acciones ni entre mensajes.
+Informa el tiempo total, los mensajes por segundo y cuánto tiempo se pasó
+en cada etapa, para encontrar los costos propios del bot (logs, eventos,
+pacing) que quedan ocultos detrás de las esperas del navegador real.
+
+Uso: python benchmarks/send_loop_benchmark.py [--contacts 10000] [--invalid-rate 0.02] [--json resultado.json]
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+import logger
+from campaign import CampaignSettings
+from fake_whatsapp import StubOptions, StubWhatsAppWeb, create_fake_client
+from main import WhatsAppBot
+from message_sender import MessageSender
+from suppression import SuppressionList
+
+
+def write_csv(path, rows):
+    """CSV de contactos con teléfonos válidos"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('nombre,telefono,mensaje\n')
+        for i in range(rows):
+            f.write(f'Contacto {i},+54 9 11 {i % 10**8:08d},Hola {{nombre}}\n')
+
+
+class StageTimer:
+    """Acumula llamadas y segundos por etapa envolviendo métodos"""
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def wrap(self, owner, attribute, stage=None):
+        stage = stage or attribute
+        original = getattr(owner, attribute)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.calls[stage] += 1
+                self.seconds[stage] += time.perf_counter() - started
+
+        setattr(owner, attribute, timed)
+
+    def report(self):
+        return {
+            stage: {'calls': self.calls[stage], 'seconds': round(self.seconds[stage], 4)}
+            for stage in self.calls
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ciclo de envío de WhatsAppBot contra WhatsApp Web simulado')
+    parser.add_argument('--contacts', type=int, default=10_000, help='Contactos del CSV')
+    parser.add_argument('--search-latency', type=float, default=0.0, help='Segundos hasta que se abre el chat')
+    parser.add_argument('--send-latency', type=float, default=0.0, help='Segundos de cada envío')
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help='Proporción de números no registrados')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Proporción de chats que no abren')
+    parser.add_argument('--session-loss-rate', type=float, default=0.0, help='Proporción de caídas del navegador')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Guardar los resultados en este archivo')
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp())
+    contacts_file = work_dir / 'contactos.csv'
+    write_csv(contacts_file, args.contacts)
+
+    # Logs y registros de la corrida fuera de las carpetas reales
+    config.MESSAGES_LOG_FILE = work_dir / 'messages_sent.csv'
+    config.TIMINGS_FILE = work_dir / 'timings.json'
+    logging.getLogger('whatsapp_bot').setLevel(logging.WARNING)
+
+    page = StubWhatsAppWeb(StubOptions(
+        search_latency=args.search_latency,
+        send_latency=args.send_latency,
+        invalid_rate=args.invalid_rate,
+        failure_rate=args.failure_rate,
+        session_loss_rate=args.session_loss_rate,
+        seed=args.seed
+    ))
+    # Con demoras simuladas, que el chat no abierto se detecte rápido
+    client = create_fake_client(page, element_timeout=max(0.05, args.search_latency * 5))
+
+    bot = WhatsAppBot()
+    bot.whatsapp_client = client
+    bot.message_sender = MessageSender(
+        client, events=bot.events, min_delay=0, daily_cap=0,
+        suppression=SuppressionList(work_dir / 'suppression.csv'), retry_min_wait=0
+    )
+    # Evitar que el reporte de progreso en consola domine la medición
+    bot.message_sender._show_progress = lambda *args: None
+
+    timer = StageTimer()
+    timer.wrap(bot.data_manager, 'load_contacts')
+    timer.wrap(client, 'start_browser')
+    timer.wrap(client, 'wait_for_qr_scan')
+    timer.wrap(client, 'search_contact')
+    timer.wrap(client, 'send_message')
+    timer.wrap(bot.message_sender, '_prepare_contact')
+    timer.wrap(bot.message_sender, '_apply_delay')
+    timer.wrap(logger, 'log_message_sent')
+
+    try:
+        started = time.perf_counter()
+        bot.run(str(contacts_file), settings=CampaignSettings(limit=None, delay=0))
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    stats = bot.message_sender.get_stats()
+    result = {
+        'contacts': args.contacts,
+        'seconds': round(elapsed, 3),
+        'messages_per_second': round(stats.messages_sent / elapsed, 1) if elapsed else 0,
+        'messages_sent': stats.messages_sent,
+        'messages_failed': stats.messages_failed,
+        'messages_retried': stats.messages_retried,
+        'messages_suppressed': stats.messages_suppressed,
+        'browser_restarts': stats.browser_restarts,
+        'page': page.stats,
+        'stages': timer.report()
+    }
+
+    print(f"📊 {args.contacts} contactos en {elapsed:.2f} s "
+          f"({result['messages_per_second']} mensajes/s)")
+    print(f"   enviados {stats.messages_sent}, fallidos {stats.messages_failed}, "
+          f"reintentos {stats.messages_retried}, suprimidos {stats.messages_suppressed}, "
+          f"reinicios {stats.browser_restarts}")
+    print(f"{'etapa':<20}{'llamadas':>10}{'total s':>10}{'ms/llamada':>12}{'% del total':>13}")
+    for stage, values in sorted(result['stages'].items(), key=lambda item: -item[1]['seconds']):
+        per_call = values['seconds'] / values['calls'] * 1000 if values['calls'] else 0
+        print(f"{stage:<20}{values['calls']:>10}{values['seconds']:>10.3f}{per_call:>12.3f}"
+              f"{values['seconds'] / elapsed * 100:>12.1f}%")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de serialización de una página de 1.000 contactos
+
+Compara el módulo json con orjson (si está instalado), el formato por filas
+con el columnar, y el tamaño y tiempo de gzip/brotli sobre cada resultado.
+
+Uso: python benchmarks/serialization_benchmark.py [cantidad] [repeticiones]
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import api_response
+import config
+
+
+def make_page(count):
+    """Página de contactos con la forma que devuelve /api/contacts"""
+    return [
+        {
+            'nombre': f'Contacto {i}',
+            'telefono': f'54911{i:08d}',
+            'telefono_original': f'+54 9 11 {i:08d}',
+            'fila': i + 1,
+            'mensaje': config.DEFAULT_MESSAGE_TEMPLATE,
+            'ciudad': 'Buenos Aires' if i % 2 else 'Córdoba',
+            'empresa': f'Empresa {i % 37}',
+            'status': 'valid'
+        }
+        for i in range(count)
+    ]
+
+
+def measure(function, repeat):
+    """Mejor tiempo de varias ejecuciones, en milisegundos"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de serialización de contactos')
+    parser.add_argument('count', nargs='?', type=int, default=1000, help='Contactos por página')
+    parser.add_argument('repeat', nargs='?', type=int, default=50, help='Repeticiones por medición')
+    args = parser.parse_args()
+
+    contacts = make_page(args.count)
+    payloads = {
+        'filas': {'success': True, 'contacts': contacts},
+        'columnar': {'success': True, 'contacts': api_response.to_columnar(contacts)}
+    }
+    encoders = {'json': lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')}
+    if api_response.orjson is not None:
+        encoders['orjson'] = api_response.dumps
+
+    print(f"📊 {args.count} contactos, mejor de {args.repeat} repeticiones")
+    print(f"{'formato':<10}{'encoder':<9}{'ms':>8}{'bytes':>10}{'gzip ms':>10}{'gzip bytes':>12}"
+          f"{'br ms':>8}{'br bytes':>10}")
+
+    for shape, payload in payloads.items():
+        for name, encode in encoders.items():
+            encode_ms, data = measure(lambda: encode(payload), args.repeat)
+            gzip_ms, gzipped = measure(lambda: gzip.compress(data, compresslevel=config.GZIP_LEVEL), args.repeat)
+            row = f"{shape:<10}{name:<9}{encode_ms:>8.2f}{len(data):>10}{gzip_ms:>10.2f}{len(gzipped):>12}"
+            if api_response.brotli is not None:
+                br_ms, compressed = measure(
+                    lambda: api_response.brotli.compress(data, quality=config.BROTLI_QUALITY), args.repeat
+                )
+                row += f"{br_ms:>8.2f}{len(compressed):>10}"
+            else:
+                row += f"{'-':>8}{'-':>10}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Costo de arranque: tiempo de import, --help/--version y disponibilidad de /health
+
+En procesos nuevos mide:
+- import de app y de main con -X importtime (total y los módulos más lentos)
+- python main.py --help y --version
+- el tiempo desde que se lanza el servidor hasta que /health responde 200
+
+Sale con código 1 si al arrancar se importa alguna dependencia pesada
+(pandas, selenium.webdriver, webdriver_manager...) o si la mediana supera
+el objetivo de --help o de /health.
+
+Uso: python benchmarks/startup_benchmark.py [--runs N] [--server dev|gunicorn]
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Dependencias que solo deben cargarse al usarlas (primer archivo, primer navegador, envío por API)
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'openpyxl', 'selenium.webdriver', 'webdriver_manager', 'aiohttp')
+# aiohttp lo importa el cliente de python-socketio: solo se exige su ausencia en main
+ALLOWED_HEAVY = {'app': {'aiohttp'}, 'main': set()}
+
+# Objetivos (mediana, en segundos)
+HELP_TARGET = 0.3
+HEALTH_TARGET = 1.0
+HEALTH_TIMEOUT = 30
+
+# Estado interno de los procesos medidos, fuera de data/
+STATE_DIR = Path(tempfile.gettempdir()) / 'whatsapp_bot_startup_state'
+
+
+def isolated_env(**extra) -> dict:
+    return dict(os.environ, STATE_DIR=str(STATE_DIR), **extra)
+
+
+def import_profile(module: str):
+    """
+    Importa el módulo con -X importtime en un proceso nuevo.
+
+    Returns:
+        Tupla (microsegundos totales, [(acumulado, propio, módulo)], módulos cargados)
+    """
+    code = f"import sys, {module}; print(','.join(sys.modules))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            env=isolated_env(), capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+        if not name.startswith('  ') and name.strip() != module:
+            entries = []  # Otro import de primer nivel (site, .pth): no es parte del módulo
+    total = entries[-1][0]
+    loaded = set(result.stdout.strip().split(','))
+    return total, entries, loaded
+
+
+def timed_run(args) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=ROOT, env=isolated_env(),
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def health_ready_time(server: str) -> float:
+    """Segundos desde que se lanza el servidor hasta el primer 200 de /health"""
+    port = free_port()
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    else:
+        command = [sys.executable, 'app.py']
+    env = isolated_env(PORT=str(port), FLASK_ENV='production')
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < HEALTH_TIMEOUT:
+            if process.poll() is not None:
+                raise RuntimeError(f"El servidor terminó con código {process.returncode}")
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.01)
+        raise RuntimeError(f"/health no respondió en {HEALTH_TIMEOUT}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Costo de arranque de app.py y main.py')
+    parser.add_argument('--runs', type=int, default=5, help='Repeticiones de cada medición (se informa la mediana)')
+    parser.add_argument('--top', type=int, default=10, help='Módulos más lentos a mostrar por import')
+    parser.add_argument('--server', choices=['dev', 'gunicorn'], default='dev',
+                        help='Servidor para medir /health: python app.py o gunicorn con gunicorn.conf.py')
+    args = parser.parse_args()
+
+    failures = []
+    STATE_DIR.mkdir(exist_ok=True)
+
+    for module in ('app', 'main'):
+        runs = [import_profile(module) for _ in range(args.runs)]
+        total = statistics.median(run[0] for run in runs)
+        _, entries, loaded = runs[-1]
+        heavy = sorted(name for name in HEAVY_MODULES if name in loaded and name not in ALLOWED_HEAVY[module])
+        print(f"📦 import {module}: {total / 1000:.1f} ms (mediana de {args.runs})")
+        for cumulative, self_us, name in sorted(entries, reverse=True)[1:args.top + 1]:
+            print(f"   {cumulative / 1000:>8.1f} ms acumulado {self_us / 1000:>7.1f} ms propio  {name.strip()}")
+        if heavy:
+            failures.append(f"import {module} carga {', '.join(heavy)}")
+
+    for flag in ('--help', '--version'):
+        elapsed = statistics.median(timed_run(['main.py', flag]) for _ in range(args.runs))
+        print(f"⌨️  main.py {flag}: {elapsed * 1000:.0f} ms (objetivo {HELP_TARGET * 1000:.0f} ms)")
+        if elapsed > HELP_TARGET:
+            failures.append(f"main.py {flag} tardó {elapsed:.2f}s")
+
+    elapsed = statistics.median(health_ready_time(args.server) for _ in range(args.runs))
+    print(f"🩺 /health listo ({args.server}): {elapsed * 1000:.0f} ms (objetivo {HEALTH_TARGET * 1000:.0f} ms)")
+    if elapsed > HEALTH_TARGET:
+        failures.append(f"/health tardó {elapsed:.2f}s en estar disponible")
+
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
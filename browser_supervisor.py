@@ -0,0 +1,97 @@
+"""
+Supervisión del navegador y recuperación automática de la sesión
+"""
+
+import time
+import config
+import logger
+from whatsapp_client import WhatsAppClient
+
+
+class BrowserSupervisor:
+    """
+    Vigila la salud del navegador durante una campaña.
+
+    La verificación por contacto solo consulta el proceso local de
+    chromedriver; la verificación completa (una llamada a WebDriver) se hace
+    como máximo una vez cada check_interval segundos. Si el navegador cae,
+    recover() lo reinicia y restaura la sesión persistida.
+    """
+
+    def __init__(self, client: WhatsAppClient,
+                 check_interval: float = config.BROWSER_HEALTH_CHECK_INTERVAL,
+                 max_restarts: int = config.MAX_BROWSER_RESTARTS,
+                 clock=time.monotonic):
+        self.client = client
+        self.check_interval = check_interval
+        self.max_restarts = max_restarts
+        self._clock = clock
+        self._last_check = clock()
+        self.restarts = 0
+        self.failed_recoveries = 0
+        self.recovery_time = 0.0
+
+    def is_healthy(self, force: bool = False) -> bool:
+        """
+        Verifica la salud del navegador.
+
+        Args:
+            force (bool): Hacer la verificación completa aunque no haya vencido el intervalo
+
+        Returns:
+            bool: True si el navegador sigue funcionando
+        """
+        if not self.client.is_browser_process_alive():
+            return False
+
+        now = self._clock()
+        if force or now - self._last_check >= self.check_interval:
+            self._last_check = now
+            return self.client.is_browser_running()
+
+        return True
+
+    def recover(self) -> bool:
+        """
+        Reinicia el navegador y restaura la sesión.
+
+        Returns:
+            bool: True si el navegador se recuperó
+        """
+        if self.restarts >= self.max_restarts:
+            logger.log_error(f"Se alcanzó el máximo de {self.max_restarts} reinicios del navegador")
+            return False
+
+        self.restarts += 1
+        started = self._clock()
+
+        try:
+            recovered = self.client.restart_browser()
+        except Exception as e:
+            logger.log_error("Error al reiniciar el navegador", e)
+            recovered = False
+
+        elapsed = self._clock() - started
+        self.recovery_time += elapsed
+        self._last_check = self._clock()
+
+        if recovered:
+            logger.log_info(f"Navegador recuperado en {elapsed:.1f} segundos (reinicio {self.restarts})")
+        else:
+            self.failed_recoveries += 1
+            logger.log_error("No se pudo recuperar la sesión del navegador")
+
+        return recovered
+
+    def ensure_healthy(self) -> bool:
+        """
+        Verifica la salud del navegador e intenta recuperarlo si cayó.
+
+        Returns:
+            bool: True si el navegador está disponible
+        """
+        if self.is_healthy():
+            return True
+
+        logger.log_error("El navegador se cerró inesperadamente")
+        return self.recover()
@@ -0,0 +1,88 @@
+"""
+Configuración propia de cada campaña de envío
+"""
+
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, Optional, Any
+import config
+
+
+# Medios de envío soportados
+TRANSPORTS = ('browser', 'api')
+
+
+@dataclass(frozen=True)
+class CampaignSettings:
+    """
+    Parámetros de una campaña.
+
+    Es inmutable: cada campaña recibe su propia instancia y los valores de
+    config.py solo se usan como valores por defecto, nunca se modifican.
+    """
+    message_template: str = config.DEFAULT_MESSAGE_TEMPLATE
+    limit: Optional[int] = None
+    delay: int = config.DEFAULT_DELAY_BETWEEN_MESSAGES
+    transport: str = 'browser'
+
+    def __post_init__(self):
+        if not self.message_template or not self.message_template.strip():
+            raise ValueError("La plantilla del mensaje no puede estar vacía")
+        if self.limit is not None and self.limit < 0:
+            raise ValueError("El límite de mensajes no puede ser negativo")
+        if self.delay < 0:
+            raise ValueError("El delay entre mensajes no puede ser negativo")
+        if self.transport not in TRANSPORTS:
+            raise ValueError(f"Transporte no soportado: {self.transport}")
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'CampaignSettings':
+        """
+        Crea la configuración a partir de los datos de una solicitud.
+
+        Args:
+            data (Optional[Dict[str, Any]]): Datos con las claves message (o
+                message_template), limit, delay y transport
+
+        Returns:
+            CampaignSettings: Configuración de la campaña
+
+        Raises:
+            ValueError: Si algún valor es inválido
+        """
+        data = data or {}
+        limit = data.get('limit', config.DEFAULT_MESSAGE_LIMIT)
+        try:
+            return cls(
+                message_template=(data.get('message') or data.get('message_template')
+                                  or config.DEFAULT_MESSAGE_TEMPLATE),
+                limit=int(limit) if limit is not None else None,
+                delay=int(data.get('delay', config.DEFAULT_DELAY_BETWEEN_MESSAGES)),
+                transport=data.get('transport') or 'browser'
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Parámetros de campaña inválidos: {e}") from e
+
+    def with_overrides(self, **changes) -> 'CampaignSettings':
+        """
+        Crea una copia con los valores indicados (se ignoran los None).
+
+        Returns:
+            CampaignSettings: Nueva configuración
+        """
+        changes = {key: value for key, value in changes.items() if value is not None}
+        return replace(self, **changes) if changes else self
+
+    def to_dict(self, include_template: bool = True) -> Dict[str, Any]:
+        """
+        Serializa la configuración.
+
+        Args:
+            include_template (bool): Incluir la plantilla del mensaje
+
+        Returns:
+            Dict[str, Any]: Configuración como diccionario
+        """
+        data = asdict(self)
+        if not include_template:
+            data.pop('message_template')
+        return data
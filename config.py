@@ -9,20 +9,121 @@ from pathlib import Path
 CHROME_DRIVER_PATH = None  # None para usar webdriver-manager
 CHROME_PROFILE_PATH = None  # None para usar perfil temporal
 CHROME_USER_DATA_DIR = None  # None para usar directorio temporal
+CHROME_PERSIST_SESSION = True  # Guardar la sesión de WhatsApp Web para recuperarla tras un reinicio
 
 # URLs
-WHATSAPP_WEB_URL = "https://web.whatsapp.com"
+WHATSAPP_WEB_URL = os.getenv("WHATSAPP_WEB_URL", "https://web.whatsapp.com")  # Otra URL para usar la página simulada (fake_whatsapp.py)
 
 # Tiempos de espera (en segundos)
 TIMEOUT_QR_SCAN = 60  # Tiempo para escanear código QR
 TIMEOUT_PAGE_LOAD = 30  # Tiempo para cargar páginas
 TIMEOUT_ELEMENT_WAIT = 10  # Tiempo para encontrar elementos
 TIMEOUT_MESSAGE_SEND = 5  # Tiempo para enviar mensaje
+ELEMENT_POLL_FREQUENCY = 0.5  # Segundos entre comprobaciones al esperar un elemento
+
+# Pausas tras cada acción para que WhatsApp Web la procese (en segundos)
+SETTLE_DELAYS = {
+    "authenticated": 3,  # Tras detectar el panel lateral
+    "search_cleared": 0.5,
+    "search_typed": 2,
+    "search_submitted": 3,
+    "message_cleared": 0.5,
+    "message_typed": 1,
+    "message_sent": TIMEOUT_MESSAGE_SEND,
+}
 
 # Límites
 DEFAULT_MESSAGE_LIMIT = 50  # Número máximo de mensajes por sesión
 DEFAULT_DELAY_BETWEEN_MESSAGES = 20  # Segundos entre mensajes
 
+# Ritmo adaptativo de envío
+PACING_MIN_DELAY = 5  # Separación mínima en segundos entre el inicio de dos envíos
+PACING_DAILY_CAP = 500  # Mensajes enviados por día como máximo (0 = sin límite)
+PACING_MAX_BACKOFF = 8.0  # Multiplicador máximo del delay ante errores
+PACING_FAILURE_THRESHOLD = 3  # Fallos consecutivos que activan el backoff
+PACING_INVALID_RATE_THRESHOLD = 0.3  # Proporción de números inválidos que activa el backoff
+PACING_WINDOW = 20  # Resultados recientes usados para calcular tasas
+
+# Supervisión del navegador
+BROWSER_HEALTH_CHECK_INTERVAL = 60  # Segundos entre verificaciones completas vía WebDriver
+MAX_BROWSER_RESTARTS = 3  # Reinicios automáticos permitidos por campaña
+
+# Campañas simultáneas
+MAX_CONCURRENT_JOBS = 2  # Campañas ejecutándose a la vez (cada una con su navegador y su perfil de Chrome)
+JOB_HISTORY_LIMIT = 100  # Campañas terminadas que se conservan en memoria
+
+# Varios procesos web (workers de gunicorn)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))  # Con más de uno el estado se comparte en SHARED_STATE_DB
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", "")  # URL redis:// o amqp:// (vacío: cola en SQLite)
+WORKER_HEARTBEAT_INTERVAL = 2  # Segundos entre latidos de cada worker
+WORKER_TIMEOUT = 10  # Segundos sin latir tras los que un worker (y su lease del navegador) se da por perdido
+MESSAGE_QUEUE_POLL_INTERVAL = 0.05  # Segundos entre lecturas de la cola de mensajes SQLite
+MESSAGE_QUEUE_RETENTION = 60  # Segundos que se conservan los mensajes de la cola
+
+# Proceso worker del navegador (python -m worker)
+BROWSER_WORKER = os.getenv("BROWSER_WORKER", "").lower() in ("1", "true", "yes")  # Las campañas con navegador corren en el worker, no en el proceso web
+BROWSER_WORKER_ID = "browser-worker"  # ID del worker en el estado compartido
+BROWSER_WORKER_POLL_INTERVAL = 0.2  # Segundos entre lecturas de los comandos enviados por los procesos web
+
+# Progreso en tiempo real (Socket.IO)
+PROGRESS_MAX_EMITS_PER_SECOND = 4  # Emisiones máximas por segundo y por campaña
+PROGRESS_MAX_BATCH_RESULTS = 200  # Resultados acumulados por emisión (los más viejos se descartan)
+WEB_LOG_MAX_MESSAGES = 100  # Mensajes de log que conservan las interfaces web
+
+# Subida de archivos de contactos
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Bytes leídos por iteración al recibir un archivo
+UPLOAD_PREVIEW_SIZE = 5  # Contactos incluidos en la vista previa de la respuesta
+UPLOAD_PIN_GRACE = 60  # Segundos antes de que un archivo protegido sin campaña activa pueda liberarse
+MAX_VALIDATION_WORKERS = 2  # Validaciones completas de archivos en segundo plano
+CONTACT_INDEX_BATCH_SIZE = 1000  # Filas leídas e insertadas por lote al indexar un archivo
+CONTACTS_PAGE_SIZE = 50  # Contactos por página en /api/contacts
+CONTACTS_PAGE_MAX = 500  # Tamaño máximo de página que puede pedir un cliente
+CONTACT_CACHE_ENABLED = True  # Guardar los contactos procesados de cada archivo (Feather si hay pyarrow)
+CONTACT_CACHE_MAX_FILES = 200  # Archivos de caché conservados (se borran los menos usados)
+
+# Pool de procesos para parsear, validar y exportar archivos fuera del proceso web
+TASK_POOL_WORKERS = int(os.getenv("TASK_POOL_WORKERS", "2"))  # Procesos del pool (0: las tareas corren en el hilo que las pide)
+TASK_POOL_MAX_PENDING = 8  # Tareas esperando un proceso libre; con más se responde 503
+TASK_TIMEOUT = 120  # Segundos máximos que un handler espera una tarea
+TASK_POOL_START_METHOD = "spawn"  # Sin fork: el proceso web tiene hilos (y con gevent, monkey-patching)
+
+# Instrumentación de tiempos por etapa (instrumentation.py)
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION", "1") != "0"  # Con "0" los temporizadores no miden nada
+HISTOGRAM_SIGNIFICANT_BITS = 5  # 32 intervalos por potencia de 2: error relativo de ~3% en los percentiles
+
+# Métricas de Prometheus (/metrics)
+METRICS_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # Segundos
+METRICS_PUBLISH_INTERVAL = 5  # Segundos entre publicaciones de las métricas de cada worker al estado compartido
+
+# Perfilado bajo demanda (profiling.py y /api/admin); los resultados quedan en LOGS_DIR
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # Vacío desactiva la API de administración
+PROFILE_SAMPLE_INTERVAL = 0.01  # Segundos entre muestras de las pilas de los hilos
+PROFILE_MAX_SECONDS = 600  # Duración máxima de un perfil pedido por la API
+TRACEMALLOC_FRAMES = 30  # Marcos guardados por asignación (para atribuirlas a DataManager a través de pandas)
+MEMORY_REPORT_TOP = 25  # Líneas con más memoria (y más crecimiento) en cada reporte de tracemalloc
+
+# Respuestas de la API
+COMPRESSION_MIN_BYTES = 1024  # Tamaño mínimo de respuesta para comprimir con gzip/brotli
+GZIP_LEVEL = 6  # Nivel de compresión gzip (1-9)
+BROTLI_QUALITY = 4  # Calidad de brotli (0-11); valores altos son lentos para respuestas dinámicas
+
+# Reintentos y supresión de números
+MAX_RETRY_ATTEMPTS = 2  # Reintentos por contacto ante fallos transitorios
+RETRY_MIN_WAIT = 30  # Segundos mínimos antes de reintentar un contacto
+
+# Transporte por API HTTP (alternativa a WhatsApp Web)
+API_BASE_URL = os.getenv("WHATSAPP_API_URL", "")  # URL base del proveedor de la API
+API_TOKEN = os.getenv("WHATSAPP_API_TOKEN", "")  # Token Bearer, vacío para no enviar cabecera
+API_SEND_PATH = "/messages"  # Ruta del endpoint de envío
+API_DEFAULT_ACCOUNT = "default"  # Cuenta usada si el contacto no define la columna "cuenta"
+API_MAX_CONCURRENCY = 8  # Solicitudes simultáneas en vuelo
+API_RATE_PER_SECOND = 1.0  # Mensajes por segundo permitidos por cuenta
+API_BURST = 5  # Capacidad del token bucket de cada cuenta
+API_MAX_RETRIES = 3  # Reintentos ante 429/5xx o errores de red
+API_BACKOFF_BASE = 1.0  # Segundos base del backoff exponencial
+API_BACKOFF_MAX = 60  # Tope del backoff en segundos
+API_REQUEST_TIMEOUT = 15  # Timeout total por solicitud en segundos
+
 # Mensajes
 DEFAULT_MESSAGE_TEMPLATE = "Hola {nombre}, este es un mensaje automático."
 
@@ -33,16 +134,35 @@ LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 # Directorios
 BASE_DIR = Path(__file__).parent
-LOGS_DIR = BASE_DIR / "logs"
+# LOGS_DIR en el entorno lleva los logs a otra carpeta (por ejemplo, en los tests)
+LOGS_DIR = Path(os.getenv("LOGS_DIR") or BASE_DIR / "logs")
 DATA_DIR = BASE_DIR / "data"
-
-# Crear directorios si no existen
-LOGS_DIR.mkdir(exist_ok=True)
-DATA_DIR.mkdir(exist_ok=True)
+# Los directorios se crean al escribir el primer archivo: importar config no toca el disco
 
 # Archivos de log
 LOG_FILE = LOGS_DIR / "whatsapp_bot.log"
 MESSAGES_LOG_FILE = LOGS_DIR / "messages_sent.csv"
+TIMINGS_FILE = LOGS_DIR / "timings.json"  # Histogramas de tiempos por etapa, al terminar cada sesión
+
+# Estado persistente interno (fuera del listado de archivos de contactos).
+# STATE_DIR en el entorno lo lleva a otra carpeta (por ejemplo, en las pruebas de carga)
+STATE_DIR = Path(os.getenv("STATE_DIR") or DATA_DIR / "state")
+
+# Perfil de Chrome con la sesión persistida (si CHROME_USER_DATA_DIR es None).
+# Las campañas simultáneas usan chrome_session_1, chrome_session_2...
+CHROME_SESSION_DIR = STATE_DIR / "chrome_session"
+
+# Archivos subidos guardados por hash de contenido
+UPLOAD_STORE_DIR = STATE_DIR / "uploads"
+
+# Estado compartido entre procesos: campañas, workers, leases y cola de Socket.IO
+SHARED_STATE_DB = STATE_DIR / "shared_state.sqlite"
+
+# Caché columnar de contactos procesados, por hash de contenido
+CONTACT_CACHE_DIR = UPLOAD_STORE_DIR / "columnar"
+
+# Números que no deben volver a intentarse (no registrados en WhatsApp, etc.)
+SUPPRESSION_FILE = STATE_DIR / "suppression.csv"
 
 # Configuración de archivos CSV
 CSV_REQUIRED_COLUMNS = ["nombre", "telefono"]
@@ -0,0 +1,241 @@
+"""
+Caché en disco, en formato columnar, de los contactos ya procesados de cada archivo
+"""
+
+import importlib.util
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+import config
+import logger
+import utils
+
+if TYPE_CHECKING:
+    import pandas as pd  # pandas y pyarrow se importan al leer o escribir la caché
+
+# pyarrow es opcional: sin él la caché usa pickle de pandas
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+# Cambiar al modificar las columnas guardadas: las cachés viejas dejan de usarse
+CACHE_VERSION = 1
+
+# Columnas que siempre tiene un contacto procesado
+CONTACT_COLUMNS = ['nombre', 'telefono', 'telefono_original', 'fila', 'mensaje']
+
+
+class ContactCache:
+    """
+    Guarda los contactos procesados de un archivo como una tabla columnar
+    con el hash del contenido como nombre.
+
+    Con pyarrow instalado la tabla es un archivo Feather (Arrow IPC) que se
+    lee con memory-map; sin pyarrow se usa pickle de pandas. En los dos
+    casos leer la caché evita volver a parsear el Excel o el CSV.
+
+    La caché no incluye la plantilla de mensaje: los contactos sin mensaje
+    propio se guardan con mensaje vacío y DataManager aplica la plantilla
+    de cada campaña al cargar. Como la clave es el hash, un archivo
+    modificado nunca usa la caché de su contenido anterior.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path] = None,
+                 max_files: int = config.CONTACT_CACHE_MAX_FILES):
+        self.cache_dir = Path(cache_dir or config.CONTACT_CACHE_DIR)
+        self.max_files = max_files
+        self.format = 'feather' if HAS_PYARROW else 'pickle'
+        if not HAS_PYARROW:
+            logger.log_warning("pyarrow no está instalado: la caché de contactos usa pickle, sin memory-map")
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'hit_seconds': 0.0,
+            'miss_seconds': 0.0,
+            'errors': 0
+        }
+
+    def source_hash(self, file_path: Union[str, Path]) -> str:
+        """
+        Obtiene el hash del contenido de un archivo.
+
+        El hash se recalcula solo si cambió el tamaño o la fecha de
+        modificación del archivo.
+
+        Args:
+            file_path (Union[str, Path]): Archivo de contactos
+
+        Returns:
+            str: SHA-256 del contenido
+        """
+        path = str(Path(file_path).resolve())
+        info = os.stat(path)
+        with self._lock:
+            known = self._hashes.get(path)
+        if known and known[:2] == (info.st_size, info.st_mtime_ns):
+            return known[2]
+
+        sha256 = utils.file_sha256(path)
+        with self._lock:
+            self._hashes[path] = (info.st_size, info.st_mtime_ns, sha256)
+        return sha256
+
+    def path_for(self, sha256: str) -> Path:
+        """
+        Ruta de la caché de un contenido.
+
+        Args:
+            sha256 (str): Hash del contenido
+
+        Returns:
+            Path: Ruta del archivo de caché (puede no existir)
+        """
+        return self.cache_dir / f"{sha256}.v{CACHE_VERSION}.{self.format}"
+
+    def load(self, sha256: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Lee los contactos guardados de un contenido.
+
+        Args:
+            sha256 (str): Hash del contenido
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Contactos sin plantilla aplicada, o None si no hay caché
+        """
+        path = self.path_for(sha256)
+        if not path.exists():
+            return None
+
+        try:
+            if self.format == 'feather':
+                import pyarrow.feather as feather
+                df = feather.read_feather(path, memory_map=True)
+            else:
+                import pandas as pd
+                df = pd.read_pickle(path)
+        except Exception as e:
+            logger.log_warning(f"Caché de contactos ilegible, se descarta: {path.name} ({e})")
+            self._count('errors')
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path)  # Para el orden de _prune
+        return _to_contacts(df)
+
+    def save(self, sha256: str, contacts: List[Dict[str, Any]]):
+        """
+        Guarda los contactos procesados de un contenido.
+
+        Args:
+            sha256 (str): Hash del contenido
+            contacts (List[Dict[str, Any]]): Contactos sin plantilla aplicada
+        """
+        path = self.path_for(sha256)
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            df = _to_frame(contacts)
+            if self.format == 'feather':
+                # Sin compresión para poder leerlo con memory-map
+                import pyarrow.feather as feather
+                feather.write_feather(df, temp_path, compression='uncompressed')
+            else:
+                df.to_pickle(temp_path)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.log_warning(f"No se pudo guardar la caché de contactos {path.name}: {e}")
+            self._count('errors')
+            temp_path.unlink(missing_ok=True)
+            return
+
+        self._prune()
+
+    def record(self, hit: bool, seconds: float):
+        """
+        Registra una carga de contactos.
+
+        Args:
+            hit (bool): Si se usó la caché
+            seconds (float): Duración de la carga
+        """
+        with self._lock:
+            self._stats['hits' if hit else 'misses'] += 1
+            self._stats['hit_seconds' if hit else 'miss_seconds'] += seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas de uso de la caché.
+
+        Returns:
+            Dict[str, Any]: Aciertos, fallos y tiempo promedio de carga de cada caso
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        for kind, count in (('hit', stats['hits']), ('miss', stats['misses'])):
+            stats[f'avg_{kind}_seconds'] = round(stats[f'{kind}_seconds'] / count, 6) if count else None
+        stats['format'] = self.format
+        return stats
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _prune(self):
+        """
+        Borra las cachés menos usadas recientemente si se superó max_files.
+        """
+        if not self.max_files:
+            return
+        files = sorted(self.cache_dir.glob('*.v*.*'), key=lambda p: p.stat().st_mtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            path.unlink(missing_ok=True)
+
+
+def _to_frame(contacts: List[Dict[str, Any]]) -> 'pd.DataFrame':
+    import pandas as pd
+
+    columns = list(CONTACT_COLUMNS)
+    for contact in contacts:
+        columns.extend(key for key in contact if key not in columns)
+    df = pd.DataFrame.from_records(contacts, columns=columns)
+    # Todo como texto salvo la fila, para que Arrow tenga un tipo por columna
+    for column in columns:
+        if column != 'fila':
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+    df['fila'] = df['fila'].astype('int64')
+    return df
+
+
+def _to_contacts(df: 'pd.DataFrame') -> List[Dict[str, Any]]:
+    contacts = df.to_dict('records')
+    # Las columnas opcionales vacías no se guardan en el contacto
+    for contact in contacts:
+        for key in [key for key, value in contact.items() if value is None and key not in CONTACT_COLUMNS]:
+            del contact[key]
+        contact['fila'] = int(contact['fila'])
+        contact['mensaje'] = contact['mensaje'] or ''
+    return contacts
+
+
+_default_cache: Optional[ContactCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ContactCache]:
+    """
+    Obtiene la caché compartida por los DataManager del proceso.
+
+    Returns:
+        Optional[ContactCache]: Caché, o None si está desactivada en config
+    """
+    global _default_cache
+    if not config.CONTACT_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ContactCache()
+        return _default_cache
@@ -0,0 +1,331 @@
+"""
+Índice en disco (SQLite) de los contactos de un archivo para consultarlos por páginas
+"""
+
+import csv
+import json
+import os
+import re
+import sqlite3
+import uuid
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import config
+import logger
+import utils
+from data_manager import DataManager
+
+if TYPE_CHECKING:
+    import pandas as pd  # Se importa al construir el primer índice
+
+
+# Estado de cada fila, con los mismos nombres que DataManager.validate_contacts
+CONTACT_STATUSES = ('valid', 'invalid_phone', 'empty_name')
+
+# Campos que siempre tiene una fila del índice
+BASE_FIELDS = ('fila', 'status')
+
+# Cota superior para las búsquedas por prefijo (col >= p AND col < p + SEARCH_MAX)
+SEARCH_MAX = '\U0010ffff'
+
+SCHEMA = """
+CREATE TABLE contacts (
+    fila INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    nombre_key TEXT NOT NULL,
+    telefono TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX contacts_status ON contacts (status, fila);
+CREATE INDEX contacts_nombre ON contacts (nombre_key, fila);
+CREATE INDEX contacts_telefono ON contacts (telefono, fila);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class ContactIndex:
+    """
+    Contactos de un archivo guardados en SQLite, con índices por estado,
+    nombre y teléfono.
+
+    Se construye una sola vez por contenido (al subir el archivo) y las
+    consultas leen solo la página pedida: recorrer una lista de 100.000
+    filas no requiere cargarla en memoria. Se guardan también las filas
+    inválidas, para poder listarlas filtrando por estado.
+
+    Los contactos sin mensaje propio se guardan sin 'mensaje'; la plantilla
+    se agrega al consultar.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    @classmethod
+    def build(cls, filepath: Union[str, Path], path: Union[str, Path],
+              batch_size: int = config.CONTACT_INDEX_BATCH_SIZE) -> "ContactIndex":
+        """
+        Construye el índice de un archivo de contactos.
+
+        El índice se escribe en un archivo temporal y se renombra al
+        terminar, así una consulta nunca ve un índice a medio construir.
+
+        Args:
+            filepath (Union[str, Path]): Archivo CSV o Excel
+            path (Union[str, Path]): Archivo SQLite a crear
+            batch_size (int): Filas leídas e insertadas por lote
+
+        Returns:
+            ContactIndex: Índice construido
+
+        Raises:
+            ValueError: Si faltan columnas requeridas o el tipo no es soportado
+        """
+        index = cls(path)
+        index.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = index.path.with_name(f".{index.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+        for encoding in ('utf-8', 'latin-1', 'cp1252', 'iso-8859-1'):
+            temp_path.unlink(missing_ok=True)
+            try:
+                index._write(temp_path, _read_batches(filepath, batch_size, encoding))
+                break
+            except UnicodeDecodeError:
+                # Igual que DataManager: probar el siguiente encoding
+                continue
+            except Exception:
+                temp_path.unlink(missing_ok=True)
+                raise
+
+        os.replace(temp_path, index.path)
+        logger.log_debug(f"Índice de contactos creado: {index.path}")
+        return index
+
+    def _write(self, temp_path: Path, batches: Iterator[Tuple[List[str], List[Sequence]]]):
+        import pandas as pd
+
+        data_manager = DataManager()
+        counts = dict.fromkeys(CONTACT_STATUSES, 0)
+        columns: List[str] = []
+
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.executescript(SCHEMA)
+            fila = 0
+            for columns, rows in batches:
+                records = []
+                for values in rows:
+                    fila += 1
+                    status, contact = _classify(data_manager, pd.Series(dict(zip(columns, values))), fila)
+                    counts[status] += 1
+                    records.append((
+                        fila, status, contact.get('nombre', '').lower(),
+                        contact.get('telefono') or re.sub(r'[^\d]', '', contact.get('telefono_original', '')),
+                        json.dumps(contact, ensure_ascii=False)
+                    ))
+                conn.executemany("INSERT INTO contacts VALUES (?, ?, ?, ?, ?)", records)
+
+            counts['total'] = sum(counts.values())
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ('counts', json.dumps(counts)),
+                ('columns', json.dumps(columns, ensure_ascii=False))
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Obtiene la cantidad de filas por estado.
+
+        Returns:
+            Dict[str, int]: total, valid, invalid_phone y empty_name
+        """
+        return self._meta('counts')
+
+    def columns(self) -> List[str]:
+        """
+        Obtiene las columnas del archivo original.
+
+        Returns:
+            List[str]: Nombres de columna
+        """
+        return self._meta('columns')
+
+    def page(self, cursor: int = 0, limit: int = config.CONTACTS_PAGE_SIZE,
+             fields: Optional[Sequence[str]] = None, status: Optional[str] = None,
+             search: Optional[str] = None,
+             message_template: str = config.DEFAULT_MESSAGE_TEMPLATE) -> Dict[str, Any]:
+        """
+        Obtiene una página de contactos en el orden del archivo.
+
+        Args:
+            cursor (int): Última fila de la página anterior (0 para empezar)
+            limit (int): Contactos por página
+            fields (Optional[Sequence[str]]): Campos a devolver (None para todos)
+            status (Optional[str]): Filtrar por estado (valid, invalid_phone, empty_name)
+            search (Optional[str]): Prefijo del teléfono (si son dígitos) o del nombre
+            message_template (str): Mensaje de los contactos sin mensaje propio
+
+        Returns:
+            Dict[str, Any]: contacts y next_cursor (None si no hay más)
+
+        Raises:
+            ValueError: Si el estado no existe
+        """
+        limit = max(1, int(limit))
+        where, params = ["fila > ?"], [int(cursor)]
+        if status:
+            if status not in CONTACT_STATUSES:
+                raise ValueError(f"Estado no válido: {status}")
+            where.append("status = ?")
+            params.append(status)
+        if search:
+            column, prefix = _search_column(search)
+            where.append(f"{column} >= ? AND {column} < ?")
+            params.extend([prefix, prefix + SEARCH_MAX])
+
+        query = f"SELECT fila, status, data FROM contacts WHERE {' AND '.join(where)} ORDER BY fila LIMIT ?"
+        params.append(limit + 1)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        contacts = [
+            _project(fila, status, json.loads(data), fields, message_template)
+            for fila, status, data in rows[:limit]
+        ]
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return {'contacts': contacts, 'next_cursor': next_cursor}
+
+    def _meta(self, key: str) -> Any:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Solo lectura: el índice no cambia una vez construido
+        return closing(sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True))
+
+
+def _classify(data_manager: DataManager, row: 'pd.Series', fila: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Determina el estado de una fila y el contacto que se guarda para ella.
+    """
+    import pandas as pd
+
+    nombre = str(row.get('nombre', '')).strip()
+    telefono = str(row.get('telefono', '')).strip()
+
+    if not nombre or nombre.lower() in ('nan', 'none'):
+        status = 'empty_name'
+    elif not utils.format_phone_number(telefono):
+        status = 'invalid_phone'
+    else:
+        contact = data_manager._process_contact_row(row, fila - 1, message_template='')
+        if not contact['mensaje']:
+            del contact['mensaje']
+        return 'valid', contact
+
+    contact = {'nombre': nombre if status != 'empty_name' else '', 'telefono_original': telefono, 'fila': fila}
+    for col, value in row.items():
+        if col not in ('nombre', 'telefono') and pd.notna(value) and str(value).strip():
+            contact[col] = str(value).strip()
+    return status, contact
+
+
+def _search_column(search: str) -> Tuple[str, str]:
+    """
+    Elige la columna de búsqueda: teléfono si el texto son dígitos, nombre si no.
+    """
+    search = search.strip()
+    digits = re.sub(r'[\s+\-()]', '', search)
+    if digits.isdigit():
+        return 'telefono', digits
+    return 'nombre_key', search.lower()
+
+
+def _project(fila: int, status: str, contact: Dict[str, Any], fields: Optional[Sequence[str]],
+             message_template: str) -> Dict[str, Any]:
+    """
+    Arma el contacto de la respuesta con los campos pedidos.
+    """
+    if status == 'valid':
+        contact.setdefault('mensaje', message_template)
+    contact['fila'] = fila
+    contact['status'] = status
+    if fields is None:
+        return contact
+    return {field: contact.get(field) for field in (*BASE_FIELDS, *fields)}
+
+
+def _read_batches(filepath: Union[str, Path], batch_size: int,
+                  encoding: str) -> Iterator[Tuple[List[str], List[Sequence]]]:
+    """
+    Lee un archivo de contactos por lotes de filas, sin cargarlo completo.
+
+    Yields:
+        Tuple[List[str], List[Sequence]]: Columnas y filas del lote
+    """
+    extension = utils.get_file_extension(filepath)
+
+    if extension == 'csv':
+        with open(filepath, 'r', encoding=encoding, newline='') as f:
+            reader = csv.reader(f)
+            header = [value.lstrip('\ufeff').strip() for value in next(reader, [])]
+            _check_columns(header)
+            batch = []
+            for values in reader:
+                if not any(value.strip() for value in values):
+                    continue
+                batch.append([value if value != '' else None for value in values])
+                if len(batch) >= batch_size:
+                    yield header, batch
+                    batch = []
+            if batch:
+                yield header, batch
+
+    elif extension == 'xlsx':
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(filepath, read_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+            _check_columns(header)
+            batch = []
+            for values in rows:
+                if all(value is None for value in values):
+                    continue
+                batch.append(values)
+                if len(batch) >= batch_size:
+                    yield header, batch
+                    batch = []
+            if batch:
+                yield header, batch
+        finally:
+            workbook.close()
+
+    elif extension == 'xls':
+        # El formato viejo de Excel no se puede leer por partes
+        import pandas as pd
+
+        df = pd.read_excel(filepath)
+        header = [str(col) for col in df.columns]
+        _check_columns(header)
+        values = df.astype(object).where(df.notna(), None).values.tolist()
+        for start in range(0, len(values), batch_size):
+            yield header, values[start:start + batch_size]
+
+    else:
+        raise ValueError(f"Tipo de archivo no soportado: {extension}")
+
+
+def _check_columns(header: List[str]):
+    missing = [col for col in config.CSV_REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"Faltan columnas requeridas: {missing}")
@@ -2,12 +2,17 @@
 Gestor de datos para cargar contactos desde archivos Excel y CSV
 """
 
-import pandas as pd
+import time
 from pathlib import Path
-from typing import List, Dict, Optional, Union
+from typing import TYPE_CHECKING, List, Dict, Optional, Union
 import config
+import instrumentation
 import utils
 import logger
+from contact_cache import ContactCache, get_default_cache
+
+if TYPE_CHECKING:
+    import pandas as pd  # Se importa al leer el primer archivo
 
 
 class DataManager:
@@ -15,16 +20,22 @@ class DataManager:
     Clase para gestionar la carga y procesamiento de datos de contactos.
     """
 
-    def __init__(self):
+    def __init__(self, cache: Optional[ContactCache] = None):
         self.contacts = []
         self.file_path = None
+        self.cache = cache if cache is not None else get_default_cache()
+        self.last_load = None  # Origen y duración de la última carga
 
-    def load_contacts(self, file_path: Union[str, Path]) -> List[Dict]:
+    @instrumentation.timed("load_contacts")
+    def load_contacts(self, file_path: Union[str, Path],
+                      message_template: Optional[str] = None) -> List[Dict]:
         """
         Carga contactos desde un archivo Excel o CSV.
 
         Args:
             file_path (Union[str, Path]): Ruta al archivo de contactos
+            message_template (Optional[str]): Plantilla para los contactos sin
+                mensaje personalizado (por defecto config.DEFAULT_MESSAGE_TEMPLATE)
 
         Returns:
             List[Dict]: Lista de contactos cargados
@@ -41,20 +52,27 @@ class DataManager:
             logger.log_error(error_msg)
             raise FileNotFoundError(error_msg)
 
-        # Determinar el tipo de archivo y cargar
-        file_extension = utils.get_file_extension(self.file_path)
-
+        started = time.perf_counter()
         try:
-            if file_extension in ['xlsx', 'xls']:
-                df = self._load_excel_file()
-            elif file_extension == 'csv':
-                df = self._load_csv_file()
-            else:
-                raise ValueError(f"Tipo de archivo no soportado: {file_extension}")
-
-            # Procesar y validar los datos
-            self.contacts = self._process_dataframe(df)
-
+            sha256 = self.cache.source_hash(self.file_path) if self.cache else None
+            contacts = self.cache.load(sha256) if sha256 else None
+            hit = contacts is not None
+            if not hit:
+                # Se procesa sin plantilla para que la caché sirva a cualquier campaña
+                contacts = self._process_dataframe(self._load_dataframe(), '')
+                if sha256:
+                    self.cache.save(sha256, contacts)
+
+            template = message_template or config.DEFAULT_MESSAGE_TEMPLATE
+            for contact in contacts:
+                if not contact['mensaje']:
+                    contact['mensaje'] = template
+            self.contacts = contacts
+
+            duration = time.perf_counter() - started
+            self.last_load = {'cache_hit': hit, 'seconds': round(duration, 6)}
+            if self.cache:
+                self.cache.record(hit, duration)
             logger.log_info(config.MESSAGES["data_loaded"].format(count=len(self.contacts)))
             return self.contacts
 
@@ -62,23 +80,44 @@ class DataManager:
             logger.log_error(f"Error al cargar el archivo {self.file_path}", e)
             raise
 
-    def _load_excel_file(self) -> pd.DataFrame:
+    def _load_dataframe(self) -> 'pd.DataFrame':
+        """
+        Lee el archivo según su extensión.
+
+        Returns:
+            pd.DataFrame: DataFrame con los datos del archivo
+
+        Raises:
+            ValueError: Si el tipo de archivo no es soportado
+        """
+        file_extension = utils.get_file_extension(self.file_path)
+        if file_extension in ['xlsx', 'xls']:
+            return self._load_excel_file()
+        if file_extension == 'csv':
+            return self._load_csv_file()
+        raise ValueError(f"Tipo de archivo no soportado: {file_extension}")
+
+    def _load_excel_file(self) -> 'pd.DataFrame':
         """
         Carga un archivo Excel.
 
         Returns:
             pd.DataFrame: DataFrame con los datos del archivo
         """
+        import pandas as pd
+
         logger.log_debug(f"Cargando archivo Excel: {self.file_path}")
         return pd.read_excel(self.file_path)
 
-    def _load_csv_file(self) -> pd.DataFrame:
+    def _load_csv_file(self) -> 'pd.DataFrame':
         """
         Carga un archivo CSV.
 
         Returns:
             pd.DataFrame: DataFrame con los datos del archivo
         """
+        import pandas as pd
+
         logger.log_debug(f"Cargando archivo CSV: {self.file_path}")
 
         # Intentar diferentes encodings
@@ -93,12 +132,13 @@ class DataManager:
         # Si ningún encoding funciona, usar el por defecto
         return pd.read_csv(self.file_path)
 
-    def _process_dataframe(self, df: pd.DataFrame) -> List[Dict]:
+    def _process_dataframe(self, df: 'pd.DataFrame', message_template: str) -> List[Dict]:
         """
         Procesa el DataFrame y valida los datos.
 
         Args:
             df (pd.DataFrame): DataFrame con los datos crudos
+            message_template (str): Plantilla para los contactos sin mensaje propio
 
         Returns:
             List[Dict]: Lista de contactos procesados
@@ -116,7 +156,7 @@ class DataManager:
 
         for index, row in df.iterrows():
             try:
-                contact = self._process_contact_row(row, int(index))
+                contact = self._process_contact_row(row, int(index), message_template)
                 if contact:
                     contacts.append(contact)
             except Exception as e:
@@ -125,17 +165,21 @@ class DataManager:
 
         return contacts
 
-    def _process_contact_row(self, row: pd.Series, index: int) -> Optional[Dict]:
+    def _process_contact_row(self, row: 'pd.Series', index: int,
+                             message_template: str = config.DEFAULT_MESSAGE_TEMPLATE) -> Optional[Dict]:
         """
         Procesa una fila individual de contacto.
 
         Args:
             row (pd.Series): Fila del DataFrame
             index (int): Índice de la fila
+            message_template (str): Plantilla si la fila no trae mensaje
 
         Returns:
             Optional[Dict]: Datos del contacto procesados o None si es inválido
         """
+        import pandas as pd
+
         # Extraer datos básicos
         nombre = str(row.get('nombre', '')).strip()
         telefono = str(row.get('telefono', '')).strip()
@@ -165,7 +209,7 @@ class DataManager:
         if pd.notna(mensaje_personalizado) and str(mensaje_personalizado).strip():
             contact['mensaje'] = str(mensaje_personalizado).strip()
         else:
-            contact['mensaje'] = config.DEFAULT_MESSAGE_TEMPLATE
+            contact['mensaje'] = message_template
 
         # Agregar otros campos opcionales
         for col in row.index:
@@ -245,6 +289,8 @@ class DataManager:
         Returns:
             bool: True si la exportación fue exitosa
         """
+        import pandas as pd
+
         try:
             df = pd.DataFrame(self.contacts)
 
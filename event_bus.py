@@ -0,0 +1,78 @@
+"""
+Bus de eventos en memoria para publicar el progreso del bot a suscriptores
+"""
+
+import threading
+from typing import Callable, Dict, Any, Optional
+import logger
+
+
+# Firma de los suscriptores: callback(evento, datos)
+Subscriber = Callable[[str, Dict[str, Any]], None]
+
+
+class EventBus:
+    """
+    Publica eventos de forma síncrona a una lista de suscriptores.
+
+    Un suscriptor que lanza una excepción se registra en el log y no
+    interrumpe al publicador ni al resto de suscriptores.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """
+        Registra un suscriptor.
+
+        Args:
+            callback (Subscriber): Función a invocar con (evento, datos)
+
+        Returns:
+            Callable[[], None]: Función que cancela la suscripción
+        """
+        with self._lock:
+            self._subscribers = self._subscribers + [callback]
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback: Subscriber):
+        """
+        Elimina un suscriptor si está registrado.
+
+        Args:
+            callback (Subscriber): Suscriptor a eliminar
+        """
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not callback]
+
+    def publish(self, event: str, data: Optional[Dict[str, Any]] = None):
+        """
+        Publica un evento a todos los suscriptores.
+
+        Args:
+            event (str): Nombre del evento
+            data (Optional[Dict[str, Any]]): Datos asociados
+        """
+        # La lista se reemplaza (no se modifica) al suscribir, así que se
+        # puede recorrer sin mantener el lock durante las llamadas
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+
+        payload = data or {}
+        for callback in subscribers:
+            try:
+                callback(event, payload)
+            except Exception as e:
+                logger.log_error(f"Error en suscriptor del evento '{event}'", e)
+
+    def has_subscribers(self) -> bool:
+        """
+        Indica si hay suscriptores registrados.
+
+        Returns:
+            bool: True si hay al menos un suscriptor
+        """
+        return bool(self._subscribers)
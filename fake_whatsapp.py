@@ -0,0 +1,463 @@
+"""
+WhatsApp Web simulado para pruebas y benchmarks de punta a punta sin navegador
+
+StubWhatsAppWeb modela la página (login, búsqueda de contactos, envío) con
+latencias configurables e inyección de fallos. Se usa de dos formas:
+
+- En el mismo proceso, con FakeWebDriver en lugar de Chrome:
+  create_fake_client() devuelve un WhatsAppClient listo para WhatsAppBot.
+- Como página HTTP local para Chrome real:
+  python fake_whatsapp.py --port 8080 y WHATSAPP_WEB_URL=http://127.0.0.1:8080
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from flask import Flask, jsonify, request
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    NoSuchElementException,
+    StaleElementReferenceException
+)
+from selenium.webdriver.common.keys import Keys
+
+import config
+from whatsapp_client import WhatsAppClient
+
+_SELECTOR_PATTERN = re.compile(r'^(\w+)((?:\[[^\]]+\])*)$')
+_ATTRIBUTE_PATTERN = re.compile(r'\[([\w-]+)(?:="([^"]*)")?\]')
+
+
+def parse_selector(selector: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Separa un selector CSS simple (tag[attr="valor"]...) en tag y atributos.
+
+    Args:
+        selector (str): Selector de config.SELECTORS
+
+    Returns:
+        Tuple[str, Dict[str, str]]: Tag y atributos
+
+    Raises:
+        ValueError: Si el selector no tiene esa forma
+    """
+    match = _SELECTOR_PATTERN.match(selector.strip())
+    if not match:
+        raise ValueError(f"Selector no soportado por la página simulada: {selector}")
+    return match.group(1), {name: value or '' for name, value in _ATTRIBUTE_PATTERN.findall(match.group(2))}
+
+
+def _digits(phone: str) -> str:
+    return re.sub(r'\D', '', phone)
+
+
+@dataclass
+class StubOptions:
+    """
+    Latencias (en segundos) y probabilidades de fallo de la página simulada.
+    """
+    login_delay: float = 0.0  # Desde la carga hasta que aparece el panel lateral
+    search_latency: float = 0.0  # Desde el Enter hasta que se abre el chat o el aviso
+    send_latency: float = 0.0  # Duración del clic en enviar
+    invalid_numbers: Set[str] = field(default_factory=set)  # Teléfonos no registrados
+    invalid_rate: float = 0.0  # Probabilidad de número no registrado
+    failure_rate: float = 0.0  # Probabilidad de que el chat no se abra (fallo transitorio)
+    session_loss_rate: float = 0.0  # Probabilidad de que el navegador se caiga al buscar
+    seed: Optional[int] = None
+
+
+class StubWhatsAppWeb:
+    """
+    Estado de la página simulada, compartido entre drivers y peticiones HTTP.
+
+    Los elementos de config.SELECTORS aparecen y desaparecen según el estado:
+    el código QR antes del login, el panel lateral y la búsqueda después, y el
+    encabezado y la caja de mensaje cuando hay un chat abierto.
+    """
+
+    def __init__(self, options: Optional[StubOptions] = None):
+        self.options = options or StubOptions()
+        self.elements = {name: parse_selector(selector) for name, selector in config.SELECTORS.items()}
+        self.invalid_numbers = {_digits(phone) for phone in self.options.invalid_numbers}
+        self.sent: List[Dict[str, Any]] = []
+        self.stats = {'loads': 0, 'searches': 0, 'invalid': 0, 'failures': 0, 'session_losses': 0}
+        self._random = random.Random(self.options.seed)
+        self._lock = threading.Lock()
+        self._texts: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._chat: Optional[str] = None
+        self._popup = False
+        self._ready_at = 0.0
+        self.session = 0  # Cambia cuando se cae el navegador: los drivers anteriores quedan inválidos
+
+    def load(self):
+        """
+        Carga la página: reinicia el estado y el temporizador del login.
+        """
+        with self._lock:
+            self._loaded_at = time.monotonic()
+            self._texts = {}
+            self._chat = None
+            self._popup = False
+            self.stats['loads'] += 1
+
+    def is_authenticated(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at >= self.options.login_delay
+
+    def visible_elements(self) -> Set[str]:
+        """
+        Nombres (claves de config.SELECTORS) de los elementos en pantalla.
+        """
+        if self._loaded_at is None:
+            return set()
+        if not self.is_authenticated():
+            return {'qr_code'}
+
+        visible = {'side_panel', 'search_box'}
+        if time.monotonic() >= self._ready_at:
+            if self._chat is not None:
+                visible |= {'chat_header', 'contact_title', 'message_box', 'send_button'}
+            elif self._popup:
+                visible.add('invalid_number')
+        return visible
+
+    def get_text(self, name: str) -> str:
+        if name == 'contact_title':
+            return self._chat or ''
+        return self._texts.get(name, '')
+
+    def set_text(self, name: str, text: str):
+        with self._lock:
+            self._texts[name] = text
+
+    def search(self, phone: str):
+        """
+        Busca un contacto (Enter en la caja de búsqueda).
+
+        Según las opciones abre el chat, muestra el aviso de número inválido,
+        no abre nada (fallo transitorio) o hace caer la sesión.
+
+        Args:
+            phone (str): Texto buscado
+        """
+        with self._lock:
+            self.stats['searches'] += 1
+            self._chat = None
+            self._popup = False
+            self._texts.pop('message_box', None)
+            self._ready_at = time.monotonic() + self.options.search_latency
+
+            roll = self._random.random()
+            if roll < self.options.session_loss_rate:
+                self.stats['session_losses'] += 1
+                self.session += 1
+                return
+            roll -= self.options.session_loss_rate
+
+            if _digits(phone) in self.invalid_numbers or roll < self.options.invalid_rate:
+                self.stats['invalid'] += 1
+                self._popup = True
+                return
+            roll -= self.options.invalid_rate
+
+            if roll < self.options.failure_rate:
+                self.stats['failures'] += 1
+                return
+
+            self._chat = phone
+
+    def send(self, message: Optional[str] = None) -> bool:
+        """
+        Envía el texto de la caja de mensaje al chat abierto.
+
+        Args:
+            message (Optional[str]): Texto a enviar (por defecto el de la caja)
+
+        Returns:
+            bool: False si no hay chat abierto o el mensaje está vacío
+        """
+        if self.options.send_latency > 0:
+            time.sleep(self.options.send_latency)
+
+        with self._lock:
+            text = self._texts.pop('message_box', '') if message is None else message
+            if self._chat is None or not text:
+                return False
+            self.sent.append({'telefono': self._chat, 'mensaje': text, 'sent_at': time.time()})
+            return True
+
+    def html(self) -> str:
+        """
+        Página HTML que reproduce los selectores para Chrome real.
+
+        Un script consulta /state y agrega o quita los elementos; la búsqueda
+        (Enter) y el botón de enviar llaman a /search y /send.
+        """
+        specs = {name: {'tag': tag, 'attrs': attrs} for name, (tag, attrs) in self.elements.items()}
+        return _PAGE_TEMPLATE.replace('__ELEMENTS__', json.dumps(specs))
+
+    def state(self) -> Dict[str, Any]:
+        return {'visible': sorted(self.visible_elements()), 'chat': self._chat}
+
+    def create_app(self) -> Flask:
+        """
+        Aplicación Flask que sirve la página simulada.
+
+        Returns:
+            Flask: Aplicación con /, /state, /search, /send y /messages
+        """
+        app = Flask(__name__)
+
+        @app.route('/')
+        def index():
+            self.load()
+            return self.html()
+
+        @app.route('/state')
+        def state():
+            return jsonify(self.state())
+
+        @app.route('/search', methods=['POST'])
+        def search():
+            self.search((request.get_json(silent=True) or {}).get('phone', ''))
+            return jsonify({'success': True})
+
+        @app.route('/send', methods=['POST'])
+        def send():
+            sent = self.send((request.get_json(silent=True) or {}).get('message', ''))
+            return jsonify({'success': sent})
+
+        @app.route('/messages')
+        def messages():
+            return jsonify({'success': True, 'messages': self.sent, 'stats': self.stats})
+
+        return app
+
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>WhatsApp</title></head>
+<body>
+<div id="app"></div>
+<script>
+const ELEMENTS = __ELEMENTS__;
+const PARENTS = {contact_title: 'chat_header'};
+
+function post(path, body) {
+  return fetch(path, {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(body)});
+}
+
+function create(name, state) {
+  const spec = ELEMENTS[name];
+  const el = document.createElement(spec.tag);
+  el.id = 'stub-' + name;
+  for (const [attr, value] of Object.entries(spec.attrs)) el.setAttribute(attr, value);
+  if (name === 'contact_title') { el.setAttribute('title', state.chat); el.textContent = state.chat; }
+  if (name === 'send_button') el.textContent = 'Enviar';
+  if (name === 'search_box') el.addEventListener('keydown', (event) => {
+    if (event.key === 'Enter') { event.preventDefault(); post('search', {phone: el.textContent.trim()}); }
+  });
+  if (name === 'send_button') el.addEventListener('click', () => {
+    const box = document.getElementById('stub-message_box');
+    post('send', {message: box ? box.textContent : ''});
+    if (box) box.textContent = '';
+  });
+  return el;
+}
+
+async function refresh() {
+  try {
+    const state = await (await fetch('state')).json();
+    for (const name of Object.keys(ELEMENTS)) {
+      const current = document.getElementById('stub-' + name);
+      if (state.visible.includes(name) && !current) {
+        const parent = document.getElementById('stub-' + PARENTS[name]) || document.getElementById('app');
+        parent.appendChild(create(name, state));
+      } else if (!state.visible.includes(name) && current) {
+        current.remove();
+      }
+    }
+  } finally {
+    setTimeout(refresh, 100);
+  }
+}
+
+refresh();
+</script>
+</body>
+</html>
+"""
+
+
+class FakeElement:
+    """
+    Elemento de FakeWebDriver: delega en el estado de la página.
+    """
+
+    def __init__(self, driver: 'FakeWebDriver', name: str):
+        self._driver = driver
+        self._page = driver.page
+        self.name = name
+
+    def _check(self):
+        self._driver._check_session()
+        if self.name not in self._page.visible_elements():
+            raise StaleElementReferenceException(f"{self.name} ya no está en la página")
+
+    @property
+    def text(self) -> str:
+        self._check()
+        return self._page.get_text(self.name)
+
+    def clear(self):
+        self._check()
+        self._page.set_text(self.name, '')
+
+    def send_keys(self, *values: str):
+        self._check()
+        for value in values:
+            text, enter, _ = value.partition(Keys.ENTER)
+            self._page.set_text(self.name, self._page.get_text(self.name) + text)
+            if enter and self.name == 'search_box':
+                self._page.search(self._page.get_text(self.name))
+
+    def click(self):
+        self._check()
+        if self.name == 'send_button':
+            self._page.send()
+
+    def is_displayed(self) -> bool:
+        self._driver._check_session()
+        return self.name in self._page.visible_elements()
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        self._check()
+        if self.name == 'contact_title' and name == 'title':
+            return self._page.get_text(self.name)
+        return self._page.elements[self.name][1].get(name)
+
+    def find_element(self, by: str, value: str) -> 'FakeElement':
+        return self._driver.find_element(by, value)
+
+
+class FakeWebDriver:
+    """
+    Reemplazo en memoria de webdriver.Chrome sobre un StubWhatsAppWeb.
+
+    Solo entiende los selectores de config.SELECTORS. No hay esperas
+    implícitas: un elemento ausente lanza NoSuchElementException enseguida y
+    WebDriverWait se encarga de reintentar. Si la sesión se cayó, cualquier
+    llamada lanza InvalidSessionIdException, como Chrome; un driver nuevo
+    sobre la misma página funciona.
+    """
+
+    service = None  # Sin proceso de chromedriver que vigilar
+
+    def __init__(self, page: StubWhatsAppWeb):
+        self.page = page
+        self.current_url = 'about:blank'
+        self._closed = False
+        self._session = page.session
+        self._selectors = {selector: name for name, selector in config.SELECTORS.items()}
+
+    def _check_session(self):
+        if self._closed or self._session != self.page.session:
+            raise InvalidSessionIdException("invalid session id")
+
+    @property
+    def title(self) -> str:
+        self._check_session()
+        return 'WhatsApp'
+
+    def get(self, url: str):
+        self._check_session()
+        self.current_url = url
+        self.page.load()
+
+    def find_element(self, by: str, value: str) -> FakeElement:
+        self._check_session()
+        name = self._selectors.get(value)
+        if name is None or name not in self.page.visible_elements():
+            raise NoSuchElementException(f"No se encontró {value}")
+        return FakeElement(self, name)
+
+    def find_elements(self, by: str, value: str) -> List[FakeElement]:
+        try:
+            return [self.find_element(by, value)]
+        except NoSuchElementException:
+            return []
+
+    def implicitly_wait(self, seconds: float):
+        self._check_session()
+
+    def set_page_load_timeout(self, seconds: float):
+        self._check_session()
+
+    def save_screenshot(self, filename: str) -> bool:
+        self._check_session()
+        return True
+
+    def quit(self):
+        self._closed = True
+
+
+def create_fake_client(page: Optional[StubWhatsAppWeb] = None,
+                       element_timeout: float = 0.5,
+                       poll_frequency: float = 0.005) -> WhatsAppClient:
+    """
+    WhatsAppClient sobre FakeWebDriver, sin pausas entre acciones.
+
+    Args:
+        page (Optional[StubWhatsAppWeb]): Página simulada (por defecto una sin latencias ni fallos)
+        element_timeout (float): Espera máxima de cada elemento
+        poll_frequency (float): Segundos entre comprobaciones de WebDriverWait
+
+    Returns:
+        WhatsAppClient: Cliente listo para WhatsAppBot o MessageSender
+    """
+    page = page or StubWhatsAppWeb()
+    client = WhatsAppClient(
+        driver_factory=lambda options: FakeWebDriver(page),
+        settle_delays={step: 0 for step in config.SETTLE_DELAYS},
+        element_timeout=element_timeout,
+        poll_frequency=poll_frequency
+    )
+    client.page = page
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WhatsApp Web simulado para pruebas con Chrome real')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--login-delay', type=float, default=2.0, help='Segundos hasta el login')
+    parser.add_argument('--search-latency', type=float, default=0.0)
+    parser.add_argument('--send-latency', type=float, default=0.0)
+    parser.add_argument('--invalid-rate', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    page = StubWhatsAppWeb(StubOptions(
+        login_delay=args.login_delay,
+        search_latency=args.search_latency,
+        send_latency=args.send_latency,
+        invalid_rate=args.invalid_rate,
+        failure_rate=args.failure_rate,
+        seed=args.seed
+    ))
+    print(f"📱 WhatsApp Web simulado en http://{args.host}:{args.port}")
+    page.create_app().run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
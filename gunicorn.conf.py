@@ -7,7 +7,10 @@ bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
 backlog = 2048
 
 # Worker processes
-workers = 1  # Railway tiene recursos limitados
+# Con más de un worker el estado de las campañas se comparte en SQLite
+# (config.SHARED_STATE_DB). Socket.IO con long-polling necesita sesiones
+# sticky en el proxy; con un solo worker no hace falta nada.
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))  # Railway tiene recursos limitados
 worker_class = "gevent"
 worker_connections = 1000
 timeout = 30
@@ -27,7 +30,8 @@ access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"
 proc_name = "whatsapp-bot-backend"
 
 # Server mechanics
-preload_app = True
+# Sin precarga: cada worker crea sus propios hilos y su id después del fork
+preload_app = False
 daemon = False
 pidfile = None
 user = None
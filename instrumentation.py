@@ -0,0 +1,344 @@
+"""
+Instrumentación de tiempos por etapa con histogramas en memoria
+
+Los temporizadores (decorador timed y context manager timer) alimentan un
+histograma por etapa. Con la instrumentación desactivada el decorador solo
+consulta un booleano y timer devuelve un context manager vacío compartido.
+"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import config
+
+# Percentiles incluidos en los resúmenes
+SUMMARY_PERCENTILES = (50, 90, 99, 99.9)
+
+_DISABLED_TIMER = nullcontext()
+
+
+class Histogram:
+    """
+    Histograma log-lineal al estilo HDR de duraciones en microsegundos.
+
+    Los valores menores a 2 * 2**significant_bits se guardan exactos; los
+    mayores, en 2**significant_bits intervalos por cada potencia de 2, de
+    modo que el error relativo de cualquier percentil queda acotado
+    (~3% con 5 bits) sin importar el rango: de microsegundos a horas.
+    Los intervalos vacíos no ocupan memoria.
+    """
+
+    def __init__(self, significant_bits: int = config.HISTOGRAM_SIGNIFICANT_BITS):
+        self.significant_bits = significant_bits
+        self._sub_buckets = 1 << significant_bits
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0  # Suma en microsegundos
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        if value < 2 * self._sub_buckets:
+            return value
+        shift = value.bit_length() - self.significant_bits - 1
+        return shift * self._sub_buckets + (value >> shift)
+
+    def bucket_bounds(self, index: int) -> tuple:
+        """
+        Límites del intervalo de un índice.
+
+        Args:
+            index (int): Índice del intervalo
+
+        Returns:
+            tuple: Valor mínimo y máximo (inclusive) en microsegundos
+        """
+        if index < 2 * self._sub_buckets:
+            return index, index
+        shift = index // self._sub_buckets - 1
+        mantissa = index - shift * self._sub_buckets
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        """
+        Registra una duración.
+
+        Args:
+            seconds (float): Duración en segundos
+        """
+        value = max(0, int(seconds * 1_000_000))
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def merge(self, other: 'Histogram'):
+        """
+        Suma los valores de otro histograma con la misma precisión.
+
+        Args:
+            other (Histogram): Histograma a sumar
+        """
+        with self._lock:
+            for index, count in other.counts.items():
+                self.counts[index] = self.counts.get(index, 0) + count
+            self.count += other.count
+            self.total += other.total
+            if other.min is not None:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+            if other.max is not None:
+                self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, pct: float) -> float:
+        """
+        Valor del percentil pedido.
+
+        Args:
+            pct (float): Percentil entre 0 y 100
+
+        Returns:
+            float: Duración en segundos (0 si no hay valores)
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(round(self.count * pct / 100)))
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= target:
+                    low, high = self.bucket_bounds(index)
+                    value = min(max((low + high) / 2, self.min), self.max)
+                    return value / 1_000_000
+        return self.max / 1_000_000
+
+    def cumulative_counts(self, bounds: List[float]) -> List[int]:
+        """
+        Cantidad de valores menores o iguales a cada límite.
+
+        Args:
+            bounds (List[float]): Límites en segundos, ordenados
+
+        Returns:
+            List[int]: Conteo acumulado por límite (según el intervalo de cada valor)
+        """
+        limits = [bound * 1_000_000 for bound in bounds]
+        result = [0] * len(limits)
+        with self._lock:
+            for index, count in self.counts.items():
+                high = self.bucket_bounds(index)[1]
+                for i, limit in enumerate(limits):
+                    if high <= limit:
+                        result[i] += count
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'significant_bits': self.significant_bits,
+                'counts': {str(index): count for index, count in self.counts.items()},
+                'count': self.count,
+                'total': self.total,
+                'min': self.min,
+                'max': self.max
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Histogram':
+        histogram = cls(data['significant_bits'])
+        histogram.counts = {int(index): count for index, count in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Resumen del histograma en milisegundos.
+
+        Returns:
+            Dict[str, Any]: count, total, mean, min, max y percentiles
+        """
+        if not self.count:
+            return {'count': 0}
+        summary = {
+            'count': self.count,
+            'total_ms': round(self.total / 1000, 3),
+            'mean_ms': round(self.total / self.count / 1000, 3),
+            'min_ms': round(self.min / 1000, 3),
+            'max_ms': round(self.max / 1000, 3)
+        }
+        for pct in SUMMARY_PERCENTILES:
+            summary[f'p{pct:g}_ms'] = round(self.percentile(pct) * 1000, 3)
+        return summary
+
+
+class Instrumentation:
+    """
+    Registro de histogramas por etapa.
+    """
+
+    def __init__(self, enabled: bool = config.INSTRUMENTATION_ENABLED):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def record(self, stage: str, seconds: float):
+        """
+        Registra la duración de una etapa (si la instrumentación está activa).
+
+        Args:
+            stage (str): Nombre de la etapa
+            seconds (float): Duración en segundos
+        """
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def timer(self, stage: str):
+        """
+        Context manager que mide el bloque como la etapa indicada.
+
+        Args:
+            stage (str): Nombre de la etapa
+        """
+        if not self.enabled:
+            return _DISABLED_TIMER
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(stage).record(time.perf_counter() - started)
+
+    def timed(self, stage: str) -> Callable:
+        """
+        Decorador que mide cada llamada a la función como la etapa indicada.
+
+        Args:
+            stage (str): Nombre de la etapa
+        """
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.histogram(stage).record(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def stages(self) -> Dict[str, Histogram]:
+        with self._lock:
+            return dict(self._histograms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Resumen de cada etapa.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Resumen (Histogram.summary) por etapa
+        """
+        return {stage: histogram.summary() for stage, histogram in sorted(self.stages().items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self.started_at = time.time()
+
+    def format_summary(self) -> List[str]:
+        """
+        Líneas de texto con los tiempos de cada etapa, para logs y consola.
+
+        Returns:
+            List[str]: Una línea por etapa con mediciones
+        """
+        lines = []
+        for stage, summary in self.snapshot().items():
+            if summary['count']:
+                lines.append(
+                    f"{stage}: n={summary['count']} media={summary['mean_ms']:.2f}ms "
+                    f"p50={summary['p50_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms "
+                    f"max={summary['max_ms']:.2f}ms"
+                )
+        return lines
+
+    def dump(self, path: Union[str, Path] = None) -> Optional[Path]:
+        """
+        Guarda los resúmenes y los histogramas en un archivo JSON.
+
+        Args:
+            path (Union[str, Path]): Archivo de destino (por defecto config.TIMINGS_FILE)
+
+        Returns:
+            Optional[Path]: Ruta escrita, o None si no hay mediciones
+        """
+        stages = self.stages()
+        if not stages:
+            return None
+        path = Path(path or config.TIMINGS_FILE)
+        data = {
+            'started_at': self.started_at,
+            'dumped_at': time.time(),
+            'stages': self.snapshot(),
+            'histograms': {stage: histogram.to_dict() for stage, histogram in stages.items()}
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.name + '.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        temp.replace(path)
+        return path
+
+
+# Registro del proceso
+registry = Instrumentation()
+
+
+def timed(stage: str) -> Callable:
+    return registry.timed(stage)
+
+
+def timer(stage: str):
+    return registry.timer(stage)
+
+
+def record(stage: str, seconds: float):
+    registry.record(stage, seconds)
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    return registry.snapshot()
+
+
+def format_summary() -> List[str]:
+    return registry.format_summary()
+
+
+def dump(path: Union[str, Path] = None) -> Optional[Path]:
+    return registry.dump(path)
@@ -0,0 +1,797 @@
+"""
+Gestor de campañas (jobs) concurrentes con estado aislado por campaña
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+import config
+import logger
+import metrics
+import profiling
+from campaign import CampaignSettings
+import task_pool as tasks
+from event_bus import EventBus
+
+
+class JobState(str, Enum):
+    """
+    Estados posibles de una campaña.
+    """
+    QUEUED = "queued"
+    VALIDATING = "validating"
+    STARTING = "starting"
+    AUTHENTICATING = "authenticating"
+    SENDING = "sending"
+    PAUSED = "paused"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+TERMINAL_STATES = {JobState.DONE, JobState.FAILED, JobState.CANCELLED}
+
+# Transiciones permitidas desde cada estado
+TRANSITIONS = {
+    JobState.QUEUED: {JobState.STARTING, JobState.VALIDATING, JobState.CANCELLED},
+    JobState.VALIDATING: {JobState.DONE, JobState.FAILED, JobState.CANCELLED},
+    # Con transporte api no hay autenticación: se pasa directo a sending
+    JobState.STARTING: {JobState.AUTHENTICATING, JobState.SENDING, JobState.FAILED, JobState.CANCELLED},
+    JobState.AUTHENTICATING: {JobState.SENDING, JobState.FAILED, JobState.CANCELLED},
+    JobState.SENDING: {JobState.PAUSED, JobState.DONE, JobState.FAILED, JobState.CANCELLED},
+    JobState.PAUSED: {JobState.SENDING, JobState.DONE, JobState.FAILED, JobState.CANCELLED},
+}
+
+# Fases publicadas por WhatsAppBot y el estado de campaña que les corresponde
+PHASE_STATES = {
+    'starting': JobState.STARTING,
+    'authenticating': JobState.AUTHENTICATING,
+    'sending': JobState.SENDING,
+}
+
+# Acciones que se pueden pedir sobre una campaña, también desde otro worker
+JOB_ACTIONS = ('pause', 'resume', 'cancel')
+
+# Lease del estado compartido: el worker que lo tiene ejecuta las campañas con navegador
+BROWSER_LEASE = 'browser'
+
+# Canal del estado compartido con los eventos de las campañas del worker del navegador
+JOB_EVENTS_CHANNEL = 'job_events'
+
+
+class JobStateError(ValueError):
+    """
+    Transición de estado no permitida.
+    """
+
+
+class WorkerUnavailableError(RuntimeError):
+    """
+    El worker que debe ejecutar la campaña no está corriendo.
+    """
+
+
+class Job:
+    """
+    Una campaña de envío con su propio bot, estado y estadísticas, o una
+    validación de un archivo de contactos (kind='validation').
+    """
+
+    def __init__(self, filepath: str, settings: Optional[CampaignSettings],
+                 kind: str = 'campaign', job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.filepath = str(filepath)
+        self.settings = settings
+        self.kind = kind
+        self.result: Optional[Dict[str, Any]] = None
+        self.index_path: Optional[str] = None
+        self.state = JobState.QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.bot = None
+        self.thread_id: Optional[int] = None  # Hilo (o greenlet, con gevent) que la ejecuta, para perfilarla
+        self.cancel_requested = False
+        self._lock = threading.RLock()
+
+    def transition(self, new_state: JobState):
+        """
+        Cambia el estado de la campaña validando la transición.
+
+        Args:
+            new_state (JobState): Estado destino
+
+        Raises:
+            JobStateError: Si la transición no está permitida
+        """
+        with self._lock:
+            if new_state == self.state:
+                return
+            if new_state not in TRANSITIONS.get(self.state, set()):
+                raise JobStateError(f"Transición no permitida: {self.state.value} -> {new_state.value}")
+
+            self.state = new_state
+            if new_state == JobState.STARTING:
+                self.started_at = time.time()
+            elif new_state in TERMINAL_STATES:
+                self.finished_at = time.time()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas de envío de esta campaña.
+
+        Returns:
+            Dict[str, Any]: Estadísticas (en cero si todavía no empezó)
+        """
+        stats = {
+            'total_contacts': 0,
+            'messages_sent': 0,
+            'messages_failed': 0,
+            'messages_skipped': 0,
+        }
+        bot = self.bot
+        if bot is not None:
+            stats.update(asdict(bot.message_sender.get_stats()))
+            stats['total_contacts'] = stats['total_contacts'] or len(bot.contacts)
+        stats['status'] = self.state.value
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serializa la campaña para la API.
+
+        Returns:
+            Dict[str, Any]: Representación de la campaña
+        """
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state.value,
+            'filename': Path(self.filepath).name,
+            'params': self.settings.to_dict(include_template=False) if self.settings else {},
+            'result': self.result,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+            'stats': self.get_stats()
+        }
+
+
+class JobManager:
+    """
+    Ejecuta campañas en un número acotado de hilos de trabajo.
+
+    Publica 'job_update' en su bus de eventos cada vez que una campaña
+    cambia de estado y 'job_event' con cada evento de su bot (resultados
+    por contacto, progreso, cuenta regresiva...).
+
+    Con un SharedStateStore (varios procesos web) el estado de cada campaña
+    se guarda también en la base compartida, así cualquier worker puede
+    listarla y pedirle acciones al worker que la ejecuta. Las campañas con
+    navegador se ejecutan siempre en el worker que tiene el lease del
+    navegador: si otro lo tiene, la campaña se le envía.
+
+    Con task_pool (TaskPool) las validaciones parsean el archivo en el pool
+    de procesos en lugar de hacerlo en su hilo.
+
+    Con upload_store (UploadStore) se liberan los archivos protegidos por
+    campañas que quedaron huérfanas (ver sweep_pins()).
+
+    Con browser_worker (el proceso de worker.py) los procesos web nunca
+    abren un navegador: todas las campañas con navegador se le envían a ese
+    worker, que publica sus eventos con forward_events(), y cada proceso
+    web los recibe en remote_events con follow_remote_events().
+    """
+
+    def __init__(self, max_workers: int = config.MAX_CONCURRENT_JOBS,
+                 bot_factory=None, history_limit: int = config.JOB_HISTORY_LIMIT,
+                 store=None, worker_id: Optional[str] = None, browser_worker: Optional[str] = None,
+                 task_pool=None, upload_store=None):
+        self.max_workers = max_workers
+        self.task_pool = task_pool
+        self.upload_store = upload_store
+        self.history_limit = history_limit
+        self.store = store
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.browser_worker = browser_worker
+        self._coordinator: Optional[threading.Thread] = None
+        self._follower: Optional[threading.Thread] = None
+        self._stop_coordination = threading.Event()
+        self._metrics_published_at = 0.0
+        self.events = EventBus()
+        self.remote_events = EventBus()
+        self._bot_factory = bot_factory or self._default_bot_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        # Las validaciones no usan navegador: tienen sus propios hilos
+        self._validation_executor = ThreadPoolExecutor(
+            max_workers=config.MAX_VALIDATION_WORKERS, thread_name_prefix='validation'
+        )
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_bot_factory(events: EventBus):
+        from main import WhatsAppBot
+        return WhatsAppBot(events=events)
+
+    def submit(self, filepath: str, settings: Optional[CampaignSettings] = None) -> Job:
+        """
+        Encola una nueva campaña.
+
+        Args:
+            filepath (str): Ruta al archivo de contactos
+            settings (Optional[CampaignSettings]): Configuración de la campaña
+
+        Returns:
+            Job: Campaña creada en estado queued
+
+        Raises:
+            WorkerUnavailableError: Si el worker del navegador no está corriendo
+        """
+        job = Job(filepath, settings or CampaignSettings())
+        owner = self._campaign_owner(job)
+        if owner != self.worker_id:
+            return self._forward(job, owner)
+        return self._enqueue(job)
+
+    def _enqueue(self, job: Job) -> Job:
+        self._register(job)
+
+        logger.log_info(f"Campaña {job.id} encolada: {job.filepath}")
+        self._publish(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def submit_validation(self, filepath: str, index_path: Optional[str] = None) -> Job:
+        """
+        Encola la validación completa de un archivo de contactos.
+
+        El resultado (conteos de DataManager.validate_contacts) queda en
+        job.result al pasar a done. Con index_path la validación construye
+        además el índice de contactos, en una sola pasada por el archivo.
+
+        Args:
+            filepath (str): Ruta al archivo de contactos
+            index_path (Optional[str]): Índice de contactos (SQLite) a construir
+
+        Returns:
+            Job: Validación creada en estado queued
+        """
+        job = Job(filepath, None, kind='validation')
+        job.index_path = index_path
+        self._register(job)
+        self._publish(job)
+        self._validation_executor.submit(self._run_validation, job)
+        return job
+
+    def _campaign_owner(self, job: Job) -> str:
+        """
+        Elige el worker que ejecuta una campaña: el worker del navegador o
+        el dueño del lease del navegador si usa navegador, este worker si no.
+        """
+        if self.store is None or job.settings.transport != 'browser':
+            return self.worker_id
+        if self.browser_worker:
+            if self.browser_worker not in self.store.live_workers():
+                raise WorkerUnavailableError("El worker del navegador no está corriendo (python -m worker)")
+            return self.browser_worker
+        owner = self.store.lease_owner(BROWSER_LEASE)
+        if owner and owner != self.worker_id and owner in self.store.live_workers():
+            return owner
+        if self.store.acquire_lease(BROWSER_LEASE, self.worker_id):
+            return self.worker_id
+        return self.store.lease_owner(BROWSER_LEASE) or self.worker_id
+
+    def _forward(self, job: Job, owner: str) -> Job:
+        """
+        Envía una campaña al worker que la va a ejecutar.
+        """
+        self.store.save_job(job.to_dict(), owner)
+        self.store.send_command(owner, {
+            'action': 'submit',
+            'job_id': job.id,
+            'filepath': job.filepath,
+            'settings': job.settings.to_dict()
+        })
+        logger.log_info(f"Campaña {job.id} enviada al worker {owner}, que tiene el navegador")
+        return job
+
+    def _register(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune_history()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Obtiene una campaña por su ID.
+
+        Args:
+            job_id (str): ID de la campaña
+
+        Returns:
+            Optional[Job]: Campaña o None si no existe
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        """
+        Lista las campañas conocidas, de la más antigua a la más reciente.
+
+        Returns:
+            List[Job]: Campañas
+        """
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active_jobs(self) -> List[Job]:
+        """
+        Lista las campañas que todavía no terminaron.
+
+        Returns:
+            List[Job]: Campañas activas
+        """
+        return [job for job in self.list_jobs() if not job.is_finished]
+
+    def get_job_dict(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene una campaña serializada, de este worker o de cualquier otro.
+
+        Args:
+            job_id (str): ID de la campaña
+
+        Returns:
+            Optional[Dict[str, Any]]: Campaña o None si no existe
+        """
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self.store.get_job(job_id) if self.store is not None else None
+
+    def list_job_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Lista las campañas serializadas de todos los workers.
+
+        Returns:
+            List[Dict[str, Any]]: Campañas, de la más antigua a la más reciente
+        """
+        jobs = {}
+        if self.store is not None:
+            jobs = {job['id']: job for job in self.store.list_jobs(self.history_limit)}
+        jobs.update((job.id, job.to_dict()) for job in self.list_jobs())
+        return sorted(jobs.values(), key=lambda job: job['created_at'])
+
+    def request_action(self, job_id: str, action: str) -> Dict[str, Any]:
+        """
+        Aplica pause/resume/cancel a una campaña, enviándolo al worker que la
+        ejecuta si no es este.
+
+        Args:
+            job_id (str): ID de la campaña
+            action (str): Acción (pause, resume o cancel)
+
+        Returns:
+            Dict[str, Any]: Campaña serializada (para otro worker, su último estado conocido)
+
+        Raises:
+            KeyError: Si la campaña no existe
+            JobStateError: Si la campaña no admite la acción
+        """
+        if action not in JOB_ACTIONS:
+            raise ValueError(f"Acción no soportada: {action}")
+        if self.store is None or self.get(job_id) is not None:
+            return getattr(self, action)(job_id).to_dict()
+
+        job = self.store.get_job(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if JobState(job['state']) in TERMINAL_STATES:
+            raise JobStateError(f"La campaña ya terminó: {job['state']}")
+        self.store.send_command(job['owner'], {'action': action, 'job_id': job_id})
+        return job
+
+    def request_profile(self, job_id: str, seconds: float,
+                        interval: float = config.PROFILE_SAMPLE_INTERVAL) -> Dict[str, Any]:
+        """
+        Perfila por muestreo el hilo de una campaña, enviando el pedido al
+        worker que la ejecuta si no es este (el resultado queda en la carpeta
+        de logs de ese worker).
+
+        Args:
+            job_id (str): ID de la campaña
+            seconds (float): Duración del perfil
+            interval (float): Segundos entre muestras
+
+        Returns:
+            Dict[str, Any]: Sesión iniciada, o el worker al que se envió el pedido
+
+        Raises:
+            KeyError: Si la campaña no existe o no está corriendo
+            ProfilingError: Si ya hay un perfil en curso en este worker
+        """
+        if self.store is None or self.get(job_id) is not None:
+            return self._profile(job_id, seconds, interval)
+
+        job = self.store.get_job(job_id)
+        if job is None or JobState(job['state']) in TERMINAL_STATES:
+            raise KeyError(job_id)
+        self.store.send_command(job['owner'], {'action': 'profile', 'job_id': job_id,
+                                               'seconds': seconds, 'interval': interval})
+        return {'job_id': job_id, 'worker': job['owner'], 'forwarded': True}
+
+    def _profile(self, job_id: str, seconds: float, interval: float) -> Dict[str, Any]:
+        job = self._require(job_id)
+        if job.thread_id is None or job.is_finished:
+            raise KeyError(job_id)
+        return profiling.profiler.start_sampling(seconds, f"job-{job.id}", {job.thread_id}, interval)
+
+    def pause(self, job_id: str) -> Job:
+        """
+        Pausa una campaña que está enviando.
+
+        Args:
+            job_id (str): ID de la campaña
+
+        Returns:
+            Job: Campaña pausada
+
+        Raises:
+            KeyError: Si la campaña no existe
+            JobStateError: Si la campaña no está enviando
+        """
+        job = self._require(job_id)
+        with job._lock:
+            if job.state != JobState.SENDING:
+                raise JobStateError(f"La campaña no está enviando: {job.state.value}")
+            job.transition(JobState.PAUSED)
+            job.bot.pause()
+        self._publish(job)
+        return job
+
+    def resume(self, job_id: str) -> Job:
+        """
+        Reanuda una campaña pausada.
+
+        Args:
+            job_id (str): ID de la campaña
+
+        Returns:
+            Job: Campaña reanudada
+
+        Raises:
+            KeyError: Si la campaña no existe
+            JobStateError: Si la campaña no está pausada
+        """
+        job = self._require(job_id)
+        with job._lock:
+            if job.state != JobState.PAUSED:
+                raise JobStateError(f"La campaña no está pausada: {job.state.value}")
+            job.transition(JobState.SENDING)
+            job.bot.resume()
+        self._publish(job)
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        Cancela una campaña encolada o en ejecución.
+
+        Args:
+            job_id (str): ID de la campaña
+
+        Returns:
+            Job: Campaña cancelada (o en proceso de cancelarse)
+
+        Raises:
+            KeyError: Si la campaña no existe
+            JobStateError: Si la campaña ya terminó
+        """
+        job = self._require(job_id)
+        with job._lock:
+            if job.is_finished:
+                raise JobStateError(f"La campaña ya terminó: {job.state.value}")
+            job.cancel_requested = True
+            if job.state == JobState.QUEUED:
+                job.transition(JobState.CANCELLED)
+            elif job.bot is not None:
+                job.bot.stop()
+        self._publish(job)
+        return job
+
+    def shutdown(self, wait: bool = False):
+        """
+        Cancela las campañas activas y libera los hilos de trabajo.
+
+        Args:
+            wait (bool): Esperar a que terminen las campañas en curso
+        """
+        for job in self.active_jobs():
+            try:
+                self.cancel(job.id)
+            except JobStateError:
+                pass
+        self._executor.shutdown(wait=wait)
+        self._validation_executor.shutdown(wait=wait)
+        self.stop_coordination()
+
+    def start_coordination(self, interval: float = config.WORKER_HEARTBEAT_INTERVAL):
+        """
+        Inicia el hilo que sincroniza este worker con el estado compartido.
+
+        Args:
+            interval (float): Segundos entre sincronizaciones
+        """
+        if self.store is None or self._coordinator is not None:
+            return
+        self._stop_coordination.clear()
+        self._coordinator = threading.Thread(target=self._coordinate, args=(interval,),
+                                             name='job-coordinator', daemon=True)
+        self._coordinator.start()
+
+    def stop_coordination(self):
+        """
+        Detiene la sincronización y da de baja el worker (libera sus leases).
+        """
+        self._stop_coordination.set()
+        if self._follower is not None:
+            self._follower.join(timeout=5)
+            self._follower = None
+        if self._coordinator is None:
+            return
+        self._coordinator.join(timeout=5)
+        self._coordinator = None
+        self.store.remove_worker(self.worker_id)
+
+    def forward_events(self):
+        """
+        Publica en el estado compartido los eventos de las campañas de este
+        worker, para que los procesos web los reenvíen a sus clientes.
+        """
+        def forward(event: str, data: Dict[str, Any]):
+            payload = json.dumps([event, data], ensure_ascii=False, default=str)
+            self.store.publish(JOB_EVENTS_CHANNEL, payload.encode('utf-8'))
+
+        self.events.subscribe(forward)
+
+    def follow_remote_events(self, poll_interval: float = config.MESSAGE_QUEUE_POLL_INTERVAL):
+        """
+        Inicia el hilo que publica en remote_events los eventos enviados por
+        otros workers con forward_events().
+
+        Args:
+            poll_interval (float): Segundos entre lecturas del estado compartido
+        """
+        if self.store is None or self._follower is not None:
+            return
+        self._stop_coordination.clear()
+        self._follower = threading.Thread(target=self._follow, args=(poll_interval,),
+                                          name='job-events', daemon=True)
+        self._follower.start()
+
+    def _follow(self, poll_interval: float):
+        # Solo se reenvían los eventos publicados después de arrancar
+        seq = self.store.last_message_seq(JOB_EVENTS_CHANNEL)
+        while not self._stop_coordination.is_set():
+            try:
+                for seq, payload in self.store.messages_since(JOB_EVENTS_CHANNEL, seq):
+                    event, data = json.loads(payload)
+                    self.remote_events.publish(event, data)
+            except Exception as e:
+                logger.log_error("Error leyendo los eventos de campañas de otros workers", e)
+            self._stop_coordination.wait(poll_interval)
+
+    def _coordinate(self, interval: float):
+        while not self._stop_coordination.is_set():
+            try:
+                self.coordinate_once()
+            except Exception as e:
+                logger.log_error("Error sincronizando el estado compartido de las campañas", e)
+            self._stop_coordination.wait(interval)
+
+    def coordinate_once(self):
+        """
+        Un ciclo de sincronización: latido del worker, lease del navegador,
+        comandos recibidos de otros workers, estadísticas de las campañas activas
+        y, cada METRICS_PUBLISH_INTERVAL segundos, las métricas del proceso.
+        """
+        self.store.heartbeat(self.worker_id)
+
+        for command in self.store.take_commands(self.worker_id):
+            self._apply_command(command)
+
+        active = self.active_jobs()
+        if any(job.kind == 'campaign' and job.settings.transport == 'browser' for job in active):
+            self.store.acquire_lease(BROWSER_LEASE, self.worker_id)
+        elif self.store.lease_owner(BROWSER_LEASE) == self.worker_id:
+            self.store.release_lease(BROWSER_LEASE, self.worker_id)
+
+        for job in active:
+            self.store.save_job(job.to_dict(), self.worker_id)
+        if self.store.fail_orphaned_jobs(self.store.live_workers()):
+            self.sweep_pins()
+        self.store.prune_jobs(self.history_limit)
+
+        now = time.monotonic()
+        if now - self._metrics_published_at >= config.METRICS_PUBLISH_INTERVAL:
+            self._metrics_published_at = now
+            self.store.save_metrics(self.worker_id, metrics.process_snapshot(self.task_pool))
+
+    def sweep_pins(self) -> int:
+        """
+        Libera los archivos subidos protegidos por campañas que ya no corren
+        en ningún worker. Se llama al arrancar (un worker reiniciado no
+        recuerda sus campañas anteriores) y al dar por fallidas las campañas
+        de un worker caído.
+
+        Returns:
+            int: Pins liberados
+        """
+        if self.upload_store is None:
+            return 0
+        owners = {job.id for job in self.active_jobs()}
+        if self.store is not None:
+            owners |= self.store.active_job_ids(self.store.live_workers() - {self.worker_id})
+        return self.upload_store.sweep_pins(owners, config.UPLOAD_PIN_GRACE)
+
+    def _apply_command(self, command: Dict[str, Any]):
+        """
+        Ejecuta un comando enviado por otro worker.
+
+        Args:
+            command (Dict[str, Any]): Comando con 'action' y 'job_id'
+        """
+        action = command.get('action')
+        try:
+            if action == 'submit':
+                stored = self.store.get_job(command['job_id'])
+                if stored is not None and JobState(stored['state']) in TERMINAL_STATES:
+                    logger.log_warning(f"Campaña {command['job_id']} descartada: ya terminó ({stored['state']})")
+                    return
+                settings = CampaignSettings.from_dict(command['settings'])
+                self._enqueue(Job(command['filepath'], settings, job_id=command['job_id']))
+            elif action in JOB_ACTIONS:
+                getattr(self, action)(command['job_id'])
+            elif action == 'profile':
+                self._profile(command['job_id'], command['seconds'], command['interval'])
+            else:
+                logger.log_warning(f"Comando desconocido de otro worker: {action}")
+        except (KeyError, ValueError, profiling.ProfilingError) as e:
+            logger.log_warning(f"No se pudo aplicar el comando {action} a la campaña {command.get('job_id')}: {e}")
+
+    def _run(self, job: Job):
+        """
+        Ejecuta una campaña en un hilo de trabajo.
+
+        Args:
+            job (Job): Campaña a ejecutar
+        """
+        with job._lock:
+            if job.cancel_requested or job.is_finished:
+                return
+            job.transition(JobState.STARTING)
+            job.thread_id = threading.get_ident()
+            job.bot = self._bot_factory(EventBus())
+            job.bot.events.subscribe(lambda event, data: self._on_bot_event(job, event, data))
+
+        self._publish(job)
+
+        try:
+            success = job.bot.run(job.filepath, settings=job.settings)
+            final_state = JobState.DONE if success else JobState.FAILED
+            if not success and job.bot.phase == 'idle':
+                job.error = "No se pudieron cargar contactos válidos"
+        except Exception as e:
+            logger.log_error(f"Error ejecutando la campaña {job.id}", e)
+            job.error = str(e)
+            final_state = JobState.FAILED
+
+        with job._lock:
+            if job.cancel_requested:
+                final_state = JobState.CANCELLED
+            job.transition(final_state)
+
+        logger.log_info(f"Campaña {job.id} finalizada: {job.state.value}")
+        self._publish(job)
+
+    def _run_validation(self, job: Job):
+        """
+        Carga y valida un archivo de contactos en un hilo de validación.
+
+        Args:
+            job (Job): Validación a ejecutar
+        """
+        with job._lock:
+            if job.cancel_requested or job.is_finished:
+                return
+            job.transition(JobState.VALIDATING)
+            job.thread_id = threading.get_ident()
+            job.started_at = time.time()
+        self._publish(job)
+
+        try:
+            if job.index_path:
+                counts = self._run_task(tasks.build_contact_index, job.filepath, job.index_path)
+                job.result = dict(counts, contact_count=counts['valid'])
+            else:
+                job.result = self._run_task(tasks.validate_contacts, job.filepath)
+            job.result['duration'] = round(time.time() - job.started_at, 3)
+            final_state = JobState.DONE
+        except Exception as e:
+            logger.log_error(f"Error validando {job.filepath}", e)
+            job.error = str(e)
+            final_state = JobState.FAILED
+
+        with job._lock:
+            job.transition(JobState.CANCELLED if job.cancel_requested else final_state)
+        self._publish(job)
+
+    def _run_task(self, function, *args):
+        """
+        Ejecuta una tarea de parseo en el pool de procesos, o en este hilo si no hay pool.
+        """
+        if self.task_pool is None:
+            return function(*args)
+        return self.task_pool.run(function, *args)
+
+    def _on_bot_event(self, job: Job, event: str, data: Dict[str, Any]):
+        """
+        Reenvía los eventos del bot como 'job_event' y traduce las fases en
+        cambios de estado de la campaña.
+
+        Args:
+            job (Job): Campaña
+            event (str): Nombre del evento
+            data (Dict[str, Any]): Datos del evento
+        """
+        self.events.publish('job_event', {'job_id': job.id, 'event': event, 'data': data})
+        if event != 'phase':
+            return
+
+        new_state = PHASE_STATES.get(data.get('phase'))
+        if new_state is None:
+            return
+
+        with job._lock:
+            if job.cancel_requested or job.state == new_state:
+                return
+            job.transition(new_state)
+        self._publish(job)
+
+    def _require(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def _publish(self, job: Job):
+        data = job.to_dict()
+        if self.store is not None:
+            try:
+                self.store.save_job(data, self.worker_id)
+            except Exception as e:
+                logger.log_error(f"Error guardando el estado de la campaña {job.id}", e)
+        self.events.publish('job_update', data)
+
+    def _prune_history(self):
+        """
+        Descarta las campañas terminadas más antiguas por encima del límite.
+        """
+        excess = len(self._jobs) - self.history_limit
+        if excess <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.is_finished][:excess]:
+            del self._jobs[job_id]
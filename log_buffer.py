@@ -0,0 +1,112 @@
+"""
+Buffer circular de mensajes de log para las interfaces web
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional
+
+
+class LogBuffer:
+    """
+    Guarda los últimos mensajes de log con números de secuencia crecientes.
+
+    Es seguro entre hilos: el hilo del bot agrega mensajes mientras los
+    hilos de las peticiones leen los nuevos con since(). La secuencia no se
+    reinicia al limpiar, así que un cursor viejo nunca se confunde con uno
+    nuevo.
+    """
+
+    def __init__(self, maxlen: int = 100):
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.generation = 0  # Cambia cada vez que se limpia el buffer
+
+    def append(self, message: str, level: str = "INFO", **fields) -> Dict[str, Any]:
+        """
+        Agrega un mensaje al buffer.
+
+        Args:
+            message (str): Texto del mensaje
+            level (str): Nivel (INFO, SUCCESS, WARNING, ERROR)
+            **fields: Campos adicionales de la entrada
+
+        Returns:
+            Dict[str, Any]: Entrada agregada, con su número de secuencia
+        """
+        with self._lock:
+            self._seq += 1
+            entry = {
+                'seq': self._seq,
+                'timestamp': time.strftime("%H:%M:%S"),
+                'message': message,
+                'level': level,
+                **fields
+            }
+            self._entries.append(entry)
+        return entry
+
+    def since(self, seq: int = 0) -> List[Dict[str, Any]]:
+        """
+        Obtiene los mensajes posteriores a un número de secuencia.
+
+        Args:
+            seq (int): Último número de secuencia que ya tiene el cliente
+
+        Returns:
+            List[Dict[str, Any]]: Mensajes con secuencia mayor a seq
+        """
+        with self._lock:
+            return self._since(seq)
+
+    def _since(self, seq: int) -> List[Dict[str, Any]]:
+        if seq <= 0:
+            return list(self._entries)
+        if not self._entries or seq >= self._entries[-1]['seq']:
+            return []
+        # Las secuencias son consecutivas dentro del buffer
+        offset = max(0, seq - self._entries[0]['seq'] + 1)
+        return [self._entries[i] for i in range(offset, len(self._entries))]
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        Obtiene todos los mensajes del buffer.
+
+        Returns:
+            List[Dict[str, Any]]: Mensajes del más viejo al más nuevo
+        """
+        return self.since(0)
+
+    def clear(self):
+        """
+        Vacía el buffer sin reiniciar la secuencia.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    @property
+    def last_seq(self) -> int:
+        """Número de secuencia del último mensaje agregado."""
+        return self._seq
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def to_dict(self, since: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Serializa los mensajes para la API.
+
+        Args:
+            since (Optional[int]): Devolver solo los posteriores a este cursor
+
+        Returns:
+            Dict[str, Any]: Mensajes y cursor para la próxima consulta
+        """
+        with self._lock:
+            return {
+                'log_messages': self._since(since or 0),
+                'log_cursor': self._seq
+            }
@@ -4,36 +4,55 @@ Sistema de logging para el bot de WhatsApp
 
 import logging
 import csv
+import threading
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Optional
 import config
+import instrumentation
 import utils
 
 
 class WhatsAppBotLogger:
     """
     Clase para gestionar el sistema de logging del bot.
+
+    Los handlers (consola y archivo) y el CSV de mensajes se crean en el
+    primer uso: importar el módulo no abre archivos ni crea directorios.
     """
-    
+
     def __init__(self):
-        self.app_logger = None
-        self.messages_logger = None
-        self._setup_app_logger()
-        self._setup_messages_logger()
-    
-    def _setup_app_logger(self):
+        self._app_logger: Optional[logging.Logger] = None
+        self._messages_file: Optional[Path] = None  # CSV de mensajes ya inicializado
+        self._lock = threading.Lock()
+        self.messages_logger = logging.getLogger('messages_sent')
+        self.messages_logger.setLevel(logging.INFO)
+
+    @property
+    def app_logger(self) -> logging.Logger:
+        """Logger principal de la aplicación (configurado en el primer uso)"""
+        if self._app_logger is None:
+            with self._lock:
+                if self._app_logger is None:
+                    self._app_logger = self._setup_app_logger()
+        return self._app_logger
+
+    def _setup_app_logger(self) -> logging.Logger:
         """
         Configura el logger principal de la aplicación.
+
+        Returns:
+            logging.Logger: Logger con los handlers de consola y archivo
         """
-        # Crear logger principal
-        self.app_logger = logging.getLogger('whatsapp_bot')
-        self.app_logger.setLevel(getattr(logging, config.LOG_LEVEL))
-        
+        # Crear logger principal; se respeta un nivel fijado antes del primer uso
+        app_logger = logging.getLogger('whatsapp_bot')
+        if app_logger.level == logging.NOTSET:
+            app_logger.setLevel(getattr(logging, config.LOG_LEVEL))
+
         # Evitar duplicar handlers si ya existen
-        if self.app_logger.handlers:
-            return
-        
+        if app_logger.handlers:
+            return app_logger
+
         # Formatter
         formatter = logging.Formatter(
             config.LOG_FORMAT,
@@ -44,9 +63,10 @@ class WhatsAppBotLogger:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(formatter)
-        self.app_logger.addHandler(console_handler)
+        app_logger.addHandler(console_handler)
         
         # Handler para archivo con rotación
+        utils.ensure_directory_exists(config.LOG_FILE.parent)
         file_handler = RotatingFileHandler(
             config.LOG_FILE,
             maxBytes=5*1024*1024,  # 5MB
@@ -55,28 +75,19 @@ class WhatsAppBotLogger:
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        self.app_logger.addHandler(file_handler)
-    
-    def _setup_messages_logger(self):
-        """
-        Configura el logger para mensajes enviados (CSV).
-        """
-        self.messages_logger = logging.getLogger('messages_sent')
-        self.messages_logger.setLevel(logging.INFO)
-        
-        # Evitar duplicar handlers si ya existen
-        if self.messages_logger.handlers:
-            return
-        
-        # Crear archivo CSV si no existe
-        self._initialize_messages_csv()
+        app_logger.addHandler(file_handler)
+        return app_logger
     
     def _initialize_messages_csv(self):
         """
-        Inicializa el archivo CSV para el registro de mensajes.
+        Inicializa el archivo CSV para el registro de mensajes (una vez por archivo).
         """
-        if not config.MESSAGES_LOG_FILE.exists():
-            with open(config.MESSAGES_LOG_FILE, 'w', newline='', encoding='utf-8') as csvfile:
+        path = config.MESSAGES_LOG_FILE
+        if path == self._messages_file:
+            return
+        if not path.exists():
+            utils.ensure_directory_exists(path.parent)
+            with open(path, 'w', newline='', encoding='utf-8') as csvfile:
                 writer = csv.writer(csvfile)
                 writer.writerow([
                     'timestamp',
@@ -86,6 +97,7 @@ class WhatsAppBotLogger:
                     'estado',
                     'error'
                 ])
+        self._messages_file = path
     
     def log_info(self, message: str):
         """
@@ -127,6 +139,7 @@ class WhatsAppBotLogger:
         """
         self.app_logger.debug(message)
     
+    @instrumentation.timed("log_message_sent")
     def log_message_sent(self, nombre: str, telefono: str, mensaje: str, 
                         estado: str, error: str = ""):
         """
@@ -145,6 +158,7 @@ class WhatsAppBotLogger:
         mensaje_truncado = utils.truncate_string(mensaje, 200)
         
         try:
+            self._initialize_messages_csv()
             with open(config.MESSAGES_LOG_FILE, 'a', newline='', encoding='utf-8') as csvfile:
                 writer = csv.writer(csvfile)
                 writer.writerow([
@@ -158,6 +172,28 @@ class WhatsAppBotLogger:
         except Exception as e:
             self.log_error(f"Error al escribir en el CSV de mensajes", e)
     
+    def count_messages_sent_today(self) -> int:
+        """
+        Cuenta los mensajes enviados hoy según el CSV de mensajes.
+
+        Returns:
+            int: Número de mensajes con estado ENVIADO en la fecha actual
+        """
+        today = utils.get_timestamp()[:10]
+        count = 0
+
+        try:
+            with open(config.MESSAGES_LOG_FILE, 'r', newline='', encoding='utf-8') as csvfile:
+                for row in csv.reader(csvfile):
+                    if len(row) > 4 and row[0].startswith(today) and row[4] == "ENVIADO":
+                        count += 1
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            self.log_error("Error al leer el CSV de mensajes", e)
+
+        return count
+
     def log_session_start(self, total_contacts: int, limit: int):
         """
         Registra el inicio de una sesión.
@@ -230,6 +266,9 @@ def log_debug(message: str):
 def log_message_sent(nombre: str, telefono: str, mensaje: str, estado: str, error: str = ""):
     logger_instance.log_message_sent(nombre, telefono, mensaje, estado, error)
 
+def count_messages_sent_today() -> int:
+    return logger_instance.count_messages_sent_today()
+
 def log_session_start(total_contacts: int, limit: int):
     logger_instance.log_session_start(total_contacts, limit)
 
@@ -11,7 +11,9 @@ from typing import Optional
 import config
 import logger
 import utils
+from campaign import CampaignSettings
 from data_manager import DataManager
+from event_bus import EventBus
 from whatsapp_client import WhatsAppClient
 from message_sender import MessageSender
 
@@ -21,26 +23,34 @@ class WhatsAppBot:
     Clase principal del bot de WhatsApp.
     """
     
-    def __init__(self):
+    def __init__(self, events: Optional[EventBus] = None,
+                 settings: Optional[CampaignSettings] = None):
+        self.events = events or EventBus()
+        self.settings = settings or CampaignSettings()
         self.data_manager = DataManager()
         self.whatsapp_client = WhatsAppClient()
-        self.message_sender = MessageSender(self.whatsapp_client)
+        self.message_sender = MessageSender(self.whatsapp_client, events=self.events)
         self.contacts = []
+        self.phase = 'idle'
+        self.stop_requested = False
     
-    def run(self, input_file: str, limit: Optional[int] = None, 
-            delay: int = config.DEFAULT_DELAY_BETWEEN_MESSAGES) -> bool:
+    def run(self, input_file: str, limit: Optional[int] = None,
+            delay: Optional[int] = None,
+            settings: Optional[CampaignSettings] = None) -> bool:
         """
         Ejecuta el bot de WhatsApp.
         
         Args:
             input_file (str): Ruta al archivo de contactos
-            limit (Optional[int]): Límite de mensajes a enviar
-            delay (int): Segundos de espera entre mensajes
+            limit (Optional[int]): Límite de mensajes a enviar (reemplaza al de settings)
+            delay (Optional[int]): Segundos de espera entre mensajes (reemplaza al de settings)
+            settings (Optional[CampaignSettings]): Configuración de la campaña
             
         Returns:
             bool: True si la ejecución fue exitosa
         """
         try:
+            self.settings = (settings or self.settings).with_overrides(limit=limit, delay=delay)
             logger.log_info("Iniciando bot de WhatsApp...")
             
             # Paso 1: Cargar contactos
@@ -50,17 +60,25 @@ class WhatsAppBot:
             # Paso 2: Validar contactos
             if not self._validate_contacts():
                 return False
+
+            if self.settings.transport == 'api':
+                return self._run_api()
             
             # Paso 3: Iniciar navegador
-            if not self._start_browser():
+            self._set_phase('starting')
+            if self.stop_requested or not self._start_browser():
                 return False
             
             # Paso 4: Autenticar en WhatsApp
-            if not self._authenticate():
+            self._set_phase('authenticating')
+            if self.stop_requested or not self._authenticate():
                 return False
             
             # Paso 5: Enviar mensajes
-            stats = self._send_messages(limit, delay)
+            self._set_phase('sending')
+            if self.stop_requested:
+                return False
+            stats = self._send_messages(self.settings.limit, self.settings.delay)
             
             # Paso 6: Mostrar resultados
             return stats.messages_sent > 0
@@ -74,6 +92,63 @@ class WhatsAppBot:
         finally:
             self._cleanup()
     
+    def _run_api(self) -> bool:
+        """
+        Envía los mensajes por la API HTTP, sin navegador.
+
+        Returns:
+            bool: True si se envió al menos un mensaje
+        """
+        from api_sender import ApiMessageSender  # aiohttp solo se importa para enviar por API
+
+        self._set_phase('starting')
+        self.message_sender = ApiMessageSender(events=self.events)
+        if self.stop_requested:
+            return False
+
+        self._set_phase('sending')
+        contacts_to_send = self.data_manager.filter_contacts(self.settings.limit)
+        logger.log_info(f"Iniciando envío por API a {len(contacts_to_send)} contactos")
+
+        stats = self.message_sender.send_messages_to_contacts(
+            contacts_to_send, self.settings.limit, self.settings.message_template
+        )
+        return stats.messages_sent > 0
+
+    def _set_phase(self, phase: str):
+        """
+        Actualiza la fase de ejecución y la publica en el bus de eventos.
+
+        Args:
+            phase (str): Nueva fase (starting, authenticating, sending)
+        """
+        self.phase = phase
+        self.events.publish('phase', {'phase': phase})
+
+    def stop(self):
+        """
+        Solicita detener la ejecución del bot.
+
+        Durante el envío se detiene el envío en curso; antes de él se cierra
+        el navegador para cortar la espera del código QR.
+        """
+        self.stop_requested = True
+        self.message_sender.stop_sending()
+        if self.phase in ('starting', 'authenticating'):
+            self.whatsapp_client.close_browser()
+
+    def pause(self):
+        """
+        Pausa el envío de mensajes.
+        """
+        self.message_sender.pause_sending()
+
+    def resume(self):
+        """
+        Reanuda el envío de mensajes.
+        """
+        self.message_sender.resume_sending()
+
     def _load_contacts(self, input_file: str) -> bool:
         """
         Carga los contactos desde el archivo especificado.
@@ -86,7 +161,9 @@ class WhatsAppBot:
         """
         try:
             logger.log_info(f"Cargando contactos desde: {input_file}")
-            self.contacts = self.data_manager.load_contacts(input_file)
+            self.contacts = self.data_manager.load_contacts(
+                input_file, self.settings.message_template
+            )
             
             if not self.contacts:
                 logger.log_error("No se encontraron contactos válidos en el archivo")
@@ -163,7 +240,7 @@ class WhatsAppBot:
         logger.log_info(f"Delay entre mensajes: {delay} segundos")
         
         return self.message_sender.send_messages_to_contacts(
-            contacts_to_send, limit, delay
+            contacts_to_send, limit, delay, self.settings.message_template
         )
     
     def _cleanup(self):
@@ -194,6 +271,38 @@ def setup_signal_handlers(bot: WhatsAppBot):
     signal.signal(signal.SIGTERM, signal_handler)
 
 
+def run_bot(bot: WhatsAppBot, args) -> bool:
+    """
+    Ejecuta el bot, con cProfile y tracemalloc si se pidieron.
+
+    Args:
+        bot (WhatsAppBot): Instancia del bot
+        args: Argumentos parseados
+
+    Returns:
+        bool: True si la ejecución fue exitosa
+    """
+    if not (args.profile or args.profile_memory):
+        return bot.run(args.input)
+
+    import profiling
+
+    if args.profile_memory:
+        profiling.profiler.start_memory()
+    if args.profile:
+        profiling.profiler.start_call('cli')
+    try:
+        return bot.run(args.input)
+    finally:
+        if args.profile:
+            print(f"Perfil de CPU: {profiling.profiler.stop_call()['path']}")
+        if args.profile_memory:
+            total = profiling.profiler.memory_snapshot('cli')
+            data_manager = profiling.profiler.memory_snapshot('cli', scope='data_manager')
+            profiling.profiler.stop_memory()
+            print(f"Reportes de memoria: {total['path']}, {data_manager['path']}")
+
+
 def parse_arguments():
     """
     Parsea los argumentos de línea de comandos.
@@ -209,6 +318,7 @@ Ejemplos de uso:
   python main.py -i contactos.xlsx
   python main.py -i contactos.csv -l 30 -d 25
   python main.py --input datos.xlsx --limit 50 --delay 15
+  python main.py -i contactos.csv --profile --profile-memory
 
 Formato del archivo de contactos:
   - Columnas requeridas: nombre, telefono
@@ -237,6 +347,25 @@ Formato del archivo de contactos:
         help=f'Segundos de espera entre mensajes (default: {config.DEFAULT_DELAY_BETWEEN_MESSAGES})'
     )
     
+    parser.add_argument(
+        '-t', '--transport',
+        choices=['browser', 'api'],
+        default='browser',
+        help='Medio de envío: WhatsApp Web (browser) o API HTTP (api) (default: browser)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Perfilar la ejecución con cProfile (guarda un .pstats en logs/)'
+    )
+    
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help='Trazar la memoria con tracemalloc (reportes en logs/, total y de DataManager)'
+    )
+    
     parser.add_argument(
         '--version',
         action='version',
@@ -298,16 +427,19 @@ def main():
         print(f"Archivo de contactos: {args.input}")
         print(f"Límite de mensajes: {args.limit}")
         print(f"Delay entre mensajes: {args.delay} segundos")
+        print(f"Medio de envío: {args.transport}")
         print("="*60)
         
         # Crear instancia del bot
-        bot = WhatsAppBot()
+        bot = WhatsAppBot(settings=CampaignSettings(
+            limit=args.limit, delay=args.delay, transport=args.transport
+        ))
         
         # Configurar manejadores de señales
         setup_signal_handlers(bot)
         
         # Ejecutar bot
-        success = bot.run(args.input, args.limit, args.delay)
+        success = run_bot(bot, args)
         
         # Salir con código apropiado
         sys.exit(0 if success else 1)
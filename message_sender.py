@@ -3,13 +3,23 @@ Módulo para gestionar el envío de mensajes a múltiples contactos
 """
 
 import time
-import random
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 import config
+import instrumentation
 import logger
 import utils
-from whatsapp_client import WhatsAppClient
+from browser_supervisor import BrowserSupervisor
+from event_bus import EventBus
+from pacing import PacingController
+from retry_queue import RetryQueue
+from send_scheduler import SendScheduler
+from suppression import SuppressionList
+from whatsapp_client import WhatsAppClient, FailureKind, classify_exception
+
+
+# Fallos que se reintentan al final de la campaña o en las esperas largas
+RETRYABLE_FAILURES = {FailureKind.TRANSIENT, FailureKind.SESSION_LOST}
 
 
 @dataclass
@@ -21,6 +31,10 @@ class SendingStats:
     messages_sent: int = 0
     messages_failed: int = 0
     messages_skipped: int = 0
+    messages_retried: int = 0
+    messages_suppressed: int = 0
+    browser_restarts: int = 0
+    recovery_time_seconds: float = 0.0
     start_time: Optional[float] = None
     end_time: Optional[float] = None
 
@@ -44,16 +58,45 @@ class MessageSender:
     Clase para gestionar el envío de mensajes a múltiples contactos.
     """
 
-    def __init__(self, whatsapp_client: WhatsAppClient, progress_callback=None):
+    def __init__(self, whatsapp_client: WhatsAppClient, progress_callback=None,
+                 events: Optional[EventBus] = None,
+                 min_delay: float = config.PACING_MIN_DELAY,
+                 daily_cap: int = config.PACING_DAILY_CAP,
+                 suppression: Optional[SuppressionList] = None,
+                 max_retry_attempts: int = config.MAX_RETRY_ATTEMPTS,
+                 retry_min_wait: float = config.RETRY_MIN_WAIT):
         self.client = whatsapp_client
         self.stats = SendingStats()
         self.is_sending = False
-        self.should_stop = False
+        self.scheduler = SendScheduler()
+        self.events = events or EventBus()
         self.progress_callback = progress_callback
+        self.min_delay = min_delay
+        self.daily_cap = daily_cap
+        self.pacing: Optional[PacingController] = None
+        self.supervisor: Optional[BrowserSupervisor] = None
+        self.suppression = suppression if suppression is not None else SuppressionList()
+        self.max_retry_attempts = max_retry_attempts
+        self.retry_min_wait = retry_min_wait
+        self.retry_queue = RetryQueue(max_retry_attempts, retry_min_wait)
+        self.message_template = config.DEFAULT_MESSAGE_TEMPLATE
+
+    @property
+    def should_stop(self) -> bool:
+        """Indica si se solicitó detener el envío."""
+        return self.scheduler.is_stopped
+
+    @should_stop.setter
+    def should_stop(self, value: bool):
+        if value:
+            self.scheduler.stop()
+        else:
+            self.scheduler.reset()
 
     def send_messages_to_contacts(self, contacts: List[Dict],
                                  limit: Optional[int] = None,
-                                 delay: int = config.DEFAULT_DELAY_BETWEEN_MESSAGES) -> SendingStats:
+                                 delay: int = config.DEFAULT_DELAY_BETWEEN_MESSAGES,
+                                 message_template: Optional[str] = None) -> SendingStats:
         """
         Envía mensajes a una lista de contactos.
 
@@ -61,6 +104,8 @@ class MessageSender:
             contacts (List[Dict]): Lista de contactos
             limit (Optional[int]): Límite de mensajes a enviar
             delay (int): Segundos de espera entre mensajes
+            message_template (Optional[str]): Plantilla para los contactos sin
+                mensaje propio (por defecto config.DEFAULT_MESSAGE_TEMPLATE)
 
         Returns:
             SendingStats: Estadísticas del envío
@@ -71,29 +116,47 @@ class MessageSender:
         self.stats.start_time = time.time()
         self.is_sending = True
         self.should_stop = False
+        self.message_template = message_template or config.DEFAULT_MESSAGE_TEMPLATE
 
         # Filtrar contactos según el límite
         contacts_to_process = contacts[:limit] if limit else contacts
 
+        self.pacing = PacingController(
+            base_delay=delay,
+            min_delay=self.min_delay,
+            daily_cap=self.daily_cap,
+            sent_today=logger.count_messages_sent_today() if self.daily_cap > 0 else 0
+        )
+        self.retry_queue = RetryQueue(self.max_retry_attempts, self.retry_min_wait)
+        self.supervisor = BrowserSupervisor(self.client)
+
         logger.log_session_start(len(contacts), self.stats.total_contacts)
 
         try:
-            for i, contact in enumerate(contacts_to_process, 1):
-                if self.should_stop:
-                    logger.log_info("Envío detenido por el usuario")
-                    break
+            # El siguiente contacto se prepara durante la espera del anterior
+            prepared = self._prepare_contact(contacts_to_process[0]) if contacts_to_process else None
 
-                # Verificar que el navegador siga funcionando
-                if not self.client.is_browser_running():
-                    logger.log_error("El navegador se cerró inesperadamente")
+            completed = True
+            for i in range(1, len(contacts_to_process) + 1):
+                if not self._ready_to_send():
+                    completed = False
                     break
 
                 # Procesar contacto
-                self._process_contact(contact, i, self.stats.total_contacts)
+                self._process_contact(contacts_to_process[i - 1], i, self.stats.total_contacts, prepared)
 
                 # Aplicar delay entre mensajes (excepto en el último)
                 if i < self.stats.total_contacts and not self.should_stop:
-                    self._apply_delay(delay, i, self.stats.total_contacts)
+                    deadline = self.scheduler.schedule_after(self._compute_delay())
+                    prepared = self._prepare_contact(contacts_to_process[i])
+                    if not self._apply_delay(deadline, i, self.stats.total_contacts):
+                        logger.log_info("Envío detenido por el usuario")
+                        completed = False
+                        break
+
+            # Reintentar los fallos transitorios pendientes
+            if completed:
+                self._process_retry_queue(self.stats.total_contacts)
 
         except KeyboardInterrupt:
             logger.log_info("Envío interrumpido por el usuario (Ctrl+C)")
@@ -103,37 +166,179 @@ class MessageSender:
             logger.log_error("Error durante el envío de mensajes", e)
 
         finally:
+            self._abandon_pending_retries()
             self.stats.end_time = time.time()
             self.is_sending = False
             self._log_session_summary()
 
         return self.stats
 
-    def _process_contact(self, contact: Dict, current: int, total: int):
+    def _ready_to_send(self) -> bool:
+        """
+        Verifica que se pueda enviar el próximo mensaje (sin pausa ni detención,
+        dentro del límite diario y con el navegador funcionando).
+
+        Returns:
+            bool: True si se puede continuar con el envío
+        """
+        if not self.scheduler.wait_if_paused():
+            logger.log_info("Envío detenido por el usuario")
+            return False
+
+        if not self.pacing.can_send():
+            logger.log_warning(f"Límite diario de {self.pacing.daily_cap} mensajes alcanzado")
+            return False
+
+        # Verificar que el navegador siga funcionando (y recuperarlo si cayó)
+        if not self.supervisor.is_healthy():
+            logger.log_error("El navegador se cerró inesperadamente")
+            if not self._recover_browser():
+                return False
+
+        return True
+
+    def _recover_browser(self) -> bool:
+        """
+        Reinicia el navegador y actualiza las estadísticas de recuperación.
+
+        Returns:
+            bool: True si el navegador se recuperó
+        """
+        recovered = self.supervisor.recover()
+        self.stats.browser_restarts = self.supervisor.restarts
+        self.stats.recovery_time_seconds = self.supervisor.recovery_time
+        self.events.publish('browser_restarted', {
+            'recovered': recovered,
+            'restarts': self.supervisor.restarts,
+            'recovery_time': round(self.supervisor.recovery_time, 2)
+        })
+        return recovered
+
+    def _process_retry_queue(self, total: int):
+        """
+        Reintenta los contactos con fallos transitorios al terminar la campaña.
+
+        Args:
+            total (int): Total de contactos
+        """
+        if self.retry_queue:
+            logger.log_info(f"Reintentando {len(self.retry_queue)} contactos con fallos transitorios")
+
+        while self.retry_queue and not self.should_stop:
+            if not self._ready_to_send():
+                return
+
+            item = self.retry_queue.pop()
+            delay = self._compute_delay()
+            deadline = self.scheduler.schedule_after(
+                max(delay, item.ready_at - time.monotonic())
+            )
+            if not self._apply_delay(deadline, item.position, total):
+                self.retry_queue.push_front(item)
+                return
+
+            self._retry_contact(item, total)
+
+    def _retry_contact(self, item, total: int):
+        """
+        Reintenta el envío a un contacto de la cola de reintentos.
+
+        Args:
+            item (RetryItem): Reintento a procesar
+            total (int): Total de contactos
+        """
+        logger.log_info(
+            f"Reintento {item.attempts}/{self.retry_queue.max_attempts} para "
+            f"{item.contact.get('nombre', 'Sin nombre')} ({item.failure})"
+        )
+        self._process_contact(item.contact, item.position, total)
+
+    def _abandon_pending_retries(self):
+        """
+        Marca como fallidos los reintentos que quedaron sin procesar.
+        """
+        while self.retry_queue:
+            item = self.retry_queue.pop()
+            contact = item.contact
+            logger.log_message_sent(
+                contact.get('nombre', 'Sin nombre'), contact.get('telefono', ''),
+                contact.get('mensaje', ''), "ERROR", f"Reintento no realizado ({item.failure})"
+            )
+            self.stats.messages_failed += 1
+            self._publish_result(
+                item.position, self.stats.total_contacts,
+                {'nombre': contact.get('nombre', 'Sin nombre'), 'telefono': contact.get('telefono', '')},
+                "ERROR", f"Reintento no realizado ({item.failure})"
+            )
+
+    def _prepare_contact(self, contact: Dict) -> Dict:
+        """
+        Valida el teléfono y formatea el mensaje de un contacto.
+
+        Args:
+            contact (Dict): Datos del contacto
+
+        Returns:
+            Dict: Contacto preparado para el envío
+        """
+        mensaje = contact.get('mensaje') or self.message_template
+        telefono = contact.get('telefono', '')
+        valido = utils.validate_phone_number(telefono)
+        suprimido = valido and self.suppression.contains(telefono)
+
+        if not valido:
+            error = f"Número de teléfono inválido: {telefono}"
+        elif suprimido:
+            error = f"Número en la lista de supresión: {telefono}"
+        else:
+            error = ""
+
+        return {
+            'nombre': contact.get('nombre', 'Sin nombre'),
+            'telefono': telefono,
+            'mensaje': mensaje,
+            'mensaje_formateado': utils.format_message(mensaje, contact) if valido else mensaje,
+            'valido': valido and not suprimido,
+            'suprimido': suprimido,
+            'error': error
+        }
+
+    def _process_contact(self, contact: Dict, current: int, total: int,
+                         prepared: Optional[Dict] = None, recover_session: bool = True):
         """
         Procesa un contacto individual.
 
+        Si la sesión del navegador se perdió durante el envío, se reinicia el
+        navegador y se reintenta el mismo contacto una vez.
+
         Args:
             contact (Dict): Datos del contacto
             current (int): Número actual
             total (int): Total de contactos
+            prepared (Optional[Dict]): Resultado previo de _prepare_contact
+            recover_session (bool): Permitir la recuperación del navegador
         """
-        nombre = contact.get('nombre', 'Sin nombre')
-        telefono = contact.get('telefono', '')
-        mensaje = contact.get('mensaje', config.DEFAULT_MESSAGE_TEMPLATE)
+        if prepared is None:
+            prepared = self._prepare_contact(contact)
+
+        nombre = prepared['nombre']
+        telefono = prepared['telefono']
+        mensaje = prepared['mensaje']
 
         logger.log_contact_processing(current, total, nombre)
 
         # Validar teléfono
-        if not utils.validate_phone_number(telefono):
-            error_msg = f"Número de teléfono inválido: {telefono}"
+        if not prepared['valido']:
+            error_msg = prepared['error']
             logger.log_warning(error_msg)
             logger.log_message_sent(nombre, telefono, mensaje, "SALTADO", error_msg)
             self.stats.messages_skipped += 1
+            if prepared['suprimido']:
+                self.stats.messages_suppressed += 1
+            self._publish_result(current, total, prepared, "SALTADO", error_msg)
             return
 
-        # Formatear mensaje
-        mensaje_formateado = utils.format_message(mensaje, contact)
+        mensaje_formateado = prepared['mensaje_formateado']
 
         # Mostrar progreso en consola
         self._show_progress(current, total, nombre, telefono)
@@ -143,49 +348,211 @@ class MessageSender:
             self.progress_callback(current, total)
 
         # Intentar enviar mensaje
+        self.pacing.start_send()
+        started = time.monotonic()
+        success = False
+        failure = None
+        error_msg = ""
+
         try:
             success = self.client.send_message_to_contact(telefono, mensaje_formateado)
-
-            if success:
-                logger.log_info(config.MESSAGES["message_sent"].format(contact=nombre))
-                logger.log_message_sent(nombre, telefono, mensaje_formateado, "ENVIADO")
-                self.stats.messages_sent += 1
-            else:
-                error_msg = "No se pudo enviar el mensaje"
-                logger.log_warning(config.MESSAGES["message_failed"].format(contact=nombre, error=error_msg))
-                logger.log_message_sent(nombre, telefono, mensaje_formateado, "ERROR", error_msg)
-                self.stats.messages_failed += 1
+            if not success:
+                failure = self.client.last_failure or FailureKind.UNKNOWN
+                error_msg = self.client.last_failure_detail or "No se pudo enviar el mensaje"
 
         except Exception as e:
+            failure = classify_exception(e)
             error_msg = str(e)
             logger.log_error(f"Error al enviar mensaje a {nombre}", e)
-            logger.log_message_sent(nombre, telefono, mensaje_formateado, "ERROR", error_msg)
-            self.stats.messages_failed += 1
 
-    def _apply_delay(self, base_delay: int, current: int, total: int):
+        finally:
+            self.pacing.record_result(
+                success,
+                time.monotonic() - started,
+                invalid_number=failure == FailureKind.INVALID_NUMBER
+            )
+
+        if success:
+            logger.log_info(config.MESSAGES["message_sent"].format(contact=nombre))
+            logger.log_message_sent(nombre, telefono, mensaje_formateado, "ENVIADO")
+            self.stats.messages_sent += 1
+            self._publish_result(current, total, prepared, "ENVIADO")
+            return
+
+        if failure == FailureKind.SESSION_LOST and recover_session and not self.should_stop:
+            logger.log_error(f"Se perdió la sesión del navegador al enviar a {nombre}")
+            if self._recover_browser():
+                # Reanudar desde el contacto que falló
+                return self._process_contact(contact, current, total, prepared, recover_session=False)
+
+        self._handle_failure(contact, current, prepared, failure, error_msg)
+
+    def _handle_failure(self, contact: Dict, current: int, prepared: Dict,
+                        failure: FailureKind, error_msg: str):
+        """
+        Decide qué hacer con un envío fallido según su clasificación.
+
+        Los números inválidos se agregan a la lista de supresión, los fallos
+        transitorios se encolan para reintentar y el resto se marca como error.
+
+        Args:
+            contact (Dict): Datos del contacto
+            current (int): Posición del contacto en la campaña
+            prepared (Dict): Contacto preparado
+            failure (FailureKind): Tipo de fallo
+            error_msg (str): Descripción del error
+        """
+        nombre = prepared['nombre']
+        telefono = prepared['telefono']
+        mensaje_formateado = prepared['mensaje_formateado']
+
+        if failure == FailureKind.INVALID_NUMBER:
+            self.suppression.add(telefono, failure.value, nombre)
+            self.stats.messages_suppressed += 1
+
+        elif failure in RETRYABLE_FAILURES and self.retry_queue.push(contact, current, failure.value):
+            logger.log_warning(f"Fallo transitorio con {nombre}, se reintentará más tarde: {error_msg}")
+            logger.log_message_sent(nombre, telefono, mensaje_formateado, "REINTENTO", error_msg)
+            self.stats.messages_retried += 1
+            self._publish_result(current, self.stats.total_contacts, prepared, "REINTENTO", error_msg)
+            return
+
+        logger.log_warning(config.MESSAGES["message_failed"].format(contact=nombre, error=error_msg))
+        logger.log_message_sent(nombre, telefono, mensaje_formateado, "ERROR", error_msg)
+        self.stats.messages_failed += 1
+        self._publish_result(current, self.stats.total_contacts, prepared, "ERROR", error_msg)
+
+    def _publish_result(self, current: int, total: int, prepared: Dict,
+                        status: str, error: str = ""):
         """
-        Aplica un delay entre mensajes con variación aleatoria.
+        Publica el resultado de un contacto y los contadores actualizados.
 
         Args:
-            base_delay (int): Delay base en segundos
+            current (int): Posición del contacto en la campaña
+            total (int): Total de contactos
+            prepared (Dict): Contacto preparado
+            status (str): ENVIADO, SALTADO, REINTENTO o ERROR
+            error (str): Descripción del error, si lo hubo
+        """
+        if not self.events.has_subscribers():
+            return
+
+        self.events.publish('contact_result', {
+            'position': current,
+            'total': total,
+            'nombre': prepared['nombre'],
+            'telefono': prepared['telefono'],
+            'status': status,
+            'error': error
+        })
+        self.events.publish('progress', self.get_progress())
+
+    def get_progress(self) -> Dict:
+        """
+        Obtiene los contadores del envío y el tiempo estimado restante.
+
+        Returns:
+            Dict: Contadores, porcentaje y ETA en segundos (None si no se puede estimar)
+        """
+        processed = self.stats.messages_sent + self.stats.messages_failed + self.stats.messages_skipped
+        total = self.stats.total_contacts
+        remaining = max(0, total - processed)
+
+        eta = None
+        if processed and self.stats.start_time:
+            elapsed = time.time() - self.stats.start_time
+            eta = round(elapsed / processed * remaining, 1)
+
+        return {
+            'processed': processed,
+            'total': total,
+            'percentage': round(processed / total * 100, 1) if total else 0.0,
+            'messages_sent': self.stats.messages_sent,
+            'messages_failed': self.stats.messages_failed,
+            'messages_skipped': self.stats.messages_skipped,
+            'messages_retried': self.stats.messages_retried,
+            'messages_suppressed': self.stats.messages_suppressed,
+            'pending_retries': len(self.retry_queue),
+            'eta_seconds': eta
+        }
+
+    def _compute_delay(self) -> float:
+        """
+        Obtiene del controlador de ritmo la espera hasta el próximo mensaje.
+
+        Returns:
+            float: Segundos de espera
+        """
+        delay = self.pacing.next_delay()
+        metrics = self.pacing.get_metrics()
+        logger.log_debug(
+            f"Ritmo: objetivo {metrics['target_delay']}s, transcurrido {metrics['elapsed']}s, "
+            f"backoff x{metrics['backoff_factor']:.2f}"
+        )
+        self.events.publish('pacing', metrics)
+        return delay
+
+    @instrumentation.timed("apply_delay")
+    def _apply_delay(self, deadline: float, current: int, total: int) -> bool:
+        """
+        Espera hasta el instante de envío del siguiente mensaje.
+
+        La cuenta regresiva se publica como evento 'countdown'; stop y pause
+        interrumpen la espera de inmediato.
+
+        Args:
+            deadline (float): Instante (reloj monotónico) del próximo envío
             current (int): Mensaje actual
             total (int): Total de mensajes
+
+        Returns:
+            bool: False si el envío se detuvo durante la espera
         """
-        # Agregar variación aleatoria del ±20%
-        variation = random.uniform(0.8, 1.2)
-        actual_delay = int(base_delay * variation)
+        logger.log_debug(
+            f"Esperando {max(0.0, deadline - time.monotonic()):.1f} segundos antes del siguiente mensaje..."
+        )
 
-        logger.log_debug(f"Esperando {actual_delay} segundos antes del siguiente mensaje...")
+        def on_tick(remaining: float):
+            self.events.publish('countdown', {
+                'remaining': round(remaining, 1),
+                'current': current,
+                'total': total
+            })
+
+        tick = on_tick if self.events.has_subscribers() else None
+
+        # Aprovechar una espera larga para un reintento, dejando la
+        # separación mínima antes y después de él
+        if self._fits_retry(deadline):
+            if not self.scheduler.wait_until(time.monotonic() + self.pacing.min_delay, tick):
+                return False
+            item = self.retry_queue.pop_ready()
+            if item is not None:
+                if self._ready_to_send():
+                    self._retry_contact(item, total)
+                else:
+                    self.retry_queue.push_front(item)
+
+        return self.scheduler.wait_until(deadline, tick)
+
+    def _fits_retry(self, deadline: float) -> bool:
+        """
+        Verifica si la espera hasta el próximo envío admite un reintento.
 
-        # Mostrar countdown
-        for remaining in range(actual_delay, 0, -1):
-            if self.should_stop:
-                break
+        Args:
+            deadline (float): Instante del próximo envío
 
-            print(f"\rEsperando {remaining} segundos... (Mensaje {current}/{total})", end="", flush=True)
-            time.sleep(1)
+        Returns:
+            bool: True si hay un reintento listo y tiempo suficiente para él
+        """
+        item = self.retry_queue.peek()
+        if item is None or not self.pacing.can_send():
+            return False
 
-        print()  # Nueva línea después del countdown
+        now = time.monotonic()
+        gap = self.pacing.min_delay
+        return (item.ready_at <= now + gap
+                and deadline - now >= 2 * gap + self.pacing.avg_latency)
 
     def _show_progress(self, current: int, total: int, nombre: str, telefono: str):
         """
@@ -241,6 +608,10 @@ class MessageSender:
         print(f"Mensajes enviados exitosamente: {self.stats.messages_sent}")
         print(f"Mensajes con error: {self.stats.messages_failed}")
         print(f"Mensajes saltados: {self.stats.messages_skipped}")
+        print(f"Reintentos: {self.stats.messages_retried} | Números suprimidos: {self.stats.messages_suppressed}")
+        if self.stats.browser_restarts:
+            print(f"Reinicios del navegador: {self.stats.browser_restarts} "
+                  f"({self.stats.recovery_time_seconds:.1f} s de recuperación)")
         print(f"Tasa de éxito: {self.stats.success_rate:.1f}%")
 
         if self.stats.duration_minutes > 0:
@@ -248,6 +619,17 @@ class MessageSender:
             messages_per_minute = self.stats.messages_sent / self.stats.duration_minutes
             print(f"Velocidad promedio: {messages_per_minute:.1f} mensajes/minuto")
 
+        timings = instrumentation.format_summary()
+        if timings:
+            print("Tiempos por etapa:")
+            for line in timings:
+                print(f"  {line}")
+                logger.log_info(f"Tiempos - {line}")
+            try:
+                instrumentation.dump()
+            except OSError as e:
+                logger.log_error("Error al guardar los tiempos por etapa", e)
+
         print(f"{'='*60}")
 
         # Mostrar mensaje final
@@ -265,9 +647,34 @@ class MessageSender:
         """
         Detiene el envío de mensajes.
         """
-        self.should_stop = True
+        self.scheduler.stop()
         logger.log_info("Solicitando detener el envío de mensajes...")
 
+    def pause_sending(self):
+        """
+        Pausa el envío; el contacto en curso termina de procesarse.
+        """
+        self.scheduler.pause()
+        self.events.publish('paused', {})
+        logger.log_info("Envío de mensajes pausado")
+
+    def resume_sending(self):
+        """
+        Reanuda un envío pausado.
+        """
+        self.scheduler.resume()
+        self.events.publish('resumed', {})
+        logger.log_info("Envío de mensajes reanudado")
+
+    def is_paused(self) -> bool:
+        """
+        Verifica si el envío está pausado.
+
+        Returns:
+            bool: True si el envío está pausado
+        """
+        return self.scheduler.is_paused
+
     def get_stats(self) -> SendingStats:
         """
         Obtiene las estadísticas actuales.
@@ -277,6 +684,15 @@ class MessageSender:
         """
         return self.stats
 
+    def get_pacing_metrics(self) -> Dict:
+        """
+        Obtiene las métricas del controlador de ritmo.
+
+        Returns:
+            Dict: Métricas de ritmo (vacío si no se inició ningún envío)
+        """
+        return self.pacing.get_metrics() if self.pacing else {}
+
     def is_sending_active(self) -> bool:
         """
         Verifica si el envío está activo.
@@ -0,0 +1,233 @@
+"""
+Métricas del backend en el formato de texto de Prometheus (/metrics)
+"""
+
+import math
+import os
+import time
+from typing import Any, Dict, Iterable, List
+
+import config
+import instrumentation
+from contact_cache import get_default_cache
+from instrumentation import Histogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prefijo de las etapas de instrumentation que son tareas del pool (parseo de archivos)
+TASK_STAGE_PREFIX = "task:"
+
+# Estados de campaña que tienen un navegador abierto
+BROWSER_STATES = ('starting', 'authenticating', 'sending', 'paused')
+
+
+def resident_memory_bytes() -> int:
+    """
+    Memoria residente (RSS) del proceso.
+
+    Returns:
+        int: Bytes en memoria (en sistemas sin /proc, el pico de uso; 0 si no se puede medir)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa kilobytes y macOS bytes
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def process_snapshot(task_pool=None) -> Dict[str, Any]:
+    """
+    Métricas de este proceso: histogramas de instrumentation, memoria, caché y pool.
+
+    Args:
+        task_pool (Optional[TaskPool]): Pool de tareas del proceso
+
+    Returns:
+        Dict[str, Any]: Métricas serializables a JSON (para el estado compartido)
+    """
+    snapshot = {
+        'pid': os.getpid(),
+        'collected_at': time.time(),
+        'resident_memory_bytes': resident_memory_bytes(),
+        'histograms': {stage: histogram.to_dict()
+                       for stage, histogram in instrumentation.registry.stages().items()}
+    }
+
+    cache = get_default_cache()
+    if cache is not None:
+        stats = cache.get_stats()
+        snapshot['contact_cache'] = {'hits': stats['hits'], 'misses': stats['misses']}
+
+    if task_pool is not None:
+        stats = task_pool.get_stats()
+        snapshot['task_pool'] = {key: stats[key] for key in ('in_flight', 'capacity', 'rejected', 'timeouts')}
+
+    return snapshot
+
+
+def collect_snapshots(store, worker_id: str, task_pool=None) -> Dict[str, Dict[str, Any]]:
+    """
+    Métricas de este proceso y, con estado compartido, las últimas de los demás workers vivos.
+
+    Args:
+        store (Optional[SharedStateStore]): Estado compartido
+        worker_id (str): ID de este worker
+        task_pool (Optional[TaskPool]): Pool de tareas de este proceso
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Métricas por worker
+    """
+    snapshots = {}
+    if store is not None:
+        snapshots = store.load_metrics(store.live_workers())
+    snapshots[worker_id] = process_snapshot(task_pool)
+    return snapshots
+
+
+class MetricsText:
+    """
+    Arma la exposición de texto: una familia (HELP y TYPE) seguida de sus muestras.
+    """
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, **labels: Any):
+        if labels:
+            rendered = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+            self.lines.append(f"{name}{{{rendered}}} {_format_value(value)}")
+        else:
+            self.lines.append(f"{name} {_format_value(value)}")
+
+    def histogram(self, name: str, histogram: Histogram, bounds: Iterable[float], **labels: Any):
+        bounds = list(bounds)
+        for bound, count in zip(bounds, histogram.cumulative_counts(bounds)):
+            self.sample(f"{name}_bucket", count, **labels, le=_format_value(float(bound)))
+        self.sample(f"{name}_bucket", histogram.count, **labels, le="+Inf")
+        self.sample(f"{name}_sum", histogram.total / 1_000_000, **labels)
+        self.sample(f"{name}_count", histogram.count, **labels)
+
+    def render(self) -> str:
+        return '\n'.join(self.lines) + '\n'
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _merge_histograms(snapshots: Dict[str, Dict[str, Any]]) -> Dict[str, Histogram]:
+    merged: Dict[str, Histogram] = {}
+    for snapshot in snapshots.values():
+        for stage, data in snapshot.get('histograms', {}).items():
+            histogram = Histogram.from_dict(data)
+            if stage in merged and merged[stage].significant_bits == histogram.significant_bits:
+                merged[stage].merge(histogram)
+            else:
+                merged.setdefault(stage, histogram)
+    return merged
+
+
+def render(jobs: List[Dict[str, Any]], snapshots: Dict[str, Dict[str, Any]],
+           bounds: Iterable[float] = config.METRICS_DURATION_BUCKETS) -> str:
+    """
+    Genera la exposición de texto de Prometheus.
+
+    Los datos salen de las campañas serializadas (acotadas por
+    JOB_HISTORY_LIMIT) y de las métricas ya calculadas de cada worker; no
+    se lee ningún archivo de contactos.
+
+    Args:
+        jobs (List[Dict[str, Any]]): Campañas (JobManager.list_job_dicts())
+        snapshots (Dict[str, Dict[str, Any]]): Métricas por worker (collect_snapshots())
+        bounds (Iterable[float]): Límites de los buckets de los histogramas en segundos
+
+    Returns:
+        str: Métricas en formato de texto
+    """
+    bounds = list(bounds)
+    out = MetricsText()
+    campaigns = [job for job in jobs if job.get('kind', 'campaign') == 'campaign']
+
+    out.family('whatsapp_bot_messages_total', 'counter', 'Mensajes procesados por campaña y resultado')
+    for job in campaigns:
+        stats = job.get('stats') or {}
+        for status, key in (('sent', 'messages_sent'), ('failed', 'messages_failed'),
+                            ('skipped', 'messages_skipped')):
+            out.sample('whatsapp_bot_messages_total', int(stats.get(key) or 0), job_id=job['id'], status=status)
+
+    out.family('whatsapp_bot_jobs', 'gauge', 'Campañas y validaciones conocidas por estado')
+    states: Dict[tuple, int] = {}
+    for job in jobs:
+        key = (job.get('kind', 'campaign'), job['state'])
+        states[key] = states.get(key, 0) + 1
+    for (kind, state), count in sorted(states.items()):
+        out.sample('whatsapp_bot_jobs', count, kind=kind, state=state)
+
+    out.family('whatsapp_bot_active_browsers', 'gauge', 'Campañas con un navegador abierto')
+    out.sample('whatsapp_bot_active_browsers', sum(
+        1 for job in campaigns
+        if job['state'] in BROWSER_STATES and (job.get('params') or {}).get('transport', 'browser') == 'browser'
+    ))
+
+    out.family('whatsapp_bot_queue_depth', 'gauge', 'Trabajos esperando: campañas en cola y tareas del pool')
+    out.sample('whatsapp_bot_queue_depth', sum(1 for job in jobs if job['state'] == 'queued'), queue='jobs')
+    for worker_id, snapshot in sorted(snapshots.items()):
+        if 'task_pool' in snapshot:
+            out.sample('whatsapp_bot_queue_depth', snapshot['task_pool']['in_flight'],
+                       queue='task_pool', worker=worker_id)
+
+    histograms = _merge_histograms(snapshots)
+    out.family('whatsapp_bot_stage_duration_seconds', 'histogram', 'Duración de cada etapa del envío')
+    for stage, histogram in sorted(histograms.items()):
+        if not stage.startswith(TASK_STAGE_PREFIX):
+            out.histogram('whatsapp_bot_stage_duration_seconds', histogram, bounds, stage=stage)
+
+    out.family('whatsapp_bot_task_duration_seconds', 'histogram',
+               'Duración de las tareas de parseo, validación y exportación de archivos')
+    for stage, histogram in sorted(histograms.items()):
+        if stage.startswith(TASK_STAGE_PREFIX):
+            out.histogram('whatsapp_bot_task_duration_seconds', histogram, bounds,
+                          task=stage[len(TASK_STAGE_PREFIX):])
+
+    out.family('whatsapp_bot_contact_cache_requests_total', 'counter', 'Cargas de contactos por resultado de la caché')
+    out_ratio: Dict[str, float] = {}
+    for worker_id, snapshot in sorted(snapshots.items()):
+        cache = snapshot.get('contact_cache')
+        if cache is None:
+            continue
+        out.sample('whatsapp_bot_contact_cache_requests_total', cache['hits'], result='hit', worker=worker_id)
+        out.sample('whatsapp_bot_contact_cache_requests_total', cache['misses'], result='miss', worker=worker_id)
+        total = cache['hits'] + cache['misses']
+        out_ratio[worker_id] = cache['hits'] / total if total else 0.0
+
+    out.family('whatsapp_bot_contact_cache_hit_ratio', 'gauge', 'Proporción de cargas servidas por la caché')
+    for worker_id, ratio in out_ratio.items():
+        out.sample('whatsapp_bot_contact_cache_hit_ratio', ratio, worker=worker_id)
+
+    out.family('whatsapp_bot_process_resident_memory_bytes', 'gauge', 'Memoria residente de cada proceso')
+    for worker_id, snapshot in sorted(snapshots.items()):
+        out.sample('whatsapp_bot_process_resident_memory_bytes', snapshot.get('resident_memory_bytes', 0),
+                   worker=worker_id, pid=snapshot.get('pid', ''))
+
+    return out.render()
@@ -19,6 +19,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Importar módulos del bot
+from campaign import CampaignSettings
 from data_manager import DataManager
 from main import WhatsAppBot
 import config
@@ -178,24 +179,16 @@ class BotRunner:
                 'stats': self.stats
             })
 
-            # Actualizar configuración del mensaje
-            original_template = config.DEFAULT_MESSAGE_TEMPLATE
-            config.DEFAULT_MESSAGE_TEMPLATE = message_template
+            # Crear instancia del bot con la plantilla propia de esta ejecución
+            self.bot_instance = WhatsAppBot()
+            settings = CampaignSettings(message_template=message_template, limit=limit, delay=delay)
 
-            try:
-                # Crear instancia del bot
-                self.bot_instance = WhatsAppBot()
-
-                # Ejecutar bot
-                self.emit_update('status_update', {'message': 'Iniciando WhatsApp Web...', 'stats': self.stats})
-                success = self.bot_instance.run(filepath, limit, delay)
-
-                self.stats['status'] = 'completed' if success else 'failed'
-                self.emit_update('bot_completed', self.stats)
+            # Ejecutar bot
+            self.emit_update('status_update', {'message': 'Iniciando WhatsApp Web...', 'stats': self.stats})
+            success = self.bot_instance.run(filepath, settings=settings)
 
-            finally:
-                # Restaurar configuración original
-                config.DEFAULT_MESSAGE_TEMPLATE = original_template
+            self.stats['status'] = 'completed' if success else 'failed'
+            self.emit_update('bot_completed', self.stats)
 
         except Exception as e:
             self.stats['status'] = 'error'
@@ -0,0 +1,156 @@
+"""
+Control adaptativo del ritmo de envío de mensajes
+"""
+
+import random
+import time
+from collections import deque
+from datetime import date
+from typing import Dict, Any
+import config
+
+
+class PacingController:
+    """
+    Decide cuánto esperar entre mensajes según el comportamiento de la sesión.
+
+    La separación se mide entre el inicio de dos envíos, de modo que el tiempo
+    que ya tardaron las operaciones del navegador cuenta como parte de la espera.
+    Ante fallos consecutivos o una tasa alta de números inválidos el delay se
+    multiplica (backoff) y vuelve gradualmente al valor base con los éxitos.
+    """
+
+    def __init__(self, base_delay: float,
+                 min_delay: float = config.PACING_MIN_DELAY,
+                 daily_cap: int = config.PACING_DAILY_CAP,
+                 max_backoff: float = config.PACING_MAX_BACKOFF,
+                 failure_threshold: int = config.PACING_FAILURE_THRESHOLD,
+                 invalid_rate_threshold: float = config.PACING_INVALID_RATE_THRESHOLD,
+                 window: int = config.PACING_WINDOW,
+                 sent_today: int = 0,
+                 clock=time.monotonic):
+        self.base_delay = max(0.0, base_delay)
+        self.min_delay = max(0.0, min_delay)
+        self.daily_cap = daily_cap
+        self.max_backoff = max(1.0, max_backoff)
+        self.failure_threshold = max(1, failure_threshold)
+        self.invalid_rate_threshold = invalid_rate_threshold
+        self._clock = clock
+
+        self.backoff_factor = 1.0
+        self.consecutive_failures = 0
+        self.sent_today = sent_today
+        self._day = date.today()
+        self._recent = deque(maxlen=max(1, window))
+        self._last_send_started = None
+
+        self.avg_latency = 0.0
+        self.last_target = 0.0
+        self.last_elapsed = 0.0
+        self.last_wait = 0.0
+        self.decisions = 0
+        self.backoff_events = 0
+
+    def start_send(self):
+        """
+        Marca el inicio de un envío (búsqueda del contacto incluida).
+        """
+        self._last_send_started = self._clock()
+
+    def record_result(self, success: bool, latency: float, invalid_number: bool = False):
+        """
+        Registra el resultado de un envío y ajusta el backoff.
+
+        Args:
+            success (bool): True si el mensaje se envió
+            latency (float): Segundos que tardó la operación en el navegador
+            invalid_number (bool): True si WhatsApp reportó el número como inválido
+        """
+        self._roll_day()
+
+        # Media móvil exponencial de la latencia
+        self.avg_latency = latency if self.avg_latency == 0 else 0.8 * self.avg_latency + 0.2 * latency
+        self._recent.append((success, invalid_number))
+
+        if success:
+            self.consecutive_failures = 0
+            self.sent_today += 1
+        else:
+            self.consecutive_failures += 1
+
+        if (self.consecutive_failures >= self.failure_threshold
+                or self.invalid_rate >= self.invalid_rate_threshold):
+            self.backoff_factor = min(self.max_backoff, self.backoff_factor * 2)
+            self.backoff_events += 1
+        elif success:
+            self.backoff_factor = max(1.0, self.backoff_factor * 0.75)
+
+    @property
+    def invalid_rate(self) -> float:
+        """Proporción de números inválidos entre los resultados recientes."""
+        # Con pocas muestras la tasa no es representativa
+        if len(self._recent) < min(5, self._recent.maxlen):
+            return 0.0
+        invalid = sum(1 for _, invalid_number in self._recent if invalid_number)
+        return invalid / len(self._recent)
+
+    def can_send(self) -> bool:
+        """
+        Verifica si todavía no se alcanzó el límite diario.
+
+        Returns:
+            bool: True si se puede enviar otro mensaje hoy
+        """
+        self._roll_day()
+        return self.daily_cap <= 0 or self.sent_today < self.daily_cap
+
+    def next_delay(self) -> float:
+        """
+        Calcula la espera antes del próximo envío.
+
+        Returns:
+            float: Segundos a esperar desde ahora
+        """
+        target = max(self.min_delay, self.base_delay * self.backoff_factor * random.uniform(0.8, 1.2))
+
+        elapsed = 0.0
+        if self._last_send_started is not None:
+            elapsed = self._clock() - self._last_send_started
+
+        self.last_target = target
+        self.last_elapsed = elapsed
+        self.last_wait = max(0.0, target - elapsed)
+        self.decisions += 1
+        return self.last_wait
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de las decisiones de ritmo.
+
+        Returns:
+            Dict[str, Any]: Métricas actuales del controlador
+        """
+        return {
+            'base_delay': self.base_delay,
+            'min_delay': self.min_delay,
+            'target_delay': round(self.last_target, 3),
+            'elapsed': round(self.last_elapsed, 3),
+            'wait': round(self.last_wait, 3),
+            'backoff_factor': self.backoff_factor,
+            'backoff_events': self.backoff_events,
+            'consecutive_failures': self.consecutive_failures,
+            'invalid_rate': round(self.invalid_rate, 3),
+            'avg_latency': round(self.avg_latency, 3),
+            'sent_today': self.sent_today,
+            'daily_cap': self.daily_cap,
+            'decisions': self.decisions
+        }
+
+    def _roll_day(self):
+        """
+        Reinicia el contador diario al cambiar de fecha.
+        """
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self.sent_today = 0
@@ -0,0 +1,427 @@
+"""
+Perfilado bajo demanda: muestreo de pilas, cProfile y snapshots de tracemalloc
+
+Nada corre hasta que se pide: sin una sesión activa no hay hilo de
+muestreo, hooks de profile ni trazado de memoria. Los resultados se
+guardan en la carpeta de logs:
+
+- profile-<etiqueta>-<fecha>.folded: pilas colapsadas del muestreo (una por
+  línea con su cantidad de muestras; se abren con speedscope o flamegraph.pl)
+- profile-<etiqueta>-<fecha>.pstats: cProfile (python -m pstats, snakeviz)
+- memory-<etiqueta>-<fecha>.txt: mayores asignaciones y crecimiento desde
+  la línea base de tracemalloc
+
+Con gevent (gunicorn con worker_class = "gevent") los "hilos" son greenlets:
+el muestreo corre en un hilo nativo y toma también sus pilas.
+"""
+
+import gc
+import importlib
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+import config
+import logger
+
+try:
+    import greenlet
+    from gevent import monkey as gevent_monkey
+except ImportError:  # gevent es opcional: solo lo usa gunicorn
+    greenlet = gevent_monkey = None
+
+# Resultados recientes que devuelve status()
+HISTORY_LIMIT = 20
+
+# Segundos entre búsquedas de greenlets nuevos con gevent
+GREENLET_RESCAN_INTERVAL = 1.0
+
+# Asignaciones del propio tracemalloc y del sistema de imports que no interesan
+_MEMORY_NOISE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+
+def _original(module: str, name: str):
+    """
+    Función de la biblioteca estándar sin el reemplazo de gevent.
+
+    Args:
+        module (str): Módulo (por ejemplo '_thread')
+        name (str): Atributo
+
+    Returns:
+        La función original
+    """
+    if gevent_monkey is not None:
+        return gevent_monkey.get_original(module, name)
+    return getattr(importlib.import_module(module), name)
+
+
+def gevent_active() -> bool:
+    """
+    Indica si gevent reemplazó threading en este proceso.
+
+    Returns:
+        bool: True si los hilos son greenlets
+    """
+    return gevent_monkey is not None and gevent_monkey.is_module_patched('threading')
+
+
+class ProfilingError(RuntimeError):
+    """
+    Pedido de perfilado incompatible con el estado actual (por ejemplo, ya hay uno en curso).
+    """
+
+
+class StackSampler:
+    """
+    Muestrea periódicamente las pilas de los hilos del proceso.
+
+    No usa hooks de profile: el costo es solo el del hilo de muestreo
+    mientras está activo, y no depende de lo que hagan los demás hilos. El
+    hilo de muestreo es nativo aunque gevent haya reemplazado threading: un
+    greenlet no correría mientras la campaña ocupa el loop, y
+    sys._current_frames() no ve los greenlets, así que con gevent sus pilas
+    se leen de gr_frame y se identifican como threading.get_ident() dentro
+    de cada uno.
+    """
+
+    def __init__(self, interval: float = config.PROFILE_SAMPLE_INTERVAL,
+                 thread_ids: Optional[Set[int]] = None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._running = False
+        self._done = None
+        self._greenlets: weakref.WeakSet = weakref.WeakSet()
+        self._rescan_at = 0.0
+
+    def start(self):
+        self._running = True
+        self._done = _original('_thread', 'allocate_lock')()
+        self._done.acquire()
+        _original('_thread', 'start_new_thread')(self._loop, ())
+
+    def stop(self):
+        self._running = False
+        if self._done is not None:
+            with self._done:
+                pass
+
+    def _loop(self):
+        sleep = _original('time', 'sleep')
+        own = _original('_thread', 'get_ident')()
+        try:
+            while True:
+                sleep(self.interval)
+                if not self._running:
+                    break
+                self._sample(own)
+                self.sample_count += 1
+        finally:
+            self._done.release()
+
+    def _sample(self, own: int):
+        # Copia sin el lock de threading: con gevent es un lock de greenlets
+        names = {ident: thread.name for ident, thread in dict(threading._active).items()}
+        frames = sys._current_frames()
+        if gevent_active():
+            frames.update(self._greenlet_frames(frames))
+        for ident, frame in frames.items():
+            if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                continue
+            self.samples[self._collapse(names.get(ident, str(ident)), frame)] += 1
+
+    def _greenlet_frames(self, thread_frames: Dict[int, Any]) -> Dict[int, Any]:
+        """
+        Pilas de los greenlets vivos, por id del greenlet.
+
+        El greenlet que está corriendo no tiene gr_frame: su pila es la del
+        hilo de su hub, que se quita de thread_frames para no contarla dos veces.
+        """
+        now = time.monotonic()
+        if now >= self._rescan_at:
+            self._rescan_at = now + GREENLET_RESCAN_INTERVAL
+            self._greenlets = weakref.WeakSet(
+                obj for obj in gc.get_objects() if isinstance(obj, greenlet.greenlet)
+                and (self.thread_ids is None or id(obj) in self.thread_ids))
+
+        frames = {}
+        for glet in list(self._greenlets):
+            frame = glet.gr_frame
+            if frame is None and glet:
+                hub = glet
+                while hub is not None and not hasattr(hub, 'thread_ident'):
+                    hub = hub.parent
+                frame = thread_frames.pop(hub.thread_ident, None) if hub is not None else None
+            if frame is not None:
+                frames[id(glet)] = frame
+        return frames
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.append(thread_name)
+        return ';'.join(reversed(stack))
+
+    def write(self, path: Path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Sesiones de perfilado del proceso: una de muestreo y una de cProfile a
+    la vez, y el trazado de memoria con tracemalloc.
+    """
+
+    def __init__(self, output_dir: Optional[Path] = None):
+        self._output_dir = output_dir
+        self._lock = threading.Lock()
+        self._sampling: Optional[Dict[str, Any]] = None
+        self._call: Optional[Dict[str, Any]] = None
+        self._memory_baseline: Optional[tracemalloc.Snapshot] = None
+        self.history: deque = deque(maxlen=HISTORY_LIMIT)
+
+    @property
+    def output_dir(self) -> Path:
+        return Path(self._output_dir or config.LOGS_DIR)
+
+    def _output_path(self, prefix: str, label: str, suffix: str) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+        return self.output_dir / f"{prefix}-{safe_label}-{stamp}.{suffix}"
+
+    def _finish(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        self.history.append(result)
+        logger.log_info(f"Perfil guardado en {result['path']}")
+        return result
+
+    # Muestreo de pilas
+
+    def start_sampling(self, seconds: float, label: str = 'process',
+                       thread_ids: Optional[Set[int]] = None,
+                       interval: float = config.PROFILE_SAMPLE_INTERVAL) -> Dict[str, Any]:
+        """
+        Empieza a muestrear las pilas durante unos segundos; al terminar se guarda el resultado.
+
+        Args:
+            seconds (float): Duración (como máximo config.PROFILE_MAX_SECONDS)
+            label (str): Etiqueta para el nombre del archivo
+            thread_ids (Optional[Set[int]]): Hilos a muestrear (None para todos)
+            interval (float): Segundos entre muestras
+
+        Returns:
+            Dict[str, Any]: Datos de la sesión iniciada
+
+        Raises:
+            ProfilingError: Si ya hay un muestreo en curso
+        """
+        seconds = min(max(seconds, interval), config.PROFILE_MAX_SECONDS)
+        with self._lock:
+            if self._sampling is not None:
+                raise ProfilingError("Ya hay un perfil en curso")
+            sampler = StackSampler(interval, thread_ids)
+            timer = threading.Timer(seconds, self.stop_sampling)
+            timer.daemon = True
+            session = {'label': label, 'started_at': time.time(), 'seconds': seconds,
+                       'sampler': sampler, 'timer': timer}
+            self._sampling = session
+            sampler.start()
+            timer.start()
+        logger.log_info(f"Perfilando '{label}' durante {seconds:g}s")
+        return self._sampling_info(session)
+
+    def stop_sampling(self) -> Optional[Dict[str, Any]]:
+        """
+        Termina el muestreo en curso y guarda las pilas colapsadas.
+
+        Returns:
+            Optional[Dict[str, Any]]: Resultado (ruta y cantidad de muestras), o None si no había muestreo
+        """
+        with self._lock:
+            session, self._sampling = self._sampling, None
+        if session is None:
+            return None
+        session['timer'].cancel()
+        sampler = session['sampler']
+        sampler.stop()
+        path = self._output_path('profile', session['label'], 'folded')
+        sampler.write(path)
+        return self._finish({
+            'kind': 'sampling',
+            'label': session['label'],
+            'path': str(path),
+            'samples': sampler.sample_count,
+            'started_at': session['started_at'],
+            'finished_at': time.time()
+        })
+
+    @staticmethod
+    def _sampling_info(session: Dict[str, Any]) -> Dict[str, Any]:
+        return {'label': session['label'], 'started_at': session['started_at'],
+                'ends_at': session['started_at'] + session['seconds']}
+
+    # cProfile
+
+    def start_call(self, label: str):
+        """
+        Activa cProfile en el hilo actual (por ejemplo, durante un request).
+
+        Args:
+            label (str): Etiqueta para el nombre del archivo
+
+        Raises:
+            ProfilingError: Si ya hay un cProfile en curso
+        """
+        import cProfile
+
+        with self._lock:
+            if self._call is not None:
+                raise ProfilingError("Ya hay un perfil de cProfile en curso")
+            profile = cProfile.Profile()
+            self._call = {'label': label, 'started_at': time.time(), 'profile': profile}
+        profile.enable()
+
+    def stop_call(self) -> Optional[Dict[str, Any]]:
+        """
+        Desactiva cProfile y guarda las estadísticas.
+
+        Returns:
+            Optional[Dict[str, Any]]: Resultado con la ruta del .pstats, o None si no había perfil
+        """
+        with self._lock:
+            session, self._call = self._call, None
+        if session is None:
+            return None
+        session['profile'].disable()
+        path = self._output_path('profile', session['label'], 'pstats')
+        session['profile'].dump_stats(str(path))
+        return self._finish({
+            'kind': 'cprofile',
+            'label': session['label'],
+            'path': str(path),
+            'started_at': session['started_at'],
+            'finished_at': time.time()
+        })
+
+    # Memoria
+
+    def start_memory(self, frames: int = config.TRACEMALLOC_FRAMES):
+        """
+        Activa tracemalloc (si no estaba activo) y toma la línea base.
+
+        Args:
+            frames (int): Marcos guardados por asignación
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._memory_baseline = tracemalloc.take_snapshot().filter_traces(_MEMORY_NOISE)
+        logger.log_info("Trazado de memoria activado")
+
+    def memory_snapshot(self, label: str = 'process', scope: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Toma un snapshot de tracemalloc y guarda el reporte de asignaciones y crecimiento.
+
+        Args:
+            label (str): Etiqueta para el nombre del archivo
+            scope (Optional[str]): Módulo (por ejemplo 'data_manager') para contar solo
+                las asignaciones hechas desde él, directa o indirectamente
+
+        Returns:
+            Dict[str, Any]: Ruta del reporte, memoria trazada y las mayores líneas
+
+        Raises:
+            ProfilingError: Si tracemalloc no está activo
+        """
+        if not tracemalloc.is_tracing():
+            raise ProfilingError("El trazado de memoria no está activo")
+
+        filters = list(_MEMORY_NOISE)
+        if scope:
+            filters.append(tracemalloc.Filter(True, f"*{scope}.py", all_frames=True))
+        snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+        top = snapshot.statistics('lineno')[:config.MEMORY_REPORT_TOP]
+        growth = []
+        if self._memory_baseline is not None:
+            baseline = self._memory_baseline.filter_traces(filters)
+            growth = [stat for stat in snapshot.compare_to(baseline, 'lineno') if stat.size_diff > 0]
+            growth = growth[:config.MEMORY_REPORT_TOP]
+        current, peak = tracemalloc.get_traced_memory()
+
+        path = self._output_path('memory', f"{label}-{scope}" if scope else label, 'txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Memoria trazada: {current / 1024 / 1024:.1f} MB (pico {peak / 1024 / 1024:.1f} MB)\n")
+            if scope:
+                f.write(f"Solo asignaciones desde {scope}.py: {sum(stat.size for stat in top) / 1024:.1f} KB "
+                        f"en las {len(top)} mayores líneas\n")
+            f.write("\nMayores asignaciones:\n")
+            f.writelines(f"{stat}\n" for stat in top)
+            f.write("\nCrecimiento desde la línea base:\n")
+            f.writelines(f"{stat}\n" for stat in growth)
+
+        return self._finish({
+            'kind': 'memory',
+            'label': label,
+            'scope': scope,
+            'path': str(path),
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top': [_stat_dict(stat) for stat in top[:10]],
+            'growth': [_stat_dict(stat) for stat in growth[:10]],
+            'finished_at': time.time()
+        })
+
+    def stop_memory(self):
+        """
+        Desactiva tracemalloc y descarta la línea base.
+        """
+        self._memory_baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.log_info("Trazado de memoria desactivado")
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Sesiones activas y resultados recientes.
+
+        Returns:
+            Dict[str, Any]: Muestreo en curso, cProfile en curso, trazado de memoria y resultados
+        """
+        with self._lock:
+            sampling = self._sampling_info(self._sampling) if self._sampling else None
+            call = {'label': self._call['label'], 'started_at': self._call['started_at']} if self._call else None
+        return {
+            'sampling': sampling,
+            'cprofile': call,
+            'memory_tracing': tracemalloc.is_tracing(),
+            'results': list(self.history)
+        }
+
+
+def _stat_dict(stat) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    data = {'location': f"{frame.filename}:{frame.lineno}", 'size_bytes': stat.size, 'count': stat.count}
+    if hasattr(stat, 'size_diff'):
+        data['size_diff_bytes'] = stat.size_diff
+    return data
+
+
+# Perfilador del proceso
+profiler = Profiler()
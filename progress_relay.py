@@ -0,0 +1,137 @@
+"""
+Reenvío del progreso de las campañas a los clientes con emisiones agrupadas
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Any, Optional
+import config
+import logger
+
+
+# Eventos de los que solo interesa el último valor
+COALESCED_EVENTS = ('progress', 'countdown', 'pacing')
+
+
+class _PendingBatch:
+    """
+    Eventos de una campaña acumulados desde la última emisión.
+    """
+
+    def __init__(self, max_results: int):
+        self.latest: Dict[str, Dict[str, Any]] = {}
+        self.results = deque(maxlen=max_results)
+        self.notices = deque(maxlen=max_results)
+        self.dropped_results = 0
+
+    def to_payload(self, job_id: str) -> Dict[str, Any]:
+        payload = {
+            'job_id': job_id,
+            'results': list(self.results),
+            'events': list(self.notices),
+            'dropped_results': self.dropped_results
+        }
+        for event in COALESCED_EVENTS:
+            payload[event] = self.latest.get(event)
+        return payload
+
+
+class ProgressRelay:
+    """
+    Agrupa los eventos de cada campaña y los emite a su sala de Socket.IO
+    como máximo max_emits_per_second veces por segundo.
+
+    publish() solo guarda el evento en memoria y despierta al hilo emisor,
+    así que un cliente lento nunca frena al hilo que envía los mensajes.
+    """
+
+    def __init__(self, emit: Callable[[str, Dict[str, Any], str], None],
+                 max_emits_per_second: float = config.PROGRESS_MAX_EMITS_PER_SECOND,
+                 max_results: int = config.PROGRESS_MAX_BATCH_RESULTS,
+                 event_name: str = 'job_progress'):
+        self._emit = emit
+        self.min_interval = 1.0 / max(0.1, max_emits_per_second)
+        self.max_results = max(1, max_results)
+        self.event_name = event_name
+        self._pending: Dict[str, _PendingBatch] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.emits = 0
+
+    def publish(self, job_id: str, event: str, data: Dict[str, Any]):
+        """
+        Registra un evento de una campaña para la próxima emisión.
+
+        Args:
+            job_id (str): ID de la campaña (y de su sala)
+            event (str): Nombre del evento
+            data (Dict[str, Any]): Datos del evento
+        """
+        with self._lock:
+            batch = self._pending.get(job_id)
+            if batch is None:
+                batch = self._pending[job_id] = _PendingBatch(self.max_results)
+
+            if event in COALESCED_EVENTS:
+                batch.latest[event] = data
+            elif event == 'contact_result':
+                if len(batch.results) == batch.results.maxlen:
+                    batch.dropped_results += 1
+                batch.results.append(data)
+            else:
+                batch.notices.append({'event': event, 'data': data})
+
+        self._ensure_started()
+        self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Emite los lotes pendientes de todas las campañas.
+
+        Returns:
+            int: Cantidad de emisiones realizadas
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for job_id, batch in pending.items():
+            try:
+                self._emit(self.event_name, batch.to_payload(job_id), job_id)
+                self.emits += 1
+            except Exception as e:
+                logger.log_error(f"Error emitiendo el progreso de la campaña {job_id}", e)
+        return len(pending)
+
+    def stop(self):
+        """
+        Detiene el hilo emisor tras emitir lo pendiente.
+        """
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stopped:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='progress-relay', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        """
+        Espera eventos y los emite respetando el intervalo mínimo.
+        """
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            started = time.monotonic()
+            self.flush()
+            if self._stopped:
+                return
+            # Lo que llegue durante el intervalo se agrupa en la próxima emisión
+            time.sleep(max(0.0, self.min_interval - (time.monotonic() - started)))
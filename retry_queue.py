@@ -0,0 +1,110 @@
+"""
+Cola de reintentos diferidos para envíos con fallos transitorios
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+import config
+
+
+@dataclass
+class RetryItem:
+    """
+    Contacto pendiente de reintento.
+    """
+    contact: Dict
+    position: int
+    attempts: int
+    failure: str
+    ready_at: float
+
+
+class RetryQueue:
+    """
+    Cola FIFO de contactos a reintentar.
+
+    Cada contacto se reintenta como máximo max_attempts veces y nunca antes
+    de min_wait segundos desde su último fallo.
+    """
+
+    def __init__(self, max_attempts: int = config.MAX_RETRY_ATTEMPTS,
+                 min_wait: float = config.RETRY_MIN_WAIT, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.min_wait = min_wait
+        self._clock = clock
+        self._items = deque()
+        self._attempts: Dict[str, int] = {}
+
+    def push(self, contact: Dict, position: int, failure: str) -> bool:
+        """
+        Encola un contacto para reintentarlo más tarde.
+
+        Args:
+            contact (Dict): Datos del contacto
+            position (int): Posición del contacto en la campaña
+            failure (str): Tipo de fallo que originó el reintento
+
+        Returns:
+            bool: False si el contacto ya agotó sus reintentos
+        """
+        key = contact.get('telefono', '')
+        attempts = self._attempts.get(key, 0)
+        if attempts >= self.max_attempts:
+            return False
+
+        self._attempts[key] = attempts + 1
+        self._items.append(RetryItem(
+            contact=contact,
+            position=position,
+            attempts=attempts + 1,
+            failure=str(failure),
+            ready_at=self._clock() + self.min_wait
+        ))
+        return True
+
+    def push_front(self, item: RetryItem):
+        """
+        Devuelve un reintento no procesado al frente de la cola.
+
+        Args:
+            item (RetryItem): Reintento a devolver
+        """
+        self._items.appendleft(item)
+
+    def peek(self) -> Optional[RetryItem]:
+        """
+        Obtiene el próximo reintento sin quitarlo de la cola.
+
+        Returns:
+            Optional[RetryItem]: Próximo reintento o None si la cola está vacía
+        """
+        return self._items[0] if self._items else None
+
+    def pop_ready(self, at: Optional[float] = None) -> Optional[RetryItem]:
+        """
+        Quita el próximo reintento si ya está listo.
+
+        Args:
+            at (Optional[float]): Instante de referencia (por defecto, ahora)
+
+        Returns:
+            Optional[RetryItem]: Reintento listo o None
+        """
+        at = self._clock() if at is None else at
+        if self._items and self._items[0].ready_at <= at:
+            return self._items.popleft()
+        return None
+
+    def pop(self) -> Optional[RetryItem]:
+        """
+        Quita el próximo reintento aunque todavía no esté listo.
+
+        Returns:
+            Optional[RetryItem]: Próximo reintento o None
+        """
+        return self._items.popleft() if self._items else None
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,134 @@
+"""
+Planificador de envíos con esperas cancelables y pausables
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class SendScheduler:
+    """
+    Calcula el instante de envío de cada contacto y espera hasta él sin
+    bloquear la detención: stop(), pause() y resume() despiertan al hilo
+    que espera de inmediato.
+    """
+
+    def __init__(self, tick_interval: float = 1.0, clock=time.monotonic):
+        self.tick_interval = tick_interval
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._paused = False
+        self.next_deadline: Optional[float] = None
+
+    def reset(self):
+        """
+        Restablece el estado para una nueva sesión de envío.
+        """
+        with self._condition:
+            self._stopped = False
+            self._paused = False
+            self.next_deadline = None
+
+    def stop(self):
+        """
+        Detiene el planificador y despierta cualquier espera en curso.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def pause(self):
+        """
+        Pausa el envío: las esperas se suspenden hasta resume() o stop().
+        """
+        with self._condition:
+            self._paused = True
+            self._condition.notify_all()
+
+    def resume(self):
+        """
+        Reanuda el envío tras una pausa.
+        """
+        with self._condition:
+            self._paused = False
+            self._condition.notify_all()
+
+    @property
+    def is_stopped(self) -> bool:
+        return self._stopped
+
+    @property
+    def is_paused(self) -> bool:
+        return self._paused
+
+    def schedule_after(self, delay: float) -> float:
+        """
+        Fija el próximo instante de envío a `delay` segundos desde ahora.
+
+        Args:
+            delay (float): Segundos hasta el próximo envío
+
+        Returns:
+            float: Instante (reloj monotónico) del próximo envío
+        """
+        self.next_deadline = self._clock() + max(0.0, delay)
+        return self.next_deadline
+
+    def wait_if_paused(self) -> bool:
+        """
+        Bloquea mientras el envío esté pausado.
+
+        Returns:
+            bool: False si el planificador fue detenido
+        """
+        with self._condition:
+            while self._paused and not self._stopped:
+                self._condition.wait()
+            return not self._stopped
+
+    def wait_until(self, deadline: float,
+                   on_tick: Optional[Callable[[float], None]] = None) -> bool:
+        """
+        Espera hasta el instante indicado.
+
+        El tiempo en pausa no cuenta: al reanudar se respeta el tiempo de
+        espera que faltaba. on_tick recibe los segundos restantes como
+        máximo una vez por tick_interval.
+
+        Args:
+            deadline (float): Instante (reloj monotónico) a esperar
+            on_tick (Optional[Callable[[float], None]]): Notificación de cuenta regresiva
+
+        Returns:
+            bool: True si se alcanzó el instante, False si se detuvo antes
+        """
+        with self._condition:
+            while not self._stopped:
+                if self._paused:
+                    paused_at = self._clock()
+                    while self._paused and not self._stopped:
+                        self._condition.wait()
+                    deadline += self._clock() - paused_at
+                    self.next_deadline = deadline
+                    continue
+
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return True
+
+                if on_tick:
+                    # Notificar fuera del lock para no bloquear stop()/pause()
+                    self._condition.release()
+                    try:
+                        on_tick(remaining)
+                    finally:
+                        self._condition.acquire()
+                    remaining = deadline - self._clock()
+                    if remaining <= 0 or self._stopped or self._paused:
+                        continue
+
+                self._condition.wait(min(remaining, self.tick_interval))
+
+            return False
@@ -0,0 +1,429 @@
+"""
+Estado compartido entre procesos (workers de gunicorn) sobre SQLite
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from socketio import PubSubManager
+
+import config
+import logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    state TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, pid INTEGER, heartbeat_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS commands (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (worker_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commands_target ON commands (target, seq);
+CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, seq);
+"""
+
+TERMINAL_STATES = ('done', 'failed', 'cancelled')
+# Marcadores para usar TERMINAL_STATES como parámetros en un IN (...)
+_TERMINAL_PLACEHOLDERS = ','.join('?' * len(TERMINAL_STATES))
+
+
+class SharedStateStore:
+    """
+    Base SQLite (modo WAL) que comparten los procesos del backend.
+
+    Guarda el estado de las campañas de todos los workers, los latidos de
+    cada worker, los leases de recursos exclusivos (el navegador), los
+    comandos dirigidos a un worker, las métricas de cada worker y la cola
+    de mensajes de Socket.IO.
+    Cada hilo usa su propia conexión.
+    """
+
+    def __init__(self, path: Union[str, Path] = None):
+        self.path = Path(path or config.SHARED_STATE_DB)
+        self._local = threading.local()
+        self._publishes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE toma el lock de escritura al empezar: no hay carreras entre procesos
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # Campañas
+
+    def save_job(self, job: Dict[str, Any], owner: str):
+        """
+        Guarda el estado de una campaña.
+
+        Una campaña terminada no vuelve a un estado activo: así una copia
+        tomada por el ciclo de coordinación antes de que termine no pisa el
+        estado final.
+
+        Args:
+            job (Dict[str, Any]): Campaña serializada (Job.to_dict())
+            owner (str): Worker que la ejecuta
+        """
+        data = json.dumps(dict(job, owner=owner), ensure_ascii=False, default=str)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, owner, state, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, state = excluded.state, "
+                "data = excluded.data, updated_at = excluded.updated_at "
+                f"WHERE jobs.state NOT IN ({_TERMINAL_PLACEHOLDERS}) "
+                f"OR excluded.state IN ({_TERMINAL_PLACEHOLDERS})",
+                (job['id'], owner, job['state'], data, job.get('created_at') or time.time(), time.time(),
+                 *TERMINAL_STATES, *TERMINAL_STATES)
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene una campaña de cualquier worker.
+
+        Args:
+            job_id (str): ID de la campaña
+
+        Returns:
+            Optional[Dict[str, Any]]: Campaña serializada, con su 'owner', o None
+        """
+        row = self._connect().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_jobs(self, limit: int = config.JOB_HISTORY_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Lista las campañas de todos los workers, de la más antigua a la más reciente.
+
+        Args:
+            limit (int): Cantidad máxima (las más recientes)
+
+        Returns:
+            List[Dict[str, Any]]: Campañas serializadas
+        """
+        rows = self._connect().execute(
+            "SELECT data FROM (SELECT data, created_at FROM jobs ORDER BY created_at DESC LIMIT ?) "
+            "ORDER BY created_at", (limit,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def prune_jobs(self, keep: int = config.JOB_HISTORY_LIMIT):
+        """
+        Borra las campañas terminadas más antiguas por encima de keep.
+
+        Args:
+            keep (int): Campañas terminadas a conservar
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                f"DELETE FROM jobs WHERE state IN ({_TERMINAL_PLACEHOLDERS}) AND id NOT IN "
+                f"(SELECT id FROM jobs WHERE state IN ({_TERMINAL_PLACEHOLDERS}) ORDER BY created_at DESC LIMIT ?)",
+                (*TERMINAL_STATES, *TERMINAL_STATES, keep)
+            )
+
+    def fail_orphaned_jobs(self, live_workers: Set[str]) -> int:
+        """
+        Marca como fallidas las campañas activas de workers que dejaron de latir.
+
+        Args:
+            live_workers (Set[str]): Workers vivos
+
+        Returns:
+            int: Campañas marcadas
+        """
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"SELECT id, owner, data FROM jobs WHERE state NOT IN ({_TERMINAL_PLACEHOLDERS})",
+                TERMINAL_STATES
+            ).fetchall()
+            orphaned = [(job_id, data) for job_id, owner, data in rows if owner not in live_workers]
+            for job_id, data in orphaned:
+                job = json.loads(data)
+                job.update(state='failed', error='El worker que ejecutaba la campaña se detuvo',
+                           finished_at=time.time())
+                conn.execute("UPDATE jobs SET state = 'failed', data = ?, updated_at = ? WHERE id = ?",
+                             (json.dumps(job, ensure_ascii=False), time.time(), job_id))
+        return len(orphaned)
+
+    def active_job_ids(self, owners: Set[str]) -> Set[str]:
+        """
+        Obtiene las campañas sin terminar de algunos workers.
+
+        Args:
+            owners (Set[str]): Workers
+
+        Returns:
+            Set[str]: IDs de las campañas
+        """
+        rows = self._connect().execute(
+            f"SELECT id, owner FROM jobs WHERE state NOT IN ({_TERMINAL_PLACEHOLDERS})", TERMINAL_STATES
+        ).fetchall()
+        return {job_id for job_id, owner in rows if owner in owners}
+
+    # Workers y leases
+
+    def heartbeat(self, worker_id: str):
+        """
+        Registra que un worker sigue vivo.
+
+        Args:
+            worker_id (str): ID del worker
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO workers (id, pid, heartbeat_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (worker_id, os.getpid(), time.time())
+            )
+
+    def live_workers(self, timeout: float = config.WORKER_TIMEOUT) -> Set[str]:
+        """
+        Obtiene los workers que latieron recientemente.
+
+        Args:
+            timeout (float): Segundos sin latir tras los que un worker se considera caído
+
+        Returns:
+            Set[str]: IDs de los workers vivos
+        """
+        rows = self._connect().execute(
+            "SELECT id FROM workers WHERE heartbeat_at >= ?", (time.time() - timeout,)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def remove_worker(self, worker_id: str):
+        """
+        Da de baja un worker y libera sus leases.
+
+        Args:
+            worker_id (str): ID del worker
+        """
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+            conn.execute("DELETE FROM leases WHERE owner = ?", (worker_id,))
+            conn.execute("DELETE FROM metrics WHERE worker_id = ?", (worker_id,))
+
+    def acquire_lease(self, name: str, owner: str, ttl: float = config.WORKER_TIMEOUT) -> bool:
+        """
+        Toma (o renueva) un recurso exclusivo por ttl segundos.
+
+        Args:
+            name (str): Nombre del recurso
+            owner (str): Worker que lo pide
+            ttl (float): Duración del lease
+
+        Returns:
+            bool: True si el worker tiene el lease
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at",
+                (name, owner, now + ttl)
+            )
+        return True
+
+    def lease_owner(self, name: str) -> Optional[str]:
+        """
+        Obtiene el worker que tiene un recurso.
+
+        Args:
+            name (str): Nombre del recurso
+
+        Returns:
+            Optional[str]: Worker dueño, o None si el recurso está libre
+        """
+        row = self._connect().execute(
+            "SELECT owner FROM leases WHERE name = ? AND expires_at > ?", (name, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def release_lease(self, name: str, owner: str):
+        """
+        Libera un recurso si lo tiene el worker indicado.
+
+        Args:
+            name (str): Nombre del recurso
+            owner (str): Worker que lo libera
+        """
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    # Comandos entre workers
+
+    def send_command(self, target: str, command: Dict[str, Any]):
+        """
+        Encola un comando para otro worker.
+
+        Args:
+            target (str): Worker destino
+            command (Dict[str, Any]): Comando serializable a JSON
+        """
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO commands (target, payload, created_at) VALUES (?, ?, ?)",
+                         (target, json.dumps(command, ensure_ascii=False), time.time()))
+
+    def take_commands(self, target: str) -> List[Dict[str, Any]]:
+        """
+        Retira los comandos pendientes de un worker.
+
+        Args:
+            target (str): Worker destino
+
+        Returns:
+            List[Dict[str, Any]]: Comandos en orden de llegada
+        """
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT seq, payload FROM commands WHERE target = ? ORDER BY seq",
+                                (target,)).fetchall()
+            if rows:
+                conn.execute("DELETE FROM commands WHERE target = ? AND seq <= ?", (target, rows[-1][0]))
+        return [json.loads(payload) for _, payload in rows]
+
+    # Métricas
+
+    def save_metrics(self, worker_id: str, snapshot: Dict[str, Any]):
+        """
+        Guarda las métricas de un worker (reemplaza las anteriores).
+
+        Args:
+            worker_id (str): ID del worker
+            snapshot (Dict[str, Any]): Métricas (metrics.process_snapshot())
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO metrics (worker_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (worker_id, json.dumps(snapshot), time.time())
+            )
+
+    def load_metrics(self, workers: Set[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene las últimas métricas guardadas de los workers indicados.
+
+        Args:
+            workers (Set[str]): IDs de los workers (por ejemplo, los vivos)
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Métricas por worker
+        """
+        rows = self._connect().execute("SELECT worker_id, data FROM metrics").fetchall()
+        return {worker_id: json.loads(data) for worker_id, data in rows if worker_id in workers}
+
+    # Cola de mensajes
+
+    def publish(self, channel: str, payload: bytes) -> int:
+        """
+        Publica un mensaje en un canal.
+
+        Args:
+            channel (str): Canal
+            payload (bytes): Mensaje
+
+        Returns:
+            int: Número de secuencia del mensaje
+        """
+        with self._transaction() as conn:
+            seq = conn.execute("INSERT INTO messages (channel, payload, created_at) VALUES (?, ?, ?)",
+                               (channel, payload, time.time())).lastrowid
+            self._publishes += 1
+            if self._publishes % 100 == 0:
+                conn.execute("DELETE FROM messages WHERE created_at < ?",
+                             (time.time() - config.MESSAGE_QUEUE_RETENTION,))
+        return seq
+
+    def messages_since(self, channel: str, seq: int) -> List[Tuple[int, bytes]]:
+        """
+        Obtiene los mensajes de un canal posteriores a una secuencia.
+
+        Args:
+            channel (str): Canal
+            seq (int): Último mensaje ya leído
+
+        Returns:
+            List[Tuple[int, bytes]]: Secuencia y contenido de cada mensaje
+        """
+        return self._connect().execute(
+            "SELECT seq, payload FROM messages WHERE channel = ? AND seq > ? ORDER BY seq", (channel, seq)
+        ).fetchall()
+
+    def last_message_seq(self, channel: str) -> int:
+        row = self._connect().execute("SELECT MAX(seq) FROM messages WHERE channel = ?", (channel,)).fetchone()
+        return row[0] or 0
+
+
+class SQLitePubSubManager(PubSubManager):
+    """
+    Cola de mensajes de Socket.IO sobre SharedStateStore.
+
+    Cada emit se guarda en la base y todos los workers lo leen y lo
+    entregan a sus propios clientes, así un evento llega a un cliente
+    conectado a cualquier worker. Reemplaza a Redis cuando todos los
+    workers corren en la misma máquina.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, store: SharedStateStore, channel: str = 'socketio',
+                 poll_interval: float = config.MESSAGE_QUEUE_POLL_INTERVAL, write_only: bool = False):
+        super().__init__(channel=channel, write_only=write_only)
+        self.store = store
+        self.poll_interval = poll_interval
+
+    def _publish(self, data):
+        self.store.publish(self.channel, pickle.dumps(data))
+
+    def _listen(self):
+        # Solo se entregan los mensajes publicados después de arrancar
+        seq = self.store.last_message_seq(self.channel)
+        while True:
+            try:
+                messages = self.store.messages_since(self.channel, seq)
+            except sqlite3.Error as e:
+                logger.log_error("Error leyendo la cola de mensajes de Socket.IO", e)
+                messages = []
+            for seq, payload in messages:
+                yield payload
+            self.server.sleep(self.poll_interval)
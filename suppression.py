@@ -0,0 +1,85 @@
+"""
+Lista de supresión de números con fallos permanentes
+"""
+
+import csv
+import threading
+from pathlib import Path
+from typing import Optional, Set, Union
+import config
+import logger
+import utils
+
+
+class SuppressionList:
+    """
+    Registro persistente (CSV) de teléfonos a los que no se debe volver a
+    enviar, por ejemplo números no registrados en WhatsApp.
+    """
+
+    def __init__(self, file_path: Union[str, Path] = None):
+        self.file_path = Path(file_path or config.SUPPRESSION_FILE)
+        self._numbers: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Set[str]:
+        """
+        Carga los números suprimidos desde el CSV (una sola vez).
+
+        Returns:
+            Set[str]: Teléfonos suprimidos
+        """
+        if self._numbers is None:
+            numbers = set()
+            try:
+                with open(self.file_path, 'r', newline='', encoding='utf-8') as csvfile:
+                    for row in csv.DictReader(csvfile):
+                        if row.get('telefono'):
+                            numbers.add(row['telefono'])
+            except FileNotFoundError:
+                pass
+            self._numbers = numbers
+        return self._numbers
+
+    def contains(self, telefono: str) -> bool:
+        """
+        Verifica si un teléfono está suprimido.
+
+        Args:
+            telefono (str): Teléfono formateado
+
+        Returns:
+            bool: True si no se debe enviar a este número
+        """
+        with self._lock:
+            return telefono in self._load()
+
+    def add(self, telefono: str, motivo: str, nombre: str = ""):
+        """
+        Agrega un teléfono a la lista de supresión.
+
+        Args:
+            telefono (str): Teléfono formateado
+            motivo (str): Motivo de la supresión
+            nombre (str): Nombre del contacto
+        """
+        with self._lock:
+            numbers = self._load()
+            if telefono in numbers:
+                return
+            numbers.add(telefono)
+
+            try:
+                utils.ensure_directory_exists(self.file_path.parent)
+                is_new = not self.file_path.exists()
+                with open(self.file_path, 'a', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.writer(csvfile)
+                    if is_new:
+                        writer.writerow(['telefono', 'nombre', 'motivo', 'timestamp'])
+                    writer.writerow([telefono, nombre, motivo, utils.get_timestamp()])
+            except Exception as e:
+                logger.log_error("Error al escribir la lista de supresión", e)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
@@ -0,0 +1,287 @@
+"""
+Pool de procesos para parsear, validar y exportar archivos de contactos fuera del proceso web
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+import instrumentation
+import logger
+from contact_index import ContactIndex
+from data_manager import DataManager
+
+
+class TaskPoolBusyError(RuntimeError):
+    """
+    El pool tiene todos sus procesos ocupados y la cola llena.
+    """
+
+
+class TaskTimeoutError(RuntimeError):
+    """
+    La tarea no terminó en el tiempo máximo.
+    """
+
+
+class TaskPool:
+    """
+    Ejecuta tareas de CPU (pandas, openpyxl) en un ProcessPoolExecutor.
+
+    Mientras un handler espera el resultado, el parseo corre en otro proceso
+    y no toma el GIL ni bloquea el loop de gevent: el resto de las peticiones
+    y los latidos de Socket.IO se siguen atendiendo.
+
+    La cola está acotada: con max_workers tareas en ejecución y max_pending
+    esperando, submit() falla enseguida con TaskPoolBusyError en lugar de
+    acumular peticiones. Una tarea que supera el timeout sigue ocupando su
+    proceso (y su lugar en la cola) hasta terminar; solo se deja de esperar.
+
+    Con max_workers=0 las tareas corren en el hilo que las pide.
+    """
+
+    def __init__(self, max_workers: int = config.TASK_POOL_WORKERS,
+                 max_pending: int = config.TASK_POOL_MAX_PENDING,
+                 timeout: float = config.TASK_TIMEOUT,
+                 start_method: str = config.TASK_POOL_START_METHOD):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'timeouts': 0
+        }
+
+    @property
+    def capacity(self) -> int:
+        return max(1, self.max_workers) + self.max_pending
+
+    def run(self, function: Callable, *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Ejecuta una tarea y espera su resultado.
+
+        Args:
+            function (Callable): Función de nivel de módulo (se envía por pickle)
+            *args (Any): Argumentos de la función
+            timeout (Optional[float]): Segundos máximos de espera (por defecto self.timeout)
+
+        Returns:
+            Any: Resultado de la función
+
+        Raises:
+            TaskPoolBusyError: Si la cola está llena
+            TaskTimeoutError: Si la tarea no terminó a tiempo
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(function, *args)
+        try:
+            # Las mediciones de los procesos del pool se pierden: se mide la espera completa
+            with instrumentation.timer(f"task:{function.__name__}"):
+                return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._count('timeouts')
+            raise TaskTimeoutError(f"La tarea {function.__name__} no terminó en {timeout}s") from None
+
+    def submit(self, function: Callable, *args: Any) -> Future:
+        """
+        Encola una tarea sin esperar su resultado.
+
+        Args:
+            function (Callable): Función de nivel de módulo (se envía por pickle)
+            *args (Any): Argumentos de la función
+
+        Returns:
+            Future: Resultado futuro de la tarea
+
+        Raises:
+            TaskPoolBusyError: Si la cola está llena
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats['rejected'] += 1
+                raise TaskPoolBusyError("Hay demasiados archivos procesándose, reintentá en unos segundos")
+            self._in_flight += 1
+            self._stats['submitted'] += 1
+
+        try:
+            if self.max_workers <= 0:
+                future = Future()
+                try:
+                    future.set_result(function(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                future = self._get_executor().submit(function, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+
+        future.add_done_callback(self._on_done)
+        return future
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas del pool.
+
+        Returns:
+            Dict[str, Any]: Tareas enviadas, terminadas, fallidas, rechazadas y en curso
+        """
+        with self._lock:
+            return dict(self._stats, in_flight=self._in_flight, workers=self.max_workers,
+                        capacity=self.capacity)
+
+    def shutdown(self, wait: bool = False):
+        """
+        Termina los procesos del pool.
+
+        Args:
+            wait (bool): Esperar a que terminen las tareas en curso
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method)
+                )
+            return self._executor
+
+    def _on_done(self, future: Future):
+        failed = future.cancelled() or future.exception() is not None
+        with self._lock:
+            self._in_flight -= 1
+            self._stats['failed' if failed else 'completed'] += 1
+
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # Un proceso murió (por ejemplo, sin memoria): el pool ya no sirve
+            logger.log_error("El pool de procesos se rompió, se crea uno nuevo", future.exception())
+            with self._lock:
+                executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+
+# Tareas: funciones de nivel de módulo que corren en los procesos del pool.
+# Devuelven tipos simples; las listas de contactos viajan como arreglos.
+
+def pack_contacts(contacts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convierte contactos en un arreglo de campos y un arreglo por contacto.
+
+    Args:
+        contacts (List[Dict[str, Any]]): Contactos
+
+    Returns:
+        Dict[str, Any]: fields y rows (valores en el orden de fields)
+    """
+    fields = list(dict.fromkeys(key for contact in contacts for key in contact))
+    return {'fields': fields, 'rows': [[contact.get(field) for field in fields] for contact in contacts]}
+
+
+def unpack_contacts(packed: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Inversa de pack_contacts (los campos vacíos se omiten).
+
+    Args:
+        packed (Dict[str, Any]): fields y rows
+
+    Returns:
+        List[Dict[str, Any]]: Contactos
+    """
+    fields = packed['fields']
+    return [
+        {field: value for field, value in zip(fields, row) if value is not None}
+        for row in packed['rows']
+    ]
+
+
+def parse_contacts(filepath: str, message_template: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Carga los contactos de un archivo.
+
+    Returns:
+        Dict[str, Any]: Contactos empaquetados con pack_contacts
+    """
+    return pack_contacts(DataManager().load_contacts(filepath, message_template))
+
+
+def count_contacts(filepath: str) -> int:
+    """
+    Cuenta los contactos válidos de un archivo.
+    """
+    return len(DataManager().load_contacts(filepath))
+
+
+def validate_contacts(filepath: str) -> Dict[str, int]:
+    """
+    Conteos de DataManager.validate_contacts, con contact_count.
+    """
+    data_manager = DataManager()
+    contacts = data_manager.load_contacts(filepath)
+    return dict(data_manager.validate_contacts(), contact_count=len(contacts))
+
+
+def check_phones(filepath: str, sample_size: int = 5) -> Dict[str, Any]:
+    """
+    Cantidad de teléfonos con largo válido y una muestra de contactos.
+
+    Returns:
+        Dict[str, Any]: total_contacts, valid_phones, invalid_phones y
+            sample_contacts (empaquetados con pack_contacts)
+    """
+    contacts = DataManager().load_contacts(filepath)
+    valid_phones = sum(1 for contact in contacts if len(contact.get('telefono', '')) >= 10)
+    return {
+        'total_contacts': len(contacts),
+        'valid_phones': valid_phones,
+        'invalid_phones': len(contacts) - valid_phones,
+        'sample_contacts': pack_contacts(contacts[:sample_size])
+    }
+
+
+def build_contact_index(filepath: str, index_path: str) -> Dict[str, int]:
+    """
+    Construye el índice de contactos de un archivo.
+
+    Returns:
+        Dict[str, int]: Conteos por estado del índice
+    """
+    return ContactIndex.build(filepath, index_path).counts()
+
+
+def export_contacts(filepath: str, output_path: str, format: str = 'csv') -> str:
+    """
+    Exporta los contactos válidos de un archivo a CSV o Excel.
+
+    Returns:
+        str: Ruta del archivo exportado
+
+    Raises:
+        ValueError: Si no se pudo exportar
+    """
+    data_manager = DataManager()
+    data_manager.load_contacts(filepath)
+    if not data_manager.export_contacts(output_path, format):
+        raise ValueError(f"No se pudieron exportar los contactos a {format}")
+    return output_path
@@ -4,20 +4,78 @@ Tests unitarios para el bot de WhatsApp
 """
 
 import pytest
+import io
 import tempfile
+import time
 import os
 import pandas as pd
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 import sys
+import json
+import pickle
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # Agregar el directorio actual al path para importar los módulos
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Logs y estado de los tests en carpetas temporales; por el entorno llegan también a los procesos del pool
+os.environ['LOGS_DIR'] = tempfile.mkdtemp()
+os.environ['STATE_DIR'] = tempfile.mkdtemp()
+
 import config
+# config puede estar importado antes (conftest de benchmarks al recolectar)
+config.LOGS_DIR = Path(os.environ['LOGS_DIR'])
+config.LOG_FILE = config.LOGS_DIR / 'whatsapp_bot.log'
+config.MESSAGES_LOG_FILE = config.LOGS_DIR / 'messages_sent.csv'
+config.STATE_DIR = Path(os.environ['STATE_DIR'])
+config.CHROME_SESSION_DIR = config.STATE_DIR / 'chrome_session'
+config.UPLOAD_STORE_DIR = config.STATE_DIR / 'uploads'
+config.SHARED_STATE_DB = config.STATE_DIR / 'shared_state.sqlite'
+config.CONTACT_CACHE_DIR = config.UPLOAD_STORE_DIR / 'columnar'
+config.SUPPRESSION_FILE = config.STATE_DIR / 'suppression.csv'
 import utils
 import logger
 from data_manager import DataManager
+from api_sender import ApiMessageSender, TokenBucket
+from message_sender import MessageSender
+from send_scheduler import SendScheduler
+from pacing import PacingController
+from suppression import SuppressionList
+from browser_supervisor import BrowserSupervisor
+from campaign import CampaignSettings
+from progress_relay import ProgressRelay
+from log_buffer import LogBuffer
+from upload_stream import CsvStreamParser, UploadError
+from upload_store import BlobMissingError, UploadStore
+from contact_index import ContactIndex
+from contact_cache import ContactCache
+import api_response
+from shared_state import SharedStateStore, SQLitePubSubManager
+from worker import BrowserWorker
+import instrumentation
+from instrumentation import Histogram, Instrumentation
+import metrics
+import profiling
+from profiling import Profiler, ProfilingError
+import task_pool
+from task_pool import TaskPool, TaskPoolBusyError, TaskTimeoutError
+from main import WhatsAppBot
+from job_manager import JobManager, JobState, JobStateError, WorkerUnavailableError
+from message_sender import SendingStats
+from whatsapp_client import FailureKind, classify_exception
+from fake_whatsapp import StubOptions, StubWhatsAppWeb, create_fake_client
+from selenium.common.exceptions import (
+    StaleElementReferenceException, TimeoutException, InvalidSessionIdException, WebDriverException
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_timings(tmp_path, monkeypatch):
+    """Los resúmenes de tiempos de cada sesión se guardan en una carpeta temporal, no en logs/"""
+    monkeypatch.setattr(config, 'TIMINGS_FILE', tmp_path / 'timings.json')
 
 
 class TestUtils:
@@ -139,6 +197,47 @@ class TestLogger:
         logger.log_message_sent("Juan", "123456789", "Hola", "ENVIADO")
         mock_logger.log_message_sent.assert_called_once_with("Juan", "123456789", "Hola", "ENVIADO", "")
 
+    def test_messages_csv_created_on_first_write(self, tmp_path):
+        """Test que el CSV de mensajes (y su carpeta) se creen al registrar el primer envío"""
+        csv_path = tmp_path / 'nuevo' / 'messages_sent.csv'
+        with patch.object(config, 'MESSAGES_LOG_FILE', csv_path):
+            instance = logger.WhatsAppBotLogger()
+            assert not csv_path.parent.exists()
+
+            instance.log_message_sent("Juan", "123456789", "Hola", "ENVIADO")
+            instance.log_message_sent("Ana", "987654321", "Hola", "ERROR", "timeout")
+
+        lines = csv_path.read_text(encoding='utf-8').splitlines()
+        assert lines[0].startswith('timestamp,nombre') and len(lines) == 3
+
+
+class TestStartup:
+    """Tests del costo de arranque: dependencias pesadas cargadas al usarlas"""
+
+    HEAVY = ('pandas', 'numpy', 'selenium.webdriver', 'webdriver_manager')
+
+    def loaded_modules(self, code, state_dir):
+        result = subprocess.run([sys.executable, '-c', f"{code}; import sys; print(','.join(sys.modules))"],
+                                cwd=Path(__file__).parent, env=dict(os.environ, STATE_DIR=str(state_dir)),
+                                capture_output=True, text=True, check=True)
+        return set(result.stdout.strip().split(','))
+
+    def test_imports_skip_heavy_dependencies(self, tmp_path):
+        """Test que importar app y main no cargue pandas ni selenium.webdriver"""
+        for module in ('app', 'main'):
+            loaded = self.loaded_modules(f"import {module}", tmp_path)
+            assert not [name for name in self.HEAVY if name in loaded], module
+        assert 'aiohttp' not in self.loaded_modules("import main", tmp_path)
+
+    def test_heavy_dependencies_load_on_first_use(self, tmp_path):
+        """Test que pandas se cargue al leer el primer archivo"""
+        csv_path = tmp_path / 'contactos.csv'
+        csv_path.write_text('nombre,telefono\nAna,5491123456789\n', encoding='utf-8')
+        loaded = self.loaded_modules(
+            f"from data_manager import DataManager; DataManager().load_contacts({str(csv_path)!r})", tmp_path
+        )
+        assert 'pandas' in loaded and 'selenium.webdriver' not in loaded
+
 
 class TestDataManager:
     """Tests para el módulo data_manager.py"""
@@ -230,6 +329,1607 @@ class TestDataManager:
         assert self.data_manager.get_contact_count() == 1
 
 
+class TestMessageSender:
+    """Tests para los módulos message_sender.py y send_scheduler.py"""
+
+    def create_sender(self, suppression=None):
+        client = Mock()
+        client.is_browser_running.return_value = True
+        client.send_message_to_contact.return_value = True
+        client.last_failure = None
+        client.last_failure_detail = ""
+        return MessageSender(client, min_delay=0, daily_cap=0, suppression=suppression,
+                             retry_min_wait=0)
+
+    def test_scheduler_stop_interrupts_wait(self):
+        """Test que stop() despierte una espera en curso de inmediato"""
+        scheduler = SendScheduler()
+        deadline = scheduler.schedule_after(30)
+        threading.Timer(0.05, scheduler.stop).start()
+
+        started = time.monotonic()
+        assert scheduler.wait_until(deadline) is False
+        assert time.monotonic() - started < 1
+
+    def test_scheduler_pause_does_not_consume_delay(self):
+        """Test que el tiempo en pausa no cuente como espera"""
+        scheduler = SendScheduler()
+        scheduler.pause()
+        deadline = scheduler.schedule_after(0.1)
+        threading.Timer(0.2, scheduler.resume).start()
+
+        started = time.monotonic()
+        assert scheduler.wait_until(deadline) is True
+        assert time.monotonic() - started >= 0.25
+
+    @patch('logger.log_message_sent')
+    def test_countdown_published_to_subscribers(self, mock_log_sent):
+        """Test que la cuenta regresiva se publique como eventos y no en consola"""
+        sender = self.create_sender()
+        sender.scheduler.tick_interval = 0.05
+        events = []
+        sender.events.subscribe(lambda event, data: events.append((event, data)))
+
+        contacts = [
+            {'nombre': 'Juan', 'telefono': '5491123456789', 'mensaje': 'Hola {nombre}'},
+            {'nombre': 'María', 'telefono': '5491187654321', 'mensaje': 'Hola {nombre}'},
+        ]
+        stats = sender.send_messages_to_contacts(contacts, delay=0.2)
+
+        assert stats.messages_sent == 2
+        countdown = [data for event, data in events if event == 'countdown']
+        assert len(countdown) >= 2
+        assert all(0 <= data['remaining'] <= 0.24 for data in countdown)
+        sender.client.send_message_to_contact.assert_any_call('5491187654321', 'Hola María')
+
+    @patch('logger.log_message_sent')
+    def test_contact_results_and_progress_published(self, mock_log_sent):
+        """Test que cada contacto publique su resultado y los contadores con ETA"""
+        sender = self.create_sender()
+        events = []
+        sender.events.subscribe(lambda event, data: events.append((event, data)))
+
+        contacts = [
+            {'nombre': 'Juan', 'telefono': '5491123456789'},
+            {'nombre': 'Pedro', 'telefono': '123'},
+        ]
+        sender.send_messages_to_contacts(contacts, delay=0)
+
+        results = [data for event, data in events if event == 'contact_result']
+        assert [(r['nombre'], r['status']) for r in results] == [('Juan', 'ENVIADO'), ('Pedro', 'SALTADO')]
+        progress = [data for event, data in events if event == 'progress']
+        assert progress[0]['processed'] == 1 and progress[0]['eta_seconds'] is not None
+        assert progress[-1]['percentage'] == 100.0 and progress[-1]['eta_seconds'] == 0
+
+    @patch('logger.log_message_sent')
+    def test_stop_during_delay_is_immediate(self, mock_log_sent):
+        """Test que detener el envío durante la espera no espere el delay completo"""
+        sender = self.create_sender()
+        contacts = [
+            {'nombre': 'Juan', 'telefono': '5491123456789'},
+            {'nombre': 'María', 'telefono': '5491187654321'},
+        ]
+        threading.Timer(0.1, sender.stop_sending).start()
+
+        started = time.monotonic()
+        stats = sender.send_messages_to_contacts(contacts, delay=30)
+        assert time.monotonic() - started < 1
+        assert stats.messages_sent == 1
+
+    def test_classify_exception(self):
+        """Test clasificación de excepciones de Selenium"""
+        assert classify_exception(StaleElementReferenceException()) == FailureKind.TRANSIENT
+        assert classify_exception(TimeoutException()) == FailureKind.TRANSIENT
+        assert classify_exception(InvalidSessionIdException()) == FailureKind.SESSION_LOST
+        assert classify_exception(WebDriverException("chrome not reachable")) == FailureKind.SESSION_LOST
+        assert classify_exception(ValueError("x")) == FailureKind.UNKNOWN
+
+    @patch('logger.log_message_sent')
+    def test_transient_retried_and_invalid_suppressed(self, mock_log_sent, tmp_path):
+        """Test que los fallos transitorios se reintenten y los permanentes se supriman"""
+        suppression = SuppressionList(tmp_path / 'suppression.csv')
+        sender = self.create_sender(suppression)
+        client = sender.client
+        attempts = {}
+
+        def send(telefono, mensaje):
+            attempts[telefono] = attempts.get(telefono, 0) + 1
+            if telefono == '5491111111111' and attempts[telefono] == 1:
+                client.last_failure = FailureKind.TRANSIENT
+                return False
+            if telefono == '5491122222222':
+                client.last_failure = FailureKind.INVALID_NUMBER
+                return False
+            client.last_failure = None
+            return True
+
+        client.send_message_to_contact.side_effect = send
+        contacts = [
+            {'nombre': 'Transitorio', 'telefono': '5491111111111'},
+            {'nombre': 'Inválido', 'telefono': '5491122222222'},
+            {'nombre': 'Correcto', 'telefono': '5491133333333'},
+        ]
+        stats = sender.send_messages_to_contacts(contacts, delay=0)
+
+        assert stats.messages_sent == 2
+        assert stats.messages_failed == 1
+        assert stats.messages_retried == 1
+        assert attempts['5491111111111'] == 2
+        assert attempts['5491122222222'] == 1
+        assert SuppressionList(tmp_path / 'suppression.csv').contains('5491122222222')
+
+        # En una nueva campaña el número suprimido no se vuelve a intentar
+        stats = sender.send_messages_to_contacts(contacts[1:2], delay=0)
+        assert stats.messages_skipped == 1
+        assert attempts['5491122222222'] == 1
+
+    @patch('logger.log_message_sent')
+    def test_session_lost_recovers_and_resumes(self, mock_log_sent, tmp_path):
+        """Test que una sesión perdida reinicie el navegador y reanude desde el contacto fallido"""
+        sender = self.create_sender(SuppressionList(tmp_path / 'suppression.csv'))
+        client = sender.client
+        sent = []
+        crashed = []
+
+        def send(telefono, mensaje):
+            if telefono == '5491122222222' and not crashed:
+                crashed.append(telefono)
+                client.last_failure = FailureKind.SESSION_LOST
+                return False
+            client.last_failure = None
+            sent.append(telefono)
+            return True
+
+        client.send_message_to_contact.side_effect = send
+        client.restart_browser.return_value = True
+        contacts = [
+            {'nombre': 'Uno', 'telefono': '5491111111111'},
+            {'nombre': 'Dos', 'telefono': '5491122222222'},
+            {'nombre': 'Tres', 'telefono': '5491133333333'},
+        ]
+        stats = sender.send_messages_to_contacts(contacts, delay=0)
+
+        assert sent == ['5491111111111', '5491122222222', '5491133333333']
+        assert stats.messages_sent == 3
+        assert stats.browser_restarts == 1
+        client.restart_browser.assert_called_once()
+
+    def test_supervisor_checks_webdriver_periodically(self):
+        """Test que la verificación vía WebDriver solo se haga cada check_interval"""
+        client = Mock()
+        client.is_browser_process_alive.return_value = True
+        client.is_browser_running.return_value = True
+        now = [0.0]
+        supervisor = BrowserSupervisor(client, check_interval=60, clock=lambda: now[0])
+
+        for _ in range(10):
+            assert supervisor.is_healthy()
+        assert client.is_browser_running.call_count == 0
+
+        now[0] = 61.0
+        assert supervisor.is_healthy()
+        assert client.is_browser_running.call_count == 1
+
+        client.is_browser_process_alive.return_value = False
+        assert not supervisor.is_healthy()
+
+
+class TestPacingController:
+    """Tests para el módulo pacing.py"""
+
+    def test_elapsed_time_counts_toward_gap(self):
+        """Test que el tiempo ya transcurrido en el navegador se descuente de la espera"""
+        now = [0.0]
+        pacing = PacingController(base_delay=5, min_delay=10, daily_cap=0, clock=lambda: now[0])
+        pacing.start_send()
+        now[0] = 7.0
+        assert pacing.next_delay() == pytest.approx(3.0)
+
+        pacing.start_send()
+        now[0] = 30.0
+        assert pacing.next_delay() == 0.0
+
+    def test_backoff_on_consecutive_failures_and_recovery(self):
+        """Test que los fallos consecutivos aumenten el delay y los éxitos lo reduzcan"""
+        pacing = PacingController(base_delay=10, min_delay=5, daily_cap=0,
+                                  failure_threshold=2, max_backoff=4)
+        pacing.record_result(False, 1.0)
+        assert pacing.backoff_factor == 1.0
+        pacing.record_result(False, 1.0)
+        pacing.record_result(False, 1.0)
+        assert pacing.backoff_factor == 4.0
+
+        pacing.record_result(True, 1.0)
+        assert pacing.backoff_factor == 3.0
+        metrics = pacing.get_metrics()
+        assert metrics['backoff_events'] == 2
+        assert metrics['consecutive_failures'] == 0
+
+    def test_invalid_number_rate_triggers_backoff(self):
+        """Test que una racha de números inválidos active el backoff"""
+        pacing = PacingController(base_delay=10, daily_cap=0, failure_threshold=100,
+                                  invalid_rate_threshold=0.5, window=10)
+        for _ in range(5):
+            pacing.record_result(False, 0.5, invalid_number=True)
+        assert pacing.backoff_factor > 1.0
+
+    def test_daily_cap(self):
+        """Test que se respete el límite diario"""
+        pacing = PacingController(base_delay=10, daily_cap=2, sent_today=1)
+        assert pacing.can_send()
+        pacing.record_result(True, 1.0)
+        assert not pacing.can_send()
+
+
+class TestUploadStream:
+    """Tests para el módulo upload_stream.py"""
+
+    CSV = ('nombre,telefono,mensaje\n'
+           '"Juan Pérez",5491123456789,"Hola {nombre},\nsegunda línea"\n'
+           'Pedro,123,\n'
+           'María,5491187654321,\n').encode('utf-8')
+
+    def test_parser_counts_across_chunk_boundaries(self):
+        """Test que el conteo no dependa de cómo se corten los fragmentos"""
+        parser = CsvStreamParser()
+        for i in range(len(self.CSV)):
+            parser.feed(self.CSV[i:i + 1])
+        parser.feed('José,5491100000000\r\n'.encode('latin-1'))
+        parser.close()
+
+        assert parser.total_rows == 4
+        assert parser.valid_rows == 3
+        assert parser.preview[0]['mensaje'] == "Hola {nombre},\nsegunda línea"
+        assert parser.preview[2]['nombre'] == 'José'
+
+    def test_parser_rejects_missing_columns(self):
+        """Test que falten columnas se detecte con el encabezado"""
+        parser = CsvStreamParser()
+        with pytest.raises(UploadError, match="Faltan columnas requeridas"):
+            parser.feed(b'nombre,celular\n')
+
+    def test_upload_endpoint_with_background_validation(self):
+        """Test subida: conteos en la respuesta y validación completa como tarea"""
+        import app as backend
+        store = UploadStore(tempfile.mkdtemp())
+        with patch.object(backend, 'upload_store', store):
+            response = backend.app.test_client().post('/api/upload', data={
+                'file': (io.BytesIO(self.CSV), 'lista.csv')
+            }, content_type='multipart/form-data')
+            data = response.get_json()
+
+            assert data['success'] is True
+            assert data['contact_count'] == 2 and data['invalid_rows'] == 1
+            assert [c['nombre'] for c in data['preview']] == ['Juan Pérez', 'María']
+            assert store.resolve('lista.csv').path == data['filepath']
+
+            job = backend.job_manager.get(data['validation_job'])
+            deadline = time.monotonic() + 5
+            while not job.is_finished and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert job.state == JobState.DONE
+            assert job.result['contact_count'] == 2 and job.result['valid'] == 2
+
+    def test_upload_rejects_disallowed_type(self):
+        """Test que un tipo no permitido no deje archivos en disco"""
+        import app as backend
+        store_dir = tempfile.mkdtemp()
+        with patch.object(backend, 'upload_store', UploadStore(store_dir)):
+            response = backend.app.test_client().post('/api/upload', data={
+                'file': (io.BytesIO(b'hola'), 'lista.txt')
+            }, content_type='multipart/form-data')
+            assert response.get_json() == {'success': False, 'error': 'Tipo de archivo no permitido'}
+            assert os.listdir(store_dir) == []
+
+
+class TestUploadStore:
+    """Tests para el módulo upload_store.py"""
+
+    def _write(self, directory, content):
+        path = Path(directory) / f"tmp-{time.monotonic_ns()}.part"
+        path.write_bytes(content)
+        return path
+
+    def test_file_sha256(self):
+        """Test que el hash por bloques coincida con hashlib"""
+        import hashlib
+        path = self._write(tempfile.mkdtemp(), b'x' * 3000)
+        assert utils.file_sha256(path, chunk_size=1024) == hashlib.sha256(b'x' * 3000).hexdigest()
+
+    def test_duplicate_content_reuses_blob(self):
+        """Test que el mismo contenido con otro nombre no se guarde dos veces"""
+        root = tempfile.mkdtemp()
+        store = UploadStore(root)
+        first = store.add(self._write(root, b'nombre,telefono\n'), 'a.csv')
+        second = store.add(self._write(root, b'nombre,telefono\n'), 'b.csv')
+
+        assert second.duplicate and not first.duplicate
+        assert first.path == second.path
+        assert len(list(Path(root, 'blobs').rglob('*.csv'))) == 1
+        # Los resultados se comparten entre nombres con el mismo contenido
+        store.set_cached(first.sha256, 'validation', {'valid': 1})
+        assert store.get_cached(second.sha256, 'validation') == {'valid': 1}
+        assert UploadStore(root).resolve('b.csv').sha256 == first.sha256
+
+    def test_pinned_blob_survives_replacement(self):
+        """Test que reemplazar un archivo no toque el que usa una campaña"""
+        root = tempfile.mkdtemp()
+        store = UploadStore(root)
+        old = store.add(self._write(root, b'version 1'), 'lista.csv')
+        store.pin(old.sha256, 'job-1')
+        calls = []
+        store.cached(old.sha256, 'preview', lambda: calls.append(1) or {'total': 1})
+        store.cached(old.sha256, 'preview', lambda: calls.append(1) or {'total': 1})
+        assert calls == [1]
+
+        new = store.add(self._write(root, b'version 2'), 'lista.csv')
+        assert store.resolve('lista.csv').sha256 == new.sha256
+        assert Path(old.path).read_bytes() == b'version 1'
+        assert not os.access(old.path, os.W_OK) or os.geteuid() == 0
+
+        store.unpin(old.sha256, 'job-1')
+        assert not os.path.exists(old.path)
+        assert store.get_cached(old.sha256, 'preview') is None
+        assert os.path.exists(new.path)
+
+    def test_resolve_and_pin_refuses_missing_blob(self):
+        """Test que no se proteja un contenido ya borrado y que la campaña reciba 409"""
+        root = tempfile.mkdtemp()
+        store = UploadStore(root)
+        old = store.add(self._write(root, b'nombre,telefono\n'), 'lista.csv')
+        pinned = store.resolve_and_pin('lista.csv', 'job-1')
+        assert pinned.sha256 == old.sha256 and store.is_pinned(old.sha256)
+
+        store.remove('lista.csv')
+        assert os.path.exists(old.path)
+        store.unpin(old.sha256, 'job-1')
+        with pytest.raises(BlobMissingError):
+            store.pin(old.sha256, 'job-2')
+        assert store.resolve_and_pin('lista.csv', 'job-2') is None
+
+        import app as backend
+        current = store.add(self._write(root, b'nombre,telefono\n'), 'lista.csv')
+        os.chmod(current.path, 0o600)
+        os.unlink(current.path)  # El blob desaparece entre la subida y la campaña
+        with patch.object(backend, 'upload_store', store):
+            response = backend.app.test_client().post('/api/jobs', json={'filename': 'lista.csv'})
+        assert response.status_code == 409
+        assert response.get_json()['success'] is False
+        assert not store.is_pinned(current.sha256)
+
+    def test_data_folder_files_hashed_once(self, tmp_path):
+        """Test que /api/files no vuelva a leer los archivos de data si no cambiaron"""
+        import app as backend
+        legacy = tmp_path / 'viejo.csv'
+        legacy.write_text('nombre,telefono\nJuan,5491123456789\n', encoding='utf-8')
+        client = backend.app.test_client()
+
+        with patch.object(backend, 'upload_store', UploadStore(tmp_path / 'store')), \
+                patch.dict(backend.app.config, {'UPLOAD_FOLDER': str(tmp_path)}), \
+                patch.object(backend.utils, 'file_sha256', wraps=utils.file_sha256) as file_sha256:
+            for _ in range(3):
+                files = client.get('/api/files').get_json()['files']
+                assert [(f['name'], f['contact_count']) for f in files] == [('viejo.csv', 1)]
+            assert file_sha256.call_count == 1
+
+            legacy.write_text('nombre,telefono\nJuan,5491123456789\nAna,5491187654321\n', encoding='utf-8')
+            assert client.get('/api/files').get_json()['files'][0]['contact_count'] == 2
+            assert file_sha256.call_count == 2
+
+
+class TestContactIndex:
+    """Tests para el módulo contact_index.py"""
+
+    def _build(self, rows, batch_size=config.CONTACT_INDEX_BATCH_SIZE):
+        directory = tempfile.mkdtemp()
+        source = Path(directory) / 'lista.csv'
+        pd.DataFrame(rows, columns=['nombre', 'telefono', 'mensaje']).to_csv(source, index=False)
+        return ContactIndex.build(source, Path(directory) / 'lista.sqlite', batch_size=batch_size)
+
+    def test_cursor_pagination_covers_every_row(self):
+        """Test que recorrer con el cursor devuelva cada fila una sola vez"""
+        rows = [[f'Contacto {i}', f'54911{i:08d}', None] for i in range(250)]
+        rows[10][1] = '123'
+        index = self._build(rows, batch_size=64)
+
+        seen, cursor = [], 0
+        while cursor is not None:
+            page = index.page(cursor=cursor, limit=40, fields=['nombre'])
+            seen.extend(page['contacts'])
+            cursor = page['next_cursor']
+
+        assert [c['fila'] for c in seen] == list(range(1, 251))
+        assert set(seen[0]) == {'fila', 'status', 'nombre'}
+        assert index.counts() == {'valid': 249, 'invalid_phone': 1, 'empty_name': 0, 'total': 250}
+
+    def test_filters_and_prefix_search(self):
+        """Test filtro por estado y búsqueda por prefijo de teléfono o nombre"""
+        index = self._build([
+            ['Juan Pérez', '+54 9 11 2345-6789', 'Hola Juan'],
+            ['juana', '5491199990000', None],
+            [None, '5491188880000', None],
+            ['Pedro', '123', None],
+        ])
+
+        invalid = index.page(status='invalid_phone')['contacts']
+        assert [(c['nombre'], c['telefono_original']) for c in invalid] == [('Pedro', '123')]
+        assert [c['fila'] for c in index.page(status='empty_name')['contacts']] == [3]
+
+        by_name = index.page(search='JUAN')['contacts']
+        assert [c['nombre'] for c in by_name] == ['Juan Pérez', 'juana']
+        assert by_name[0]['mensaje'] == 'Hola Juan'
+        assert by_name[1]['mensaje'] == config.DEFAULT_MESSAGE_TEMPLATE
+        assert [c['fila'] for c in index.page(search='+54 9 1199')['contacts']] == [2]
+
+        with pytest.raises(ValueError):
+            index.page(status='otro')
+
+    def test_contacts_endpoint(self):
+        """Test /api/contacts/<archivo> sobre el índice creado al subir"""
+        import app as backend
+        store = UploadStore(tempfile.mkdtemp())
+        csv_data = TestUploadStream.CSV
+        with patch.object(backend, 'upload_store', store):
+            client = backend.app.test_client()
+            upload = client.post('/api/upload', data={'file': (io.BytesIO(csv_data), 'lista.csv')},
+                                 content_type='multipart/form-data').get_json()
+            job = backend.job_manager.get(upload['validation_job'])
+            deadline = time.monotonic() + 5
+            while not job.is_finished and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert store.index_path(upload['sha256']).exists()
+
+            first = client.get('/api/contacts/lista.csv?limit=1&fields=telefono').get_json()
+            assert first['contacts'] == [{'fila': 1, 'status': 'valid', 'telefono': '5491123456789'}]
+            second = client.get(f"/api/contacts/lista.csv?limit=1&cursor={first['next_cursor']}").get_json()
+            assert second['contacts'][0]['status'] == 'invalid_phone'
+            assert first['counts']['total'] == 3
+
+            assert client.get('/api/contacts/lista.csv?status=otro').status_code == 400
+            assert client.get('/api/contacts/otra.csv').status_code == 404
+            bad_limit = client.get('/api/contacts/lista.csv?limit=abc')
+            assert bad_limit.status_code == 400 and bad_limit.get_json()['error'] == 'limit debe ser un número'
+            for cursor in ('abc', '-3'):
+                bad_cursor = client.get(f'/api/contacts/lista.csv?cursor={cursor}')
+                assert bad_cursor.status_code == 400 and bad_cursor.get_json()['error'] == 'cursor inválido'
+
+
+class TestTaskPool:
+    """Tests para el módulo task_pool.py"""
+
+    def test_inline_pool_packs_contacts(self):
+        """Test que las tareas devuelvan los contactos como arreglos"""
+        path = Path(tempfile.mkdtemp()) / 'lista.csv'
+        path.write_bytes(TestUploadStream.CSV)
+        pool = TaskPool(max_workers=0)
+
+        packed = pool.run(task_pool.parse_contacts, str(path))
+        assert packed['fields'][:2] == ['nombre', 'telefono']
+        assert len(packed['rows']) == 2 and isinstance(packed['rows'][0], list)
+        assert task_pool.unpack_contacts(packed)[0]['nombre'] == 'Juan Pérez'
+        assert pool.get_stats()['completed'] == 1 and pool.get_stats()['in_flight'] == 0
+
+    def test_bounded_queue_and_timeout(self):
+        """Test que con la cola llena se rechace y que el timeout no espere de más"""
+        pool = TaskPool(max_workers=1, max_pending=0, timeout=0.2)
+        try:
+            with pytest.raises(TaskTimeoutError):
+                pool.run(time.sleep, 1)
+            with pytest.raises(TaskPoolBusyError):
+                pool.submit(time.sleep, 0)
+            stats = pool.get_stats()
+            assert stats['timeouts'] == 1 and stats['rejected'] == 1
+        finally:
+            pool.shutdown(wait=True)
+
+    def test_export_endpoint(self):
+        """Test /api/contacts/<archivo>/export con el parseo en el pool"""
+        import app as backend
+        store = UploadStore(tempfile.mkdtemp())
+        with patch.object(backend, 'upload_store', store), \
+                patch.object(backend, 'task_pool', TaskPool(max_workers=0)):
+            client = backend.app.test_client()
+            client.post('/api/upload', data={'file': (io.BytesIO(TestUploadStream.CSV), 'lista.csv')},
+                        content_type='multipart/form-data')
+            response = client.get('/api/contacts/lista.csv/export?format=csv')
+            assert response.status_code == 200
+            assert response.headers['Content-Disposition'].endswith('lista_contactos.csv')
+            assert response.get_data(as_text=True).splitlines()[0].startswith('nombre,telefono')
+            response.close()
+            assert client.get('/api/contacts/lista.csv/export?format=pdf').status_code == 400
+
+
+class TestContactCache:
+    """Tests para el módulo contact_cache.py"""
+
+    def test_second_load_uses_cache_without_template(self):
+        """Test que la caché se reutilice con otra plantilla y se invalide al cambiar el archivo"""
+        directory = tempfile.mkdtemp()
+        source = Path(directory) / 'lista.csv'
+        source.write_text('nombre,telefono,mensaje,ciudad\n'
+                          'Juan,5491123456789,Hola Juan,Rosario\n'
+                          'María,5491187654321,,\n', encoding='utf-8')
+        cache = ContactCache(Path(directory) / 'cache')
+
+        first = DataManager(cache=cache)
+        contacts = first.load_contacts(source, message_template="A {nombre}")
+        second = DataManager(cache=cache)
+        cached = second.load_contacts(source, message_template="B {nombre}")
+
+        assert first.last_load['cache_hit'] is False and second.last_load['cache_hit'] is True
+        assert [c['mensaje'] for c in contacts] == ['Hola Juan', 'A {nombre}']
+        assert [c['mensaje'] for c in cached] == ['Hola Juan', 'B {nombre}']
+        assert cached[0]['ciudad'] == 'Rosario' and 'ciudad' not in cached[1]
+        assert cached[1]['fila'] == 2 and isinstance(cached[1]['fila'], int)
+
+        source.write_text('nombre,telefono\nPedro,5491100000000\n', encoding='utf-8')
+        changed = DataManager(cache=cache)
+        assert [c['nombre'] for c in changed.load_contacts(source)] == ['Pedro']
+        assert changed.last_load['cache_hit'] is False
+
+        stats = cache.get_stats()
+        assert stats['hits'] == 1 and stats['misses'] == 2
+        assert stats['avg_hit_seconds'] is not None
+
+    def test_feather_round_trip(self):
+        """Test que con pyarrow la caché se guarde en Feather y se lea igual"""
+        pytest.importorskip('pyarrow')
+        cache = ContactCache(Path(tempfile.mkdtemp()) / 'cache')
+        contacts = [
+            {'nombre': 'José', 'telefono': '5491123456789', 'telefono_original': '+54 9 11 2345-6789',
+             'fila': 1, 'mensaje': 'Hola José', 'ciudad': 'Córdoba'},
+            {'nombre': 'María', 'telefono': '5491187654321', 'telefono_original': '5491187654321',
+             'fila': 2, 'mensaje': ''}
+        ]
+
+        cache.save('abc123', contacts)
+        path = cache.path_for('abc123')
+        assert cache.format == 'feather' and path.suffix == '.feather'
+        assert path.read_bytes()[:6] == b'ARROW1'
+        assert cache.load('abc123') == contacts
+
+    def test_pickle_fallback_warns(self):
+        """Test que sin pyarrow se avise que la caché no usa Feather"""
+        with patch('contact_cache.HAS_PYARROW', False), patch.object(logger, 'log_warning') as warning:
+            cache = ContactCache(Path(tempfile.mkdtemp()) / 'cache')
+        assert cache.format == 'pickle'
+        assert 'pyarrow' in warning.call_args[0][0]
+
+
+class TestApiResponse:
+    """Tests para el módulo api_response.py"""
+
+    def setup_method(self):
+        from flask import Flask, jsonify
+        self.app = Flask(__name__)
+        api_response.init_app(self.app)
+        self.app.add_url_rule('/grande', 'grande', lambda: jsonify({'data': ['contacto'] * 1000}))
+        self.app.add_url_rule('/chico', 'chico', lambda: jsonify({'ok': True}))
+        self.client = self.app.test_client()
+
+    def test_gzip_negotiation(self):
+        """Test que se comprima solo si el cliente acepta gzip y supera el mínimo"""
+        import gzip
+        response = self.client.get('/grande', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert json.loads(gzip.decompress(response.data)) == {'data': ['contacto'] * 1000}
+
+        assert 'Content-Encoding' not in self.client.get('/grande').headers
+        small = self.client.get('/chico', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in small.headers
+        assert small.get_json() == {'ok': True}
+
+    def test_columnar_payload(self):
+        """Test que el formato columnar conserve los valores y los campos faltantes"""
+        contacts = [{'nombre': 'Juan', 'fila': 1}, {'nombre': 'María', 'fila': 2, 'ciudad': 'Rosario'}]
+        columnar = api_response.to_columnar(contacts)
+        assert columnar == {
+            'fields': ['nombre', 'fila', 'ciudad'],
+            'count': 2,
+            'columns': {'nombre': ['Juan', 'María'], 'fila': [1, 2], 'ciudad': [None, 'Rosario']}
+        }
+        assert json.loads(api_response.dumps(columnar)) == columnar
+
+
+class TestLogBuffer:
+    """Tests para el módulo log_buffer.py"""
+
+    def test_since_returns_only_new_entries(self):
+        """Test que since() devuelva solo los mensajes posteriores al cursor"""
+        buffer = LogBuffer(maxlen=3)
+        for i in range(5):
+            buffer.append(f"mensaje {i}")
+
+        assert [e['seq'] for e in buffer.entries()] == [3, 4, 5]
+        assert [e['message'] for e in buffer.since(4)] == ["mensaje 4"]
+        assert buffer.since(5) == []
+        # Un cursor anterior al buffer devuelve lo que queda
+        assert [e['seq'] for e in buffer.since(1)] == [3, 4, 5]
+
+        buffer.clear()
+        assert buffer.to_dict(5) == {'log_messages': [], 'log_cursor': 5}
+        assert buffer.append("después de limpiar")['seq'] == 6
+
+    def test_concurrent_appends(self):
+        """Test que las secuencias no se repitan con varios hilos escribiendo"""
+        buffer = LogBuffer(maxlen=1000)
+        threads = [
+            threading.Thread(target=lambda: [buffer.append("x") for _ in range(200)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        seqs = [e['seq'] for e in buffer.entries()]
+        assert seqs == list(range(1, 801))
+
+    def test_app_logs_endpoint(self):
+        """Test que /api/logs del backend Socket.IO use el mismo buffer"""
+        import app as backend
+        cursor = backend.log_buffer.last_seq
+        backend.log_buffer.append("Campaña de prueba")
+
+        data = backend.app.test_client().get(f'/api/logs?since={cursor}').get_json()
+        assert [e['message'] for e in data['log_messages']] == ["Campaña de prueba"]
+        assert data['log_cursor'] == cursor + 1
+
+
+class TestInstrumentation:
+    """Tests de los temporizadores y los histogramas por etapa"""
+
+    def test_histogram_percentiles_within_precision(self):
+        histogram = Histogram(significant_bits=5)
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+
+        assert histogram.count == 1000
+        for pct, expected in ((50, 0.5), (90, 0.9), (99, 0.99)):
+            assert abs(histogram.percentile(pct) - expected) / expected < 0.04
+        assert histogram.percentile(100) == pytest.approx(1.0)
+
+        copy = Histogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+        copy.merge(histogram)
+        assert copy.count == 2000 and copy.percentile(50) == histogram.percentile(50)
+        assert copy.cumulative_counts([0.0001, 10]) == [0, 2000]
+
+    def test_timed_and_timer_record_only_when_enabled(self, tmp_path):
+        registry = Instrumentation(enabled=False)
+
+        @registry.timed('stage')
+        def work(value):
+            return value * 2
+
+        assert work(2) == 4
+        with registry.timer('block'):
+            pass
+        assert registry.snapshot() == {}
+
+        registry.enabled = True
+        work(1)
+        with registry.timer('block'):
+            time.sleep(0.01)
+        summary = registry.snapshot()
+        assert summary['stage']['count'] == 1
+        assert summary['block']['p50_ms'] >= 9
+
+        path = registry.dump(tmp_path / 'timings.json')
+        assert json.loads(path.read_text())['stages']['block']['count'] == 1
+
+    def test_api_returns_stage_timings(self):
+        import app as backend
+
+        instrumentation.record('test_stage', 0.002)
+        client = backend.app.test_client()
+        data = client.get('/api/timings').get_json()
+        assert data['stages']['test_stage']['count'] >= 1
+
+        client.delete('/api/timings')
+        assert 'test_stage' not in client.get('/api/timings').get_json()['stages']
+
+
+class TestWebInterface:
+    """Tests para el stream de estado de web_interface.py"""
+
+    def setup_method(self):
+        import web_interface
+        self.web = web_interface
+        self.client = web_interface.app.test_client()
+
+    def test_status_etag_not_modified(self):
+        """Test que /api/status responda 304 si el estado no cambió"""
+        first = self.client.get('/api/status')
+        etag = first.headers['ETag']
+
+        assert self.client.get('/api/status', headers={'If-None-Match': etag}).status_code == 304
+
+        self.web.log_to_web("Nuevo mensaje")
+        changed = self.client.get('/api/status', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+
+    def test_event_stream_sends_only_diffs(self):
+        """Test que el stream envíe el estado completo y luego solo los cambios"""
+        self.web.log_to_web("Antes de conectar")
+        cursor = self.web.log_buffer.last_seq
+        stream = self.web._state_diffs(cursor, keepalive=0.05)
+
+        initial = json.loads(next(stream).split('data: ', 1)[1])
+        assert 'status' in initial and 'log_messages' not in initial
+
+        self.web.update_state(messages_sent=initial['messages_sent'] + 1)
+        self.web.log_to_web("Mensaje nuevo")
+        chunk = next(stream)
+        diff = json.loads(chunk.split('data: ', 1)[1])
+
+        assert set(diff) <= {'messages_sent', 'log_messages'}
+        messages = [entry['message'] for entry in diff['log_messages']]
+        assert messages[-1] == "Mensaje nuevo" and "Antes de conectar" not in messages
+        assert chunk.startswith(f"id: {self.web.log_buffer.last_seq}")
+        assert next(stream) == ": keep-alive\n\n"
+
+
+class TestProgressRelay:
+    """Tests para el módulo progress_relay.py"""
+
+    def test_flush_coalesces_events_per_job(self):
+        """Test que los eventos de una campaña se agrupen en una sola emisión"""
+        emitted = []
+        relay = ProgressRelay(lambda event, data, room: emitted.append((event, data, room)),
+                              max_results=2)
+
+        for i in range(50):
+            relay.publish('job1', 'progress', {'processed': i})
+        for i in range(3):
+            relay.publish('job1', 'contact_result', {'position': i})
+        relay.publish('job2', 'paused', {})
+        relay.stop()
+        relay.flush()
+
+        by_room = {room: data for event, data, room in emitted}
+        assert set(by_room) == {'job1', 'job2'}
+        assert by_room['job1']['progress'] == {'processed': 49}
+        assert [r['position'] for r in by_room['job1']['results']] == [1, 2]
+        assert by_room['job1']['dropped_results'] == 1
+        assert by_room['job2']['events'] == [{'event': 'paused', 'data': {}}]
+
+    def test_slow_client_does_not_block_publisher(self):
+        """Test que una emisión lenta no frene al publicador y respete el máximo por segundo"""
+        emits = []
+
+        def slow_emit(event, data, room):
+            emits.append(time.monotonic())
+            time.sleep(0.2)
+
+        relay = ProgressRelay(slow_emit, max_emits_per_second=4)
+        started = time.monotonic()
+        deadline = started + 0.6
+        published = 0
+        while time.monotonic() < deadline:
+            relay.publish('job1', 'progress', {'processed': published})
+            published += 1
+            time.sleep(0.001)
+        relay.stop()
+
+        assert published > 100
+        assert len(emits) <= 4
+        assert all(b - a >= 0.2 for a, b in zip(emits, emits[1:]))
+
+
+class TestSharedState:
+    """Tests para el módulo shared_state.py y las campañas entre workers"""
+
+    def setup_method(self):
+        self.store = SharedStateStore(Path(tempfile.mkdtemp()) / 'shared.sqlite')
+        self.bots = []
+
+        def factory(events):
+            bot = FakeBot(events)
+            self.bots.append(bot)
+            return bot
+
+        self.first = JobManager(bot_factory=factory, store=self.store, worker_id='worker-a')
+        self.second = JobManager(bot_factory=factory, store=self.store, worker_id='worker-b')
+
+    def teardown_method(self):
+        for bot in self.bots:
+            bot.release.set()
+        self.first.shutdown(wait=True)
+        self.second.shutdown(wait=True)
+
+    def wait_for(self, condition, timeout=2):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert condition()
+
+    def test_browser_campaigns_run_on_lease_holder(self):
+        """Test que las campañas con navegador vayan al worker que tiene el lease"""
+        self.first.coordinate_once()
+        self.second.coordinate_once()
+        local = self.first.submit('a.csv')
+        assert self.store.lease_owner('browser') == 'worker-a'
+
+        forwarded = self.second.submit('b.csv')
+        assert self.second.get(forwarded.id) is None
+        assert self.second.get_job_dict(forwarded.id)['owner'] == 'worker-a'
+
+        self.first.coordinate_once()
+        job = self.first.get(forwarded.id)
+        assert job is not None
+        self.wait_for(lambda: job.state == JobState.SENDING)
+        assert {j['id'] for j in self.second.list_job_dicts()} == {local.id, forwarded.id}
+
+        # Las acciones pedidas en otro worker llegan al dueño
+        self.second.request_action(forwarded.id, 'cancel')
+        self.first.coordinate_once()
+        self.wait_for(lambda: self.second.get_job_dict(forwarded.id)['state'] == 'cancelled')
+        assert job.state == JobState.CANCELLED
+        with pytest.raises(JobStateError):
+            self.second.request_action(forwarded.id, 'cancel')
+
+        # Sin navegador la campaña corre en el worker que la recibe
+        api_job = self.second.submit('c.csv', CampaignSettings(transport='api'))
+        assert self.second.get(api_job.id) is api_job
+
+    def test_orphaned_jobs_and_expired_leases(self):
+        """Test que un worker caído no deje campañas activas ni el navegador tomado"""
+        self.store.save_job({'id': 'x1', 'state': 'sending', 'created_at': time.time()}, 'worker-z')
+        assert self.store.acquire_lease('browser', 'worker-z', ttl=0.05)
+        assert not self.store.acquire_lease('browser', 'worker-a')
+        time.sleep(0.06)
+        assert self.store.acquire_lease('browser', 'worker-a')
+
+        assert self.store.fail_orphaned_jobs({'worker-a'}) == 1
+        assert self.store.get_job('x1')['state'] == 'failed'
+
+    def test_stale_snapshot_does_not_reopen_finished_job(self):
+        """Test que una copia vieja 'sending' no pise el estado final 'done'"""
+        self.store.save_job({'id': 'x2', 'state': 'sending', 'created_at': time.time()}, 'worker-a')
+        self.store.save_job({'id': 'x2', 'state': 'done', 'created_at': time.time()}, 'worker-a')
+        self.store.save_job({'id': 'x2', 'state': 'sending', 'created_at': time.time()}, 'worker-a')
+        assert self.store.get_job('x2')['state'] == 'done'
+        assert self.store.fail_orphaned_jobs(set()) == 0
+
+        self.store.prune_jobs(keep=0)
+        assert self.store.get_job('x2') is None
+
+    def test_pubsub_manager_delivers_published_messages(self):
+        """Test que la cola SQLite entregue los emits de otro proceso"""
+        manager = SQLitePubSubManager(self.store, poll_interval=0.01)
+        manager.server = Mock(sleep=time.sleep)
+        received = []
+        listener = manager._listen()
+        thread = threading.Thread(target=lambda: received.append(next(listener)), daemon=True)
+        thread.start()
+        time.sleep(0.05)
+
+        SQLitePubSubManager(self.store)._publish({'method': 'emit', 'event': 'job_update', 'data': {'id': 1}})
+        thread.join(timeout=2)
+        assert pickle.loads(received[0])['event'] == 'job_update'
+
+
+class TestBrowserWorker:
+    """Tests para el módulo worker.py"""
+
+    def setup_method(self):
+        temp_dir = Path(tempfile.mkdtemp())
+        self.store = SharedStateStore(temp_dir / 'shared.sqlite')
+        self.bots = []
+
+        def factory(events):
+            bot = FakeBot(events)
+            self.bots.append(bot)
+            return bot
+
+        self.worker = BrowserWorker(self.store, bot_factory=factory, upload_store=UploadStore(temp_dir / 'uploads'))
+        self.web = JobManager(store=self.store, worker_id='web-1', browser_worker=self.worker.job_manager.worker_id)
+        self.remote = []
+        self.web.remote_events.subscribe(lambda event, data: self.remote.append((event, data)))
+
+    def teardown_method(self):
+        for bot in self.bots:
+            bot.release.set()
+        self.worker.job_manager.shutdown(wait=True)
+        self.web.shutdown(wait=True)
+
+    def wait_for_state(self, job_id, state, timeout=2):
+        def seen():
+            return any(event == 'job_update' and data['id'] == job_id and data['state'] == state
+                       for event, data in list(self.remote))
+        deadline = time.monotonic() + timeout
+        while not seen() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert seen()
+
+    def test_submit_requires_running_worker(self):
+        """Test que sin worker del navegador la campaña se rechace"""
+        with pytest.raises(WorkerUnavailableError):
+            self.web.submit('a.csv')
+        # Sin navegador la campaña corre en el proceso web
+        job = self.web.submit('a.csv', CampaignSettings(transport='api'))
+        assert self.web.get(job.id) is job
+
+    def test_web_reports_unavailable_worker(self, tmp_path, monkeypatch):
+        """Test que sin worker del navegador la API responda 503 y Socket.IO emita error"""
+        import app as backend
+
+        source = tmp_path / 'a.csv'
+        source.write_text('nombre,telefono\nAna,5491100000001\n')
+        backend.upload_store.add(source, 'sin_worker.csv')
+        monkeypatch.setattr(backend.job_manager, 'submit', Mock(
+            side_effect=WorkerUnavailableError("El worker del navegador no está corriendo (python -m worker)")))
+
+        response = backend.app.test_client().post('/api/jobs', json={'filename': 'sin_worker.csv'})
+        assert response.status_code == 503
+        assert 'python -m worker' in response.get_json()['error']
+
+        client = backend.socketio.test_client(backend.app)
+        client.get_received()
+        client.emit('submit_job', {'filename': 'sin_worker.csv'})
+        errors = [message['args'][0] for message in client.get_received() if message['name'] == 'error']
+        client.disconnect()
+        assert errors and 'python -m worker' in errors[0]['message']
+
+    def test_campaign_runs_in_worker(self):
+        """Test que la campaña corra en el worker y sus eventos lleguen al proceso web"""
+        self.worker.job_manager.coordinate_once()
+        self.web.follow_remote_events(poll_interval=0.01)
+
+        job = self.web.submit('a.csv')
+        assert self.web.get(job.id) is None
+        self.worker.job_manager.coordinate_once()
+        self.wait_for_state(job.id, 'sending')
+        assert any(event == 'job_event' and data['job_id'] == job.id for event, data in self.remote)
+
+        self.web.request_action(job.id, 'cancel')
+        self.worker.job_manager.coordinate_once()
+        self.wait_for_state(job.id, 'cancelled')
+        assert self.web.get_job_dict(job.id)['state'] == 'cancelled'
+
+
+    def test_crashed_worker_pins_are_swept(self, tmp_path):
+        """Test que los archivos protegidos por un worker caído o un pedido interrumpido se liberen"""
+        uploads = self.worker.upload_store
+        source = tmp_path / 'a.csv'
+        source.write_text('nombre,telefono\nAna,5491100000001\n')
+        stored = uploads.add(source, 'a.csv')
+
+        self.worker.job_manager.coordinate_once()
+        job = self.web.submit(stored.path)
+        uploads.pin(stored.sha256, job.id)
+        uploads.pin(stored.sha256, 'submit-1-1')
+        self.worker.job_manager.coordinate_once()
+        uploads.remove('a.csv')
+
+        web = JobManager(store=self.store, worker_id='web-2', upload_store=uploads)
+        try:
+            # Los pins recientes se conservan aunque su dueño no figure como activo
+            assert web.sweep_pins() == 0
+            aged = time.time() - config.UPLOAD_PIN_GRACE - 1
+            for pin in uploads.pins_dir.iterdir():
+                os.utime(pin, (aged, aged))
+            assert web.sweep_pins() == 1
+            assert uploads.is_pinned(stored.sha256) and Path(stored.path).exists()
+
+            # El worker deja de latir: su campaña falla y el archivo se borra
+            self.store.remove_worker(self.worker.job_manager.worker_id)
+            web.coordinate_once()
+            assert self.store.get_job(job.id)['state'] == 'failed'
+            assert not uploads.is_pinned(stored.sha256)
+            assert not Path(stored.path).exists()
+        finally:
+            web.shutdown(wait=True)
+
+    def test_job_profile_runs_in_owning_worker(self, tmp_path, monkeypatch):
+        """Test que el perfil de una campaña del worker del navegador se pida por el estado compartido"""
+        profiler = Profiler(tmp_path)
+        monkeypatch.setattr(profiling, 'profiler', profiler)
+        self.worker.job_manager.coordinate_once()
+        self.web.follow_remote_events(poll_interval=0.01)
+        job = self.web.submit('a.csv')
+        self.worker.job_manager.coordinate_once()
+        self.wait_for_state(job.id, 'sending')
+
+        forwarded = self.web.request_profile(job.id, 5, interval=0.005)
+        assert forwarded == {'job_id': job.id, 'worker': self.worker.job_manager.worker_id, 'forwarded': True}
+        assert profiler.status()['sampling'] is None
+        self.worker.job_manager.coordinate_once()
+        assert profiler.status()['sampling']['label'] == f"job-{job.id}"
+        time.sleep(0.05)
+        result = profiler.stop_sampling()
+
+        stacks = Path(result['path']).read_text(encoding='utf-8').splitlines()
+        assert stacks and all('run (test_whatsapp_bot.py' in line for line in stacks)
+        with pytest.raises(KeyError):
+            self.web.request_profile('nope', 5)
+
+
+class TestFakeWhatsApp:
+    """Tests de WhatsApp Web simulado"""
+
+    def test_client_sends_and_classifies_failures(self):
+        page = StubWhatsAppWeb(StubOptions(invalid_numbers={'5491100000001'}))
+        client = create_fake_client(page, element_timeout=0.05)
+
+        assert client.start_browser()
+        assert client.wait_for_qr_scan()
+        assert client.send_message_to_contact('5491155550000', 'Hola')
+        assert client.get_current_chat_title() == '5491155550000'
+        assert page.sent[-1]['mensaje'] == 'Hola'
+
+        assert not client.send_message_to_contact('5491100000001', 'Hola')
+        assert client.last_failure == FailureKind.INVALID_NUMBER
+
+        page.options.failure_rate = 1
+        assert not client.send_message_to_contact('5491155550000', 'Hola')
+        assert client.last_failure == FailureKind.TRANSIENT
+
+        page.options.failure_rate = 0
+        page.options.session_loss_rate = 1
+        assert not client.send_message_to_contact('5491155550000', 'Hola')
+        assert client.last_failure == FailureKind.SESSION_LOST
+        assert not client.is_browser_running()
+
+        # Un navegador nuevo recupera la sesión
+        page.options.session_loss_rate = 0
+        assert client.restart_browser()
+        assert client.send_message_to_contact('5491155550000', 'Otra vez')
+        assert len(page.sent) == 2
+
+    def test_concurrent_clients_use_distinct_chrome_profiles(self, tmp_path):
+        """Test que dos navegadores abiertos a la vez no compartan --user-data-dir"""
+        def profile_of(client):
+            return next(arg for arg in client.page.options_used.arguments if arg.startswith('--user-data-dir='))
+
+        clients = []
+        for _ in range(2):
+            client = create_fake_client(StubWhatsAppWeb())
+            factory = client.driver_factory
+            client.driver_factory = lambda options, client=client, factory=factory: (
+                setattr(client.page, 'options_used', options) or factory(options))
+            clients.append(client)
+
+        with patch.object(config, 'CHROME_SESSION_DIR', tmp_path / 'chrome_session'):
+            first, second = clients
+            assert first.start_browser() and second.start_browser()
+            assert profile_of(first) != profile_of(second)
+            assert all(profile_of(c).startswith(f"--user-data-dir={tmp_path / 'chrome_session'}") for c in clients)
+            first_profile = profile_of(first)
+
+            # Un reinicio conserva el perfil; al cerrar se libera para la próxima campaña
+            in_use = profile_of(second)
+            assert second.restart_browser()
+            assert profile_of(second) == in_use
+            first.close_browser()
+            second.close_browser()
+            assert first.start_browser()
+            assert profile_of(first) == first_profile
+            first.close_browser()
+
+    def test_bot_run_end_to_end(self, tmp_path):
+        contacts_file = tmp_path / 'contactos.csv'
+        contacts_file.write_text(
+            'nombre,telefono\n' + ''.join(f'Contacto {i},54911555500{i:02d}\n' for i in range(20)),
+            encoding='utf-8'
+        )
+        page = StubWhatsAppWeb(StubOptions(invalid_numbers={'5491155550007'}, login_delay=0.05))
+        client = create_fake_client(page, element_timeout=0.05)
+
+        bot = WhatsAppBot()
+        bot.whatsapp_client = client
+        bot.message_sender = MessageSender(
+            client, events=bot.events, min_delay=0, daily_cap=0,
+            suppression=SuppressionList(tmp_path / 'suppression.csv'), retry_min_wait=0
+        )
+
+        with patch.object(config, 'MESSAGES_LOG_FILE', tmp_path / 'messages_sent.csv'):
+            assert bot.run(str(contacts_file), settings=CampaignSettings(delay=0, limit=None))
+
+        stats = bot.message_sender.get_stats()
+        assert stats.messages_sent == 19
+        assert stats.messages_suppressed == 1
+        assert len(page.sent) == 19
+        assert client.driver is None
+
+    def test_stub_app_serves_selectors(self):
+        page = StubWhatsAppWeb()
+        http = page.create_app().test_client()
+
+        html = http.get('/').get_data(as_text=True)
+        assert 'data-testid' in html and 'chatlist-header' in html
+        assert 'side_panel' in http.get('/state').get_json()['visible']
+
+        http.post('/search', json={'phone': '5491155550000'})
+        assert 'message_box' in http.get('/state').get_json()['visible']
+        assert http.post('/send', json={'message': 'Hola'}).get_json()['success']
+        assert http.get('/messages').get_json()['messages'][0]['telefono'] == '5491155550000'
+
+
+class TestMetrics:
+    """Tests de las métricas de Prometheus (metrics.py y /metrics)"""
+
+    def snapshot(self, seconds, hits=0, misses=0):
+        histogram = Histogram()
+        histogram.record(seconds)
+        return {'pid': 1, 'resident_memory_bytes': 1024,
+                'histograms': {'send_message': histogram.to_dict(), 'task:parse_contacts': histogram.to_dict()},
+                'contact_cache': {'hits': hits, 'misses': misses},
+                'task_pool': {'in_flight': 2, 'capacity': 10, 'rejected': 0, 'timeouts': 0}}
+
+    def test_render_counters_gauges_and_histograms(self):
+        jobs = [
+            {'id': 'job-1', 'kind': 'campaign', 'state': 'sending', 'params': {'transport': 'browser'},
+             'stats': {'messages_sent': 5, 'messages_failed': 1, 'messages_skipped': 2}},
+            {'id': 'job-2', 'kind': 'campaign', 'state': 'queued', 'params': {'transport': 'api'}, 'stats': {}},
+            {'id': 'val-1', 'kind': 'validation', 'state': 'completed', 'params': {}, 'stats': {}}
+        ]
+        text = metrics.render(jobs, {'w1': self.snapshot(0.2, hits=3, misses=1)}, bounds=[0.1, 1])
+        lines = text.splitlines()
+
+        assert 'whatsapp_bot_messages_total{job_id="job-1",status="sent"} 5' in lines
+        assert 'whatsapp_bot_messages_total{job_id="job-1",status="skipped"} 2' in lines
+        assert 'whatsapp_bot_active_browsers 1' in lines
+        assert 'whatsapp_bot_queue_depth{queue="jobs"} 1' in lines
+        assert 'whatsapp_bot_queue_depth{queue="task_pool",worker="w1"} 2' in lines
+        assert 'whatsapp_bot_stage_duration_seconds_bucket{stage="send_message",le="0.1"} 0' in lines
+        assert 'whatsapp_bot_stage_duration_seconds_bucket{stage="send_message",le="1.0"} 1' in lines
+        assert 'whatsapp_bot_task_duration_seconds_count{task="parse_contacts"} 1' in lines
+        assert 'whatsapp_bot_contact_cache_hit_ratio{worker="w1"} 0.75' in lines
+        assert '# TYPE whatsapp_bot_messages_total counter' in lines
+
+    def test_snapshots_merge_across_workers(self):
+        store = SharedStateStore(Path(tempfile.mkdtemp()) / 'shared.sqlite')
+        store.heartbeat('other')
+        store.save_metrics('other', self.snapshot(0.5))
+        store.save_metrics('gone', self.snapshot(0.5))
+
+        snapshots = metrics.collect_snapshots(store, 'self')
+        assert set(snapshots) == {'self', 'other'}
+
+        snapshots['self'] = self.snapshot(0.05)
+        text = metrics.render([], snapshots, bounds=[0.1])
+        assert 'whatsapp_bot_stage_duration_seconds_bucket{stage="send_message",le="0.1"} 1' in text
+        assert 'whatsapp_bot_stage_duration_seconds_count{stage="send_message"} 2' in text
+
+        store.remove_worker('other')
+        assert store.load_metrics({'other'}) == {}
+
+    def test_metrics_endpoint(self):
+        import app as backend
+
+        instrumentation.record('metrics_test_stage', 0.01)
+        response = backend.app.test_client().get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        body = response.get_data(as_text=True)
+        assert 'whatsapp_bot_stage_duration_seconds_count{stage="metrics_test_stage"}' in body
+        assert 'whatsapp_bot_process_resident_memory_bytes{worker=' in body
+
+
+class TestProfiling:
+    """Tests del perfilado bajo demanda (profiling.py y /api/admin)"""
+
+    def test_sampling_profiles_only_requested_thread(self, tmp_path):
+        profiler = Profiler(tmp_path)
+        stop = threading.Event()
+
+        def busy_campaign_loop():
+            while not stop.is_set():
+                sum(range(1000))
+
+        worker = threading.Thread(target=busy_campaign_loop)
+        worker.start()
+        try:
+            profiler.start_sampling(5, 'job-test', {worker.ident}, interval=0.005)
+            with pytest.raises(ProfilingError):
+                profiler.start_sampling(1)
+            time.sleep(0.1)
+            result = profiler.stop_sampling()
+        finally:
+            stop.set()
+            worker.join()
+
+        assert result['samples'] > 0
+        stacks = Path(result['path']).read_text(encoding='utf-8').splitlines()
+        assert stacks and all('busy_campaign_loop' in line for line in stacks)
+        assert profiler.stop_sampling() is None
+        assert profiler.status()['results'] == [result]
+
+    def test_sampling_profiles_greenlets_under_gevent(self, tmp_path):
+        """Test que con gevent el muestreo vea el greenlet ocupado y los que esperan"""
+        pytest.importorskip('gevent')
+        code = (
+            "from gevent import monkey; monkey.patch_all()\n"
+            "import sys, threading, time\n"
+            "from pathlib import Path\n"
+            "from profiling import Profiler\n"
+            "def busy_campaign_loop():\n"
+            "    deadline = time.monotonic() + 0.3\n"
+            "    while time.monotonic() < deadline:\n"
+            "        sum(range(1000))\n"
+            "def waiting_campaign_loop():\n"
+            "    for _ in range(50):\n"
+            "        time.sleep(0.01)\n"
+            "waiting = threading.Thread(target=waiting_campaign_loop)\n"
+            "waiting.start()\n"
+            "busy = threading.Thread(target=busy_campaign_loop)\n"
+            "profiler = Profiler(Path(sys.argv[1]))\n"
+            "profiler.start_sampling(5, 'job-test', {waiting.ident}, interval=0.005)\n"
+            "busy.start()\n"
+            "busy.join()\n"
+            "waiting.join()\n"
+            "print(profiler.stop_sampling()['path'])\n"
+        )
+        result = subprocess.run([sys.executable, '-c', code, str(tmp_path)], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, check=True)
+
+        stacks = Path(result.stdout.strip()).read_text(encoding='utf-8').splitlines()
+        assert stacks and all('waiting_campaign_loop' in line for line in stacks)
+        # Mientras el greenlet ocupado bloquea el loop, el greenlet de la campaña sigue esperando
+        assert sum(int(line.rsplit(' ', 1)[1]) for line in stacks) > 10
+
+        code = code.replace("{waiting.ident}", "None")
+        result = subprocess.run([sys.executable, '-c', code, str(tmp_path)], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, check=True)
+        stacks = Path(result.stdout.strip()).read_text(encoding='utf-8')
+        assert 'busy_campaign_loop' in stacks and '_loop (profiling.py' not in stacks
+
+    def test_memory_snapshot_scoped_to_data_manager(self, tmp_path):
+        profiler = Profiler(tmp_path)
+        with pytest.raises(ProfilingError):
+            profiler.memory_snapshot()
+
+        csv_path = tmp_path / 'contactos.csv'
+        csv_path.write_text('nombre,telefono\n' + ''.join(f'Ana {i},54911{i:08d}\n' for i in range(500)))
+        profiler.start_memory()
+        try:
+            contacts = DataManager().load_contacts(str(csv_path))
+            result = profiler.memory_snapshot('test', scope='data_manager')
+        finally:
+            profiler.stop_memory()
+
+        assert len(contacts) == 500
+        assert result['scope'] == 'data_manager' and result['growth']
+        assert 'Crecimiento desde la línea base' in Path(result['path']).read_text(encoding='utf-8')
+
+    def test_admin_api_requires_token(self, tmp_path, monkeypatch):
+        import app as backend
+
+        client = backend.app.test_client()
+        monkeypatch.setattr(config, 'ADMIN_TOKEN', '')
+        assert client.get('/api/admin/profile').status_code == 404
+
+        monkeypatch.setattr(config, 'ADMIN_TOKEN', 'secreto')
+        monkeypatch.setattr(profiling, 'profiler', Profiler(tmp_path))
+        assert client.get('/api/admin/profile', headers={'X-Admin-Token': 'otro'}).status_code == 401
+        assert 'X-Profile-Path' not in client.get('/health?profile=1').headers
+
+        headers = {'Authorization': 'Bearer secreto'}
+        started = client.post('/api/admin/profile', json={'seconds': 5}, headers=headers)
+        assert started.status_code == 202
+        assert client.post('/api/admin/profile', json={'seconds': 5}, headers=headers).status_code == 409
+        assert client.post('/api/admin/profile', json={'job_id': 'nope'}, headers=headers).status_code == 404
+        assert client.delete('/api/admin/profile', headers=headers).get_json()['result']['kind'] == 'sampling'
+
+        profiled = client.get('/health?profile=1', headers=headers)
+        assert Path(profiled.headers['X-Profile-Path']).suffix == '.pstats'
+
+
+class TestCampaignSettings:
+    """Tests para el módulo campaign.py"""
+
+    def test_from_dict_uses_config_defaults(self):
+        """Test que los valores ausentes tomen los defaults de config"""
+        settings = CampaignSettings.from_dict({'message': 'Hola {nombre}', 'limit': '3'})
+        assert settings.message_template == 'Hola {nombre}'
+        assert settings.limit == 3
+        assert settings.delay == config.DEFAULT_DELAY_BETWEEN_MESSAGES
+        assert settings.transport == 'browser'
+
+    def test_invalid_values(self):
+        """Test validación de parámetros inválidos"""
+        with pytest.raises(ValueError):
+            CampaignSettings.from_dict({'delay': 'rápido'})
+        with pytest.raises(ValueError):
+            CampaignSettings(transport='sms')
+        with pytest.raises(ValueError):
+            CampaignSettings(message_template='  ')
+
+    def test_concurrent_campaigns_render_their_own_template(self, tmp_path):
+        """Test dos campañas simultáneas enviando cada una su plantilla"""
+        csv_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, encoding='utf-8')
+        csv_file.write('nombre,telefono\nJuan,5491123456789\nMaría,5491187654321\n')
+        csv_file.close()
+
+        # Obliga a que ambas campañas estén enviando al mismo tiempo
+        barrier = threading.Barrier(2, timeout=5)
+        sent = {}
+
+        def factory(events):
+            bot = WhatsAppBot(events=events)
+            client = Mock()
+            client.start_browser.return_value = True
+            client.wait_for_qr_scan.return_value = True
+            client.last_failure = None
+            client.last_failure_detail = ""
+            messages = []
+
+            def send(telefono, mensaje):
+                if not messages:
+                    barrier.wait()
+                messages.append(mensaje)
+                return True
+
+            client.send_message_to_contact.side_effect = send
+            bot.whatsapp_client = bot.message_sender.client = client
+            bot.message_sender.min_delay = 0
+            bot.message_sender.daily_cap = 0
+            bot.message_sender.suppression = SuppressionList(Path(tempfile.mkdtemp()) / 'suppression.csv')
+            sent[id(events)] = messages
+            return bot
+
+        manager = JobManager(max_workers=2, bot_factory=factory)
+        csv_patch = patch.object(config, 'MESSAGES_LOG_FILE', tmp_path / 'messages_sent.csv')
+        csv_patch.start()
+        try:
+            first = manager.submit(csv_file.name, CampaignSettings('Promo A para {nombre}', delay=0))
+            second = manager.submit(csv_file.name, CampaignSettings('Promo B para {nombre}', delay=0))
+
+            deadline = time.monotonic() + 10
+            while not (first.is_finished and second.is_finished) and time.monotonic() < deadline:
+                time.sleep(0.02)
+
+            assert first.state == JobState.DONE and second.state == JobState.DONE
+            rendered = sorted(tuple(messages) for messages in sent.values())
+            assert rendered == [
+                ('Promo A para Juan', 'Promo A para María'),
+                ('Promo B para Juan', 'Promo B para María'),
+            ]
+            assert config.DEFAULT_MESSAGE_TEMPLATE == "Hola {nombre}, este es un mensaje automático."
+        finally:
+            manager.shutdown(wait=True)
+            csv_patch.stop()
+            os.unlink(csv_file.name)
+
+
+class FakeBot:
+    """Bot simulado: publica las fases y envía un mensaje por contacto sin navegador"""
+
+    def __init__(self, events):
+        self.events = events
+        self.contacts = []
+        self.phase = 'idle'
+        self.message_sender = Mock()
+        self.stats = SendingStats()
+        self.message_sender.get_stats.return_value = self.stats
+        self.release = threading.Event()
+        self.stopped = False
+        self.paused = False
+
+    def run(self, input_file, limit=None, delay=None, settings=None):
+        for phase in ('starting', 'authenticating', 'sending'):
+            self.phase = phase
+            self.events.publish('phase', {'phase': phase})
+        self.stats.total_contacts = 2
+        self.stats.messages_sent += 1
+        self.release.wait(5)
+        if self.stopped:
+            return False
+        self.stats.messages_sent += 1
+        return True
+
+    def stop(self):
+        self.stopped = True
+        self.release.set()
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+
+class TestJobManager:
+    """Tests para el módulo job_manager.py"""
+
+    def setup_method(self):
+        self.bots = []
+
+        def factory(events):
+            bot = FakeBot(events)
+            self.bots.append(bot)
+            return bot
+
+        self.manager = JobManager(max_workers=2, bot_factory=factory)
+
+    def teardown_method(self):
+        for bot in self.bots:
+            bot.release.set()
+        self.manager.shutdown(wait=True)
+
+    def wait_for_state(self, job, state, timeout=2):
+        deadline = time.monotonic() + timeout
+        while job.state != state and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert job.state == state
+
+    def test_concurrent_jobs_with_isolated_stats(self):
+        """Test varias campañas simultáneas con estadísticas independientes"""
+        first = self.manager.submit('a.csv')
+        second = self.manager.submit('b.csv')
+        third = self.manager.submit('c.csv')
+
+        self.wait_for_state(first, JobState.SENDING)
+        self.wait_for_state(second, JobState.SENDING)
+        # Solo hay dos hilos de trabajo: la tercera espera en la cola
+        assert third.state == JobState.QUEUED
+
+        self.bots[0].release.set()
+        self.wait_for_state(first, JobState.DONE)
+        assert first.get_stats()['messages_sent'] == 2
+        assert second.get_stats()['messages_sent'] == 1
+
+        self.wait_for_state(third, JobState.SENDING)
+
+    def test_pause_resume_and_cancel(self):
+        """Test pausa, reanudación y cancelación de una campaña"""
+        job = self.manager.submit('a.csv')
+        self.wait_for_state(job, JobState.SENDING)
+
+        self.manager.pause(job.id)
+        assert job.state == JobState.PAUSED and self.bots[0].paused
+        with pytest.raises(JobStateError):
+            self.manager.pause(job.id)
+
+        self.manager.resume(job.id)
+        assert job.state == JobState.SENDING and not self.bots[0].paused
+
+        self.manager.cancel(job.id)
+        self.wait_for_state(job, JobState.CANCELLED)
+        with pytest.raises(JobStateError):
+            self.manager.cancel(job.id)
+
+    def test_cancel_queued_job(self):
+        """Test cancelar una campaña que todavía está en la cola"""
+        self.manager.submit('a.csv')
+        self.manager.submit('b.csv')
+        queued = self.manager.submit('c.csv')
+
+        self.manager.cancel(queued.id)
+        assert queued.state == JobState.CANCELLED
+        for bot in self.bots:
+            bot.release.set()
+        time.sleep(0.1)
+        assert queued.state == JobState.CANCELLED
+        assert len(self.bots) == 2
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Stub de la API de mensajes: responde 429 al primer intento de cada número"""
+
+    lock = threading.Lock()
+    attempts = {}
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+            cls.attempts[body['to']] = cls.attempts.get(body['to'], 0) + 1
+            first_attempt = cls.attempts[body['to']] == 1
+        time.sleep(0.02)
+        with cls.lock:
+            cls.in_flight -= 1
+
+        if body['to'].endswith('0000'):
+            status = 400
+        elif first_attempt:
+            status = 429
+        else:
+            status = 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestApiSender:
+    """Tests para el módulo api_sender.py"""
+
+    def setup_method(self):
+        StubApiHandler.attempts = {}
+        StubApiHandler.in_flight = 0
+        StubApiHandler.max_in_flight = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubApiHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_token_bucket_reserves_in_order(self):
+        """Test que el token bucket respete la capacidad y la tasa"""
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.5)
+        assert bucket.reserve() == pytest.approx(1.0)
+        now[0] = 1.0
+        assert bucket.reserve() == pytest.approx(0.5)
+
+    @patch('logger.log_message_sent')
+    def test_send_with_retries_and_bounded_concurrency(self, mock_log_sent):
+        """Test envío concurrente con reintentos ante 429 y errores permanentes"""
+        contacts = [
+            {'nombre': f'Contacto {i}', 'telefono': f'54911234{i:05d}', 'mensaje': 'Hola {nombre}'}
+            for i in range(1, 21)
+        ]
+        contacts.append({'nombre': 'Rechazado', 'telefono': '5491100000000', 'mensaje': 'Hola'})
+        contacts.append({'nombre': 'Corto', 'telefono': '123', 'mensaje': 'Hola'})
+
+        sender = ApiMessageSender(base_url=self.base_url, concurrency=4,
+                                  rate_per_second=1000, burst=1000,
+                                  max_retries=2, backoff_base=0.01)
+        stats = sender.send_messages_to_contacts(contacts)
+
+        assert stats.messages_sent == 20
+        assert stats.messages_failed == 1
+        assert stats.messages_skipped == 1
+        assert StubApiHandler.max_in_flight <= 4
+        assert StubApiHandler.attempts['5491123400001'] == 2
+        assert StubApiHandler.attempts['5491100000000'] == 1
+
+        estados = [call.args[3] for call in mock_log_sent.call_args_list]
+        assert estados.count("ENVIADO") == 20
+        sent_messages = [call.args[2] for call in mock_log_sent.call_args_list if call.args[3] == "ENVIADO"]
+        assert "Hola Contacto 1" in sent_messages
+
+    def test_api_job_streams_job_progress(self, tmp_path):
+        """Test que una campaña por API emita resultados y progreso con ETA a su sala"""
+        import api_sender
+        contacts_file = tmp_path / 'contactos.csv'
+        contacts_file.write_text('nombre,telefono\nJuan,5491123456789\nAna,5491187654321\n'
+                                 'Rechazado,5491100000000\n', encoding='utf-8')
+        emitted = []
+        relay = ProgressRelay(lambda event, data, room: emitted.append((event, data, room)))
+        manager = JobManager(bot_factory=lambda events: WhatsAppBot(events=events))
+        manager.events.subscribe(
+            lambda event, data: relay.publish(data['job_id'], data['event'], data['data'])
+            if event == 'job_event' else None
+        )
+        sender = lambda **kwargs: ApiMessageSender(base_url=self.base_url, rate_per_second=1000, burst=1000,
+                                                   max_retries=2, backoff_base=0.01, **kwargs)
+
+        with patch.object(api_sender, 'ApiMessageSender', sender):
+            job = manager.submit(str(contacts_file), CampaignSettings(transport='api'))
+            deadline = time.monotonic() + 10
+            while not job.is_finished and time.monotonic() < deadline:
+                time.sleep(0.02)
+        manager.shutdown(wait=True)
+        relay.stop()
+        relay.flush()
+
+        assert job.state == JobState.DONE
+        batches = [data for event, data, room in emitted if event == 'job_progress' and room == job.id]
+        results = [result for batch in batches for result in batch['results']]
+        assert sorted(r['status'] for r in results) == ['ENVIADO', 'ENVIADO', 'ERROR']
+        progress = batches[-1]['progress']
+        assert progress['processed'] == progress['total'] == 3
+        assert progress['messages_sent'] == 2 and progress['eta_seconds'] == 0
+
+
 class TestIntegration:
     """Tests de integración"""
 
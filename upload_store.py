@@ -0,0 +1,427 @@
+"""
+Almacenamiento de archivos subidos direccionado por contenido (SHA-256)
+"""
+
+import json
+import os
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+import config
+import logger
+import utils
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo proceso web)
+    fcntl = None
+
+
+class BlobMissingError(Exception):
+    """
+    El contenido de un archivo ya no está en el almacén (se reemplazó o se eliminó).
+    """
+
+
+@dataclass
+class StoredUpload:
+    """
+    Un nombre de archivo y el contenido (blob) al que apunta.
+    """
+    name: str
+    sha256: str
+    path: str
+    size: int
+    uploaded_at: float
+    duplicate: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class UploadStore:
+    """
+    Guarda cada archivo subido una sola vez, con su hash como nombre.
+
+    Los nombres que ve el usuario se mapean a hashes en index.json. Subir
+    otro contenido con el mismo nombre solo cambia el mapeo: el blob
+    anterior no se modifica, así que una campaña que lo está leyendo no se
+    ve afectada. Los blobs son de solo lectura y los que usan campañas
+    activas (pin) no se borran aunque ningún nombre los referencie.
+
+    Los resultados de procesar un contenido (conteos, validación, índice de
+    contactos) se guardan por hash y se reutilizan para cualquier nombre
+    con ese contenido.
+
+    Varios procesos pueden compartir el almacén: el índice se relee cuando
+    otro proceso lo modifica, los cambios se serializan con un lock de
+    archivo y los pins son archivos en pins/.
+    """
+
+    def __init__(self, root: Union[str, Path] = None):
+        self.root = Path(root or config.UPLOAD_STORE_DIR)
+        self.blobs_dir = self.root / "blobs"
+        self.parsed_dir = self.root / "parsed"
+        self.contacts_dir = self.root / "contacts"
+        self.columnar_dir = self.root / "columnar"  # Caché de ContactCache
+        self.pins_dir = self.root / "pins"
+        self.index_file = self.root / "index.json"
+        self._lock = threading.RLock()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index_mtime = None
+        self._parsed: Dict[str, tuple] = {}
+
+    def add(self, temp_path: Union[str, Path], name: str, sha256: Optional[str] = None) -> StoredUpload:
+        """
+        Incorpora un archivo ya escrito en disco bajo un nombre.
+
+        Si el contenido ya existe, el archivo temporal se descarta.
+
+        Args:
+            temp_path (Union[str, Path]): Archivo recibido (se mueve o se borra)
+            name (str): Nombre visible del archivo
+            sha256 (Optional[str]): Hash del contenido si ya se calculó
+
+        Returns:
+            StoredUpload: Archivo almacenado (duplicate=True si el contenido ya existía)
+        """
+        temp_path = Path(temp_path)
+        sha256 = sha256 or utils.file_sha256(temp_path)
+        blob = self._blob_path(sha256, name)
+
+        with self._locked():
+            duplicate = blob.exists()
+            if duplicate:
+                temp_path.unlink()
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, blob)
+                os.chmod(blob, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+            index = self._load_index()
+            previous = index.get(name, {}).get('sha256')
+            entry = index[name] = {
+                'sha256': sha256,
+                'path': str(blob),
+                'size': blob.stat().st_size,
+                'uploaded_at': time.time()
+            }
+            self._save_index()
+            if previous and previous != sha256:
+                logger.log_info(f"Archivo {name} reemplazado: {previous[:12]} -> {sha256[:12]}")
+                self._collect(previous)
+
+            return StoredUpload(name=name, duplicate=duplicate, **entry)
+
+    def resolve(self, name: str) -> Optional[StoredUpload]:
+        """
+        Busca el archivo al que apunta un nombre.
+
+        Args:
+            name (str): Nombre visible del archivo
+
+        Returns:
+            Optional[StoredUpload]: Archivo almacenado o None si no existe
+        """
+        with self._lock:
+            entry = self._load_index().get(name)
+            if entry is None:
+                return None
+            return StoredUpload(name=name, **entry)
+
+    def list(self) -> List[StoredUpload]:
+        """
+        Lista los archivos almacenados.
+
+        Returns:
+            List[StoredUpload]: Archivos ordenados por nombre
+        """
+        with self._lock:
+            return [StoredUpload(name=name, **entry) for name, entry in sorted(self._load_index().items())]
+
+    def remove(self, name: str) -> bool:
+        """
+        Elimina un nombre; el blob se borra si nadie más lo usa.
+
+        Args:
+            name (str): Nombre visible del archivo
+
+        Returns:
+            bool: True si el nombre existía
+        """
+        with self._locked():
+            entry = self._load_index().pop(name, None)
+            if entry is None:
+                return False
+            self._save_index()
+            self._collect(entry['sha256'])
+            return True
+
+    def resolve_and_pin(self, name: str, owner: str) -> Optional[StoredUpload]:
+        """
+        Busca el archivo al que apunta un nombre y lo protege en un solo paso,
+        para que un reemplazo o un borrado en el medio no lo elimine.
+
+        Args:
+            name (str): Nombre visible del archivo
+            owner (str): Quién lo usa (ID de la campaña o un token provisorio)
+
+        Returns:
+            Optional[StoredUpload]: Archivo almacenado y protegido, o None si el nombre no existe
+
+        Raises:
+            BlobMissingError: Si el nombre apunta a un contenido que ya no está
+        """
+        with self._locked():
+            stored = self.resolve(name)
+            if stored is not None:
+                self._pin(stored.sha256, owner)
+            return stored
+
+    def pin(self, sha256: str, owner: str):
+        """
+        Protege un blob mientras lo usa una campaña.
+
+        Args:
+            sha256 (str): Hash del contenido
+            owner (str): Quién lo usa (ID de la campaña)
+
+        Raises:
+            BlobMissingError: Si el blob ya se borró
+        """
+        with self._locked():
+            self._pin(sha256, owner)
+
+    def unpin(self, sha256: str, owner: str):
+        """
+        Libera un blob protegido; si ya no tiene nombre, se borra.
+
+        Args:
+            sha256 (str): Hash del contenido
+            owner (str): Quién lo usaba
+        """
+        with self._locked():
+            pin = self._pin_path(sha256, owner)
+            if not pin.exists():
+                return
+            pin.unlink()
+            self._collect(sha256)
+
+    def sweep_pins(self, active_owners: Set[str], grace: float = config.UPLOAD_PIN_GRACE) -> int:
+        """
+        Libera los pins que nadie va a liberar: los de campañas que ya no
+        corren en ningún worker (el proceso se detuvo o se reinició a mitad de
+        la campaña) y los tokens provisorios de pedidos interrumpidos. Los
+        blobs que quedan sin nombre ni pins se borran.
+
+        Los pins más nuevos que grace se conservan aunque su dueño no figure
+        entre los activos: pueden ser de una campaña recién creada.
+
+        Args:
+            active_owners (Set[str]): Campañas activas en algún worker
+            grace (float): Antigüedad mínima (segundos) de un pin para liberarlo
+
+        Returns:
+            int: Pins liberados
+        """
+        cutoff = time.time() - grace
+        released = []
+        with self._locked():
+            for pin in self.pins_dir.glob('*.*'):
+                sha256, _, owner = pin.name.partition('.')
+                if owner in active_owners:
+                    continue
+                try:
+                    if pin.stat().st_mtime > cutoff:
+                        continue
+                    pin.unlink()
+                except FileNotFoundError:
+                    continue
+                released.append(sha256)
+            for sha256 in set(released):
+                self._collect(sha256)
+        if released:
+            logger.log_warning(f"Liberados {len(released)} archivos protegidos por campañas que ya no corren")
+        return len(released)
+
+    def is_pinned(self, sha256: str) -> bool:
+        return any(self.pins_dir.glob(f"{sha256}.*"))
+
+    def hash_of(self, path: Union[str, Path]) -> Optional[str]:
+        """
+        Obtiene el hash de un blob a partir de su ruta.
+
+        Args:
+            path (Union[str, Path]): Ruta de un blob del almacén
+
+        Returns:
+            Optional[str]: Hash, o None si la ruta no es un blob
+        """
+        path = Path(path).resolve()
+        if path.parent.parent != self.blobs_dir.resolve():
+            return None
+        return path.stem
+
+    def index_path(self, sha256: str) -> Path:
+        """
+        Ruta del índice de contactos (SQLite) de un contenido.
+
+        Args:
+            sha256 (str): Hash del contenido
+
+        Returns:
+            Path: Ruta del índice (puede no existir todavía)
+        """
+        return self.contacts_dir / f"{sha256}.sqlite"
+
+    def get_cached(self, sha256: str, key: str) -> Optional[Any]:
+        """
+        Obtiene un resultado guardado para un contenido.
+
+        Args:
+            sha256 (str): Hash del contenido
+            key (str): Tipo de resultado (por ejemplo 'upload' o 'validation')
+
+        Returns:
+            Optional[Any]: Resultado o None si no existe
+        """
+        with self._lock:
+            return self._load_parsed(sha256).get(key)
+
+    def set_cached(self, sha256: str, key: str, value: Any):
+        """
+        Guarda un resultado para un contenido.
+
+        Args:
+            sha256 (str): Hash del contenido
+            key (str): Tipo de resultado
+            value (Any): Resultado serializable a JSON
+        """
+        with self._locked():
+            parsed = self._load_parsed(sha256)
+            parsed[key] = value
+            self.parsed_dir.mkdir(parents=True, exist_ok=True)
+            path = self.parsed_dir / f"{sha256}.json"
+            self._write_json(path, parsed)
+            self._parsed[sha256] = (_file_version(path), parsed)
+
+    def cached(self, sha256: str, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Obtiene un resultado guardado o lo calcula y lo guarda.
+
+        Args:
+            sha256 (str): Hash del contenido
+            key (str): Tipo de resultado
+            compute (Callable[[], Any]): Función que calcula el resultado
+
+        Returns:
+            Any: Resultado
+        """
+        value = self.get_cached(sha256, key)
+        if value is None:
+            value = compute()
+            self.set_cached(sha256, key, value)
+        return value
+
+    def _blob_path(self, sha256: str, name: str) -> Path:
+        # La extensión se conserva porque DataManager elige el lector por ella
+        extension = utils.get_file_extension(name)
+        return self.blobs_dir / sha256[:2] / f"{sha256}.{extension}"
+
+    def _pin_path(self, sha256: str, owner: str) -> Path:
+        return self.pins_dir / f"{sha256}.{owner}"
+
+    def _pin(self, sha256: str, owner: str):
+        # Con el almacén bloqueado: el blob no puede borrarse entre la verificación y el pin
+        if not any(self.blobs_dir.glob(f"{sha256[:2]}/{sha256}.*")):
+            raise BlobMissingError(f"El contenido {sha256[:12]} ya no está disponible")
+        self.pins_dir.mkdir(parents=True, exist_ok=True)
+        self._pin_path(sha256, owner).touch()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Bloquea el almacén para este hilo y, si se puede, para los demás procesos.
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / ".lock", 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _collect(self, sha256: str):
+        """
+        Borra un blob y sus resultados si no tiene nombres ni campañas que lo usen.
+        """
+        if self.is_pinned(sha256):
+            return
+        if any(entry['sha256'] == sha256 for entry in self._load_index().values()):
+            return
+
+        for blob in self.blobs_dir.glob(f"{sha256[:2]}/{sha256}.*"):
+            os.chmod(blob, stat.S_IWUSR | stat.S_IRUSR)
+            blob.unlink()
+        (self.parsed_dir / f"{sha256}.json").unlink(missing_ok=True)
+        self.index_path(sha256).unlink(missing_ok=True)
+        for cached in self.columnar_dir.glob(f"{sha256}.*"):
+            cached.unlink()
+        self._parsed.pop(sha256, None)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        # Se relee si otro proceso lo reescribió (cada escritura crea un archivo nuevo)
+        mtime = _file_version(self.index_file)
+        if self._index is None or mtime != self._index_mtime:
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {}
+            self._index_mtime = mtime
+        return self._index
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._write_json(self.index_file, self._index)
+        self._index_mtime = _file_version(self.index_file)
+
+    def _load_parsed(self, sha256: str) -> Dict[str, Any]:
+        path = self.parsed_dir / f"{sha256}.json"
+        version = _file_version(path)
+        cached = self._parsed.get(sha256)
+        if cached is None or cached[0] != version:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    cached = (version, json.load(f))
+            except FileNotFoundError:
+                cached = (None, {})
+            self._parsed[sha256] = cached
+        return cached[1]
+
+    @staticmethod
+    def _write_json(path: Path, data: Any):
+        # Escritura atómica: nunca queda un JSON a medio escribir
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+
+def _file_version(path: Path) -> Optional[tuple]:
+    """
+    Identifica una versión de un archivo escrito con reemplazo atómico.
+    """
+    try:
+        info = path.stat()
+    except FileNotFoundError:
+        return None
+    return (info.st_ino, info.st_mtime_ns, info.st_size)
@@ -0,0 +1,327 @@
+"""
+Recepción de archivos de contactos procesándolos mientras llegan
+"""
+
+import csv
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union, IO
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+from werkzeug.utils import secure_filename
+
+import config
+import utils
+from data_manager import DataManager
+
+
+class UploadError(ValueError):
+    """
+    La subida no se pudo procesar (formato, tipo de archivo o columnas).
+    """
+
+
+@dataclass
+class UploadResult:
+    """
+    Resultado de recibir un archivo de contactos.
+
+    Los conteos son exactos para CSV (se calculan sobre todo el archivo
+    mientras se recibe) y estimados para Excel, que solo puede leerse una
+    vez completo. La validación completa la hace una tarea en segundo plano.
+    """
+    filename: str
+    filepath: str
+    size: int = 0
+    total_rows: Optional[int] = None
+    contact_count: Optional[int] = None
+    invalid_rows: Optional[int] = None
+    preview: List[Dict] = field(default_factory=list)
+    counts_exact: bool = False
+    sha256: Optional[str] = None
+    duplicate: bool = False
+
+    def to_dict(self) -> Dict:
+        return {
+            'filename': self.filename,
+            'filepath': self.filepath,
+            'sha256': self.sha256,
+            'duplicate': self.duplicate,
+            'size': self.size,
+            'total_rows': self.total_rows,
+            'contact_count': self.contact_count,
+            'invalid_rows': self.invalid_rows,
+            'preview': self.preview,
+            'counts_exact': self.counts_exact
+        }
+
+
+class CsvStreamParser:
+    """
+    Cuenta y previsualiza los contactos de un CSV a medida que llegan los bytes.
+
+    Las filas se cortan por saltos de línea, uniendo las líneas de un campo
+    entre comillas que contiene saltos. Cada línea se decodifica como UTF-8
+    y, si falla, como latin-1 (igual que DataManager).
+    """
+
+    def __init__(self, preview_size: int = config.UPLOAD_PREVIEW_SIZE,
+                 message_template: str = config.DEFAULT_MESSAGE_TEMPLATE):
+        self.preview_size = preview_size
+        self.message_template = message_template
+        self.header: Optional[List[str]] = None
+        self.total_rows = 0
+        self.valid_rows = 0
+        self.preview: List[Dict] = []
+        self._buffer = b""
+        self._record = ""
+        self._data_manager = DataManager()
+
+    def feed(self, data: bytes):
+        """
+        Procesa un fragmento del archivo.
+
+        Args:
+            data (bytes): Bytes recibidos
+
+        Raises:
+            UploadError: Si el encabezado no tiene las columnas requeridas
+        """
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            self._feed_line(line)
+
+    def close(self):
+        """
+        Procesa la última línea (sin salto de línea final).
+        """
+        if self._buffer:
+            self._feed_line(self._buffer)
+            self._buffer = b""
+        if self._record:
+            self._parse_record(self._record)
+            self._record = ""
+
+    @property
+    def invalid_rows(self) -> int:
+        return self.total_rows - self.valid_rows
+
+    def _feed_line(self, line: bytes):
+        try:
+            text = line.decode('utf-8')
+        except UnicodeDecodeError:
+            text = line.decode('latin-1')
+
+        self._record += text.rstrip("\r") + "\n"
+        # Un número impar de comillas indica un campo que sigue en la línea siguiente
+        if self._record.count('"') % 2 == 0:
+            record, self._record = self._record, ""
+            self._parse_record(record)
+
+    def _parse_record(self, record: str):
+        if not record.strip():
+            return
+        values = next(csv.reader([record.rstrip("\r\n")]), [])
+
+        if self.header is None:
+            self.header = [value.lstrip('\ufeff').strip() for value in values]
+            missing = [col for col in config.CSV_REQUIRED_COLUMNS if col not in self.header]
+            if missing:
+                raise UploadError(f"Faltan columnas requeridas: {missing}")
+            return
+
+        self.total_rows += 1
+        row = dict(zip(self.header, values))
+        nombre = row.get('nombre', '').strip()
+        if not nombre or nombre.lower() in ('nan', 'none') or not utils.format_phone_number(row.get('telefono', '').strip()):
+            return
+
+        self.valid_rows += 1
+        if len(self.preview) < self.preview_size:
+            import pandas as pd
+
+            contact = self._data_manager._process_contact_row(
+                pd.Series({k: (v if v != '' else None) for k, v in row.items()}),
+                self.total_rows - 1, self.message_template
+            )
+            if contact:
+                self.preview.append(contact)
+
+
+def preview_excel(filepath: Union[str, Path],
+                  preview_size: int = config.UPLOAD_PREVIEW_SIZE) -> UploadResult:
+    """
+    Lee solo las primeras filas de un Excel (.xlsx) y estima la cantidad de filas.
+
+    Args:
+        filepath (Union[str, Path]): Ruta al archivo
+        preview_size (int): Contactos a incluir en la vista previa
+
+    Returns:
+        UploadResult: Resultado con conteos estimados
+    """
+    import openpyxl
+    import pandas as pd
+
+    path = Path(filepath)
+    result = UploadResult(filename=path.name, filepath=str(path), size=path.stat().st_size)
+    if utils.get_file_extension(path) != 'xlsx':
+        return result
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+        missing = [col for col in config.CSV_REQUIRED_COLUMNS if col not in header]
+        if missing:
+            raise UploadError(f"Faltan columnas requeridas: {missing}")
+
+        data_manager = DataManager()
+        for index, values in enumerate(rows):
+            if len(result.preview) >= preview_size:
+                break
+            contact = data_manager._process_contact_row(pd.Series(dict(zip(header, values))), index)
+            if contact:
+                result.preview.append(contact)
+
+        if sheet.max_row:
+            result.total_rows = sheet.max_row - 1
+    finally:
+        workbook.close()
+
+    return result
+
+
+def receive_upload(stream: IO[bytes], content_type: str, upload_dir: Union[str, Path],
+                   allowed_file: Callable[[str], bool],
+                   chunk_size: int = config.UPLOAD_CHUNK_SIZE,
+                   store=None) -> UploadResult:
+    """
+    Recibe un multipart/form-data con el campo "file" escribiéndolo a disco
+    y contando los contactos de un CSV mientras llega.
+
+    El archivo se escribe con un nombre temporal y se renombra al terminar,
+    así una campaña que lee un archivo con el mismo nombre nunca ve una
+    copia a medio escribir. Con un UploadStore el archivo se guarda por el
+    hash de su contenido (calculado mientras llega) y, si ese contenido ya
+    se había subido, se reutilizan los conteos guardados.
+
+    Args:
+        stream (IO[bytes]): Cuerpo de la petición (request.stream)
+        content_type (str): Cabecera Content-Type de la petición
+        upload_dir (Union[str, Path]): Carpeta destino
+        allowed_file (Callable[[str], bool]): Filtro de nombres de archivo permitidos
+        chunk_size (int): Bytes leídos por iteración
+        store (Optional[UploadStore]): Almacén por contenido (si no, se guarda en upload_dir)
+
+    Returns:
+        UploadResult: Archivo guardado, conteos y vista previa
+
+    Raises:
+        UploadError: Si la petición o el archivo no son válidos
+    """
+    mimetype, options = parse_options_header(content_type or '')
+    boundary = options.get('boundary')
+    if mimetype != 'multipart/form-data' or not boundary:
+        raise UploadError('No se seleccionó archivo')
+
+    decoder = MultipartDecoder(boundary.encode('latin-1'))
+    upload_dir = Path(upload_dir)
+    result = None
+    parser = None
+    digest = hashlib.sha256()
+    output = None
+    temp_path = None
+    receiving = False
+
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, File) and event.name == 'file' and result is None:
+                    filename = secure_filename(event.filename or '')
+                    if not filename:
+                        raise UploadError('No se seleccionó archivo')
+                    if not allowed_file(filename):
+                        raise UploadError('Tipo de archivo no permitido')
+
+                    result = UploadResult(filename=filename, filepath=str(upload_dir / filename))
+                    if utils.get_file_extension(filename) == 'csv':
+                        parser = CsvStreamParser()
+                    temp_dir = store.root if store is not None else upload_dir
+                    temp_dir.mkdir(parents=True, exist_ok=True)
+                    temp_path = temp_dir / f".{filename}.{uuid.uuid4().hex[:8]}.part"
+                    output = open(temp_path, 'wb')
+                    receiving = True
+
+                elif isinstance(event, (File, Field)):
+                    receiving = False
+
+                elif isinstance(event, Data) and receiving:
+                    output.write(event.data)
+                    digest.update(event.data)
+                    result.size += len(event.data)
+                    if parser:
+                        parser.feed(event.data)
+                    if not event.more_data:
+                        receiving = False
+
+                event = decoder.next_event()
+
+            if isinstance(event, Epilogue) or not chunk:
+                break
+
+        if result is None:
+            raise UploadError('No se seleccionó archivo')
+
+        output.close()
+        result.sha256 = digest.hexdigest()
+        if store is not None:
+            stored = store.add(temp_path, result.filename, result.sha256)
+            result.filepath = stored.path
+            result.duplicate = stored.duplicate
+        else:
+            os.replace(temp_path, result.filepath)
+        temp_path = None
+
+    finally:
+        if output is not None and not output.closed:
+            output.close()
+        if temp_path is not None and temp_path.exists():
+            temp_path.unlink()
+
+    cached = store.get_cached(result.sha256, 'upload') if store is not None else None
+    if cached:
+        for key in ('total_rows', 'contact_count', 'invalid_rows', 'preview', 'counts_exact'):
+            setattr(result, key, cached[key])
+    elif parser:
+        parser.close()
+        result.total_rows = parser.total_rows
+        result.contact_count = parser.valid_rows
+        result.invalid_rows = parser.invalid_rows
+        result.preview = parser.preview
+        result.counts_exact = True
+    else:
+        excel = preview_excel(result.filepath)
+        result.total_rows = excel.total_rows
+        result.preview = excel.preview
+
+    if store is not None and not cached:
+        store.set_cached(result.sha256, 'upload', {
+            'total_rows': result.total_rows,
+            'contact_count': result.contact_count,
+            'invalid_rows': result.invalid_rows,
+            'preview': result.preview,
+            'counts_exact': result.counts_exact
+        })
+
+    return result
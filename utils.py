@@ -4,6 +4,7 @@ Funciones auxiliares para el bot de WhatsApp
 
 import re
 import os
+import hashlib
 import unicodedata
 from datetime import datetime
 from pathlib import Path
@@ -143,6 +144,24 @@ def get_file_extension(file_path: Union[str, Path]) -> str:
     return Path(file_path).suffix.lower().lstrip('.')
 
 
+def file_sha256(file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """
+    Calcula el hash SHA-256 del contenido de un archivo.
+
+    Args:
+        file_path (Union[str, Path]): Ruta del archivo
+        chunk_size (int): Bytes leídos por iteración
+
+    Returns:
+        str: Hash en hexadecimal
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def format_message(template: str, contact_data: dict) -> str:
     """
     Formatea un mensaje usando los datos del contacto.
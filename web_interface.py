@@ -3,23 +3,27 @@
 Interfaz web para el bot de WhatsApp usando Flask
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 import os
 import json
 import threading
-import time
+import uuid
 from pathlib import Path
 import queue
 
 # Importar módulos del bot
+import api_response
 import config
 import logger
 from data_manager import DataManager
+from log_buffer import LogBuffer
+from upload_stream import receive_upload, UploadError
 from whatsapp_client import WhatsAppClient
 from message_sender import MessageSender
 
 app = Flask(__name__)
 app.secret_key = 'whatsapp_bot_secret_key_2024'
+api_response.init_app(app)
 
 # Variables globales para el estado del bot
 bot_state = {
@@ -30,13 +34,42 @@ bot_state = {
     'messages_sent': 0,
     'messages_total': 0,
     'progress': 0,
-    'status': 'Listo',
-    'log_messages': []
+    'status': 'Listo'
 }
 
+# Últimos mensajes del log web, con número de secuencia para pedir solo los nuevos
+log_buffer = LogBuffer(config.WEB_LOG_MAX_MESSAGES)
+
 # Queue para comunicación entre threads
 message_queue = queue.Queue()
 
+# Sincronización del estado: cada cambio incrementa la versión y despierta
+# a los clientes conectados a /api/events
+state_changed = threading.Condition()
+state_version = 0
+server_id = uuid.uuid4().hex[:8]  # Distingue los ETags entre reinicios del servidor
+
+# Segundos sin cambios tras los que se envía un keep-alive por el stream
+STREAM_KEEPALIVE_SECONDS = 15
+
+def update_state(**changes):
+    """Actualiza bot_state y notifica a los clientes si algo cambió"""
+    global state_version
+    with state_changed:
+        changed = {key: value for key, value in changes.items() if bot_state.get(key) != value}
+        if not changed:
+            return
+        bot_state.update(changed)
+        state_version += 1
+        state_changed.notify_all()
+
+def _notify_log_change():
+    """Avisa a los clientes que cambió el log"""
+    global state_version
+    with state_changed:
+        state_version += 1
+        state_changed.notify_all()
+
 # Instancias del bot
 data_manager = None
 whatsapp_client = None
@@ -45,8 +78,6 @@ bot_thread = None
 
 def log_to_web(message, level="INFO"):
     """Agrega un mensaje al log web"""
-    timestamp = time.strftime("%H:%M:%S")
-    
     # Agregar emoji según el nivel
     if level == "ERROR":
         icon = "❌"
@@ -61,79 +92,78 @@ def log_to_web(message, level="INFO"):
         icon = "ℹ️"
         css_class = "info"
     
-    log_entry = {
-        'timestamp': timestamp,
-        'icon': icon,
-        'message': message,
-        'level': level,
-        'css_class': css_class
-    }
-    
-    bot_state['log_messages'].append(log_entry)
-    
-    # Mantener solo los últimos 100 mensajes
-    if len(bot_state['log_messages']) > 100:
-        bot_state['log_messages'] = bot_state['log_messages'][-100:]
+    log_buffer.append(message, level, icon=icon, css_class=css_class)
+    _notify_log_change()
 
 @app.route('/')
 def index():
     """Página principal"""
-    return render_template('index.html', state=bot_state)
+    return render_template('index.html', state=dict(bot_state, log_messages=log_buffer.entries()))
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Maneja la subida de archivos"""
     try:
-        if 'file' not in request.files:
-            return jsonify({'success': False, 'error': 'No se seleccionó archivo'})
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'success': False, 'error': 'No se seleccionó archivo'})
-        
         # Verificar extensión
         allowed_extensions = {'.csv', '.xlsx', '.xls'}
-        file_ext = Path(file.filename).suffix.lower()
-        
-        if file_ext not in allowed_extensions:
-            return jsonify({'success': False, 'error': 'Formato no soportado. Use CSV o Excel'})
-        
-        # Guardar archivo temporalmente
         upload_dir = Path('uploads')
         upload_dir.mkdir(exist_ok=True)
         
-        file_path = upload_dir / file.filename
-        file.save(str(file_path))
+        # Recibir el archivo contando los contactos mientras llega
+        try:
+            upload = receive_upload(
+                request.stream, request.content_type, upload_dir,
+                lambda name: Path(name).suffix.lower() in allowed_extensions
+            )
+        except UploadError as e:
+            return jsonify({'success': False, 'error': str(e)})
         
-        # Cargar y validar contactos
-        global data_manager
-        data_manager = DataManager()
-        contacts = data_manager.load_contacts(str(file_path))
-        stats = data_manager.validate_contacts()
+        update_state(contacts_valid=0, status='Validando archivo...')
+        log_to_web(f"Archivo recibido: {upload.filename}", "INFO")
         
-        # Actualizar estado
-        bot_state['contacts_loaded'] = stats['total']
-        bot_state['contacts_valid'] = stats['valid']
-        bot_state['status'] = f"Archivo cargado: {stats['valid']} contactos válidos"
-        
-        log_to_web(f"Archivo cargado: {file.filename}", "SUCCESS")
-        log_to_web(f"Contactos válidos: {stats['valid']}/{stats['total']}", "INFO")
-        
-        # Limpiar archivo temporal
-        os.unlink(file_path)
+        # La carga completa continúa en segundo plano y se informa por /api/events
+        threading.Thread(target=load_uploaded_file, args=(upload,), daemon=True).start()
         
         return jsonify({
             'success': True,
-            'filename': file.filename,
-            'total': stats['total'],
-            'valid': stats['valid'],
-            'invalid': stats['total'] - stats['valid']
+            'filename': upload.filename,
+            'total': upload.total_rows,
+            'valid': upload.contact_count,
+            'invalid': upload.invalid_rows,
+            'preview': upload.preview
         })
         
     except Exception as e:
         log_to_web(f"Error cargando archivo: {e}", "ERROR")
         return jsonify({'success': False, 'error': str(e)})
 
+def load_uploaded_file(upload):
+    """Carga y valida por completo un archivo recibido"""
+    global data_manager
+    try:
+        manager = DataManager()
+        manager.load_contacts(upload.filepath)
+        stats = manager.validate_contacts()
+        data_manager = manager
+        
+        # Actualizar estado
+        update_state(
+            contacts_loaded=stats['total'],
+            contacts_valid=stats['valid'],
+            status=f"Archivo cargado: {stats['valid']} contactos válidos"
+        )
+        
+        log_to_web(f"Archivo cargado: {upload.filename}", "SUCCESS")
+        log_to_web(f"Contactos válidos: {stats['valid']}/{stats['total']}", "INFO")
+        
+    except Exception as e:
+        update_state(status='Error cargando archivo')
+        log_to_web(f"Error cargando archivo: {e}", "ERROR")
+    
+    finally:
+        # Limpiar archivo temporal
+        os.unlink(upload.filepath)
+
 @app.route('/api/start', methods=['POST'])
 def start_bot():
     """Inicia el bot"""
@@ -159,9 +189,7 @@ def start_bot():
             return jsonify({'success': False, 'error': 'Delay debe estar entre 5 y 300 segundos'})
         
         # Iniciar bot en thread separado
-        bot_state['is_running'] = True
-        bot_state['current_step'] = 'starting'
-        bot_state['status'] = 'Iniciando bot...'
+        update_state(is_running=True, current_step='starting', status='Iniciando bot...')
         
         bot_thread = threading.Thread(
             target=run_bot_thread,
@@ -175,7 +203,7 @@ def start_bot():
         return jsonify({'success': True})
         
     except Exception as e:
-        bot_state['is_running'] = False
+        update_state(is_running=False)
         log_to_web(f"Error iniciando bot: {e}", "ERROR")
         return jsonify({'success': False, 'error': str(e)})
 
@@ -196,9 +224,7 @@ def stop_bot():
         if whatsapp_client:
             whatsapp_client.close_browser()
         
-        bot_state['is_running'] = False
-        bot_state['current_step'] = 'stopped'
-        bot_state['status'] = 'Detenido por el usuario'
+        update_state(is_running=False, current_step='stopped', status='Detenido por el usuario')
         
         log_to_web("Bot detenido", "WARNING")
         
@@ -208,15 +234,97 @@ def stop_bot():
         log_to_web(f"Error deteniendo bot: {e}", "ERROR")
         return jsonify({'success': False, 'error': str(e)})
 
+def _since_arg():
+    """Cursor del log recibido en ?since= (0 si falta o es inválido)"""
+    try:
+        return max(0, int(request.args.get('since', 0)))
+    except ValueError:
+        return 0
+
 @app.route('/api/status')
 def get_status():
-    """Obtiene el estado actual del bot"""
-    return jsonify(bot_state)
+    """
+    Obtiene el estado actual del bot (304 si no cambió desde If-None-Match).
+
+    Con ?since=<cursor> solo incluye los mensajes de log posteriores.
+    """
+    with state_changed:
+        etag = f"{server_id}-{state_version}"
+        body = json.dumps(dict(bot_state, **log_buffer.to_dict(_since_arg())))
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/logs')
+def get_logs():
+    """Obtiene los mensajes de log posteriores a ?since=<cursor>"""
+    return jsonify(dict(log_buffer.to_dict(_since_arg()), success=True))
+
+@app.route('/api/events')
+def stream_events():
+    """
+    Stream de cambios del estado (Server-Sent Events).
+
+    El primer evento trae el estado completo; los siguientes solo los campos
+    que cambiaron y los mensajes de log nuevos. El id de cada evento es el
+    cursor del log, así que al reconectar (Last-Event-ID o ?since=) no se
+    reenvían mensajes ya recibidos.
+    """
+    try:
+        cursor = int(request.headers.get('Last-Event-ID') or request.args.get('since') or 0)
+    except ValueError:
+        cursor = 0
+
+    return Response(
+        stream_with_context(_state_diffs(cursor)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _state_diffs(cursor, keepalive=STREAM_KEEPALIVE_SECONDS):
+    """Genera los eventos SSE con las diferencias de estado para un cliente"""
+    sent_state = {}
+    version = None
+    generation = log_buffer.generation
+
+    while True:
+        with state_changed:
+            if version == state_version:
+                state_changed.wait(keepalive)
+
+            if version == state_version:
+                payload = None
+            else:
+                version = state_version
+                current = dict(bot_state)
+                payload = {k: v for k, v in current.items() if k not in sent_state or sent_state[k] != v}
+                sent_state = current
+
+                # Si se limpió el log o el cursor es de otra ejecución, se reenvía completo
+                if generation != log_buffer.generation or cursor > log_buffer.last_seq:
+                    payload['log_reset'] = True
+                    generation = log_buffer.generation
+                    cursor = 0
+                logs = log_buffer.to_dict(cursor)
+                if logs['log_messages']:
+                    payload['log_messages'] = logs['log_messages']
+                cursor = logs['log_cursor']
+
+        if payload is None:
+            yield ": keep-alive\n\n"
+        elif payload:
+            yield f"id: {cursor}\ndata: {json.dumps(payload)}\n\n"
 
 @app.route('/api/clear_log', methods=['POST'])
 def clear_log():
     """Limpia el log"""
-    bot_state['log_messages'] = []
+    log_buffer.clear()
+    _notify_log_change()
     return jsonify({'success': True})
 
 def run_bot_thread(limit, delay):
@@ -225,8 +333,7 @@ def run_bot_thread(limit, delay):
     
     try:
         log_to_web("🚀 Iniciando bot de WhatsApp...")
-        bot_state['current_step'] = 'browser'
-        bot_state['status'] = 'Iniciando navegador...'
+        update_state(current_step='browser', status='Iniciando navegador...')
         
         # Crear cliente de WhatsApp
         whatsapp_client = WhatsAppClient()
@@ -237,8 +344,7 @@ def run_bot_thread(limit, delay):
             raise Exception("Error iniciando navegador")
         
         log_to_web("✅ Navegador iniciado")
-        bot_state['current_step'] = 'qr'
-        bot_state['status'] = 'Esperando código QR...'
+        update_state(current_step='qr', status='Esperando código QR...')
         
         # Esperar escaneo QR
         log_to_web("📱 Esperando escaneo de código QR...")
@@ -246,30 +352,30 @@ def run_bot_thread(limit, delay):
             raise Exception("Timeout esperando código QR")
         
         log_to_web("✅ Código QR escaneado")
-        bot_state['current_step'] = 'sending'
-        bot_state['status'] = 'Enviando mensajes...'
+        update_state(current_step='sending', status='Enviando mensajes...')
         
         # Enviar mensajes
         message_sender = MessageSender(whatsapp_client, progress_callback=update_progress)
         contacts_to_send = data_manager.filter_contacts(limit)
         
-        bot_state['messages_total'] = len(contacts_to_send)
+        update_state(messages_total=len(contacts_to_send))
         
         stats = message_sender.send_messages_to_contacts(
             contacts_to_send, limit, delay
         )
         
         # Mostrar resultados
-        bot_state['messages_sent'] = stats.messages_sent
-        bot_state['progress'] = 100
-        bot_state['current_step'] = 'completed'
-        bot_state['status'] = f"Completado: {stats.messages_sent}/{stats.total_contacts} enviados"
+        update_state(
+            messages_sent=stats.messages_sent,
+            progress=100,
+            current_step='completed',
+            status=f"Completado: {stats.messages_sent}/{stats.total_contacts} enviados"
+        )
         
         log_to_web(f"✅ Envío completado: {stats.messages_sent}/{stats.total_contacts}", "SUCCESS")
         
     except Exception as e:
-        bot_state['current_step'] = 'error'
-        bot_state['status'] = f"Error: {str(e)}"
+        update_state(current_step='error', status=f"Error: {str(e)}")
         log_to_web(f"❌ Error: {e}", "ERROR")
     
     finally:
@@ -277,14 +383,17 @@ def run_bot_thread(limit, delay):
         if whatsapp_client:
             whatsapp_client.close_browser()
         
-        bot_state['is_running'] = False
+        update_state(is_running=False)
 
 def update_progress(current, total):
     """Callback para actualizar progreso"""
     if total > 0:
-        bot_state['progress'] = (current / total) * 100
-        bot_state['messages_sent'] = current
-        bot_state['status'] = f"Enviando: {current}/{total} ({bot_state['progress']:.1f}%)"
+        progress = (current / total) * 100
+        update_state(
+            progress=progress,
+            messages_sent=current,
+            status=f"Enviando: {current}/{total} ({progress:.1f}%)"
+        )
 
 def create_templates():
     """Crea los templates HTML si no existen"""
@@ -397,8 +506,16 @@ def create_templates():
     </div>
     
     <script>
-        // Actualizar estado cada 2 segundos
-        setInterval(updateStatus, 2000);
+        // Recibir cambios del servidor; sin EventSource se consulta /api/status
+        let state = {};
+        let etag = null;
+        let logCursor = 0;
+        if (window.EventSource) {
+            const events = new EventSource('/api/events');
+            events.onmessage = (event) => applyChanges(JSON.parse(event.data));
+        } else {
+            setInterval(updateStatus, 2000);
+        }
         
         // Manejar subida de archivo
         document.getElementById('fileInput').addEventListener('change', uploadFile);
@@ -461,36 +578,54 @@ def create_templates():
         
         function clearLog() {
             fetch('/api/clear_log', {method: 'POST'})
-            .then(() => updateStatus());
+            .then(() => {
+                // Con EventSource el servidor avisa la limpieza por el stream
+                if (!window.EventSource) document.getElementById('logContainer').innerHTML = '';
+            });
         }
         
         function updateStatus() {
-            fetch('/api/status')
-            .then(response => response.json())
+            const headers = etag ? {'If-None-Match': etag} : {};
+            fetch(`/api/status?since=${logCursor}`, {headers})
+            .then(response => {
+                if (response.status === 304) return null;
+                etag = response.headers.get('ETag');
+                return response.json();
+            })
             .then(data => {
-                // Actualizar estado
-                document.getElementById('status').textContent = 'Estado: ' + data.status;
-                
-                // Actualizar progreso
-                document.getElementById('progressBar').style.width = data.progress + '%';
-                document.getElementById('progressText').textContent = 
-                    `${data.messages_sent}/${data.messages_total} (${data.progress.toFixed(1)}%)`;
-                
-                // Actualizar botones
-                document.getElementById('startBtn').disabled = data.is_running || data.contacts_valid === 0;
-                document.getElementById('stopBtn').disabled = !data.is_running;
-                
-                // Actualizar log
-                const logContainer = document.getElementById('logContainer');
-                logContainer.innerHTML = '';
-                data.log_messages.forEach(log => {
-                    const div = document.createElement('div');
-                    div.className = `log-entry log-${log.css_class}`;
-                    div.textContent = `[${log.timestamp}] ${log.icon} ${log.message}`;
-                    logContainer.appendChild(div);
-                });
-                logContainer.scrollTop = logContainer.scrollHeight;
+                if (!data) return;
+                // Un cursor menor al anterior indica que el servidor se reinició
+                data.log_reset = logCursor === 0 || data.log_cursor < logCursor;
+                logCursor = data.log_cursor;
+                applyChanges(data);
+            });
+        }
+        
+        function applyChanges(changes) {
+            Object.assign(state, changes);
+            
+            // Actualizar estado
+            document.getElementById('status').textContent = 'Estado: ' + state.status;
+            
+            // Actualizar progreso
+            document.getElementById('progressBar').style.width = state.progress + '%';
+            document.getElementById('progressText').textContent = 
+                `${state.messages_sent}/${state.messages_total} (${state.progress.toFixed(1)}%)`;
+            
+            // Actualizar botones
+            document.getElementById('startBtn').disabled = state.is_running || state.contacts_valid === 0;
+            document.getElementById('stopBtn').disabled = !state.is_running;
+            
+            // Agregar solo los mensajes de log nuevos
+            const logContainer = document.getElementById('logContainer');
+            if (changes.log_reset) logContainer.innerHTML = '';
+            (changes.log_messages || []).forEach(log => {
+                const div = document.createElement('div');
+                div.className = `log-entry log-${log.css_class}`;
+                div.textContent = `[${log.timestamp}] ${log.icon} ${log.message}`;
+                logContainer.appendChild(div);
             });
+            logContainer.scrollTop = logContainer.scrollHeight;
         }
     </script>
 </body>
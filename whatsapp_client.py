@@ -2,37 +2,185 @@
 Cliente de WhatsApp usando Selenium para automatizar WhatsApp Web
 """
 
+import itertools
+import threading
 import time
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
+from pathlib import Path
 from selenium.common.exceptions import (
     TimeoutException, 
     NoSuchElementException, 
     WebDriverException,
-    ElementNotInteractableException
+    ElementNotInteractableException,
+    ElementClickInterceptedException,
+    StaleElementReferenceException,
+    InvalidSessionIdException,
+    NoSuchWindowException
 )
-from webdriver_manager.chrome import ChromeDriverManager
-from typing import Optional, Dict
+from enum import Enum
+from typing import TYPE_CHECKING, Callable, Optional, Dict, Set
 import config
+import instrumentation
 import logger
 import utils
 
+if TYPE_CHECKING:
+    # selenium.webdriver y webdriver_manager se importan al abrir el navegador
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+
+
+class FailureKind(str, Enum):
+    """
+    Clasificación de los fallos de envío.
+    """
+    TRANSIENT = "transient"  # Reintentable: timeouts, elementos obsoletos, etc.
+    INVALID_NUMBER = "invalid_number"  # Permanente: número no registrado en WhatsApp
+    SESSION_LOST = "session_lost"  # El navegador o la sesión de WhatsApp Web se perdió
+    UNKNOWN = "unknown"
+
+
+# Fragmentos de mensajes de WebDriver que indican que la sesión ya no existe
+_SESSION_LOST_MARKERS = (
+    "invalid session id",
+    "session deleted",
+    "disconnected",
+    "chrome not reachable",
+    "target window already closed",
+    "no such window"
+)
+
+
+def classify_exception(error: Exception) -> FailureKind:
+    """
+    Clasifica una excepción de Selenium según si vale la pena reintentar.
+
+    Args:
+        error (Exception): Excepción capturada
+
+    Returns:
+        FailureKind: Tipo de fallo
+    """
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return FailureKind.SESSION_LOST
+
+    if isinstance(error, (TimeoutException, StaleElementReferenceException,
+                          ElementNotInteractableException, ElementClickInterceptedException,
+                          NoSuchElementException)):
+        return FailureKind.TRANSIENT
+
+    if isinstance(error, WebDriverException):
+        message = str(error).lower()
+        if any(marker in message for marker in _SESSION_LOST_MARKERS):
+            return FailureKind.SESSION_LOST
+        return FailureKind.UNKNOWN
+
+    if isinstance(error, (ConnectionError, OSError)) or type(error).__module__.startswith("urllib3"):
+        # El proceso de chromedriver dejó de responder
+        return FailureKind.SESSION_LOST
+
+    return FailureKind.UNKNOWN
+
+
+def create_chrome_driver(options: 'Options') -> 'webdriver.Chrome':
+    """
+    Crea el driver de Chrome, descargando chromedriver si no está configurado.
+
+    Args:
+        options (Options): Opciones de Chrome
+
+    Returns:
+        webdriver.Chrome: Driver listo para usar
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    if config.CHROME_DRIVER_PATH:
+        service = Service(config.CHROME_DRIVER_PATH)
+    else:
+        from webdriver_manager.chrome import ChromeDriverManager
+        service = Service(ChromeDriverManager().install())
+    return webdriver.Chrome(service=service, options=options)
+
+
+class ProfileSlots:
+    """
+    Reparte los perfiles de Chrome entre los navegadores abiertos del proceso.
+
+    Chrome no abre una segunda instancia sobre un --user-data-dir en uso,
+    así que cada campaña simultánea usa su propio perfil: el 0 es el
+    configurado y el n, el mismo con el sufijo _n. Cada perfil conserva su
+    sesión de WhatsApp Web entre campañas (la primera vez pide el QR).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._used: Set[int] = set()
+
+    def acquire(self) -> int:
+        """
+        Reserva el perfil libre de menor número.
+
+        Returns:
+            int: Número de perfil
+        """
+        with self._lock:
+            slot = next(i for i in itertools.count() if i not in self._used)
+            self._used.add(slot)
+            return slot
+
+    def release(self, slot: int):
+        with self._lock:
+            self._used.discard(slot)
+
+    @staticmethod
+    def path(slot: int) -> Optional[Path]:
+        """
+        Directorio de un perfil.
+
+        Args:
+            slot (int): Número de perfil
+
+        Returns:
+            Optional[Path]: Directorio, o None si Chrome usa un perfil temporal
+        """
+        if config.CHROME_USER_DATA_DIR:
+            base = Path(config.CHROME_USER_DATA_DIR)
+        elif config.CHROME_PERSIST_SESSION:
+            base = Path(config.CHROME_SESSION_DIR)
+        else:
+            return None
+        return base if slot == 0 else base.with_name(f"{base.name}_{slot}")
+
+
+# Perfiles de los navegadores de este proceso (las campañas con navegador corren en uno solo)
+profile_slots = ProfileSlots()
+
 
 class WhatsAppClient:
     """
     Cliente para interactuar con WhatsApp Web usando Selenium.
+
+    El driver, las pausas tras cada acción y los tiempos de espera se pueden
+    reemplazar, por ejemplo para correr contra fake_whatsapp.FakeWebDriver.
     """
     
-    def __init__(self):
+    def __init__(self, driver_factory: Optional[Callable[['Options'], object]] = None,
+                 settle_delays: Optional[Dict[str, float]] = None,
+                 element_timeout: float = config.TIMEOUT_ELEMENT_WAIT,
+                 poll_frequency: float = config.ELEMENT_POLL_FREQUENCY):
+        self.driver_factory = driver_factory or create_chrome_driver
+        self.settle_delays = dict(config.SETTLE_DELAYS, **(settle_delays or {}))
+        self.element_timeout = element_timeout
+        self.poll_frequency = poll_frequency
         self.driver = None
         self.wait = None
         self.is_authenticated = False
+        self.last_failure: Optional[FailureKind] = None  # Tipo del último fallo de envío
+        self.last_failure_detail = ""
+        self.profile_slot: Optional[int] = None  # Perfil de Chrome reservado mientras el navegador está abierto
     
+    @instrumentation.timed("start_browser")
     def start_browser(self) -> bool:
         """
         Inicia el navegador Chrome y carga WhatsApp Web.
@@ -41,6 +189,8 @@ class WhatsAppClient:
             bool: True si el navegador se inició correctamente
         """
         try:
+            from selenium.webdriver.chrome.options import Options
+
             logger.log_info("Iniciando navegador Chrome...")
             
             # Configurar opciones de Chrome
@@ -50,25 +200,25 @@ class WhatsAppClient:
             for option in config.CHROME_OPTIONS:
                 chrome_options.add_argument(option)
             
-            # Configurar perfil de usuario si se especifica
-            if config.CHROME_USER_DATA_DIR:
-                chrome_options.add_argument(f"--user-data-dir={config.CHROME_USER_DATA_DIR}")
+            # Configurar perfil de usuario si se especifica; si no, usar el
+            # perfil persistente para poder recuperar la sesión tras un reinicio.
+            # Un reinicio conserva el perfil reservado
+            if self.profile_slot is None:
+                self.profile_slot = profile_slots.acquire()
+            user_data_dir = profile_slots.path(self.profile_slot)
+            if user_data_dir is not None:
+                utils.ensure_directory_exists(user_data_dir)
+                chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
             
             if config.CHROME_PROFILE_PATH:
                 chrome_options.add_argument(f"--profile-directory={config.CHROME_PROFILE_PATH}")
             
-            # Configurar servicio del driver
-            if config.CHROME_DRIVER_PATH:
-                service = Service(config.CHROME_DRIVER_PATH)
-            else:
-                service = Service(ChromeDriverManager().install())
-            
             # Inicializar driver
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.wait = WebDriverWait(self.driver, config.TIMEOUT_ELEMENT_WAIT)
+            self.driver = self.driver_factory(chrome_options)
+            self.wait = self._create_wait(self.element_timeout)
             
             # Configurar timeouts
-            self.driver.implicitly_wait(config.TIMEOUT_ELEMENT_WAIT)
+            self.driver.implicitly_wait(self.element_timeout)
             self.driver.set_page_load_timeout(config.TIMEOUT_PAGE_LOAD)
             
             # Cargar WhatsApp Web
@@ -79,8 +229,10 @@ class WhatsAppClient:
             
         except Exception as e:
             logger.log_error("Error al iniciar el navegador", e)
+            self._release_profile()
             return False
     
+    @instrumentation.timed("wait_for_qr_scan")
     def wait_for_qr_scan(self) -> bool:
         """
         Espera a que el usuario escanee el código QR.
@@ -88,18 +240,20 @@ class WhatsAppClient:
         Returns:
             bool: True si el escaneo fue exitoso
         """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+
         try:
             logger.log_qr_scan_start()
             print(config.MESSAGES["qr_scan_prompt"])
             
             # Esperar a que aparezca el panel lateral (indica que se escaneó el QR)
-            self.wait = WebDriverWait(self.driver, config.TIMEOUT_QR_SCAN)
-            self.wait.until(
+            self._create_wait(config.TIMEOUT_QR_SCAN).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, config.SELECTORS["side_panel"]))
             )
             
             # Esperar un poco más para asegurar que la página cargue completamente
-            time.sleep(3)
+            self._settle("authenticated")
             
             self.is_authenticated = True
             logger.log_qr_scan_success()
@@ -115,6 +269,7 @@ class WhatsAppClient:
             logger.log_error("Error durante el escaneo del código QR", e)
             return False
     
+    @instrumentation.timed("search_contact")
     def search_contact(self, phone_number: str) -> bool:
         """
         Busca un contacto por número de teléfono.
@@ -125,6 +280,10 @@ class WhatsAppClient:
         Returns:
             bool: True si el contacto fue encontrado
         """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support import expected_conditions as EC
+
         try:
             # Buscar la caja de búsqueda
             search_box = self.wait.until(
@@ -133,15 +292,15 @@ class WhatsAppClient:
             
             # Limpiar la caja de búsqueda
             search_box.clear()
-            time.sleep(0.5)
+            self._settle("search_cleared")
             
             # Escribir el número de teléfono
             search_box.send_keys(phone_number)
-            time.sleep(2)
+            self._settle("search_typed")
             
             # Presionar Enter para buscar
             search_box.send_keys(Keys.ENTER)
-            time.sleep(3)
+            self._settle("search_submitted")
             
             # Verificar si se encontró el contacto
             try:
@@ -158,18 +317,23 @@ class WhatsAppClient:
                         By.CSS_SELECTOR, config.SELECTORS["invalid_number"]
                     )
                     if invalid_number_popup.is_displayed():
+                        self._set_failure(FailureKind.INVALID_NUMBER, "Número no registrado en WhatsApp")
                         logger.log_warning(f"Número inválido o no registrado en WhatsApp: {phone_number}")
                         return False
                 except NoSuchElementException:
                     pass
                 
+                # El chat no llegó a abrirse a tiempo: puede deberse a lentitud
+                self._set_failure(FailureKind.TRANSIENT, "El chat no se abrió a tiempo")
                 logger.log_warning(f"No se pudo encontrar el contacto: {phone_number}")
                 return False
                 
         except Exception as e:
+            self._set_failure(classify_exception(e), str(e))
             logger.log_error(f"Error al buscar contacto {phone_number}", e)
             return False
     
+    @instrumentation.timed("send_message")
     def send_message(self, message: str) -> bool:
         """
         Envía un mensaje al chat actualmente abierto.
@@ -180,6 +344,9 @@ class WhatsAppClient:
         Returns:
             bool: True si el mensaje fue enviado exitosamente
         """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+
         try:
             # Buscar la caja de mensaje
             message_box = self.wait.until(
@@ -188,11 +355,11 @@ class WhatsAppClient:
             
             # Limpiar la caja de mensaje
             message_box.clear()
-            time.sleep(0.5)
+            self._settle("message_cleared")
             
             # Escribir el mensaje
             message_box.send_keys(message)
-            time.sleep(1)
+            self._settle("message_typed")
             
             # Buscar y hacer clic en el botón de enviar
             send_button = self.wait.until(
@@ -201,11 +368,12 @@ class WhatsAppClient:
             send_button.click()
             
             # Esperar un momento para que se envíe el mensaje
-            time.sleep(config.TIMEOUT_MESSAGE_SEND)
+            self._settle("message_sent")
             
             return True
             
         except Exception as e:
+            self._set_failure(classify_exception(e), str(e))
             logger.log_error(f"Error al enviar mensaje: {message[:50]}...", e)
             return False
     
@@ -220,6 +388,9 @@ class WhatsAppClient:
         Returns:
             bool: True si el mensaje fue enviado exitosamente
         """
+        self.last_failure = None
+        self.last_failure_detail = ""
+
         try:
             # Buscar el contacto
             if not self.search_contact(phone_number):
@@ -229,8 +400,36 @@ class WhatsAppClient:
             return self.send_message(message)
             
         except Exception as e:
+            self._set_failure(classify_exception(e), str(e))
             logger.log_error(f"Error al enviar mensaje a {phone_number}", e)
             return False
+
+    def _create_wait(self, timeout: float) -> 'WebDriverWait':
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        return WebDriverWait(self.driver, timeout, poll_frequency=self.poll_frequency)
+
+    def _settle(self, step: str):
+        """
+        Pausa tras una acción para que la página la procese.
+
+        Args:
+            step (str): Clave de settle_delays
+        """
+        delay = self.settle_delays.get(step, 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _set_failure(self, kind: FailureKind, detail: str = ""):
+        """
+        Registra el motivo del fallo del envío en curso.
+
+        Args:
+            kind (FailureKind): Tipo de fallo
+            detail (str): Descripción del error
+        """
+        self.last_failure = kind
+        self.last_failure_detail = utils.truncate_string(detail.split("\n")[0], 200)
     
     def is_browser_running(self) -> bool:
         """
@@ -250,6 +449,47 @@ class WhatsAppClient:
         except WebDriverException:
             return False
     
+    def is_browser_process_alive(self) -> bool:
+        """
+        Verifica localmente que el proceso de chromedriver siga vivo, sin
+        hacer una llamada a WebDriver.
+
+        Returns:
+            bool: False si el driver no existe o su proceso terminó
+        """
+        if self.driver is None:
+            return False
+
+        process = getattr(getattr(self.driver, 'service', None), 'process', None)
+        if process is None:
+            return True
+        return process.poll() is None
+
+    def restart_browser(self) -> bool:
+        """
+        Reinicia el navegador y restaura la sesión de WhatsApp Web.
+
+        Con el perfil persistido la sesión se recupera sin escanear el QR;
+        en caso contrario se vuelve a esperar el escaneo.
+
+        Returns:
+            bool: True si el navegador quedó autenticado nuevamente
+        """
+        logger.log_warning("Reiniciando el navegador para recuperar la sesión...")
+
+        try:
+            if self.driver:
+                self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
+        self.wait = None
+        self.is_authenticated = False
+
+        if not self.start_browser():
+            return False
+        return self.wait_for_qr_scan()
+
     def close_browser(self):
         """
         Cierra el navegador y limpia los recursos.
@@ -264,6 +504,13 @@ class WhatsAppClient:
                 
         except Exception as e:
             logger.log_error("Error al cerrar el navegador", e)
+        finally:
+            self._release_profile()
+
+    def _release_profile(self):
+        if self.profile_slot is not None:
+            profile_slots.release(self.profile_slot)
+            self.profile_slot = None
     
     def get_current_chat_title(self) -> Optional[str]:
         """
@@ -272,6 +519,8 @@ class WhatsAppClient:
         Returns:
             Optional[str]: Título del chat o None si no se puede obtener
         """
+        from selenium.webdriver.common.by import By
+
         try:
             chat_header = self.driver.find_element(
                 By.CSS_SELECTOR, config.SELECTORS["chat_header"]
@@ -294,7 +543,7 @@ class WhatsAppClient:
         """
         try:
             if self.driver:
-                screenshot_path = config.LOGS_DIR / f"{filename}_{utils.get_timestamp_filename()}.png"
+                screenshot_path = utils.ensure_directory_exists(config.LOGS_DIR) / f"{filename}_{utils.get_timestamp_filename()}.png"
                 self.driver.save_screenshot(str(screenshot_path))
                 logger.log_info(f"Captura de pantalla guardada: {screenshot_path}")
                 return True
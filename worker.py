@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Worker del navegador: ejecuta las campañas fuera del servidor web
+
+El proceso web (con BROWSER_WORKER=1) no abre navegadores: guarda cada
+campaña en el estado compartido y le envía un comando a este proceso, que
+la ejecuta con su propio JobManager y publica los eventos de vuelta. Así
+las llamadas bloqueantes de Selenium y el parseo con pandas no comparten
+el proceso (ni el monkey-patching de gevent) con las peticiones HTTP.
+
+Uso: python -m worker [--concurrency N]
+"""
+
+import argparse
+import signal
+import threading
+from typing import Any, Dict, Optional
+
+import config
+import logger
+from job_manager import JobManager
+from shared_state import SharedStateStore
+from upload_store import UploadStore
+
+
+class BrowserWorker:
+    """
+    Ejecuta las campañas que le envían los procesos web.
+
+    Los procesos web solo le hablan a través de SharedStateStore: comandos
+    (submit, pause, resume, cancel, profile) hacia el worker y eventos de las
+    campañas desde el worker.
+    """
+
+    def __init__(self, store: Optional[SharedStateStore] = None,
+                 max_workers: int = config.MAX_CONCURRENT_JOBS, bot_factory=None,
+                 upload_store: Optional[UploadStore] = None,
+                 worker_id: str = config.BROWSER_WORKER_ID):
+        self.store = store or SharedStateStore()
+        self.upload_store = upload_store or UploadStore()
+        self.job_manager = JobManager(max_workers=max_workers, bot_factory=bot_factory,
+                                      store=self.store, worker_id=worker_id,
+                                      upload_store=self.upload_store)
+        self.job_manager.forward_events()
+        self.job_manager.events.subscribe(self._release_upload)
+        self._stopped = threading.Event()
+
+    def _release_upload(self, event: str, data: Dict[str, Any]):
+        """
+        Libera el archivo subido de una campaña terminada (el proceso web lo
+        protegió al crearla).
+        """
+        if event != 'job_update' or data['kind'] != 'campaign' or data['state'] not in ('done', 'failed', 'cancelled'):
+            return
+        job = self.job_manager.get(data['id'])
+        sha256 = self.upload_store.hash_of(job.filepath) if job else None
+        if sha256 is not None:
+            self.upload_store.unpin(sha256, job.id)
+
+    def run(self, poll_interval: float = config.BROWSER_WORKER_POLL_INTERVAL):
+        """
+        Atiende comandos hasta que se llame a stop(); al salir cancela las
+        campañas en curso y espera a que terminen.
+
+        Args:
+            poll_interval (float): Segundos entre lecturas de los comandos
+        """
+        logger.log_info(f"Worker del navegador iniciado ({self.job_manager.worker_id}, "
+                        f"{self.job_manager.max_workers} campañas simultáneas)")
+        self.job_manager.sweep_pins()
+        self.job_manager.start_coordination(poll_interval)
+        while not self._stopped.wait(1):
+            pass
+
+        logger.log_info("Deteniendo el worker del navegador...")
+        self.job_manager.shutdown(wait=True)
+        logger.log_info("Worker del navegador detenido")
+
+    def stop(self):
+        """
+        Pide que run() termine.
+        """
+        self._stopped.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Worker del navegador del bot de WhatsApp')
+    parser.add_argument('--concurrency', type=int, default=config.MAX_CONCURRENT_JOBS,
+                        help='Campañas ejecutándose a la vez')
+    args = parser.parse_args(argv)
+
+    worker = BrowserWorker(max_workers=args.concurrency)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()